@@ -49,9 +49,29 @@ class JobHabilidadRequeridaAdmin(admin.ModelAdmin):
     search_fields = ('job__name', 'habilidad__nombre')
     autocomplete_fields = ('job', 'habilidad')
 
+class JobCandidateMatchAdmin(admin.ModelAdmin):
+    list_display = ('job', 'candidato', 'score', 'percentage', 'missing_essentials', 'vacancies', 'updated_at')
+    list_select_related = ('job__company', 'candidato__user')
+    search_fields = ('job__name', 'candidato__user__email')
+    raw_id_fields = ('job', 'candidato')
+
+class RecommendationRunAdmin(admin.ModelAdmin):
+    list_display = ('started_at', 'finished_at', 'duration_seconds', 'pairs_evaluated', 'recommendations', 'candidates', 'jobs')
+    readonly_fields = [f.name for f in RecommendationRun._meta.fields]
+
+class JobRecommendationAdmin(admin.ModelAdmin):
+    list_display = ('job', 'candidato', 'score', 'skill_percentage', 'missing_essentials', 'distance_km', 'vacancies', 'run')
+    list_select_related = ('job__company', 'candidato__user', 'run')
+    list_filter = ('run',)
+    search_fields = ('job__name', 'candidato__user__email')
+    raw_id_fields = ('job', 'candidato', 'run')
+
 admin.site.register(Location, LocationAdmin)
 admin.site.register(Company)
 admin.site.register(Job, JobAdmin)
 admin.site.register(Employer, EmployerAdmin)
 admin.site.register(Habilidad, HabilidadAdmin)
 admin.site.register(JobHabilidadRequerida, JobHabilidadRequeridaAdmin)
+admin.site.register(JobCandidateMatch, JobCandidateMatchAdmin)
+admin.site.register(RecommendationRun, RecommendationRunAdmin)
+admin.site.register(JobRecommendation, JobRecommendationAdmin)
@@ -0,0 +1,105 @@
+"""
+Búsqueda de empleos por cercanía.
+
+Primero se acota la búsqueda con un rectángulo (bounding box) de latitud y
+longitud alrededor del punto, que la base de datos resuelve con el índice
+de Location (address_lat, address_lng); después se calcula la distancia
+exacta (haversine) con numpy solo sobre esa lista corta y se descartan las
+esquinas del rectángulo que quedan fuera del radio.
+"""
+import math
+
+import numpy as np
+
+EARTH_RADIUS_KM = 6371.0
+# Kilómetros por grado de latitud (constante en toda la Tierra)
+KM_PER_DEGREE = math.pi * EARTH_RADIUS_KM / 180
+
+
+def calculate_distance(lat1, lng1, lat2, lng2):
+    """
+    Calculate the great circle distance between two points 
+    on the earth (specified in decimal degrees).
+    Returns distance in kilometers.
+    """
+    if None in [lat1, lng1, lat2, lng2]:
+        return None
+    
+    # Convert decimal degrees to radians
+    lat1, lng1, lat2, lng2 = map(math.radians, [float(lat1), float(lng1), float(lat2), float(lng2)])
+    
+    # Haversine formula
+    dlat = lat2 - lat1
+    dlng = lng2 - lng1
+    a = math.sin(dlat/2)**2 + math.cos(lat1) * math.cos(lat2) * math.sin(dlng/2)**2
+    c = 2 * math.asin(math.sqrt(a))
+    
+    # Radius of earth in kilometers
+    r = 6371
+    return c * r
+
+
+def bounding_box(lat, lng, radius_km):
+    """
+    Rectángulo `(min_lat, max_lat, min_lng, max_lng)` que contiene el círculo
+    de `radius_km` alrededor del punto. `min_lng`/`max_lng` son None cuando el
+    círculo toca un polo o cruza el antimeridiano; en ese caso solo se puede
+    acotar por latitud.
+    """
+    delta_lat = radius_km / KM_PER_DEGREE
+    min_lat, max_lat = lat - delta_lat, lat + delta_lat
+    if min_lat <= -90 or max_lat >= 90:
+        return max(min_lat, -90.0), min(max_lat, 90.0), None, None
+
+    # Un grado de longitud mide cos(lat) veces lo que uno de latitud; se usa
+    # la latitud del borde más cercano al polo para no recortar el círculo
+    widest = max(abs(min_lat), abs(max_lat))
+    delta_lng = radius_km / (KM_PER_DEGREE * math.cos(math.radians(widest)))
+    min_lng, max_lng = lng - delta_lng, lng + delta_lng
+    if min_lng < -180 or max_lng > 180:
+        return min_lat, max_lat, None, None
+    return min_lat, max_lat, min_lng, max_lng
+
+
+def haversine_km(lat, lng, lats, lngs):
+    """Distancia en km desde el punto a cada par de `lats`/`lngs` (arreglos)."""
+    return haversine_pairs_km(lat, lng, lats, lngs)
+
+
+def haversine_pairs_km(lats1, lngs1, lats2, lngs2):
+    """Distancia en km entre pares de puntos (escalares o arreglos del mismo tamaño)."""
+    lat1 = np.radians(np.asarray(lats1, dtype=float))
+    lng1 = np.radians(np.asarray(lngs1, dtype=float))
+    lat2 = np.radians(np.asarray(lats2, dtype=float))
+    lng2 = np.radians(np.asarray(lngs2, dtype=float))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lng2 - lng1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+def bounding_box_filter(lat, lng, radius_km, prefix='location__'):
+    """Lookups de Django para el rectángulo, sobre `address_lat`/`address_lng`."""
+    min_lat, max_lat, min_lng, max_lng = bounding_box(lat, lng, radius_km)
+    lookups = {f'{prefix}address_lat__range': (min_lat, max_lat)}
+    if min_lng is not None:
+        lookups[f'{prefix}address_lng__range'] = (min_lng, max_lng)
+    return lookups
+
+
+def within_radius(queryset, lat, lng, radius_km, prefix='location__'):
+    """
+    IDs del queryset a `radius_km` o menos del punto, ordenados por distancia:
+    `[(id, distancia_km), ...]`. Los registros sin coordenadas se ignoran.
+    """
+    rows = list(
+        queryset.filter(**bounding_box_filter(lat, lng, radius_km, prefix))
+        .order_by()
+        .values_list('pk', f'{prefix}address_lat', f'{prefix}address_lng')
+    )
+    if not rows:
+        return []
+
+    ids, lats, lngs = zip(*rows)
+    distances = haversine_km(lat, lng, lats, lngs)
+    inside = np.flatnonzero(distances <= radius_km)
+    order = inside[np.lexsort((np.asarray(ids)[inside], distances[inside]))]
+    return [(ids[i], float(distances[i])) for i in order]
@@ -0,0 +1,155 @@
+import random
+import time
+import uuid
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from rest_framework.test import APIClient
+
+from agencia.models import Job
+from agencia.serializers import ASSIGNED_COMMENTS_PREVIEW
+from candidatos.models import JobHistory, JobHistoryComment, UserProfile
+
+from .benchmark_skill_matching import count_queries
+
+User = get_user_model()
+
+# Consultas máximas de /api/agencia/jobs/<id>/assigned-candidates/ (empleo,
+# habilidades, candidatos, historiales y comentarios) sin importar el tamaño
+QUERY_BUDGET = 5
+
+
+class Command(BaseCommand):
+    help = (
+        'Verifica el presupuesto de consultas del detalle de empleo con candidatos '
+        'asignados (constante aunque crezca el número de contrataciones) y la '
+        'paginación por cursor del historial de comentarios, contra el cálculo '
+        'anterior por candidato. Todos los datos se revierten al terminar.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', default='10,100', help='Candidatos asignados por empleo, separados por coma')
+        parser.add_argument('--max-comments', type=int, default=30)
+        parser.add_argument('--seed', type=int, default=5)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        sizes = [int(size) for size in options['sizes'].split(',')]
+        failures = []
+
+        with transaction.atomic():
+            tag = uuid.uuid4().hex[:8]
+            staff = User.objects.create(
+                id=uuid.uuid4(), email=f"staff-{tag}@benchmark.invalid", password='!', is_staff=True
+            )
+            client = APIClient(SERVER_NAME='localhost')
+            client.force_authenticate(staff)
+
+            header = f"{'candidatos':>10} {'comentarios':>12} {'consultas':>10} {'ms':>8} {'consultas ant.':>15} {'ms ant.':>8}"
+            self.stdout.write(header)
+            self.stdout.write('-' * len(header))
+            for size in sizes:
+                job, total_comments = self._create_job(size, options['max_comments'], staff, rng, tag)
+                url = f'/api/agencia/jobs/{job.pk}/assigned-candidates/'
+                with count_queries() as queries:
+                    start = time.perf_counter()
+                    response = client.get(url)
+                    elapsed = time.perf_counter() - start
+                if response.status_code != 200:
+                    raise CommandError(f"{url} respondió {response.status_code}")
+
+                with count_queries() as legacy_queries:
+                    start = time.perf_counter()
+                    expected = self._legacy(job)
+                    legacy_elapsed = time.perf_counter() - start
+
+                self.stdout.write(
+                    f"{size:>10} {total_comments:>12} {queries[0]:>10} {elapsed * 1000:>8.1f} "
+                    f"{legacy_queries[0]:>15} {legacy_elapsed * 1000:>8.1f}"
+                )
+                if queries[0] > QUERY_BUDGET:
+                    failures.append(f"{size} candidatos: {queries[0]} consultas (presupuesto {QUERY_BUDGET})")
+
+                got = {
+                    c['id']: ([m['id'] for m in c['current_job_history_comments']], c['current_job_history_comments_count'])
+                    for c in response.json()['assigned_candidates']
+                }
+                expected = {
+                    pk: ([m['id'] for m in comments][:ASSIGNED_COMMENTS_PREVIEW], len(comments))
+                    for pk, comments in expected.items()
+                }
+                if {str(pk): v for pk, v in expected.items()} != got:
+                    failures.append(f"{size} candidatos: comentarios distintos al cálculo anterior")
+
+                failures += self._check_history_pages(client, job)
+
+            transaction.set_rollback(True)
+
+        if failures:
+            raise CommandError('; '.join(failures))
+        self.stdout.write(self.style.SUCCESS(
+            f"Presupuesto de {QUERY_BUDGET} consultas respetado; historial paginado completo y sin duplicados"
+        ))
+
+    def _create_job(self, size, max_comments, author, rng, tag):
+        job = Job.objects.create(name=f"bench-{tag}-{size}", vacancies=size)
+        users = [
+            User(id=uuid.uuid4(), email=f"asignado{size}-{i}-{tag}@benchmark.invalid", password='!',
+                 first_name='Candidato', last_name=str(i))
+            for i in range(size)
+        ]
+        User.objects.bulk_create(users)
+        UserProfile.objects.bulk_create(
+            [UserProfile(user=user, agency_state='Emp', current_job=job) for user in users]
+        )
+        histories = JobHistory.objects.bulk_create(
+            [JobHistory(candidate_id=user.pk, job=job) for user in users]
+        )
+        comments = [
+            JobHistoryComment(job_history=history, comment_text=f"Comentario {n}", author=author)
+            for history in histories
+            for n in range(rng.randint(0, max_comments))
+        ]
+        JobHistoryComment.objects.bulk_create(comments)
+        return job, len(comments)
+
+    def _check_history_pages(self, client, job):
+        """Recorre el historial más largo del empleo página por página."""
+        history = JobHistory.objects.filter(job=job).order_by('-id').first()
+        if history is None:
+            return []
+        expected = list(
+            JobHistoryComment.objects.filter(job_history=history).order_by('-created_at', '-id').values_list('id', flat=True)
+        )
+        seen, pages, max_queries = [], 0, 0
+        url = f'/api/candidatos/employment/comments/{history.pk}/?page_size=7'
+        while url:
+            with count_queries() as queries:
+                response = client.get(url)
+            if response.status_code != 200:
+                return [f"historial {history.pk}: la página respondió {response.status_code}"]
+            data = response.json()
+            seen += [comment['id'] for comment in data['results']]
+            url, pages = data['next'], pages + 1
+            max_queries = max(max_queries, queries[0])
+        self.stdout.write(
+            f"  historial {history.pk}: {len(seen)} comentarios en {pages} páginas, máx. {max_queries} consultas por página"
+        )
+        return [] if seen == expected else [f"historial {history.pk}: el recorrido por cursor no coincide"]
+
+    def _legacy(self, job):
+        """Recorrido anterior de get_assigned_candidates: dos consultas por candidato."""
+        result = {}
+        for candidate in UserProfile.objects.filter(current_job=job, agency_state='Emp').select_related('user'):
+            current_history = JobHistory.objects.filter(candidate=candidate, job=job, end_date__isnull=True).first()
+            comments = []
+            if current_history:
+                comments = [
+                    {'id': comment.id, 'author_name': f"{comment.author.first_name} {comment.author.last_name}"}
+                    for comment in JobHistoryComment.objects.filter(
+                        job_history=current_history
+                    ).select_related('author').order_by('-created_at', '-id')
+                ]
+            result[candidate.user_id] = comments
+        return result
@@ -0,0 +1,109 @@
+import random
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from agencia.geo import bounding_box_filter, calculate_distance, within_radius
+from agencia.models import Job, Location
+
+# Centros urbanos aproximados para agrupar las ubicaciones sintéticas
+CITIES = [
+    (19.4326, -99.1332), (20.6597, -103.3496), (25.6866, -100.3161), (19.0414, -98.2063),
+    (21.1619, -86.8515), (32.5149, -117.0382), (20.9674, -89.5926), (21.8853, -102.2916),
+    (22.1565, -100.9855), (20.5888, -100.3899), (16.7569, -93.1292), (17.0732, -96.7266),
+    (28.6330, -106.0691), (29.0729, -110.9559), (24.8091, -107.3940), (19.1738, -96.1342),
+]
+# Rectángulo aproximado de México para las ubicaciones dispersas
+MEXICO_BOX = (14.5, 32.7, -118.4, -86.7)
+
+
+class Command(BaseCommand):
+    help = (
+        'Genera ubicaciones y empleos sintéticos (100,000 por defecto) y compara la '
+        'búsqueda por cercanía con rectángulo + distancia exacta contra el recorrido '
+        'completo anterior. Todos los datos se revierten al terminar.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--locations', type=int, default=100_000)
+        parser.add_argument('--queries', type=int, default=20)
+        parser.add_argument('--legacy-queries', type=int, default=3)
+        parser.add_argument('--radii', default='5,25,50,100', help='Radios en km separados por coma')
+        parser.add_argument('--seed', type=int, default=3)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        radii = [float(r) for r in options['radii'].split(',')]
+
+        with transaction.atomic():
+            start = time.perf_counter()
+            self._create_data(options['locations'], rng)
+            total = Job.objects.filter(location__address_lat__isnull=False).count()
+            self.stdout.write(f"Empleos con ubicación: {total} ({time.perf_counter() - start:.1f}s)")
+
+            points = [self._point(rng) for _ in range(options['queries'])]
+            plan = Job.objects.filter(**bounding_box_filter(*points[0], radii[0])).values('pk').explain()
+            self.stdout.write(f"Plan del rectángulo: {' | '.join(plan.splitlines())}")
+
+            header = f"{'radio':>7} {'rectángulo':>11} {'% tabla':>8} {'resultado':>10} {'ms':>8} {'ms anterior':>12}"
+            self.stdout.write(header)
+            self.stdout.write('-' * len(header))
+            mismatches = 0
+            for radius in radii:
+                shortlist, found, elapsed = [], [], []
+                for lat, lng in points:
+                    shortlist.append(Job.objects.filter(**bounding_box_filter(lat, lng, radius)).count())
+                    start = time.perf_counter()
+                    found.append(within_radius(Job.objects.all(), lat, lng, radius))
+                    elapsed.append(time.perf_counter() - start)
+
+                legacy_elapsed = []
+                for (lat, lng), result in list(zip(points, found))[:options['legacy_queries']]:
+                    start = time.perf_counter()
+                    expected = self._legacy(lat, lng, radius)
+                    legacy_elapsed.append(time.perf_counter() - start)
+                    if expected != {job_id for job_id, _ in result}:
+                        mismatches += 1
+
+                avg_shortlist = statistics.mean(shortlist)
+                self.stdout.write(
+                    f"{radius:>5.0f}km {avg_shortlist:>11.0f} {avg_shortlist / max(total, 1) * 100:>7.2f}% "
+                    f"{statistics.mean(len(f) for f in found):>10.0f} {statistics.mean(elapsed) * 1000:>8.1f} "
+                    f"{statistics.mean(legacy_elapsed) * 1000 if legacy_elapsed else 0:>12.1f}"
+                )
+
+            transaction.set_rollback(True)
+        if mismatches:
+            raise CommandError(f"{mismatches} búsquedas con resultados distintos al recorrido completo")
+        self.stdout.write(self.style.SUCCESS('Resultados idénticos al recorrido completo'))
+
+    def _point(self, rng):
+        lat, lng = rng.choice(CITIES)
+        return lat + rng.gauss(0, 0.1), lng + rng.gauss(0, 0.1)
+
+    def _create_data(self, count, rng):
+        locations = []
+        for _ in range(count):
+            if rng.random() < 0.8:
+                lat, lng = rng.choice(CITIES)
+                lat, lng = lat + rng.gauss(0, 0.3), lng + rng.gauss(0, 0.3)
+            else:
+                lat, lng = rng.uniform(*MEXICO_BOX[:2]), rng.uniform(*MEXICO_BOX[2:])
+            locations.append(Location(alias='bench', address_lat=round(lat, 6), address_lng=round(lng, 6)))
+        locations = Location.objects.bulk_create(locations, batch_size=2000)
+        Job.objects.bulk_create(
+            [Job(name=f"Empleo {i}", location=location) for i, location in enumerate(locations)],
+            batch_size=2000,
+        )
+
+    def _legacy(self, lat, lng, radius):
+        """Recorrido anterior de JobViewSet: distancia en Python contra todos los empleos."""
+        found = set()
+        for job in Job.objects.select_related('location'):
+            if job.location and job.location.address_lat and job.location.address_lng:
+                distance = calculate_distance(lat, lng, job.location.address_lat, job.location.address_lng)
+                if distance is not None and distance <= radius:
+                    found.add(job.id)
+        return found
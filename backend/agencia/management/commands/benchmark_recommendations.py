@@ -0,0 +1,173 @@
+import random
+import time
+import uuid
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from agencia import recommendations
+from agencia.geo import calculate_distance
+from agencia.match_index import rebuild_match_index
+from agencia.models import Habilidad, Job, JobCandidateMatch, JobHabilidadRequerida, JobRecommendation, Location
+from candidatos.models import CandidatoHabilidadEvaluada, Domicile, UserProfile
+
+from .benchmark_job_proximity import CITIES
+from .benchmark_skill_matching import count_queries
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = (
+        'Genera candidatos con domicilio, empleos con ubicación y habilidades '
+        'sintéticas, reconstruye el índice de matching y mide el cálculo nocturno '
+        'de recomendaciones. Verifica algunos candidatos contra un cálculo directo '
+        'en Python. Todos los datos se revierten al terminar.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--candidates', type=int, default=5000)
+        parser.add_argument('--jobs', type=int, default=500)
+        parser.add_argument('--skills', type=int, default=200)
+        parser.add_argument('--skills-per-candidate', type=int, default=8)
+        parser.add_argument('--skills-per-job', type=int, default=6)
+        parser.add_argument('--check', type=int, default=5, help='Candidatos a verificar con el cálculo directo')
+        parser.add_argument('--seed', type=int, default=17)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        with transaction.atomic():
+            start = time.perf_counter()
+            candidatos = self._create_data(options, rng)
+            self.stdout.write(
+                f"Datos sintéticos: {len(candidatos)} candidatos, {options['jobs']} empleos "
+                f"({time.perf_counter() - start:.1f}s)"
+            )
+
+            # Solo cuentan los datos sintéticos; el índice se reconstruye completo
+            start = time.perf_counter()
+            pairs = rebuild_match_index()
+            self.stdout.write(f"Índice de matching: {pairs} pares en {time.perf_counter() - start:.1f}s")
+
+            with count_queries() as queries:
+                metrics = recommendations.generate_recommendations(stdout=self.stdout)
+            self.stdout.write(
+                f"Recomendaciones: {metrics['recommendations']} de {metrics['pairs_evaluated']} pares "
+                f"({metrics['candidates']} candidatos, {metrics['jobs']} empleos) en "
+                f"{metrics['duration_seconds']:.2f}s con {queries[0]} consultas"
+            )
+
+            # Una segunda ejecución reemplaza a la primera
+            metrics = recommendations.generate_recommendations()
+            self.stdout.write(
+                f"Segunda ejecución: {metrics['duration_seconds']:.2f}s, {metrics['deleted']} renglones anteriores borrados"
+            )
+
+            mismatches = 0
+            run = recommendations.current_run()
+            for candidato_id in rng.sample(candidatos, min(options['check'], len(candidatos))):
+                expected = self._direct(candidato_id)
+                got = [
+                    (r.job_id, r.score) for r in JobRecommendation.objects.filter(run=run, candidato_id=candidato_id)
+                ]
+                got_ids = {job_id for job_id, _ in got}
+                # Todo lo guardado debe coincidir; además debe estar el top del candidato
+                top = {job_id for job_id, _ in expected[:recommendations.RECOMENDACIONES_POR_CANDIDATO]}
+                scores = dict(expected)
+                if not top <= got_ids or any(abs(scores.get(job_id, -1) - score) > 0.01 for job_id, score in got):
+                    mismatches += 1
+                    self.stdout.write(self.style.ERROR(f"candidato {candidato_id}: recomendaciones distintas"))
+
+            transaction.set_rollback(True)
+        if mismatches:
+            raise CommandError(f"{mismatches} candidatos con diferencias contra el cálculo directo")
+        self.stdout.write(self.style.SUCCESS('Paridad: puntuaciones idénticas al cálculo directo'))
+
+    def _point(self, rng):
+        lat, lng = rng.choice(CITIES)
+        return round(lat + rng.gauss(0, 0.2), 6), round(lng + rng.gauss(0, 0.2), 6)
+
+    def _create_data(self, options, rng):
+        tag = uuid.uuid4().hex[:8]
+        habilidades = Habilidad.objects.bulk_create([
+            Habilidad(nombre=f"bench-{tag}-{i}", categoria=rng.choice(['tecnica', 'blanda', 'fisica']))
+            for i in range(options['skills'])
+        ])
+        niveles = [n for n, _ in CandidatoHabilidadEvaluada.NIVEL_COMPETENCIA_CHOICES]
+        importancias = [n for n, _ in JobHabilidadRequerida.NIVEL_IMPORTANCIA_CHOICES]
+
+        users = [
+            User(id=uuid.uuid4(), email=f"recom{i}-{tag}@benchmark.invalid", password='!',
+                 first_name='Candidato', last_name=str(i))
+            for i in range(options['candidates'])
+        ]
+        User.objects.bulk_create(users, batch_size=1000)
+        # Uno de cada diez candidatos sin coordenadas de domicilio
+        domiciles = Domicile.objects.bulk_create([
+            Domicile(**dict(zip(('address_lat', 'address_lng'), self._point(rng) if rng.random() > 0.1 else (None, None))))
+            for _ in users
+        ], batch_size=1000)
+        UserProfile.objects.bulk_create([
+            UserProfile(user=user, agency_state='Bol', domicile=domicile)
+            for user, domicile in zip(users, domiciles)
+        ], batch_size=1000)
+        CandidatoHabilidadEvaluada.objects.bulk_create([
+            CandidatoHabilidadEvaluada(
+                candidato_id=user.pk,
+                habilidad=habilidad,
+                nivel_competencia=rng.choice(niveles),
+                es_activa=rng.random() > 0.05,
+            )
+            for user in users
+            for habilidad in rng.sample(habilidades, options['skills_per_candidate'])
+        ], batch_size=1000)
+
+        locations = Location.objects.bulk_create([
+            Location(alias='bench', **dict(zip(('address_lat', 'address_lng'), self._point(rng))))
+            for _ in range(options['jobs'])
+        ])
+        jobs = Job.objects.bulk_create([
+            Job(name=f"Empleo {i}", location=location, vacancies=rng.choice([None, 0, 1, 2, 3, 5, 8]))
+            for i, location in enumerate(locations)
+        ])
+        JobHabilidadRequerida.objects.bulk_create([
+            JobHabilidadRequerida(job=job, habilidad=habilidad, nivel_importancia=rng.choice(importancias))
+            for job in jobs
+            for habilidad in rng.sample(habilidades, options['skills_per_job'])
+        ], batch_size=1000)
+        return [user.pk for user in users]
+
+    def _direct(self, candidato_id):
+        """Puntuaciones del candidato calculadas renglón por renglón, ordenadas."""
+        candidato = UserProfile.objects.select_related('domicile').get(pk=candidato_id)
+        domicile = candidato.domicile
+        pesos = recommendations.PESOS_RECOMENDACION
+        result = []
+        for match in JobCandidateMatch.objects.filter(candidato=candidato).select_related('job__location'):
+            if match.vacancies is not None and match.vacancies <= 0:
+                continue
+            location = match.job.location
+            distance = None
+            if domicile and location and domicile.address_lat is not None and location.address_lat is not None:
+                distance = calculate_distance(
+                    domicile.address_lat, domicile.address_lng, location.address_lat, location.address_lng
+                )
+            if distance is not None and distance > recommendations.DISTANCIA_MAXIMA_KM:
+                continue
+            total = JobHabilidadRequerida.objects.filter(job_id=match.job_id, nivel_importancia='esencial').count()
+            componentes = {
+                'habilidades': match.percentage / 100,
+                'esenciales': 1 - match.missing_essentials / total if total else 1.0,
+                'distancia': (
+                    recommendations.DISTANCIA_DESCONOCIDA if distance is None
+                    else max(0.0, 1 - distance / recommendations.DISTANCIA_MAXIMA_KM)
+                ),
+                'vacantes': (
+                    recommendations.VACANTES_DESCONOCIDAS if match.vacancies is None
+                    else min(match.vacancies / recommendations.VACANTES_SATURACION, 1.0)
+                ),
+            }
+            score = 100 * sum(pesos[factor] * valor for factor, valor in componentes.items())
+            result.append((match.job_id, round(score, 2)))
+        return sorted(result, key=lambda item: (-item[1], item[0]))
@@ -0,0 +1,223 @@
+import contextlib
+import random
+import time
+import uuid
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from agencia.matching import load_skill_matrix, match_candidates_for_job, match_jobs_for_candidate
+from agencia.models import Habilidad, Job, JobHabilidadRequerida
+from candidatos.models import CandidatoHabilidadEvaluada, UserProfile
+
+User = get_user_model()
+
+
+@contextlib.contextmanager
+def count_queries():
+    """Cuenta las consultas ejecutadas, sin depender del log de DEBUG (limitado a 9000)."""
+    counter = [0]
+
+    def wrapper(execute, sql, params, many, context):
+        counter[0] += 1
+        return execute(sql, params, many, context)
+
+    with connection.execute_wrapper(wrapper):
+        yield counter
+
+
+class Command(BaseCommand):
+    help = (
+        'Compara el motor de matching por matrices contra el cálculo anterior '
+        '(una consulta por candidato y por habilidad) sobre datos sintéticos: '
+        'verifica que las puntuaciones coincidan y mide tiempos y consultas. '
+        'Todos los datos se revierten al terminar.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--candidates', type=int, default=5000)
+        parser.add_argument('--jobs', type=int, default=500)
+        parser.add_argument('--skills', type=int, default=200)
+        parser.add_argument('--skills-per-candidate', type=int, default=8)
+        parser.add_argument('--skills-per-job', type=int, default=6)
+        parser.add_argument('--top', type=int, default=10)
+        parser.add_argument('--legacy-jobs', type=int, default=3,
+                            help='Empleos a calcular con el método anterior (para paridad y tiempo)')
+        parser.add_argument('--seed', type=int, default=11)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        with transaction.atomic():
+            candidatos, jobs, habilidades = self._create_data(options, rng)
+            self.stdout.write(
+                f"Datos sintéticos: {len(candidatos)} candidatos, {len(jobs)} empleos, {options['skills']} habilidades"
+            )
+            candidate_ids = set(candidatos)
+            job_ids = [job.id for job in jobs]
+
+            # Todos los empleos contra todos los candidatos
+            with count_queries() as queries:
+                start = time.perf_counter()
+                matrix = load_skill_matrix(
+                    evaluaciones=CandidatoHabilidadEvaluada.objects.filter(habilidad__in=habilidades),
+                    requisitos=JobHabilidadRequerida.objects.filter(habilidad__in=habilidades),
+                )
+                load_time = time.perf_counter() - start
+                start = time.perf_counter()
+                ranking = matrix.top_matches(job_ids=job_ids, k=options['top'], por='empleo')
+                score_time = time.perf_counter() - start
+            self.stdout.write(
+                f"motor: carga {load_time * 1000:.0f} ms, puntuación+top-{options['top']} {score_time * 1000:.0f} ms "
+                f"para {len(candidatos)}×{len(jobs)} pares, {queries[0]} consultas"
+            )
+
+            # Paridad y tiempo contra el método anterior
+            legacy_jobs = jobs[:options['legacy_jobs']]
+            mismatches = 0
+            legacy_time = engine_time = 0.0
+            legacy_queries = engine_queries = 0
+            for job in legacy_jobs:
+                with count_queries() as queries:
+                    start = time.perf_counter()
+                    expected = self._legacy_job_scores(job)
+                    legacy_time += time.perf_counter() - start
+                legacy_queries += queries[0]
+
+                with count_queries() as queries:
+                    start = time.perf_counter()
+                    _, matches, _ = match_candidates_for_job(job)
+                    engine_time += time.perf_counter() - start
+                engine_queries += queries[0]
+
+                got = {
+                    m['candidato']['id']: (m['matching_score'], m['matching_percentage'], m['habilidades_coincidentes_count'])
+                    for m in matches if m['candidato']['id'] in candidate_ids
+                }
+                mismatches += self._compare(f"empleo {job.id}", expected, got)
+                top = [c for c, _ in ranking[job.id]]
+                best = sorted(expected.values(), key=lambda v: -v[0])[:len(top)]
+                if [got[c][0] for c in top] != [v[0] for v in best]:
+                    mismatches += 1
+                    self.stdout.write(self.style.ERROR(f"empleo {job.id}: el top-{len(top)} no coincide"))
+
+            for candidato_id in candidatos[:options['legacy_jobs']]:
+                candidato = UserProfile.objects.get(pk=candidato_id)
+                expected = self._legacy_candidate_scores(candidato)
+                empleos, _ = match_jobs_for_candidate(candidato)
+                got = {
+                    e['empleo']['id']: (e['matching_score'], e['matching_percentage'], e['habilidades_coincidentes_count'])
+                    for e in empleos
+                }
+                mismatches += self._compare(f"candidato {candidato_id}", expected, got)
+
+            n = max(len(legacy_jobs), 1)
+            self.stdout.write(
+                f"anterior: {legacy_time / n * 1000:.0f} ms y {legacy_queries // n} consultas por empleo "
+                f"(~{legacy_time / n * len(jobs):.0f} s para {len(jobs)} empleos)"
+            )
+            self.stdout.write(
+                f"motor (vista de un empleo): {engine_time / n * 1000:.0f} ms y {engine_queries // n} consultas por empleo"
+            )
+            if mismatches:
+                transaction.set_rollback(True)
+                raise CommandError(f"{mismatches} diferencias contra el cálculo anterior")
+            self.stdout.write(self.style.SUCCESS('Paridad: puntuaciones idénticas al cálculo anterior'))
+            transaction.set_rollback(True)
+
+    def _create_data(self, options, rng):
+        tag = uuid.uuid4().hex[:8]
+        habilidades = Habilidad.objects.bulk_create([
+            Habilidad(nombre=f"bench-{tag}-{i}", categoria=rng.choice(['tecnica', 'blanda', 'fisica']))
+            for i in range(options['skills'])
+        ])
+        niveles = [n for n, _ in CandidatoHabilidadEvaluada.NIVEL_COMPETENCIA_CHOICES]
+        importancias = [n for n, _ in JobHabilidadRequerida.NIVEL_IMPORTANCIA_CHOICES]
+
+        users = [
+            User(id=uuid.uuid4(), email=f"match{i}-{tag}@benchmark.invalid", password='!',
+                 first_name='Candidato', last_name=str(i))
+            for i in range(options['candidates'])
+        ]
+        User.objects.bulk_create(users, batch_size=1000)
+        UserProfile.objects.bulk_create(
+            [UserProfile(user=user, agency_state='Bol') for user in users], batch_size=1000
+        )
+        CandidatoHabilidadEvaluada.objects.bulk_create([
+            CandidatoHabilidadEvaluada(
+                candidato_id=user.pk,
+                habilidad=habilidad,
+                nivel_competencia=rng.choice(niveles),
+                es_activa=rng.random() > 0.05,
+            )
+            for user in users
+            for habilidad in rng.sample(habilidades, options['skills_per_candidate'])
+        ], batch_size=1000)
+
+        jobs = Job.objects.bulk_create([
+            Job(name=f"Empleo {i}", vacancies=rng.randint(1, 5)) for i in range(options['jobs'])
+        ])
+        JobHabilidadRequerida.objects.bulk_create([
+            JobHabilidadRequerida(job=job, habilidad=habilidad, nivel_importancia=rng.choice(importancias))
+            for job in jobs
+            for habilidad in rng.sample(habilidades, options['skills_per_job'])
+        ], batch_size=1000)
+        return [user.pk for user in users], jobs, Habilidad.objects.filter(nombre__startswith=f"bench-{tag}-")
+
+    def _compare(self, label, expected, got):
+        if expected == got:
+            return 0
+        missing = set(expected) ^ set(got)
+        different = [k for k in set(expected) & set(got) if expected[k] != got[k]]
+        self.stdout.write(self.style.ERROR(
+            f"{label}: {len(missing)} resultados de más o de menos, {len(different)} puntuaciones distintas"
+        ))
+        return 1
+
+    # Cálculo anterior de JobMatchingView/CandidatoMatchingView, para comparar
+
+    def _legacy_score(self, habilidades_requeridas, habilidades_candidato):
+        matching_score = 0
+        max_possible_score = 0
+        coincidentes = 0
+        for hr in habilidades_requeridas:
+            peso_importancia = {'esencial': 4.0, 'importante': 2.0, 'deseable': 1.0}.get(hr.nivel_importancia, 1.0)
+            max_possible_score += peso_importancia * 4.0
+            habilidad_candidato = habilidades_candidato.filter(habilidad=hr.habilidad).first()
+            if habilidad_candidato:
+                competencia_score = {
+                    'basico': 1.0, 'intermedio': 2.0, 'avanzado': 3.0, 'experto': 4.0
+                }.get(habilidad_candidato.nivel_competencia, 0.0)
+                matching_score += competencia_score * peso_importancia
+                coincidentes += 1
+        matching_percentage = (matching_score / max_possible_score * 100) if max_possible_score > 0 else 0
+        return round(matching_score, 2), round(matching_percentage, 1), coincidentes
+
+    def _legacy_job_scores(self, job):
+        habilidades_requeridas = JobHabilidadRequerida.objects.filter(job=job).select_related('habilidad')
+        habilidades_ids = [hr.habilidad.id for hr in habilidades_requeridas]
+        candidatos = UserProfile.objects.filter(
+            candidatohabilidadevaluada__habilidad_id__in=habilidades_ids,
+            candidatohabilidadevaluada__es_activa=True,
+            agency_state='Bol'
+        ).distinct().select_related('user')
+        result = {}
+        for candidato in candidatos:
+            habilidades_candidato = CandidatoHabilidadEvaluada.objects.filter(
+                candidato=candidato, habilidad_id__in=habilidades_ids, es_activa=True
+            ).select_related('habilidad')
+            result[candidato.user_id] = self._legacy_score(habilidades_requeridas, habilidades_candidato)
+        return result
+
+    def _legacy_candidate_scores(self, candidato):
+        habilidades_candidato = CandidatoHabilidadEvaluada.objects.filter(
+            candidato=candidato, es_activa=True
+        ).select_related('habilidad')
+        habilidades_ids = [hc.habilidad.id for hc in habilidades_candidato]
+        empleos = Job.objects.filter(jobhabilidadrequerida__habilidad_id__in=habilidades_ids).distinct()
+        return {
+            empleo.id: self._legacy_score(
+                JobHabilidadRequerida.objects.filter(job=empleo).select_related('habilidad'), habilidades_candidato
+            )
+            for empleo in empleos
+        }
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+from agencia.match_index import rebuild_match_index
+from agencia.models import JobCandidateMatch
+
+
+class Command(BaseCommand):
+    help = 'Reconstruye el índice de matching empleo–candidato (JobCandidateMatch)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=200, help='Empleos procesados por lote')
+        parser.add_argument('--if-empty', action='store_true',
+                            help='Solo reconstruir si el índice está vacío (p. ej. tras la primera migración)')
+
+    def handle(self, *args, **options):
+        if options['if_empty'] and JobCandidateMatch.objects.exists():
+            self.stdout.write('El índice de matching ya tiene datos, no se reconstruye.')
+            return
+        self.stdout.write('Reconstruyendo índice de matching empleo–candidato...')
+        total = rebuild_match_index(job_chunk_size=options['chunk_size'], stdout=self.stdout)
+        self.stdout.write(self.style.SUCCESS(f'✅ Índice reconstruido: {total} pares'))
@@ -0,0 +1,184 @@
+"""
+Mantenimiento del índice persistido JobCandidateMatch.
+
+Cada renglón guarda la puntuación de un par empleo–candidato calculada con
+el motor de agencia/matching.py. Los cambios se aplican por candidato o por
+empleo completos: se borran sus renglones y se vuelven a insertar en la
+misma transacción, así que el índice nunca queda a medias.
+
+Las señales (agencia/signals.py) acumulan los candidatos y empleos afectados
+durante la transacción y, al confirmarse, encolan una sola tarea de Celery
+por tipo (agencia/tasks.py). Si el broker no está disponible, la
+actualización se hace en el mismo proceso para no dejar el índice desfasado.
+"""
+import logging
+import threading
+
+from django.db import transaction
+from django.db.models import Q
+from kombu.exceptions import OperationalError
+
+from candidatos.models import CandidatoHabilidadEvaluada
+
+from .matching import load_skill_matrix
+from .models import Job, JobCandidateMatch, JobHabilidadRequerida
+
+logger = logging.getLogger(__name__)
+
+# Las consultas de refresco repiten los IDs en subconsultas; 500 mantiene
+# cada consulta bajo el límite de 2100 parámetros de SQL Server
+REFRESH_CHUNK = 500
+BULK_BATCH_SIZE = 1000
+
+
+def _chunks(values, size=REFRESH_CHUNK):
+    values = list(values)
+    for i in range(0, len(values), size):
+        yield values[i:i + size]
+
+
+def build_matches(matrix, candidate_ids=None, job_ids=None):
+    """
+    Genera los JobCandidateMatch (sin guardar) de los pares con al menos una
+    habilidad en común, a partir de una SkillMatrix.
+    """
+    puntuacion, coincidencias, candidatos, empleos = matrix.puntuaciones(candidate_ids, job_ids)
+    if not candidatos or not empleos:
+        return
+    faltantes = matrix.esenciales_faltantes(candidatos, empleos)
+    requeridas = matrix.requeridas[[matrix.job_index[j] for j in empleos]].sum(axis=1)
+    maximos = matrix.puntuacion_maxima[[matrix.job_index[j] for j in empleos]]
+    vacantes = {}
+    for chunk in _chunks(empleos, BULK_BATCH_SIZE):
+        vacantes.update(Job.objects.filter(id__in=chunk).values_list('id', 'vacancies'))
+
+    for i, j in zip(*(coincidencias > 0).nonzero()):
+        job_id = empleos[j]
+        max_score = float(maximos[j])
+        score = float(puntuacion[i, j])
+        yield JobCandidateMatch(
+            job_id=job_id,
+            candidato_id=candidatos[i],
+            score=score,
+            max_score=max_score,
+            percentage=round(score / max_score * 100, 1) if max_score > 0 else 0,
+            matched_skills=int(coincidencias[i, j]),
+            required_skills=int(requeridas[j]),
+            missing_essentials=int(faltantes[i, j]),
+            vacancies=vacantes.get(job_id),
+        )
+
+
+def _replace(delete_filter, matches):
+    with transaction.atomic():
+        JobCandidateMatch.objects.filter(delete_filter).delete()
+        JobCandidateMatch.objects.bulk_create(matches, batch_size=BULK_BATCH_SIZE)
+
+
+def refresh_candidate_matches(candidate_ids):
+    """Recalcula todos los pares de los candidatos dados."""
+    total = 0
+    for chunk in _chunks(candidate_ids):
+        evaluaciones = CandidatoHabilidadEvaluada.objects.filter(candidato_id__in=chunk)
+        empleos = JobHabilidadRequerida.objects.filter(
+            habilidad_id__in=evaluaciones.filter(es_activa=True).values('habilidad_id')
+        ).values('job_id')
+        matrix = load_skill_matrix(
+            evaluaciones=evaluaciones,
+            requisitos=JobHabilidadRequerida.objects.filter(job_id__in=empleos),
+        )
+        matches = list(build_matches(matrix))
+        _replace(Q(candidato_id__in=chunk), matches)
+        total += len(matches)
+    return total
+
+
+def refresh_job_matches(job_ids):
+    """Recalcula todos los pares de los empleos dados."""
+    total = 0
+    for chunk in _chunks(job_ids):
+        requisitos = JobHabilidadRequerida.objects.filter(job_id__in=chunk)
+        matrix = load_skill_matrix(
+            evaluaciones=CandidatoHabilidadEvaluada.objects.filter(
+                habilidad_id__in=requisitos.values('habilidad_id')
+            ),
+            requisitos=requisitos,
+        )
+        matches = list(build_matches(matrix))
+        _replace(Q(job_id__in=chunk), matches)
+        total += len(matches)
+    return total
+
+
+def update_job_vacancies(job):
+    """Copia Job.vacancies a los renglones del empleo que tengan otro valor."""
+    stale = JobCandidateMatch.objects.filter(job_id=job.pk)
+    if job.vacancies is None:
+        stale = stale.filter(vacancies__isnull=False)
+    else:
+        stale = stale.filter(Q(vacancies__isnull=True) | ~Q(vacancies=job.vacancies))
+    return stale.update(vacancies=job.vacancies)
+
+
+def rebuild_match_index(job_chunk_size=200, stdout=None):
+    """
+    Reconstruye el índice completo. Se procesa por bloques de empleos para
+    acotar la memoria; cada bloque se reemplaza en su propia transacción.
+    """
+    job_ids = list(
+        JobHabilidadRequerida.objects.order_by('job_id').values_list('job_id', flat=True).distinct()
+    )
+    JobCandidateMatch.objects.exclude(job_id__in=JobHabilidadRequerida.objects.values('job_id')).delete()
+
+    total = 0
+    for i in range(0, len(job_ids), job_chunk_size):
+        total += refresh_job_matches(job_ids[i:i + job_chunk_size])
+        if stdout is not None:
+            stdout.write(f"  {min(i + job_chunk_size, len(job_ids))}/{len(job_ids)} empleos, {total} pares")
+    return total
+
+
+# Acumulación de cambios por transacción
+
+_pending = threading.local()
+
+
+def _pending_ids():
+    if not hasattr(_pending, 'candidates'):
+        _pending.candidates = set()
+        _pending.jobs = set()
+    return _pending
+
+
+def _flush():
+    pending = _pending_ids()
+    candidates, jobs = list(pending.candidates), list(pending.jobs)
+    pending.candidates.clear()
+    pending.jobs.clear()
+
+    from .tasks import refresh_candidate_matches_task, refresh_job_matches_task
+
+    for task, ids, refresh in (
+        (refresh_job_matches_task, jobs, refresh_job_matches),
+        (refresh_candidate_matches_task, [str(pk) for pk in candidates], refresh_candidate_matches),
+    ):
+        if not ids:
+            continue
+        try:
+            task.delay(ids)
+        except OperationalError:
+            logger.warning("Broker no disponible; actualizando el índice de matching en el proceso")
+            refresh(ids)
+
+
+def schedule_refresh(candidate_ids=(), job_ids=()):
+    """
+    Marca candidatos/empleos para recalcular cuando se confirme la
+    transacción actual. Varios cambios en la misma transacción generan una
+    sola tarea por tipo: el primer callback de on_commit vacía lo acumulado
+    y los demás no encuentran nada que enviar.
+    """
+    pending = _pending_ids()
+    pending.candidates.update(candidate_ids)
+    pending.jobs.update(job_ids)
+    transaction.on_commit(_flush)
@@ -0,0 +1,346 @@
+"""
+Motor de matching entre candidatos y empleos por habilidades.
+
+Las evaluaciones activas se cargan en una matriz candidatos × habilidades con
+el nivel de competencia (básico 1 ... experto 4) y los requisitos en una
+matriz empleos × habilidades con el peso de importancia (esencial 4,
+importante 2, deseable 1). La puntuación de todos los pares es el producto
+de ambas matrices y el número de habilidades coincidentes es el producto de
+sus máscaras, así que el costo en consultas no depende de cuántos
+candidatos o empleos se comparan. El desglose por habilidad solo se arma
+para los pares que se devuelven.
+
+La puntuación es la misma que calculaban JobMatchingView y
+CandidatoMatchingView habilidad por habilidad: un candidato aparece para un
+empleo si tiene evaluada al menos una de las habilidades requeridas.
+"""
+import numpy as np
+
+from candidatos.models import CandidatoHabilidadEvaluada, UserProfile
+
+from .models import Habilidad, Job, JobHabilidadRequerida
+
+PESOS_IMPORTANCIA = {
+    'esencial': 4.0,
+    'importante': 2.0,
+    'deseable': 1.0,
+}
+PESO_POR_DEFECTO = 1.0
+
+PUNTOS_COMPETENCIA = {
+    'basico': 1.0,
+    'intermedio': 2.0,
+    'avanzado': 3.0,
+    'experto': 4.0,
+}
+NIVEL_MAXIMO = 4.0
+
+IMPORTANCIA_DISPLAY = dict(JobHabilidadRequerida.NIVEL_IMPORTANCIA_CHOICES)
+COMPETENCIA_DISPLAY = dict(CandidatoHabilidadEvaluada.NIVEL_COMPETENCIA_CHOICES)
+
+# Límite de parámetros por cláusula IN (SQL Server acepta 2100)
+IN_CLAUSE_CHUNK = 1000
+
+
+def _chunks(values, size=IN_CLAUSE_CHUNK):
+    values = list(values)
+    for i in range(0, len(values), size):
+        yield values[i:i + size]
+
+
+class SkillMatrix:
+    """
+    Matrices de niveles (candidatos × habilidades) y pesos (empleos ×
+    habilidades) construidas a partir de tuplas:
+
+        evaluaciones: (candidato_id, habilidad_id, nivel_competencia)
+        requisitos:   (job_id, habilidad_id, nivel_importancia)
+    """
+
+    def __init__(self, evaluaciones, requisitos):
+        evaluaciones = list(evaluaciones)
+        requisitos = list(requisitos)
+
+        habilidades = sorted({h for _, h, _ in evaluaciones} | {h for _, h, _ in requisitos})
+        self.habilidad_index = {h: i for i, h in enumerate(habilidades)}
+        self.candidate_ids = list(dict.fromkeys(c for c, _, _ in evaluaciones))
+        self.candidate_index = {c: i for i, c in enumerate(self.candidate_ids)}
+        self.job_ids = list(dict.fromkeys(j for j, _, _ in requisitos))
+        self.job_index = {j: i for i, j in enumerate(self.job_ids)}
+
+        self.niveles = np.zeros((len(self.candidate_ids), len(habilidades)))
+        self.evaluadas = np.zeros(self.niveles.shape)
+        self.pesos = np.zeros((len(self.job_ids), len(habilidades)))
+
+        if evaluaciones:
+            rows = [self.candidate_index[c] for c, _, _ in evaluaciones]
+            cols = [self.habilidad_index[h] for _, h, _ in evaluaciones]
+            self.niveles[rows, cols] = [PUNTOS_COMPETENCIA.get(n, 0.0) for _, _, n in evaluaciones]
+            self.evaluadas[rows, cols] = 1.0
+        if requisitos:
+            rows = [self.job_index[j] for j, _, _ in requisitos]
+            cols = [self.habilidad_index[h] for _, h, _ in requisitos]
+            self.pesos[rows, cols] = [PESOS_IMPORTANCIA.get(n, PESO_POR_DEFECTO) for _, _, n in requisitos]
+        self.requeridas = (self.pesos > 0).astype(float)
+        self.puntuacion_maxima = self.pesos.sum(axis=1) * NIVEL_MAXIMO
+
+        # Para el desglose: niveles originales y requisitos en su orden de captura
+        self.competencias = {(c, h): n for c, h, n in evaluaciones}
+        self.requisitos = {}
+        for job_id, habilidad_id, nivel in requisitos:
+            self.requisitos.setdefault(job_id, []).append((habilidad_id, nivel))
+
+    def _filas(self, candidate_ids=None, job_ids=None):
+        candidatos = self.candidate_ids if candidate_ids is None else [c for c in candidate_ids if c in self.candidate_index]
+        empleos = self.job_ids if job_ids is None else [j for j in job_ids if j in self.job_index]
+        return (
+            candidatos, empleos,
+            [self.candidate_index[c] for c in candidatos], [self.job_index[j] for j in empleos],
+        )
+
+    def puntuaciones(self, candidate_ids=None, job_ids=None):
+        """
+        Devuelve `(puntuacion, coincidencias, candidatos, empleos)`: matrices
+        candidatos × empleos con la puntuación y el número de habilidades
+        requeridas que el candidato tiene evaluadas.
+        """
+        candidatos, empleos, c_rows, j_rows = self._filas(candidate_ids, job_ids)
+        puntuacion = self.niveles[c_rows] @ self.pesos[j_rows].T
+        coincidencias = self.evaluadas[c_rows] @ self.requeridas[j_rows].T
+        return puntuacion, coincidencias, candidatos, empleos
+
+    def esenciales_faltantes(self, candidate_ids=None, job_ids=None):
+        """Matriz candidatos × empleos con las habilidades esenciales sin evaluar."""
+        _, _, c_rows, j_rows = self._filas(candidate_ids, job_ids)
+        esenciales = (self.pesos[j_rows] == PESOS_IMPORTANCIA['esencial']).astype(float)
+        return esenciales.sum(axis=1)[None, :] - self.evaluadas[c_rows] @ esenciales.T
+
+    def top_matches(self, candidate_ids=None, job_ids=None, k=None, por='empleo'):
+        """
+        Mejores pares ordenados por puntuación. Con `por='empleo'` devuelve
+        `{job_id: [(candidato_id, puntuacion), ...]}` con hasta `k` candidatos
+        por empleo; con `por='candidato'`, `{candidato_id: [(job_id, puntuacion)]}`.
+        """
+        puntuacion, coincidencias, candidatos, empleos = self.puntuaciones(candidate_ids, job_ids)
+        if por == 'empleo':
+            puntuacion, coincidencias = puntuacion.T, coincidencias.T
+            filas, columnas = empleos, candidatos
+        else:
+            filas, columnas = candidatos, empleos
+
+        resultado = {}
+        for i, fila in enumerate(filas):
+            validas = np.flatnonzero(coincidencias[i] > 0)
+            if not len(validas):
+                resultado[fila] = []
+                continue
+            scores = puntuacion[i, validas]
+            if k is not None and len(validas) > k:
+                mejores = np.argpartition(-scores, k - 1)[:k]
+                validas, scores = validas[mejores], scores[mejores]
+            # Orden estable: puntuación descendente, luego el orden de carga
+            orden = np.lexsort((validas, -scores))
+            resultado[fila] = [(columnas[validas[o]], float(scores[o])) for o in orden]
+        return resultado
+
+    def desglose(self, candidate_id, job_id, habilidades):
+        """
+        Detalle por habilidad de un par, con el mismo formato que devolvían
+        las vistas de matching. `habilidades` es `{id: (nombre, categoria)}`.
+        """
+        matching_score = 0.0
+        coincidentes = []
+        faltantes = []
+        for habilidad_id, nivel_importancia in self.requisitos.get(job_id, []):
+            peso = PESOS_IMPORTANCIA.get(nivel_importancia, PESO_POR_DEFECTO)
+            nombre, categoria = habilidades.get(habilidad_id, (None, None))
+            nivel_requerido = IMPORTANCIA_DISPLAY.get(nivel_importancia, nivel_importancia)
+            nivel_competencia = self.competencias.get((candidate_id, habilidad_id))
+
+            if nivel_competencia is not None:
+                competencia = PUNTOS_COMPETENCIA.get(nivel_competencia, 0.0)
+                skill_score = competencia * peso
+                matching_score += skill_score
+                coincidentes.append({
+                    'habilidad': nombre,
+                    'categoria': categoria,
+                    'nivel_requerido': nivel_requerido,
+                    'nivel_candidato': COMPETENCIA_DISPLAY.get(nivel_competencia, nivel_competencia),
+                    'puntuacion': round(skill_score, 2),
+                    'porcentaje_competencia': round(competencia / NIVEL_MAXIMO * 100, 1),
+                    'peso_importancia': peso,
+                })
+            else:
+                faltantes.append({
+                    'habilidad': nombre,
+                    'categoria': categoria,
+                    'nivel_requerido': nivel_requerido,
+                    'peso_importancia': peso,
+                    'puntuacion_perdida': peso * NIVEL_MAXIMO,
+                })
+
+        max_possible_score = float(self.puntuacion_maxima[self.job_index[job_id]])
+        matching_percentage = (matching_score / max_possible_score * 100) if max_possible_score > 0 else 0
+        return {
+            'matching_score': round(matching_score, 2),
+            'max_possible_score': round(max_possible_score, 2),
+            'matching_percentage': round(matching_percentage, 1),
+            'habilidades_coincidentes': coincidentes,
+            'habilidades_faltantes': faltantes,
+            'total_habilidades_requeridas': len(coincidentes) + len(faltantes),
+            'habilidades_coincidentes_count': len(coincidentes),
+            'habilidades_faltantes_count': len(faltantes),
+            'puntuacion_perdida': round(sum(h['puntuacion_perdida'] for h in faltantes), 2),
+        }
+
+    def habilidades(self):
+        """Nombre y categoría de las habilidades de la matriz, en una consulta por bloque."""
+        result = {}
+        for chunk in _chunks(self.habilidad_index):
+            result.update(
+                (pk, (nombre, categoria))
+                for pk, nombre, categoria in Habilidad.objects.filter(id__in=chunk).values_list('id', 'nombre', 'categoria')
+            )
+        return result
+
+
+def load_skill_matrix(evaluaciones=None, requisitos=None):
+    """
+    Carga la matriz desde la base de datos con dos consultas. `evaluaciones`
+    y `requisitos` son querysets opcionales para acotar los candidatos y los
+    empleos; por defecto se usan todas las evaluaciones activas y todos los
+    requisitos.
+    """
+    if evaluaciones is None:
+        evaluaciones = CandidatoHabilidadEvaluada.objects.all()
+    if requisitos is None:
+        requisitos = JobHabilidadRequerida.objects.all()
+    return SkillMatrix(
+        evaluaciones.filter(es_activa=True).order_by().values_list('candidato_id', 'habilidad_id', 'nivel_competencia'),
+        requisitos.order_by('job_id', 'id').values_list('job_id', 'habilidad_id', 'nivel_importancia'),
+    )
+
+
+def job_skill_matrix(job, candidate_ids=None):
+    """Matriz con los requisitos de un empleo y las evaluaciones relevantes de los candidatos."""
+    requisitos = JobHabilidadRequerida.objects.filter(job=job)
+    evaluaciones = CandidatoHabilidadEvaluada.objects.filter(habilidad_id__in=requisitos.values('habilidad_id'))
+    if candidate_ids is not None:
+        evaluaciones = evaluaciones.filter(candidato_id__in=candidate_ids)
+    return load_skill_matrix(evaluaciones=evaluaciones, requisitos=requisitos)
+
+
+def candidate_skill_matrix(candidato, job_ids=None):
+    """Matriz con las evaluaciones de un candidato y los requisitos completos de los empleos afines."""
+    evaluaciones = CandidatoHabilidadEvaluada.objects.filter(candidato=candidato)
+    if job_ids is None:
+        job_ids = JobHabilidadRequerida.objects.filter(
+            habilidad_id__in=evaluaciones.filter(es_activa=True).values('habilidad_id')
+        ).values('job_id')
+    return load_skill_matrix(
+        evaluaciones=evaluaciones,
+        requisitos=JobHabilidadRequerida.objects.filter(job_id__in=job_ids),
+    )
+
+
+def required_skills(matrix, job_id, habilidades):
+    return [
+        {
+            'id': habilidad_id,
+            'nombre': habilidades[habilidad_id][0],
+            'categoria': habilidades[habilidad_id][1],
+            'nivel_importancia': IMPORTANCIA_DISPLAY.get(nivel, nivel),
+        }
+        for habilidad_id, nivel in matrix.requisitos.get(job_id, [])
+    ]
+
+
+def candidate_match_rows(matrix, job_id, candidate_ids, habilidades=None):
+    """Resultados con desglose para los candidatos dados, en el mismo orden."""
+    if habilidades is None:
+        habilidades = matrix.habilidades()
+    perfiles = {}
+    for chunk in _chunks(candidate_ids):
+        perfiles.update(
+            (perfil.user_id, perfil)
+            for perfil in UserProfile.objects.filter(user_id__in=chunk).select_related('user')
+        )
+
+    rows = []
+    for candidato_id in candidate_ids:
+        perfil = perfiles.get(candidato_id)
+        if perfil is None or job_id not in matrix.job_index:
+            continue
+        rows.append({
+            'candidato': {
+                'id': perfil.user_id,
+                'nombre': f"{perfil.user.first_name} {perfil.user.last_name} {perfil.user.second_last_name}",
+                'curp': perfil.curp,
+                'email': perfil.user.email,
+            },
+            **matrix.desglose(candidato_id, job_id, habilidades),
+        })
+    return rows
+
+
+def job_match_rows(matrix, candidate_id, job_ids, habilidades=None):
+    """Resultados con desglose para los empleos dados, en el mismo orden."""
+    if habilidades is None:
+        habilidades = matrix.habilidades()
+    empleos = {}
+    for chunk in _chunks(job_ids):
+        empleos.update(
+            (empleo.id, empleo)
+            for empleo in Job.objects.filter(id__in=chunk).select_related('company', 'location')
+        )
+
+    rows = []
+    for job_id in job_ids:
+        empleo = empleos.get(job_id)
+        if empleo is None or job_id not in matrix.job_index:
+            continue
+        rows.append({
+            'empleo': {
+                'id': empleo.id,
+                'name': empleo.name,
+                'company': empleo.company.name if empleo.company else None,
+                'location': str(empleo.location) if empleo.location else None,
+                'vacancies': empleo.vacancies,
+                'horario': empleo.horario,
+                'sueldo_base': float(empleo.sueldo_base) if empleo.sueldo_base else None,
+                'prestaciones': empleo.prestaciones,
+            },
+            **matrix.desglose(candidate_id, job_id, habilidades),
+        })
+    return rows
+
+
+def match_candidates_for_job(job, top=None):
+    """
+    Calcula en memoria los candidatos en bolsa de trabajo ordenados por
+    afinidad con el empleo, sin usar el índice persistido.
+    Devuelve `(requisitos, candidatos_matching, total)`.
+    """
+    matrix = job_skill_matrix(job, candidate_ids=UserProfile.objects.filter(agency_state='Bol').values('pk'))
+    ranking = matrix.top_matches(job_ids=[job.id], por='empleo').get(job.id, [])
+    total = len(ranking)
+    if top is not None:
+        ranking = ranking[:top]
+
+    habilidades = matrix.habilidades()
+    candidatos_matching = candidate_match_rows(matrix, job.id, [c for c, _ in ranking], habilidades)
+    return required_skills(matrix, job.id, habilidades), candidatos_matching, total
+
+
+def match_jobs_for_candidate(candidato, top=None):
+    """
+    Calcula en memoria los empleos ordenados por afinidad con las
+    habilidades del candidato, sin usar el índice persistido.
+    Devuelve `(empleos_matching, total)`.
+    """
+    matrix = candidate_skill_matrix(candidato)
+    ranking = matrix.top_matches(candidate_ids=[candidato.pk], por='candidato').get(candidato.pk, [])
+    total = len(ranking)
+    if top is not None:
+        ranking = ranking[:top]
+    return job_match_rows(matrix, candidato.pk, [j for j, _ in ranking]), total
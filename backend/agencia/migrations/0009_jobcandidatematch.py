@@ -0,0 +1,37 @@
+# Generated by Django 5.1.12 on 2026-10-19 14:41
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('agencia', '0008_historicaljob'),
+        ('candidatos', '0014_candidatecohort'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='JobCandidateMatch',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('score', models.FloatField()),
+                ('max_score', models.FloatField()),
+                ('percentage', models.FloatField()),
+                ('matched_skills', models.PositiveSmallIntegerField(default=0)),
+                ('required_skills', models.PositiveSmallIntegerField(default=0)),
+                ('missing_essentials', models.PositiveSmallIntegerField(default=0, help_text='Habilidades esenciales del empleo que el candidato no tiene evaluadas')),
+                ('vacancies', models.IntegerField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('candidato', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='job_matches', to='candidatos.userprofile')),
+                ('job', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='candidate_matches', to='agencia.job')),
+            ],
+            options={
+                'verbose_name': 'Coincidencia Empleo-Candidato',
+                'verbose_name_plural': 'Coincidencias Empleo-Candidato',
+                'indexes': [models.Index(fields=['job', '-score'], name='match_job_score_idx'), models.Index(fields=['candidato', '-score'], name='match_candidate_score_idx')],
+                'unique_together': {('job', 'candidato')},
+            },
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.1.12 on 2026-10-19 14:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('agencia', '0009_jobcandidatematch'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='location',
+            index=models.Index(fields=['address_lat', 'address_lng'], name='location_lat_lng_idx'),
+        ),
+    ]
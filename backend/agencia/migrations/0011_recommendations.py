@@ -0,0 +1,58 @@
+# Generated by Django 5.1.12 on 2026-10-19 14:47
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('agencia', '0010_location_lat_lng_index'),
+        ('candidatos', '0014_candidatecohort'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RecommendationRun',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('started_at', models.DateTimeField(auto_now_add=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('weights', models.JSONField(default=dict, help_text='Pesos usados para combinar los componentes')),
+                ('candidates', models.PositiveIntegerField(default=0)),
+                ('jobs', models.PositiveIntegerField(default=0)),
+                ('pairs_evaluated', models.PositiveIntegerField(default=0)),
+                ('recommendations', models.PositiveIntegerField(default=0)),
+                ('duration_seconds', models.FloatField(blank=True, null=True)),
+            ],
+            options={
+                'verbose_name': 'Ejecución de Recomendaciones',
+                'verbose_name_plural': 'Ejecuciones de Recomendaciones',
+                'ordering': ['-started_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='JobRecommendation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('score', models.FloatField()),
+                ('skill_component', models.FloatField()),
+                ('essentials_component', models.FloatField()),
+                ('distance_component', models.FloatField()),
+                ('vacancies_component', models.FloatField()),
+                ('skill_percentage', models.FloatField()),
+                ('missing_essentials', models.PositiveSmallIntegerField(default=0)),
+                ('total_essentials', models.PositiveSmallIntegerField(default=0)),
+                ('distance_km', models.FloatField(blank=True, null=True)),
+                ('vacancies', models.IntegerField(blank=True, null=True)),
+                ('candidato', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='job_recommendations', to='candidatos.userprofile')),
+                ('job', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='recommendations', to='agencia.job')),
+                ('run', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='items', to='agencia.recommendationrun')),
+            ],
+            options={
+                'verbose_name': 'Recomendación de Empleo',
+                'verbose_name_plural': 'Recomendaciones de Empleo',
+                'indexes': [models.Index(fields=['run', 'candidato', '-score'], name='recommend_candidate_idx'), models.Index(fields=['run', 'job', '-score'], name='recommend_job_idx')],
+            },
+        ),
+    ]
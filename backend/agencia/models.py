@@ -1,4 +1,5 @@
 from django.db import models
+from api.tracking import FieldTrackerMixin
 from django.conf import settings
 from simple_history.models import HistoricalRecords # type: ignore
 
@@ -33,7 +34,10 @@ class Habilidad(models.Model):
     def __str__(self):
         return f"{self.nombre} ({self.get_categoria_display()})"
 
-class Company(models.Model):
+class Company(FieldTrackerMixin, models.Model):
+    # El archivo anterior se borra al reemplazarlo (api/files.py)
+    tracked_fields = ('logo',)
+
     name = models.CharField(max_length=255, unique=True)
     logo = models.ImageField(upload_to='company_logos/', null=True, blank=True)
 
@@ -57,6 +61,12 @@ class Location(models.Model):
     address_lng = models.DecimalField(max_digits=9, decimal_places=6, null=True, blank=True)
 
     company = models.ForeignKey(Company, on_delete=models.CASCADE, null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            # Búsqueda por cercanía: rectángulo de latitud/longitud (ver agencia/geo.py)
+            models.Index(fields=['address_lat', 'address_lng'], name='location_lat_lng_idx'),
+        ]
     
     def __str__(self):
         return f"{self.address_road}, {self.address_number}, {self.address_municip}, {self.address_city}, {self.address_state}"
@@ -130,4 +140,96 @@ class Employer(models.Model):
             company_name_str = f"{self.company.name} - " if self.company else ""
             return f"{company_name_str} - {self.user.first_name} {self.user.last_name}"
         else:
-            return f"Sin compañia - {self.user.first_name} {self.user.last_name}"
\ No newline at end of file
+            return f"Sin compañia - {self.user.first_name} {self.user.last_name}"
+class JobCandidateMatch(models.Model):
+    """
+    Índice persistido de afinidad empleo–candidato por habilidades. Guarda
+    un renglón por cada par en el que el candidato tiene evaluada al menos
+    una habilidad requerida. Se mantiene al día desde las señales de
+    evaluaciones, requisitos y vacantes (ver agencia/match_index.py) y se
+    reconstruye con `manage.py rebuild_match_index`.
+    """
+    job = models.ForeignKey(Job, on_delete=models.CASCADE, related_name='candidate_matches')
+    candidato = models.ForeignKey('candidatos.UserProfile', on_delete=models.CASCADE, related_name='job_matches')
+
+    score = models.FloatField()
+    max_score = models.FloatField()
+    percentage = models.FloatField()
+    matched_skills = models.PositiveSmallIntegerField(default=0)
+    required_skills = models.PositiveSmallIntegerField(default=0)
+    missing_essentials = models.PositiveSmallIntegerField(
+        default=0, help_text="Habilidades esenciales del empleo que el candidato no tiene evaluadas"
+    )
+    # Copia de Job.vacancies para filtrar sin unir con la tabla de empleos
+    vacancies = models.IntegerField(null=True, blank=True)
+
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ['job', 'candidato']
+        indexes = [
+            models.Index(fields=['job', '-score'], name='match_job_score_idx'),
+            models.Index(fields=['candidato', '-score'], name='match_candidate_score_idx'),
+        ]
+        verbose_name = 'Coincidencia Empleo-Candidato'
+        verbose_name_plural = 'Coincidencias Empleo-Candidato'
+
+    def __str__(self):
+        return f"{self.job_id} - {self.candidato_id}: {self.score}"
+
+class RecommendationRun(models.Model):
+    """
+    Ejecución del cálculo nocturno de recomendaciones. Las lecturas usan
+    siempre la última ejecución terminada, así que una ejecución en curso o
+    fallida no afecta lo que ven los usuarios.
+    """
+    started_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    weights = models.JSONField(default=dict, help_text="Pesos usados para combinar los componentes")
+    candidates = models.PositiveIntegerField(default=0)
+    jobs = models.PositiveIntegerField(default=0)
+    pairs_evaluated = models.PositiveIntegerField(default=0)
+    recommendations = models.PositiveIntegerField(default=0)
+    duration_seconds = models.FloatField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-started_at']
+        verbose_name = 'Ejecución de Recomendaciones'
+        verbose_name_plural = 'Ejecuciones de Recomendaciones'
+
+    def __str__(self):
+        return f"Recomendaciones {self.started_at:%Y-%m-%d %H:%M} ({self.recommendations})"
+
+class JobRecommendation(models.Model):
+    """
+    Recomendación precalculada de un empleo para un candidato (y viceversa).
+    Los componentes van de 0 a 1 y `score` es su combinación ponderada (0-100)
+    con los pesos de la ejecución.
+    """
+    run = models.ForeignKey(RecommendationRun, on_delete=models.CASCADE, related_name='items')
+    job = models.ForeignKey(Job, on_delete=models.CASCADE, related_name='recommendations')
+    candidato = models.ForeignKey('candidatos.UserProfile', on_delete=models.CASCADE, related_name='job_recommendations')
+
+    score = models.FloatField()
+    skill_component = models.FloatField()
+    essentials_component = models.FloatField()
+    distance_component = models.FloatField()
+    vacancies_component = models.FloatField()
+
+    # Datos de origen para explicar la recomendación
+    skill_percentage = models.FloatField()
+    missing_essentials = models.PositiveSmallIntegerField(default=0)
+    total_essentials = models.PositiveSmallIntegerField(default=0)
+    distance_km = models.FloatField(null=True, blank=True)
+    vacancies = models.IntegerField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['run', 'candidato', '-score'], name='recommend_candidate_idx'),
+            models.Index(fields=['run', 'job', '-score'], name='recommend_job_idx'),
+        ]
+        verbose_name = 'Recomendación de Empleo'
+        verbose_name_plural = 'Recomendaciones de Empleo'
+
+    def __str__(self):
+        return f"{self.job_id} - {self.candidato_id}: {self.score:.1f}"
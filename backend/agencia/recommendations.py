@@ -0,0 +1,278 @@
+"""
+Recomendaciones precalculadas de empleos para candidatos (y de candidatos
+para empleos).
+
+Cada noche una tarea de Celery (agencia/tasks.py) toma los pares del índice
+JobCandidateMatch de los candidatos en bolsa de trabajo y combina cuatro
+componentes, cada uno entre 0 y 1:
+
+- habilidades: porcentaje de afinidad del índice de matching.
+- esenciales: proporción de habilidades esenciales del empleo que cubre.
+- distancia: cercanía entre el domicilio del candidato y la ubicación del
+  empleo; los pares más lejanos que DISTANCIA_MAXIMA_KM se descartan.
+- vacantes: vacantes abiertas del empleo; los empleos sin vacantes se
+  descartan.
+
+Se guardan los mejores RECOMENDACIONES_POR_CANDIDATO empleos de cada
+candidato y los mejores RECOMENDACIONES_POR_EMPLEO candidatos de cada
+empleo. Cada cálculo se escribe como una RecommendationRun nueva y las
+vistas leen siempre la última terminada, así que los usuarios nunca ven una
+ejecución a medias; al terminar se borran los renglones de las anteriores.
+"""
+import logging
+import time
+
+import numpy as np
+from django.db.models import Count
+from django.utils import timezone
+
+from candidatos.models import UserProfile
+
+from .geo import haversine_pairs_km
+from .models import Job, JobCandidateMatch, JobHabilidadRequerida, JobRecommendation, RecommendationRun
+
+logger = logging.getLogger(__name__)
+
+PESOS_RECOMENDACION = {
+    'habilidades': 0.45,
+    'esenciales': 0.20,
+    'distancia': 0.25,
+    'vacantes': 0.10,
+}
+DISTANCIA_MAXIMA_KM = 60.0
+# Componentes cuando falta el dato (sin coordenadas o vacantes sin capturar)
+DISTANCIA_DESCONOCIDA = 0.5
+VACANTES_DESCONOCIDAS = 0.5
+# Número de vacantes a partir del cual el componente vale 1
+VACANTES_SATURACION = 5
+
+RECOMENDACIONES_POR_CANDIDATO = 20
+RECOMENDACIONES_POR_EMPLEO = 50
+
+BULK_BATCH_SIZE = 1000
+# Borrado por bloques de IDs, bajo el límite de 2100 parámetros de SQL Server
+DELETE_CHUNK = 1000
+LOAD_CHUNK_SIZE = 5000
+
+
+def current_run():
+    """Última ejecución terminada, o None si todavía no hay ninguna."""
+    return RecommendationRun.objects.filter(finished_at__isnull=False).order_by('-finished_at').first()
+
+
+def _coordinates(rows, index):
+    """Arreglos de latitud/longitud alineados con `index`, con NaN donde no hay dato."""
+    lats = np.full(len(index), np.nan)
+    lngs = np.full(len(index), np.nan)
+    for pk, lat, lng in rows:
+        i = index.get(pk)
+        if i is not None and lat is not None and lng is not None:
+            lats[i], lngs[i] = float(lat), float(lng)
+    return lats, lngs
+
+
+def _top_k(groups, others, score, k):
+    """Máscara de los `k` pares con mayor puntuación dentro de cada grupo."""
+    order = np.lexsort((others, -score, groups))
+    sorted_groups = groups[order]
+    starts = np.flatnonzero(np.r_[True, sorted_groups[1:] != sorted_groups[:-1]])
+    sizes = np.diff(np.r_[starts, len(order)])
+    rank = np.arange(len(order)) - np.repeat(starts, sizes)
+    mask = np.zeros(len(order), dtype=bool)
+    mask[order[rank < k]] = True
+    return mask
+
+
+def _load_pairs():
+    """Pares del índice de matching de candidatos en bolsa con vacantes posibles."""
+    rows = (
+        JobCandidateMatch.objects.filter(candidato__agency_state='Bol')
+        .exclude(vacancies__lte=0)
+        .order_by()
+        .values_list('job_id', 'candidato_id', 'percentage', 'missing_essentials', 'vacancies')
+        .iterator(chunk_size=LOAD_CHUNK_SIZE)
+    )
+    job_ids, candidate_ids, percentages, missing, vacancies = [], [], [], [], []
+    for job_id, candidato_id, percentage, faltantes, vacantes in rows:
+        job_ids.append(job_id)
+        candidate_ids.append(candidato_id)
+        percentages.append(percentage)
+        missing.append(faltantes)
+        vacancies.append(np.nan if vacantes is None else vacantes)
+    return job_ids, candidate_ids, percentages, missing, vacancies
+
+
+def score_pairs(percentages, missing, total_essentials, distances, vacancies, pesos=PESOS_RECOMENDACION):
+    """
+    Componentes y puntuación (0-100) de cada par. Recibe arreglos alineados;
+    `distances` y `vacancies` usan NaN cuando no hay dato.
+    """
+    habilidades = np.clip(np.asarray(percentages, dtype=float) / 100, 0, 1)
+    total = np.asarray(total_essentials, dtype=float)
+    esenciales = np.where(total > 0, 1 - np.asarray(missing, dtype=float) / np.maximum(total, 1), 1.0)
+    distances = np.asarray(distances, dtype=float)
+    distancia = np.where(
+        np.isnan(distances), DISTANCIA_DESCONOCIDA,
+        np.clip(1 - np.nan_to_num(distances) / DISTANCIA_MAXIMA_KM, 0, 1),
+    )
+    vacancies = np.asarray(vacancies, dtype=float)
+    vacantes = np.where(
+        np.isnan(vacancies), VACANTES_DESCONOCIDAS,
+        np.clip(np.nan_to_num(vacancies) / VACANTES_SATURACION, 0, 1),
+    )
+    componentes = {
+        'habilidades': habilidades,
+        'esenciales': esenciales,
+        'distancia': distancia,
+        'vacantes': vacantes,
+    }
+    score = 100 * sum(pesos[factor] * valores for factor, valores in componentes.items())
+    return componentes, score
+
+
+def _delete_other_runs(run):
+    """Borra por bloques los renglones de las ejecuciones distintas a `run`."""
+    stale = JobRecommendation.objects.exclude(run=run)
+    deleted = 0
+    while True:
+        ids = list(stale.values_list('pk', flat=True)[:DELETE_CHUNK])
+        if not ids:
+            return deleted
+        deleted += JobRecommendation.objects.filter(pk__in=ids).delete()[0]
+
+
+def generate_recommendations(stdout=None):
+    """
+    Calcula una ejecución completa de recomendaciones y la publica al
+    terminar. Devuelve las métricas de la ejecución.
+    """
+    start = time.perf_counter()
+    run = RecommendationRun.objects.create(weights=dict(PESOS_RECOMENDACION))
+
+    job_ids, candidate_ids, percentages, missing, vacancies = _load_pairs()
+    # Índices en orden de ID para que los empates se resuelvan siempre igual
+    job_index = {pk: i for i, pk in enumerate(sorted(set(job_ids)))}
+    candidate_index = {pk: i for i, pk in enumerate(sorted(set(candidate_ids)))}
+    jobs = np.fromiter((job_index[pk] for pk in job_ids), dtype=np.int64, count=len(job_ids))
+    candidates = np.fromiter((candidate_index[pk] for pk in candidate_ids), dtype=np.int64, count=len(candidate_ids))
+    if stdout is not None:
+        stdout.write(f"  {len(jobs)} pares cargados ({time.perf_counter() - start:.1f}s)")
+
+    esenciales = dict(
+        JobHabilidadRequerida.objects.filter(nivel_importancia='esencial')
+        .order_by().values('job_id').annotate(total=Count('id')).values_list('job_id', 'total')
+    )
+    total_essentials = np.array([esenciales.get(pk, 0) for pk in job_index], dtype=float)[jobs]
+
+    # Coordenadas: domicilio del candidato y ubicación del empleo
+    job_lats, job_lngs = _coordinates(
+        Job.objects.filter(location__address_lat__isnull=False).order_by()
+        .values_list('id', 'location__address_lat', 'location__address_lng').iterator(chunk_size=LOAD_CHUNK_SIZE),
+        job_index,
+    )
+    candidate_lats, candidate_lngs = _coordinates(
+        UserProfile.objects.filter(agency_state='Bol', domicile__address_lat__isnull=False).order_by()
+        .values_list('pk', 'domicile__address_lat', 'domicile__address_lng').iterator(chunk_size=LOAD_CHUNK_SIZE),
+        candidate_index,
+    )
+    distances = haversine_pairs_km(
+        candidate_lats[candidates], candidate_lngs[candidates], job_lats[jobs], job_lngs[jobs]
+    )
+
+    componentes, score = score_pairs(percentages, missing, total_essentials, distances, vacancies)
+    cerca = np.isnan(distances) | (distances <= DISTANCIA_MAXIMA_KM)
+    keep = cerca & (
+        _top_k(np.where(cerca, candidates, -1), jobs, np.where(cerca, score, -np.inf), RECOMENDACIONES_POR_CANDIDATO)
+        | _top_k(np.where(cerca, jobs, -1), candidates, np.where(cerca, score, -np.inf), RECOMENDACIONES_POR_EMPLEO)
+    )
+    selected = np.flatnonzero(keep)
+    if stdout is not None:
+        stdout.write(f"  {len(selected)} recomendaciones seleccionadas ({time.perf_counter() - start:.1f}s)")
+
+    batch = []
+    for i in selected.tolist():
+        distance = distances[i]
+        vacantes = vacancies[i]
+        batch.append(JobRecommendation(
+            run=run,
+            job_id=job_ids[i],
+            candidato_id=candidate_ids[i],
+            score=round(float(score[i]), 2),
+            skill_component=float(componentes['habilidades'][i]),
+            essentials_component=float(componentes['esenciales'][i]),
+            distance_component=float(componentes['distancia'][i]),
+            vacancies_component=float(componentes['vacantes'][i]),
+            skill_percentage=percentages[i],
+            missing_essentials=missing[i],
+            total_essentials=int(total_essentials[i]),
+            distance_km=None if np.isnan(distance) else round(float(distance), 2),
+            vacancies=None if np.isnan(vacantes) else int(vacantes),
+        ))
+        if len(batch) >= BULK_BATCH_SIZE:
+            JobRecommendation.objects.bulk_create(batch, batch_size=BULK_BATCH_SIZE)
+            batch = []
+    JobRecommendation.objects.bulk_create(batch, batch_size=BULK_BATCH_SIZE)
+
+    run.candidates = len(np.unique(candidates[selected]))
+    run.jobs = len(np.unique(jobs[selected]))
+    run.pairs_evaluated = len(jobs)
+    run.recommendations = len(selected)
+    run.finished_at = timezone.now()
+    run.duration_seconds = round(time.perf_counter() - start, 3)
+    run.save()
+
+    deleted = _delete_other_runs(run)
+    metrics = {
+        'run': run.pk,
+        'pairs_evaluated': run.pairs_evaluated,
+        'recommendations': run.recommendations,
+        'candidates': run.candidates,
+        'jobs': run.jobs,
+        'deleted': deleted,
+        'duration_seconds': round(time.perf_counter() - start, 3),
+    }
+    logger.info("Recomendaciones generadas: %s", metrics)
+    return metrics
+
+
+def explain(recommendation, pesos=None):
+    """
+    Desglose de una recomendación: el aporte de cada componente a la
+    puntuación y una frase que lo explica.
+    """
+    pesos = pesos or PESOS_RECOMENDACION
+    r = recommendation
+    if r.total_essentials == 0:
+        esenciales = 'El empleo no tiene habilidades esenciales'
+    elif r.missing_essentials == 0:
+        esenciales = f'Cubre las {r.total_essentials} habilidades esenciales'
+    else:
+        esenciales = f'Le faltan {r.missing_essentials} de {r.total_essentials} habilidades esenciales'
+    detalles = {
+        'habilidades': f'{r.skill_percentage:.0f}% de afinidad con las habilidades requeridas',
+        'esenciales': esenciales,
+        'distancia': (
+            f'A {r.distance_km:.1f} km del domicilio' if r.distance_km is not None
+            else 'Sin coordenadas del domicilio o de la ubicación del empleo'
+        ),
+        'vacantes': (
+            f'{r.vacancies} vacante(s) abierta(s)' if r.vacancies is not None
+            else 'Vacantes sin especificar'
+        ),
+    }
+    valores = {
+        'habilidades': r.skill_component,
+        'esenciales': r.essentials_component,
+        'distancia': r.distance_component,
+        'vacantes': r.vacancies_component,
+    }
+    return [
+        {
+            'factor': factor,
+            'valor': round(valores[factor], 3),
+            'peso': pesos.get(factor, 0),
+            'aporte': round(100 * pesos.get(factor, 0) * valores[factor], 2),
+            'detalle': detalles[factor],
+        }
+        for factor in PESOS_RECOMENDACION
+    ]
@@ -1,4 +1,6 @@
 from rest_framework import serializers
+from django.db.models import Count, F, Prefetch, Window
+from django.db.models.functions import RowNumber
 
 from .models import Location, Company, Job, Employer, Habilidad, JobHabilidadRequerida
 from django.contrib.auth import get_user_model
@@ -6,6 +8,7 @@ from django.contrib.auth.models import Group
 from candidatos.models import UserProfile, CandidatoHabilidadEvaluada
 from candidatos.serializers import UserProfileMinimalSerializer
 from api.fields import SASImageField
+from api.fieldsets import SparseFieldsetsMixin
 
 User = get_user_model()
 
@@ -52,7 +55,7 @@ class CompanySerializer(serializers.ModelSerializer):
                 required=False, allow_null=True, write_only=True
             )
 
-class JobSerializer(serializers.ModelSerializer):
+class JobSerializer(SparseFieldsetsMixin, serializers.ModelSerializer):
     company = serializers.PrimaryKeyRelatedField(
         queryset=Company.objects.all(),
         allow_null=True,
@@ -82,14 +85,28 @@ class JobSerializer(serializers.ModelSerializer):
         required=False,
         help_text="Lista de IDs de habilidades requeridas"
     )
+    # Solo se llena en búsquedas por cercanía (max_distance)
+    distance_km = serializers.SerializerMethodField()
 
     class Meta:
         model = Job
         fields = [
             'id', 'name', 'company', 'company_name', 'company_logo', 'location_details', 'location_id', 
             'job_description', 'vacancies', 'horario', 'sueldo_base', 'prestaciones',
-            'habilidades_requeridas', 'habilidades_ids'
+            'habilidades_requeridas', 'habilidades_ids', 'distance_km'
         ]
+        fieldset_select_related = {
+            'company_name': ['company'],
+            'company_logo': ['company'],
+            'location_details': ['location'],
+        }
+        fieldset_prefetch_related = {
+            'habilidades_requeridas': ['jobhabilidadrequerida_set__habilidad'],
+        }
+
+    def get_distance_km(self, obj):
+        distance = getattr(obj, 'distance_km', None)
+        return round(distance, 2) if distance is not None else None
 
     def create(self, validated_data):
         # Extract habilidades_ids before creating the job
@@ -226,6 +243,9 @@ class EmployerSerializer(serializers.ModelSerializer):
 
         return instance
     
+# Comentarios por candidato incluidos en el detalle del empleo
+ASSIGNED_COMMENTS_PREVIEW = 5
+
 class JobWithAssignedCandidatesSerializer(serializers.ModelSerializer):
     company_name = serializers.CharField(source="company.name", read_only=True)
     company_logo = SASImageField(source="company.logo", read_only=True)
@@ -253,38 +273,56 @@ class JobWithAssignedCandidatesSerializer(serializers.ModelSerializer):
         } for hr in habilidades]
 
     def get_assigned_candidates(self, obj):
+        """
+        Candidatos empleados en el puesto con sus últimos comentarios, en un
+        número fijo de consultas sin importar cuántos candidatos haya: una
+        para los perfiles (con su historial actual en Prefetch) y otra para
+        los comentarios, limitados por historial con ROW_NUMBER(). El resto
+        del historial se consulta paginado en
+        /api/candidatos/employment/comments/<historial>/.
+        """
         from candidatos.models import JobHistory, JobHistoryComment
-        
-        candidates = UserProfile.objects.filter(current_job=obj, agency_state='Emp').select_related('user')
+
+        limit = self.context.get('comments_limit', ASSIGNED_COMMENTS_PREVIEW)
+        historiales = JobHistory.objects.filter(
+            job=obj,
+            end_date__isnull=True,
+            candidate__current_job=obj,
+            candidate__agency_state='Emp',
+        )
+        candidates = UserProfile.objects.filter(current_job=obj, agency_state='Emp').select_related('user').prefetch_related(
+            Prefetch('jobhistory_set', queryset=historiales.order_by('id'), to_attr='current_histories')
+        )
+
+        comments = {}
+        for comment in JobHistoryComment.objects.filter(job_history__in=historiales).annotate(
+            position=Window(
+                RowNumber(),
+                partition_by=F('job_history_id'),
+                order_by=[F('created_at').desc(), F('id').desc()],
+            ),
+            history_total=Window(Count('id'), partition_by=F('job_history_id')),
+        ).filter(position__lte=limit).select_related('author').order_by('job_history_id', 'position'):
+            comments.setdefault(comment.job_history_id, []).append(comment)
+
         candidate_data = []
-        
         for candidate in candidates:
-            # Get current job history and comments
-            current_history = JobHistory.objects.filter(
-                candidate=candidate,
-                job=obj,
-                end_date__isnull=True
-            ).first()
-            
-            comments = []
-            if current_history:
-                comments = JobHistoryComment.objects.filter(
-                    job_history=current_history
-                ).select_related('author').order_by('-created_at')
-                comments = [{
-                    'id': comment.id,
-                    'comment_text': comment.comment_text,
-                    'type': comment.type,
-                    'author_name': f"{comment.author.first_name} {comment.author.last_name}",
-                    'created_at': comment.created_at
-                } for comment in comments]
-            
+            current_history = candidate.current_histories[0] if candidate.current_histories else None
+            history_comments = comments.get(current_history.id, []) if current_history else []
             candidate_data.append({
                 'id': candidate.user_id,
                 'full_name': f"{candidate.user.first_name} {candidate.user.last_name}",
                 'email': candidate.user.email,
                 'agency_state': candidate.agency_state,
-                'current_job_history_comments': comments
+                'current_job_history_id': current_history.id if current_history else None,
+                'current_job_history_comments_count': history_comments[0].history_total if history_comments else 0,
+                'current_job_history_comments': [{
+                    'id': comment.id,
+                    'comment_text': comment.comment_text,
+                    'type': comment.type,
+                    'author_name': f"{comment.author.first_name} {comment.author.last_name}" if comment.author else None,
+                    'created_at': comment.created_at
+                } for comment in history_comments]
             })
-        
+
         return candidate_data
\ No newline at end of file
@@ -0,0 +1,28 @@
+from celery import shared_task
+
+from agencia.match_index import refresh_candidate_matches, refresh_job_matches
+from agencia.recommendations import generate_recommendations
+
+
+@shared_task
+def refresh_candidate_matches_task(candidate_ids):
+    """
+    Celery task that recalculates the job matches of the given candidates.
+    """
+    return refresh_candidate_matches(candidate_ids)
+
+
+@shared_task
+def refresh_job_matches_task(job_ids):
+    """
+    Celery task that recalculates the candidate matches of the given jobs.
+    """
+    return refresh_job_matches(job_ids)
+
+
+@shared_task
+def generate_recommendations_task():
+    """
+    Celery task that recomputes the nightly job recommendation feed.
+    """
+    return generate_recommendations()
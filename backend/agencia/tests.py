@@ -1,3 +1,208 @@
+import random
+import uuid
+
+from django.contrib.auth import get_user_model
 from django.test import TestCase
 
-# Create your tests here.
+from candidatos.models import CandidatoHabilidadEvaluada, JobHistory, JobHistoryComment, UserProfile
+
+from .matching import (
+    PESOS_IMPORTANCIA,
+    PUNTOS_COMPETENCIA,
+    SkillMatrix,
+    match_candidates_for_job,
+    match_jobs_for_candidate,
+)
+from .models import Habilidad, Job, JobHabilidadRequerida
+from .serializers import ASSIGNED_COMMENTS_PREVIEW, JobWithAssignedCandidatesSerializer
+
+User = get_user_model()
+
+NIVELES = list(PUNTOS_COMPETENCIA)
+IMPORTANCIAS = list(PESOS_IMPORTANCIA)
+
+
+def reference_score(requisitos, competencias):
+    """
+    Cálculo habilidad por habilidad que hacían JobMatchingView y
+    CandidatoMatchingView: `requisitos` son (habilidad_id, nivel_importancia)
+    y `competencias` {habilidad_id: nivel_competencia}.
+    """
+    matching_score = 0
+    max_possible_score = 0
+    coincidentes = 0
+    for habilidad_id, nivel_importancia in requisitos:
+        peso = PESOS_IMPORTANCIA.get(nivel_importancia, 1.0)
+        max_possible_score += peso * 4.0
+        if habilidad_id in competencias:
+            matching_score += PUNTOS_COMPETENCIA.get(competencias[habilidad_id], 0.0) * peso
+            coincidentes += 1
+    matching_percentage = (matching_score / max_possible_score * 100) if max_possible_score > 0 else 0
+    return round(matching_score, 2), round(matching_percentage, 1), coincidentes
+
+
+class SkillMatrixTests(TestCase):
+    def setUp(self):
+        rng = random.Random(7)
+        habilidades = list(range(1, 31))
+        self.evaluaciones = [
+            (c, h, rng.choice(NIVELES))
+            for c in range(100, 160)
+            for h in rng.sample(habilidades, 5)
+        ]
+        self.requisitos = [
+            (j, h, rng.choice(IMPORTANCIAS))
+            for j in range(1, 21)
+            for h in rng.sample(habilidades, 4)
+        ]
+        self.matrix = SkillMatrix(self.evaluaciones, self.requisitos)
+
+    def _expected(self):
+        competencias = {}
+        for c, h, nivel in self.evaluaciones:
+            competencias.setdefault(c, {})[h] = nivel
+        requisitos = {}
+        for j, h, nivel in self.requisitos:
+            requisitos.setdefault(j, []).append((h, nivel))
+        return {
+            (c, j): reference_score(requisitos[j], competencias[c])
+            for c in competencias for j in requisitos
+        }
+
+    def test_scores_match_reference(self):
+        puntuacion, coincidencias, candidatos, empleos = self.matrix.puntuaciones()
+        for (c, j), (score, _, count) in self._expected().items():
+            i, k = candidatos.index(c), empleos.index(j)
+            self.assertAlmostEqual(round(puntuacion[i, k], 2), score)
+            self.assertEqual(int(coincidencias[i, k]), count)
+
+    def test_desglose_matches_reference(self):
+        for (c, j), (score, percentage, count) in self._expected().items():
+            desglose = self.matrix.desglose(c, j, {})
+            self.assertEqual(
+                (desglose['matching_score'], desglose['matching_percentage'], desglose['habilidades_coincidentes_count']),
+                (score, percentage, count),
+            )
+
+    def test_top_matches_only_returns_candidates_with_a_required_skill(self):
+        expected = self._expected()
+        ranking = self.matrix.top_matches(k=5, por='empleo')
+        for j, top in ranking.items():
+            best = sorted(
+                (v[0] for (c, job), v in expected.items() if job == j and v[2] > 0), reverse=True,
+            )[:5]
+            self.assertEqual([round(score, 2) for _, score in top], best)
+            self.assertTrue(all(expected[(c, j)][2] > 0 for c, _ in top))
+
+
+class MatchingQueryTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        rng = random.Random(11)
+        habilidades = Habilidad.objects.bulk_create([
+            Habilidad(nombre=f"habilidad-{i}", categoria='tecnica') for i in range(12)
+        ])
+        users = User.objects.bulk_create([
+            User(id=uuid.uuid4(), email=f"match{i}@benchmark.invalid", password='!') for i in range(30)
+        ])
+        perfiles = UserProfile.objects.bulk_create([UserProfile(user=user, agency_state='Bol') for user in users])
+        CandidatoHabilidadEvaluada.objects.bulk_create([
+            CandidatoHabilidadEvaluada(
+                candidato=perfil, habilidad=habilidad,
+                nivel_competencia=rng.choice(NIVELES), es_activa=rng.random() > 0.2,
+            )
+            for perfil in perfiles
+            for habilidad in rng.sample(habilidades, 4)
+        ])
+        cls.jobs = Job.objects.bulk_create([Job(name=f"Empleo {i}") for i in range(5)])
+        JobHabilidadRequerida.objects.bulk_create([
+            JobHabilidadRequerida(job=job, habilidad=habilidad, nivel_importancia=rng.choice(IMPORTANCIAS))
+            for job in cls.jobs
+            for habilidad in rng.sample(habilidades, 3)
+        ])
+
+    def _competencias(self, perfil):
+        return dict(
+            CandidatoHabilidadEvaluada.objects.filter(candidato=perfil, es_activa=True)
+            .values_list('habilidad_id', 'nivel_competencia')
+        )
+
+    def _requisitos(self, job):
+        return list(
+            JobHabilidadRequerida.objects.filter(job=job).order_by('id').values_list('habilidad_id', 'nivel_importancia')
+        )
+
+    def test_candidates_for_job_match_reference(self):
+        for job in self.jobs:
+            requisitos = self._requisitos(job)
+            expected = {}
+            for perfil in UserProfile.objects.filter(agency_state='Bol'):
+                score = reference_score(requisitos, self._competencias(perfil))
+                if score[2]:
+                    expected[perfil.user_id] = score
+            # Requisitos, evaluaciones, habilidades y perfiles
+            with self.assertNumQueries(4):
+                _, matches, total = match_candidates_for_job(job)
+            got = {
+                m['candidato']['id']: (m['matching_score'], m['matching_percentage'], m['habilidades_coincidentes_count'])
+                for m in matches
+            }
+            self.assertEqual(got, expected)
+            self.assertEqual(total, len(expected))
+            scores = [m['matching_score'] for m in matches]
+            self.assertEqual(scores, sorted(scores, reverse=True))
+
+    def test_jobs_for_candidate_match_reference(self):
+        for perfil in UserProfile.objects.all()[:10]:
+            competencias = self._competencias(perfil)
+            expected = {}
+            for job in self.jobs:
+                score = reference_score(self._requisitos(job), competencias)
+                if score[2]:
+                    expected[job.id] = score
+            empleos, _ = match_jobs_for_candidate(perfil)
+            got = {
+                e['empleo']['id']: (e['matching_score'], e['matching_percentage'], e['habilidades_coincidentes_count'])
+                for e in empleos
+            }
+            self.assertEqual(got, expected)
+
+
+class AssignedCandidatesTests(TestCase):
+    def setUp(self):
+        self.job = Job.objects.create(name='Empleo')
+        self.author = User.objects.create_user(email='personal@benchmark.invalid', password='x', first_name='Ana')
+
+    def _hire(self, count, comments=8):
+        for i in range(count):
+            user = User.objects.create(id=uuid.uuid4(), email=f"empleado{uuid.uuid4().hex[:8]}@benchmark.invalid", password='!')
+            perfil = UserProfile.objects.create(user=user, agency_state='Emp', current_job=self.job)
+            # Un historial anterior del mismo puesto que ya terminó
+            JobHistory.objects.create(candidate=perfil, job=self.job, end_date='2024-01-01')
+            historial = JobHistory.objects.create(candidate=perfil, job=self.job)
+            JobHistoryComment.objects.bulk_create([
+                JobHistoryComment(job_history=historial, comment_text=f"Comentario {n}", author=self.author)
+                for n in range(comments)
+            ])
+
+    def _assigned(self):
+        return JobWithAssignedCandidatesSerializer().get_assigned_candidates(self.job)
+
+    def test_query_count_does_not_depend_on_candidates(self):
+        self._hire(2)
+        # Perfiles, historiales actuales y comentarios
+        with self.assertNumQueries(3):
+            self._assigned()
+        self._hire(98, comments=3)
+        with self.assertNumQueries(3):
+            data = self._assigned()
+        self.assertEqual(len(data), 100)
+
+    def test_latest_comments_preview(self):
+        self._hire(1)
+        candidate = self._assigned()[0]
+        self.assertEqual(candidate['current_job_history_comments_count'], 8)
+        comments = candidate['current_job_history_comments']
+        self.assertEqual(len(comments), ASSIGNED_COMMENTS_PREVIEW)
+        self.assertEqual(comments[0]['comment_text'], 'Comentario 7')
+        self.assertEqual(comments[0]['author_name'], 'Ana ')
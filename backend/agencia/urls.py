@@ -4,7 +4,7 @@ from .views import (
     JobAssignedCandidatesView, LocationViewSet, CompanyViewSet, JobViewSet, 
     EmployerViewSet, CurrentEmployerAPIView, HabilidadViewSet, 
     JobHabilidadRequeridaViewSet, CandidatoHabilidadEvaluadaViewSet,
-    JobMatchingView, CandidatoMatchingView
+    JobMatchingView, CandidatoMatchingView, JobRecomendacionesView, CandidatoRecomendacionesView
 )
 
 router = DefaultRouter()
@@ -22,4 +22,6 @@ urlpatterns = [
     path('jobs/<int:pk>/assigned-candidates/', JobAssignedCandidatesView.as_view(), name='job-assigned-candidates'),
     path('jobs/<int:job_id>/matching-candidates/', JobMatchingView.as_view(), name='job-matching-candidates'),
     path('candidatos/<uuid:candidato_id>/matching-jobs/', CandidatoMatchingView.as_view(), name='candidato-matching-jobs'),
+    path('jobs/<int:job_id>/recomendaciones/', JobRecomendacionesView.as_view(), name='job-recomendaciones'),
+    path('candidatos/<uuid:candidato_id>/recomendaciones/', CandidatoRecomendacionesView.as_view(), name='candidato-recomendaciones'),
 ]
\ No newline at end of file
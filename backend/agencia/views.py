@@ -1,10 +1,18 @@
 from rest_framework import viewsets, permissions, generics, status
 from rest_framework.decorators import action
+from rest_framework.pagination import PageNumberPagination
 from rest_framework.response import Response
 from django.db.models import Q, Count
 from api.permissions import IsEmployer, IsEmployerOrReadOnly
-import math
-from .models import Location, Company, Job, Employer, Habilidad, JobHabilidadRequerida
+from api.roles import has_role
+from .models import (
+    Location, Company, Job, Employer, Habilidad, JobHabilidadRequerida, JobCandidateMatch, JobRecommendation
+)
+from .geo import within_radius
+from .recommendations import current_run, explain
+from .matching import (
+    candidate_match_rows, candidate_skill_matrix, job_match_rows, job_skill_matrix, required_skills
+)
 from .serializers import (
     JobWithAssignedCandidatesSerializer, LocationSerializer, CompanySerializer, 
     JobSerializer, EmployerSerializer, HabilidadSerializer, JobHabilidadRequeridaSerializer
@@ -12,28 +20,6 @@ from .serializers import (
 from candidatos.models import UserProfile, CandidatoHabilidadEvaluada
 from candidatos.serializers import CandidatoHabilidadEvaluadaSerializer
 
-def calculate_distance(lat1, lng1, lat2, lng2):
-    """
-    Calculate the great circle distance between two points 
-    on the earth (specified in decimal degrees).
-    Returns distance in kilometers.
-    """
-    if None in [lat1, lng1, lat2, lng2]:
-        return None
-    
-    # Convert decimal degrees to radians
-    lat1, lng1, lat2, lng2 = map(math.radians, [float(lat1), float(lng1), float(lat2), float(lng2)])
-    
-    # Haversine formula
-    dlat = lat2 - lat1
-    dlng = lng2 - lng1
-    a = math.sin(dlat/2)**2 + math.cos(lat1) * math.cos(lat2) * math.sin(dlng/2)**2
-    c = 2 * math.asin(math.sqrt(a))
-    
-    # Radius of earth in kilometers
-    r = 6371
-    return c * r
-
 class LocationViewSet(viewsets.ModelViewSet):
     queryset         = Location.objects.all()
     serializer_class = LocationSerializer
@@ -42,7 +28,7 @@ class LocationViewSet(viewsets.ModelViewSet):
 
     def get_queryset(self):
         qs = Location.objects.select_related('company').all()
-        if not self.request.user.is_staff and not self.request.user.groups.filter(name='agencia_laboral').exists():
+        if not self.request.user.is_staff and not has_role(self.request.user, 'agencia_laboral'):
             qs = qs.filter(company=self.request.user.employer.company)
         
         # Add search functionality
@@ -67,51 +53,76 @@ class CompanyViewSet(viewsets.ModelViewSet):
 
     def get_queryset(self):
         qs = Company.objects.all()
-        if not self.request.user.is_staff and not self.request.user.groups.filter(name='agencia_laboral').exists():
+        if not self.request.user.is_staff and not has_role(self.request.user, 'agencia_laboral'):
             # employer only sees their own company
             qs = qs.filter(pk=self.request.user.employer.company_id)
         return qs
 
+class OptionalPagination(PageNumberPagination):
+    """Pagina solo cuando el cliente envía `page_size`; si no, devuelve la lista completa."""
+    page_size = None
+    page_size_query_param = 'page_size'
+    max_page_size = 200
+
+
 class JobViewSet(viewsets.ModelViewSet):
     permission_classes = [permissions.IsAuthenticated, IsEmployerOrReadOnly]
     serializer_class = JobSerializer
+    pagination_class = OptionalPagination
 
     queryset = Job.objects.select_related('company', 'location').all()
 
     def get_queryset(self):
-        qs = Job.objects.select_related('company', 'location').all()
-        if not self.request.user.is_staff and not self.request.user.groups.filter(name='personal').exists():
+        qs = self.get_serializer_class().optimize_queryset(Job.objects.all(), self.request)
+        if not self.request.user.is_staff and not has_role(self.request.user, 'personal'):
             qs = qs.filter(company=self.request.user.employer.company)
-        
-        # Proximity filtering
-        max_distance = self.request.query_params.get('max_distance', None)
-        candidate_lat = self.request.query_params.get('candidate_lat', None)
-        candidate_lng = self.request.query_params.get('candidate_lng', None)
-        
-        if max_distance and candidate_lat and candidate_lng:
-            try:
-                max_distance = float(max_distance)
-                candidate_lat = float(candidate_lat)
-                candidate_lng = float(candidate_lng)
-                
-                # Filter jobs by distance
-                filtered_jobs = []
-                for job in qs:
-                    if job.location and job.location.address_lat and job.location.address_lng:
-                        distance = calculate_distance(
-                            candidate_lat, candidate_lng,
-                            job.location.address_lat, job.location.address_lng
-                        )
-                        if distance is not None and distance <= max_distance:
-                            filtered_jobs.append(job.id)
-                
-                qs = qs.filter(id__in=filtered_jobs)
-            except (ValueError, TypeError):
-                # If invalid parameters, ignore proximity filtering
-                pass
-        
         return qs
 
+    def _proximity_params(self):
+        """`(lat, lng, max_distance)` si se pidió filtrar por cercanía; si no, None."""
+        params = self.request.query_params
+        try:
+            return (
+                float(params['candidate_lat']),
+                float(params['candidate_lng']),
+                float(params['max_distance']),
+            )
+        except (KeyError, ValueError, TypeError):
+            # Si faltan parámetros o son inválidos se ignora el filtro de cercanía
+            return None
+
+    def list(self, request, *args, **kwargs):
+        """
+        Con `max_distance`, `candidate_lat` y `candidate_lng` devuelve solo los
+        empleos dentro del radio (km), ordenados por distancia. Se pagina si
+        se envía `page_size` (y opcionalmente `page`).
+        """
+        proximity = self._proximity_params()
+        if proximity is None:
+            return super().list(request, *args, **kwargs)
+
+        lat, lng, max_distance = proximity
+        queryset = self.filter_queryset(self.get_queryset())
+        ranked = within_radius(queryset, lat, lng, max_distance)
+
+        page = self.paginate_queryset(ranked)
+        rows = page if page is not None else ranked
+        jobs = {}
+        for i in range(0, len(rows), 1000):
+            jobs.update(queryset.in_bulk([job_id for job_id, _ in rows[i:i + 1000]]))
+
+        results = []
+        for job_id, distance in rows:
+            job = jobs.get(job_id)
+            if job is not None:
+                job.distance_km = distance
+                results.append(job)
+
+        serializer = self.get_serializer(results, many=True)
+        if page is not None:
+            return self.get_paginated_response(serializer.data)
+        return Response(serializer.data)
+
 class EmployerViewSet(viewsets.ModelViewSet):
     permission_classes = [permissions.IsAuthenticated, IsEmployer]
     serializer_class = EmployerSerializer
@@ -120,7 +131,7 @@ class EmployerViewSet(viewsets.ModelViewSet):
 
     def get_queryset(self):
         qs = Employer.objects.select_related('user','company').all()
-        if not self.request.user.is_staff and not self.request.user.groups.filter(name='agencia_laboral').exists():
+        if not self.request.user.is_staff and not has_role(self.request.user, 'agencia_laboral'):
             qs = qs.filter(company=self.request.user.employer.company)
         return qs
     
@@ -137,7 +148,7 @@ class JobAssignedCandidatesView(generics.RetrieveAPIView):
     API view to retrieve a specific Job and the candidates currently assigned to it.
     Takes a job_id as a URL parameter.
     """
-    queryset = Job.objects.all() # The base queryset for the job
+    queryset = Job.objects.select_related('company', 'location') # The base queryset for the job
     serializer_class = JobWithAssignedCandidatesSerializer
     permission_classes = [permissions.IsAuthenticated, IsEmployerOrReadOnly] # Or more restrictive if needed
 
@@ -205,162 +216,75 @@ class CandidatoHabilidadEvaluadaViewSet(viewsets.ModelViewSet):
             qs = qs.filter(candidato_id=candidato_id)
         return qs
 
+class MatchPagination(PageNumberPagination):
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 200
+
+
 class JobMatchingView(generics.GenericAPIView):
     """
     Vista para encontrar candidatos que coincidan con las habilidades requeridas de un empleo.
+    Lee el índice JobCandidateMatch ordenado por puntuación y pagina con
+    `?page=` y `?page_size=`; el desglose por habilidad se calcula solo para
+    los candidatos de la página.
     """
     permission_classes = [permissions.IsAuthenticated, IsEmployerOrReadOnly]
     
     def get(self, request, job_id):
         try:
-            job = Job.objects.get(id=job_id)
+            job = Job.objects.select_related('company').get(id=job_id)
         except Job.DoesNotExist:
             return Response(
                 {'error': 'Empleo no encontrado'}, 
                 status=status.HTTP_404_NOT_FOUND
             )
         
-        # Obtener habilidades requeridas del empleo
-        habilidades_requeridas = JobHabilidadRequerida.objects.filter(job=job).select_related('habilidad')
-        
-        if not habilidades_requeridas.exists():
+        job_data = {
+            'id': job.id,
+            'name': job.name,
+            'company': job.company.name if job.company else None
+        }
+
+        if not JobHabilidadRequerida.objects.filter(job=job).exists():
             return Response({
-                'job': {
-                    'id': job.id,
-                    'name': job.name,
-                    'company': job.company.name if job.company else None
-                },
+                'job': job_data,
                 'habilidades_requeridas': [],
                 'candidatos_matching': [],
                 'message': 'Este empleo no tiene habilidades requeridas definidas'
             })
         
-        # Obtener IDs de habilidades requeridas
-        habilidades_ids = [hr.habilidad.id for hr in habilidades_requeridas]
-        
-        # Buscar candidatos que tengan al menos una de las habilidades requeridas
-        candidatos_con_habilidades = UserProfile.objects.filter(
-            candidatohabilidadevaluada__habilidad_id__in=habilidades_ids,
-            candidatohabilidadevaluada__es_activa=True,
-            agency_state='Bol'  # Solo candidatos en bolsa de trabajo
-        ).distinct().select_related('user')
-        
-        # Calcular matching para cada candidato
-        candidatos_matching = []
-        for candidato in candidatos_con_habilidades:
-            # Obtener habilidades evaluadas del candidato
-            habilidades_candidato = CandidatoHabilidadEvaluada.objects.filter(
-                candidato=candidato,
-                habilidad_id__in=habilidades_ids,
-                es_activa=True
-            ).select_related('habilidad')
-            
-            # Calcular puntuación de matching con algoritmo mejorado
-            matching_score = 0
-            max_possible_score = 0
-            habilidades_coincidentes = []
-            habilidades_faltantes = []
-            
-            for hr in habilidades_requeridas:
-                # Peso de importancia de la habilidad
-                peso_importancia = {
-                    'esencial': 4.0,    # Peso máximo para habilidades esenciales
-                    'importante': 2.0,  # Peso medio para habilidades importantes
-                    'deseable': 1.0     # Peso mínimo para habilidades deseables
-                }.get(hr.nivel_importancia, 1.0)
-                
-                # Puntuación máxima posible para esta habilidad
-                max_score_habilidad = peso_importancia * 4.0  # 4 = nivel experto máximo
-                max_possible_score += max_score_habilidad
-                
-                habilidad_candidato = habilidades_candidato.filter(habilidad=hr.habilidad).first()
-                if habilidad_candidato:
-                    # Puntuación del candidato basada en su nivel de competencia
-                    competencia_score = {
-                        'basico': 1.0,      # 25% de la puntuación máxima
-                        'intermedio': 2.0,  # 50% de la puntuación máxima
-                        'avanzado': 3.0,    # 75% de la puntuación máxima
-                        'experto': 4.0      # 100% de la puntuación máxima
-                    }.get(habilidad_candidato.nivel_competencia, 0.0)
-                    
-                    # Puntuación final para esta habilidad
-                    skill_score = competencia_score * peso_importancia
-                    matching_score += skill_score
-                    
-                    # Calcular porcentaje de competencia para esta habilidad específica
-                    porcentaje_competencia = (competencia_score / 4.0) * 100
-                    
-                    habilidades_coincidentes.append({
-                        'habilidad': hr.habilidad.nombre,
-                        'categoria': hr.habilidad.categoria,
-                        'nivel_requerido': hr.get_nivel_importancia_display(),
-                        'nivel_candidato': habilidad_candidato.get_nivel_competencia_display(),
-                        'puntuacion': round(skill_score, 2),
-                        'porcentaje_competencia': round(porcentaje_competencia, 1),
-                        'peso_importancia': peso_importancia
-                    })
-                else:
-                    # El candidato no tiene esta habilidad
-                    habilidades_faltantes.append({
-                        'habilidad': hr.habilidad.nombre,
-                        'categoria': hr.habilidad.categoria,
-                        'nivel_requerido': hr.get_nivel_importancia_display(),
-                        'peso_importancia': peso_importancia,
-                        'puntuacion_perdida': max_score_habilidad
-                    })
-            
-            # Calcular porcentaje de matching preciso
-            matching_percentage = (matching_score / max_possible_score * 100) if max_possible_score > 0 else 0
-            
-            candidatos_matching.append({
-                'candidato': {
-                    'id': candidato.user_id,
-                    'nombre': f"{candidato.user.first_name} {candidato.user.last_name} {candidato.user.second_last_name}",
-                    'curp': candidato.curp,
-                    'email': candidato.user.email
-                },
-                'matching_score': round(matching_score, 2),
-                'max_possible_score': round(max_possible_score, 2),
-                'matching_percentage': round(matching_percentage, 1),
-                'habilidades_coincidentes': habilidades_coincidentes,
-                'habilidades_faltantes': habilidades_faltantes,
-                'total_habilidades_requeridas': len(habilidades_requeridas),
-                'habilidades_coincidentes_count': len(habilidades_coincidentes),
-                'habilidades_faltantes_count': len(habilidades_faltantes),
-                'puntuacion_perdida': round(sum([h.get('puntuacion_perdida', 0) for h in habilidades_faltantes]), 2)
-            })
-        
-        # Ordenar por puntuación de matching (mayor a menor)
-        candidatos_matching.sort(key=lambda x: x['matching_score'], reverse=True)
+        matches = JobCandidateMatch.objects.filter(
+            job=job,
+            candidato__agency_state='Bol'  # Solo candidatos en bolsa de trabajo
+        ).order_by('-score', 'candidato_id')
+
+        paginator = MatchPagination()
+        candidato_ids = paginator.paginate_queryset(matches.values_list('candidato_id', flat=True), request, view=self)
+
+        matrix = job_skill_matrix(job, candidate_ids=candidato_ids)
+        habilidades = matrix.habilidades()
         
         return Response({
-            'job': {
-                'id': job.id,
-                'name': job.name,
-                'company': job.company.name if job.company else None
-            },
-            'habilidades_requeridas': [
-                {
-                    'id': hr.habilidad.id,
-                    'nombre': hr.habilidad.nombre,
-                    'categoria': hr.habilidad.categoria,
-                    'nivel_importancia': hr.get_nivel_importancia_display()
-                }
-                for hr in habilidades_requeridas
-            ],
-            'candidatos_matching': candidatos_matching,
-            'total_candidatos': len(candidatos_matching)
+            'job': job_data,
+            'habilidades_requeridas': required_skills(matrix, job.id, habilidades),
+            'candidatos_matching': candidate_match_rows(matrix, job.id, candidato_ids, habilidades),
+            'total_candidatos': paginator.page.paginator.count,
+            'next': paginator.get_next_link(),
+            'previous': paginator.get_previous_link()
         })
 
 class CandidatoMatchingView(generics.GenericAPIView):
     """
     Vista para encontrar empleos que coincidan con las habilidades de un candidato.
+    Lee el índice JobCandidateMatch ordenado por puntuación y pagina con
+    `?page=` y `?page_size=`. Filtros opcionales: `job_id` y `con_vacantes=true`.
     """
     permission_classes = [permissions.IsAuthenticated]
     
     def get(self, request, candidato_id):
         try:
-            candidato = UserProfile.objects.get(user_id=candidato_id)
+            candidato = UserProfile.objects.select_related('user').get(user_id=candidato_id)
         except UserProfile.DoesNotExist:
             return Response(
                 {'error': 'Candidato no encontrado'}, 
@@ -368,127 +292,41 @@ class CandidatoMatchingView(generics.GenericAPIView):
             )
         
         # Obtener habilidades evaluadas del candidato
-        habilidades_candidato = CandidatoHabilidadEvaluada.objects.filter(
+        habilidades_candidato = list(CandidatoHabilidadEvaluada.objects.filter(
             candidato=candidato,
             es_activa=True
-        ).select_related('habilidad')
+        ).select_related('habilidad'))
+
+        candidato_data = {
+            'id': candidato.user_id,
+            'nombre': f"{candidato.user.first_name} {candidato.user.last_name} {candidato.user.second_last_name}",
+            'curp': candidato.curp
+        }
         
-        if not habilidades_candidato.exists():
+        if not habilidades_candidato:
             return Response({
-                'candidato': {
-                    'id': candidato.user_id,
-                    'nombre': f"{candidato.user.first_name} {candidato.user.last_name} {candidato.user.second_last_name}",
-                    'curp': candidato.curp
-                },
+                'candidato': candidato_data,
                 'habilidades_evaluadas': [],
                 'empleos_matching': [],
                 'message': 'Este candidato no tiene habilidades evaluadas'
             })
         
-        # Obtener IDs de habilidades del candidato
-        habilidades_ids = [hc.habilidad.id for hc in habilidades_candidato]
-        
-        # Buscar empleos que requieran al menos una de las habilidades del candidato
-        empleos_con_habilidades = Job.objects.filter(
-            jobhabilidadrequerida__habilidad_id__in=habilidades_ids
-        ).distinct().select_related('company', 'location')
-        
-        # Calcular matching para cada empleo
-        empleos_matching = []
-        for empleo in empleos_con_habilidades:
-            # Obtener habilidades requeridas del empleo
-            habilidades_requeridas = JobHabilidadRequerida.objects.filter(
-                job=empleo
-            ).select_related('habilidad')
-            
-            # Calcular puntuación de matching con algoritmo mejorado
-            matching_score = 0
-            max_possible_score = 0
-            habilidades_coincidentes = []
-            habilidades_faltantes = []
-            
-            for hr in habilidades_requeridas:
-                # Peso de importancia de la habilidad
-                peso_importancia = {
-                    'esencial': 4.0,    # Peso máximo para habilidades esenciales
-                    'importante': 2.0,  # Peso medio para habilidades importantes
-                    'deseable': 1.0     # Peso mínimo para habilidades deseables
-                }.get(hr.nivel_importancia, 1.0)
-                
-                # Puntuación máxima posible para esta habilidad
-                max_score_habilidad = peso_importancia * 4.0  # 4 = nivel experto máximo
-                max_possible_score += max_score_habilidad
-                
-                habilidad_candidato = habilidades_candidato.filter(habilidad=hr.habilidad).first()
-                if habilidad_candidato:
-                    # Puntuación del candidato basada en su nivel de competencia
-                    competencia_score = {
-                        'basico': 1.0,      # 25% de la puntuación máxima
-                        'intermedio': 2.0,  # 50% de la puntuación máxima
-                        'avanzado': 3.0,    # 75% de la puntuación máxima
-                        'experto': 4.0      # 100% de la puntuación máxima
-                    }.get(habilidad_candidato.nivel_competencia, 0.0)
-                    
-                    # Puntuación final para esta habilidad
-                    skill_score = competencia_score * peso_importancia
-                    matching_score += skill_score
-                    
-                    # Calcular porcentaje de competencia para esta habilidad específica
-                    porcentaje_competencia = (competencia_score / 4.0) * 100
-                    
-                    habilidades_coincidentes.append({
-                        'habilidad': hr.habilidad.nombre,
-                        'categoria': hr.habilidad.categoria,
-                        'nivel_requerido': hr.get_nivel_importancia_display(),
-                        'nivel_candidato': habilidad_candidato.get_nivel_competencia_display(),
-                        'puntuacion': round(skill_score, 2),
-                        'porcentaje_competencia': round(porcentaje_competencia, 1),
-                        'peso_importancia': peso_importancia
-                    })
-                else:
-                    # El candidato no tiene esta habilidad
-                    habilidades_faltantes.append({
-                        'habilidad': hr.habilidad.nombre,
-                        'categoria': hr.habilidad.categoria,
-                        'nivel_requerido': hr.get_nivel_importancia_display(),
-                        'peso_importancia': peso_importancia,
-                        'puntuacion_perdida': max_score_habilidad
-                    })
-            
-            # Calcular porcentaje de matching preciso
-            matching_percentage = (matching_score / max_possible_score * 100) if max_possible_score > 0 else 0
-            
-            empleos_matching.append({
-                'empleo': {
-                    'id': empleo.id,
-                    'name': empleo.name,
-                    'company': empleo.company.name if empleo.company else None,
-                    'location': str(empleo.location) if empleo.location else None,
-                    'vacancies': empleo.vacancies,
-                    'horario': empleo.horario,
-                    'sueldo_base': float(empleo.sueldo_base) if empleo.sueldo_base else None,
-                    'prestaciones': empleo.prestaciones
-                },
-                'matching_score': round(matching_score, 2),
-                'max_possible_score': round(max_possible_score, 2),
-                'matching_percentage': round(matching_percentage, 1),
-                'habilidades_coincidentes': habilidades_coincidentes,
-                'habilidades_faltantes': habilidades_faltantes,
-                'total_habilidades_requeridas': len(habilidades_requeridas),
-                'habilidades_coincidentes_count': len(habilidades_coincidentes),
-                'habilidades_faltantes_count': len(habilidades_faltantes),
-                'puntuacion_perdida': round(sum([h.get('puntuacion_perdida', 0) for h in habilidades_faltantes]), 2)
-            })
-        
-        # Ordenar por puntuación de matching (mayor a menor)
-        empleos_matching.sort(key=lambda x: x['matching_score'], reverse=True)
+        matches = JobCandidateMatch.objects.filter(candidato=candidato).order_by('-score', 'job_id')
+        job_id = request.query_params.get('job_id')
+        if job_id:
+            try:
+                matches = matches.filter(job_id=int(job_id))
+            except ValueError:
+                return Response({'error': 'job_id inválido'}, status=status.HTTP_400_BAD_REQUEST)
+        if request.query_params.get('con_vacantes') == 'true':
+            matches = matches.filter(vacancies__gt=0)
+
+        paginator = MatchPagination()
+        job_ids = paginator.paginate_queryset(matches.values_list('job_id', flat=True), request, view=self)
+        matrix = candidate_skill_matrix(candidato, job_ids=job_ids)
         
         return Response({
-            'candidato': {
-                'id': candidato.user_id,
-                'nombre': f"{candidato.user.first_name} {candidato.user.last_name} {candidato.user.second_last_name}",
-                'curp': candidato.curp
-            },
+            'candidato': candidato_data,
             'habilidades_evaluadas': [
                 {
                     'id': hc.habilidad.id,
@@ -498,6 +336,100 @@ class CandidatoMatchingView(generics.GenericAPIView):
                 }
                 for hc in habilidades_candidato
             ],
-            'empleos_matching': empleos_matching,
-            'total_empleos': len(empleos_matching)
+            'empleos_matching': job_match_rows(matrix, candidato.pk, job_ids),
+            'total_empleos': paginator.page.paginator.count,
+            'next': paginator.get_next_link(),
+            'previous': paginator.get_previous_link()
+        })
+
+
+class CandidatoRecomendacionesView(generics.GenericAPIView):
+    """
+    Empleos recomendados para un candidato según el último cálculo nocturno
+    (agencia/recommendations.py), ordenados por puntuación y paginados con
+    `?page=` y `?page_size=`. Cada recomendación incluye el desglose de por
+    qué se recomienda.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request, candidato_id):
+        try:
+            candidato = UserProfile.objects.select_related('user').get(user_id=candidato_id)
+        except UserProfile.DoesNotExist:
+            return Response({'error': 'Candidato no encontrado'}, status=status.HTTP_404_NOT_FOUND)
+
+        run = current_run()
+        recomendaciones = JobRecommendation.objects.filter(run=run, candidato=candidato).select_related(
+            'job__company'
+        ).order_by('-score', 'job_id')
+        paginator = MatchPagination()
+        page = paginator.paginate_queryset(recomendaciones, request, view=self)
+
+        return Response({
+            'candidato': {
+                'id': candidato.user_id,
+                'nombre': f"{candidato.user.first_name} {candidato.user.last_name} {candidato.user.second_last_name}",
+            },
+            'generado': run.finished_at if run else None,
+            'recomendaciones': [
+                {
+                    'empleo': {
+                        'id': r.job.id,
+                        'name': r.job.name,
+                        'company': r.job.company.name if r.job.company else None,
+                        'vacancies': r.job.vacancies,
+                    },
+                    'puntuacion': r.score,
+                    'porque': explain(r, run.weights),
+                }
+                for r in page
+            ],
+            'total_recomendaciones': paginator.page.paginator.count,
+            'next': paginator.get_next_link(),
+            'previous': paginator.get_previous_link()
+        })
+
+
+class JobRecomendacionesView(generics.GenericAPIView):
+    """
+    Candidatos recomendados para un empleo según el último cálculo nocturno,
+    con el mismo formato y paginación que CandidatoRecomendacionesView. Solo
+    incluye candidatos que siguen en bolsa de trabajo.
+    """
+    permission_classes = [permissions.IsAuthenticated, IsEmployerOrReadOnly]
+
+    def get(self, request, job_id):
+        try:
+            job = Job.objects.select_related('company').get(id=job_id)
+        except Job.DoesNotExist:
+            return Response({'error': 'Empleo no encontrado'}, status=status.HTTP_404_NOT_FOUND)
+
+        run = current_run()
+        recomendaciones = JobRecommendation.objects.filter(
+            run=run, job=job, candidato__agency_state='Bol'
+        ).select_related('candidato__user').order_by('-score', 'candidato_id')
+        paginator = MatchPagination()
+        page = paginator.paginate_queryset(recomendaciones, request, view=self)
+
+        return Response({
+            'job': {
+                'id': job.id,
+                'name': job.name,
+                'company': job.company.name if job.company else None
+            },
+            'generado': run.finished_at if run else None,
+            'recomendaciones': [
+                {
+                    'candidato': {
+                        'id': r.candidato.user_id,
+                        'nombre': f"{r.candidato.user.first_name} {r.candidato.user.last_name} {r.candidato.user.second_last_name}",
+                    },
+                    'puntuacion': r.score,
+                    'porque': explain(r, run.weights),
+                }
+                for r in page
+            ],
+            'total_recomendaciones': paginator.page.paginator.count,
+            'next': paginator.get_next_link(),
+            'previous': paginator.get_previous_link()
         })
@@ -1,6 +1,7 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
-from .models import CustomUser
+from .email_outbox import retry
+from .models import CustomUser, EmailOutbox, UploadSession
 from .forms import CustomUserChangeForm # <-- Import your new form
 
 class CustomUserAdmin(UserAdmin):
@@ -24,4 +25,27 @@ class CustomUserAdmin(UserAdmin):
 
     groups_list.short_description = 'Groups'
 
-admin.site.register(CustomUser, CustomUserAdmin)
\ No newline at end of file
+admin.site.register(CustomUser, CustomUserAdmin)
+
+class EmailOutboxAdmin(admin.ModelAdmin):
+    list_display = ['id', 'subject', 'recipients', 'status', 'attempts', 'created_at', 'sent_at', 'next_attempt_at']
+    list_filter = ['status']
+    search_fields = ['subject', 'recipients']
+    readonly_fields = [f.name for f in EmailOutbox._meta.fields]
+    actions = ['retry_emails']
+
+    @admin.action(description='Reintentar el envío')
+    def retry_emails(self, request, queryset):
+        count = retry(queryset)
+        self.message_user(request, f"{count} correos en cola para reenviar")
+
+admin.site.register(EmailOutbox, EmailOutboxAdmin)
+
+
+class UploadSessionAdmin(admin.ModelAdmin):
+    list_display = ['id', 'filename', 'target', 'target_id', 'user', 'size', 'status', 'created_at', 'expires_at']
+    list_filter = ['status', 'target']
+    search_fields = ['filename', 'target_id', 'user__email']
+    readonly_fields = [f.name for f in UploadSession._meta.fields]
+
+admin.site.register(UploadSession, UploadSessionAdmin)
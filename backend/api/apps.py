@@ -6,4 +6,6 @@ class ApiConfig(AppConfig):
     name = 'api'
 
     def ready(self):
-        import api.signals
\ No newline at end of file
+        import api.signals
+        from api.conditional import connect_version_tracking
+        connect_version_tracking()
\ No newline at end of file
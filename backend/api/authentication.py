@@ -1,17 +1,23 @@
 import logging
+import jwt
 from rest_framework import authentication
 from rest_framework_simplejwt.authentication import JWTAuthentication
 from django_auth_adfs.rest_framework import AdfsAccessTokenAuthentication
 from django.contrib.auth import get_user_model
 from django.contrib.auth.models import Group
 from centros.models import Center
+from api import token_cache
+from api.roles import has_role
 
 logger = logging.getLogger(__name__)
 User = get_user_model()
 
 class MultipleAuthAuthentication(authentication.BaseAuthentication):
     """
-    Try ADFS first, then JWT.  ADFS logins get auto‐added to 'personal' group.
+    ADFS o JWT según el tipo de token (api/token_cache.py). ADFS logins get
+    auto‐added to 'personal' group. Los tokens validados se guardan en caché
+    hasta su expiración, así que las peticiones siguientes con el mismo token
+    solo cargan al usuario.
     """
 
     def __init__(self):
@@ -20,60 +26,72 @@ class MultipleAuthAuthentication(authentication.BaseAuthentication):
 
     def authenticate(self, request):
         auth_header = request.META.get('HTTP_AUTHORIZATION', '')
-        logger.debug(f"Authorization header: {auth_header!r}")
+        parts = auth_header.split()
+        if len(parts) != 2 or parts[0].lower() != 'bearer':
+            logger.debug("No bearer token in Authorization header")
+            return None
+        raw_token = parts[1]
 
-        # --- 1) Try ADFS ---
-        try:
-            if auth_header.startswith('Bearer '):
-                adfs_auth = self.adfs_authentication.authenticate(request)
-                if adfs_auth is not None:
-                    user, token = adfs_auth
-                    logger.debug("ADFS authentication successful")
-
-                    # ✅ Ensure the user is in the 'personal' group
-                    personal_group, _ = Group.objects.get_or_create(name='personal')
-                    if personal_group not in user.groups.all():
-                        user.groups.add(personal_group)
-                        user.save(update_fields=['last_login'])  # or no fields
-
-                    # ✅ Add user to center with ID 1 if they don't have a center
-                    if not hasattr(user, 'center') or user.center is None:
-                        try:
-                            center_one = Center.objects.get(pk=1)
-                            user.center = center_one
-                            user.save(update_fields=['center'])
-                            logger.info(f"User {user.username} added to center: {center_one.name} (ID 1)")
-                        except Center.DoesNotExist:
-                            logger.error("Center with ID 1 does not exist.")
-                            
-                    #Alternative: Restrict Staff Access Based on ADFS Groups
-                    #if user and not user.is_staff:
-                    #    roles = token.get('roles', [])  # Extract roles from ADFS token
-                    #    if "AdminRole" in roles:  # Replace with your ADFS role
-                    #        user.is_staff = True
-                    #        user.save()
-                    #        logger.debug(f"User {user.username} marked as staff based on role")
-                    #
+        # --- 0) Token validado antes ---
+        user = token_cache.cached_user(raw_token)
+        if user is not None:
+            return user, raw_token
 
-                    return user, token
+        # --- 1) ADFS ---
+        if token_cache.token_kind(raw_token) == token_cache.ADFS:
+            try:
+                adfs_auth = self.adfs_authentication.authenticate(request)
+            except Exception as e:
+                logger.debug(f"ADFS auth error: {e}")
+                return None
+            if adfs_auth is None:
+                logger.debug("ADFS returned None")
+                return None
 
-                logger.debug("ADFS returned None, falling back to JWT")
-        except Exception as e:
-            logger.debug(f"ADFS auth error: {e}")
+            user, token = adfs_auth
+            logger.debug("ADFS authentication successful")
+            self._setup_adfs_user(user)
+            token_cache.remember(
+                raw_token, user, jwt.decode(raw_token, options={"verify_signature": False}), token_cache.ADFS,
+            )
+            return user, raw_token
 
-        # --- 2) Try JWT ---
+        # --- 2) JWT ---
         try:
-            jwt_auth = self.jwt_authentication.authenticate(request)
-            if jwt_auth is not None:
-                logger.debug("JWT authentication successful")
-                return jwt_auth
-            logger.debug("JWT returned None")
+            validated_token = self.jwt_authentication.get_validated_token(raw_token)
+            user = self.jwt_authentication.get_user(validated_token)
         except Exception as e:
             logger.debug(f"JWT auth error: {e}")
+            return None
+        logger.debug("JWT authentication successful")
+        token_cache.remember(raw_token, user, dict(validated_token.payload), token_cache.JWT)
+        return user, raw_token
+
+    def _setup_adfs_user(self, user):
+        # ✅ Ensure the user is in the 'personal' group
+        if not has_role(user, 'personal'):
+            personal_group, _ = Group.objects.get_or_create(name='personal')
+            user.groups.add(personal_group)
+            user.save(update_fields=['last_login'])  # or no fields
+
+        # ✅ Add user to center with ID 1 if they don't have a center
+        if not hasattr(user, 'center') or user.center is None:
+            try:
+                center_one = Center.objects.get(pk=1)
+                user.center = center_one
+                user.save(update_fields=['center'])
+                logger.info(f"User {user.username} added to center: {center_one.name} (ID 1)")
+            except Center.DoesNotExist:
+                logger.error("Center with ID 1 does not exist.")
 
-        # --- 3) All failed ---
-        logger.debug("Authentication failed")
-        return None
+        #Alternative: Restrict Staff Access Based on ADFS Groups
+        #if user and not user.is_staff:
+        #    roles = token.get('roles', [])  # Extract roles from ADFS token
+        #    if "AdminRole" in roles:  # Replace with your ADFS role
+        #        user.is_staff = True
+        #        user.save()
+        #        logger.debug(f"User {user.username} marked as staff based on role")
+        #
 
     def authenticate_header(self, request):
         headers = []
@@ -0,0 +1,232 @@
+"""
+GET condicionales (ETag / Last-Modified) para los endpoints de lectura pesados.
+
+Cada modelo registrado en VERSIONED_MODELS tiene un contador de versión en la
+caché que se incrementa con post_save, post_delete y m2m_changed. Un endpoint
+declara de qué modelos depende su respuesta; el ETag se calcula con esas
+versiones, el usuario y la URL, sin consultar la base de datos. Si el cliente
+envía el mismo ETag (If-None-Match) se responde 304 sin serializar nada.
+Last-Modified se envía solo como referencia: tiene resolución de segundos y
+un cambio dentro del mismo segundo no se notaría, así que If-Modified-Since
+nunca produce un 304.
+
+Las versiones se incrementan al confirmar la transacción (ATOMIC_REQUESTS):
+si se incrementaran antes, un GET simultáneo podría guardar datos sin
+confirmar bajo el ETag nuevo. Si la caché no responde, los guardados siguen
+funcionando y los GET responden sin ETag.
+
+Los cambios hechos con queryset.update()/bulk_create no disparan señales; en
+esos casos hay que llamar a `bump_model_version(Model)`.
+"""
+import functools
+import hashlib
+import logging
+import time
+
+from django.apps import apps
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+
+logger = logging.getLogger(__name__)
+
+VERSION_KEY = 'model-version:{}'
+CHANGED_AT_KEY = 'model-changed-at:{}'
+
+# Modelos cuyos cambios invalidan los ETags de los endpoints que dependen de ellos
+VERSIONED_MODELS = [
+    'api.CustomUser',
+    'candidatos.UserProfile',
+    'candidatos.Domicile',
+    'candidatos.Cycle',
+    'candidatos.Medication',
+    'candidatos.JobHistory',
+    'centros.Center',
+    'centros.TransferRequest',
+    'centros.Location',
+    'agencia.Company',
+    'agencia.Job',
+    'agencia.JobHabilidadRequerida',
+    'cuestionarios.BaseCuestionarios',
+    'cuestionarios.Cuestionario',
+    'cuestionarios.Pregunta',
+    'cuestionarios.Opcion',
+    'cuestionarios.ImagenOpcion',
+    'cuestionarios.DesbloqueoPregunta',
+    'cuestionarios.Respuesta',
+    'cuestionarios.EstadoCuestionario',
+    'discapacidad.DisabilityGroup',
+    'discapacidad.Disability',
+    'discapacidad.Impediment',
+    'discapacidad.TechnicalAid',
+    'discapacidad.TechnicalAidImpediment',
+    'discapacidad.TechnicalAidLink',
+    'discapacidad.SISGroup',
+    'discapacidad.SISItem',
+    'discapacidad.SISAid',
+    'discapacidad.SISHelp',
+    'discapacidad.CHGroup',
+    'discapacidad.CHItem',
+]
+
+# Guardados que no cambian ninguna respuesta (p. ej. el inicio de sesión)
+IGNORED_UPDATE_FIELDS = {'last_login'}
+
+
+def _label(model):
+    return model._meta.label_lower
+
+
+def _initial_version():
+    # Si la caché se vacía, el contador reinicia en un valor mayor a cualquier anterior
+    return int(time.time() * 1000)
+
+
+def model_version(model):
+    key = VERSION_KEY.format(_label(model))
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, _initial_version(), None)
+        cache.add(CHANGED_AT_KEY.format(_label(model)), time.time(), None)
+        version = cache.get(key)
+    return version
+
+
+def model_changed_at(model):
+    changed_at = cache.get(CHANGED_AT_KEY.format(_label(model)))
+    if changed_at is None:
+        model_version(model)
+        changed_at = cache.get(CHANGED_AT_KEY.format(_label(model)), time.time())
+    return changed_at
+
+
+def bump_model_version(*models):
+    """Marca los modelos como modificados."""
+    now = time.time()
+    try:
+        for model in models:
+            key = VERSION_KEY.format(_label(model))
+            try:
+                cache.incr(key)
+            except ValueError:
+                cache.set(key, _initial_version(), None)
+            cache.set(CHANGED_AT_KEY.format(_label(model)), now, None)
+    except Exception as e:
+        logger.warning(f"No se pudo actualizar la versión de {', '.join(_label(m) for m in models)}: {e}")
+
+
+def _bump_on_commit(using, *models):
+    transaction.on_commit(functools.partial(bump_model_version, *models), using=using)
+
+
+def _on_save(sender, update_fields=None, raw=False, using=None, **kwargs):
+    if raw or (update_fields and set(update_fields) <= IGNORED_UPDATE_FIELDS):
+        return
+    _bump_on_commit(using, sender)
+
+
+def _on_delete(sender, using=None, **kwargs):
+    _bump_on_commit(using, sender)
+
+
+def _on_m2m_changed(sender, instance, action, model, using=None, **kwargs):
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        _bump_on_commit(using, type(instance), model)
+
+
+def connect_version_tracking():
+    """Conecta las señales de los modelos versionados. Se llama desde ApiConfig.ready()."""
+    for label in VERSIONED_MODELS:
+        model = apps.get_model(label)
+        uid = f'model-version-{label}'
+        post_save.connect(_on_save, sender=model, dispatch_uid=uid)
+        post_delete.connect(_on_delete, sender=model, dispatch_uid=uid)
+        for field in model._meta.local_many_to_many:
+            m2m_changed.connect(_on_m2m_changed, sender=field.remote_field.through, dispatch_uid=f'{uid}-{field.name}')
+
+
+def compute_etag(request, models):
+    """ETag para la petición según las versiones de los modelos de los que depende."""
+    parts = [request.get_full_path(), str(getattr(request.user, 'pk', '') or '')]
+    parts += [f'{_label(model)}={model_version(model)}' for model in models]
+    return '"%s"' % hashlib.md5('|'.join(parts).encode()).hexdigest()
+
+
+def compute_last_modified(models):
+    return max((model_changed_at(model) for model in models), default=None)
+
+
+def conditional_get_response(request, models, compute_response):
+    """
+    Responde 304 si el cliente ya tiene la versión actual (mismo ETag); si
+    no, genera la respuesta con `compute_response()` y le agrega ETag y
+    Last-Modified.
+    """
+    if request.method not in ('GET', 'HEAD'):
+        return compute_response()
+
+    try:
+        etag = compute_etag(request, models)
+        last_modified = compute_last_modified(models)
+    except Exception as e:
+        logger.warning(f"No se pudieron leer las versiones de los modelos: {e}")
+        return compute_response()
+    last_modified = int(last_modified) if last_modified else None
+
+    # Solo el ETag decide el 304: Last-Modified redondea a segundos
+    not_modified = get_conditional_response(request, etag=etag)
+    if not_modified is not None:
+        return not_modified
+
+    response = compute_response()
+    if response.status_code == 200:
+        response['ETag'] = etag
+        if last_modified:
+            response['Last-Modified'] = http_date(last_modified)
+        response['Cache-Control'] = 'private, no-cache'
+    return response
+
+
+def conditional_get(*models, extra_models=None):
+    """
+    Decorador para métodos `get` de APIView:
+
+        @conditional_get(Respuesta, Pregunta)
+        def get(self, request): ...
+
+    `extra_models(request)` puede agregar dependencias según la petición.
+    """
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(self, request, *args, **kwargs):
+            dependencies = list(models)
+            if extra_models is not None:
+                dependencies += list(extra_models(request))
+            return conditional_get_response(
+                request, dependencies, lambda: method(self, request, *args, **kwargs)
+            )
+        return wrapper
+    return decorator
+
+
+class ConditionalGetMixin:
+    """
+    Mixin para ViewSets y vistas genéricas: `list` y `retrieve` responden 304
+    cuando no cambió ninguno de `conditional_models`.
+    """
+    conditional_models = ()
+
+    def get_conditional_models(self):
+        return self.conditional_models
+
+    def list(self, request, *args, **kwargs):
+        return conditional_get_response(
+            request, self.get_conditional_models(), lambda: super(ConditionalGetMixin, self).list(request, *args, **kwargs)
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        return conditional_get_response(
+            request, self.get_conditional_models(), lambda: super(ConditionalGetMixin, self).retrieve(request, *args, **kwargs)
+        )
@@ -2,11 +2,13 @@
 import json
 from channels.generic.websocket import AsyncWebsocketConsumer
 
+from .user_updates import user_updates_group_name
+
 class UserUpdateConsumer(AsyncWebsocketConsumer):
     async def connect(self):
         user = self.scope["user"]
         if user.is_authenticated:
-            self.group_name = f"user_{user.id}_updates"
+            self.group_name = user_updates_group_name(user.id)
             await self.channel_layer.group_add(self.group_name, self.channel_name)
             await self.accept()
         else:
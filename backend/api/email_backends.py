@@ -1,138 +1,307 @@
 # api/email_backends.py
+"""
+Backend de correo con Microsoft Graph.
+
+- El token de la aplicación se guarda por proceso y se reutiliza hasta
+  TOKEN_REFRESH_MARGIN segundos antes de que expire.
+- Las peticiones salen por una `requests.Session` compartida, que mantiene
+  abiertas las conexiones a Graph entre envíos.
+- Los mensajes se agrupan en peticiones `$batch` de hasta GRAPH_BATCH_SIZE
+  mensajes, con hasta GRAPH_MAX_CONCURRENCY lotes en paralelo; Graph limita
+  las peticiones concurrentes por buzón, así que el paralelismo es bajo.
+- Los mensajes que Graph rechaza con 429 (o 503/504) se reintentan solos,
+  después del Retry-After que indique Graph o con espera exponencial. Un
+  error de red en un lote también se reintenta, sin detener los demás lotes.
+- Los mensajes que no se pudieron enviar quedan en `failed_messages` como
+  (mensaje, motivo) hasta la siguiente llamada a send_messages.
+"""
+import base64
 import json
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
 import msal
 import requests
-from django.core.mail.backends.base import BaseEmailBackend
-from django.core.mail import EmailMultiAlternatives
 from django.conf import settings
-import logging
+from django.core.mail.backends.base import BaseEmailBackend
+from requests.adapters import HTTPAdapter
 
 logger = logging.getLogger(__name__)
 
+GRAPH_URL = 'https://graph.microsoft.com/v1.0'
+# Graph acepta hasta 20 peticiones por $batch
+GRAPH_BATCH_SIZE = 20
+# Tope del cuerpo de un $batch (Graph rechaza peticiones de más de 4 MB)
+GRAPH_BATCH_MAX_BYTES = 3 * 1024 * 1024
+GRAPH_MAX_CONCURRENCY = 4
+GRAPH_MAX_RETRIES = 4
+GRAPH_TIMEOUT = 30
+RETRY_STATUSES = (429, 503, 504)
+RETRY_BASE_DELAY = 1
+RETRY_MAX_DELAY = 30
+TOKEN_REFRESH_MARGIN = 300
+
+# (tenant, client_id) -> (token, expira_en); compartido por las instancias del backend
+_tokens = {}
+_token_lock = threading.Lock()
+_session = None
+_session_lock = threading.Lock()
+
+
+def graph_session():
+    """Sesión HTTP compartida por el proceso, con su pool de conexiones."""
+    global _session
+    with _session_lock:
+        if _session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=2, pool_maxsize=GRAPH_MAX_CONCURRENCY * 2)
+            session.mount('https://', adapter)
+            session.mount('http://', adapter)
+            _session = session
+        return _session
+
+
+def _retry_delay(retry_after, attempt):
+    try:
+        return min(float(retry_after), RETRY_MAX_DELAY)
+    except (TypeError, ValueError):
+        return min(RETRY_BASE_DELAY * 2 ** attempt, RETRY_MAX_DELAY)
+
+
 class MicrosoftGraphEmailBackend(BaseEmailBackend):
     """
     Email backend that uses Microsoft Graph API to send emails
     """
-    
+
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
         self.client_id = getattr(settings, 'client_id', None)
         self.client_secret = getattr(settings, 'client_secret', None)
         self.tenant_id = getattr(settings, 'tenant_id', None)
         self.email_user = getattr(settings, 'email_user', None)
-        
+        self.graph_url = getattr(settings, 'MS_GRAPH_URL', GRAPH_URL).rstrip('/')
+
         if not all([self.client_id, self.client_secret, self.tenant_id, self.email_user]):
             raise ValueError("Microsoft Graph email backend requires MS_GRAPH_CLIENT_ID, "
                            "MS_GRAPH_CLIENT_SECRET, MS_GRAPH_TENANT_ID, and MS_GRAPH_EMAIL_USER settings")
-    
+        self.failed_messages = []
+
     def _get_access_token(self):
-        """Get access token using client credentials flow"""
-        authority = f"https://login.microsoftonline.com/{self.tenant_id}"
-        scope = ["https://graph.microsoft.com/.default"]
-        
-        app = msal.ConfidentialClientApplication(
-            client_id=self.client_id,
-            client_credential=self.client_secret,
-            authority=authority
-        )
-        
-        result = app.acquire_token_for_client(scopes=scope)
-        
-        if "access_token" in result:
-            return result["access_token"]
-        else:
-            logger.error(f"Error getting access token: {result}")
-            raise Exception(f"Failed to acquire access token: {result.get('error_description', 'Unknown error')}")
-    
+        """Token de la aplicación, desde la caché del proceso mientras no esté por expirar"""
+        key = (self.tenant_id, self.client_id)
+        with _token_lock:
+            cached = _tokens.get(key)
+            if cached and cached[1] - TOKEN_REFRESH_MARGIN > time.time():
+                return cached[0]
+
+            authority = f"https://login.microsoftonline.com/{self.tenant_id}"
+            scope = ["https://graph.microsoft.com/.default"]
+
+            app = msal.ConfidentialClientApplication(
+                client_id=self.client_id,
+                client_credential=self.client_secret,
+                authority=authority
+            )
+
+            result = app.acquire_token_for_client(scopes=scope)
+
+            if "access_token" in result:
+                _tokens[key] = (result["access_token"], time.time() + int(result.get("expires_in", 3599)))
+                return result["access_token"]
+            else:
+                logger.error(f"Error getting access token: {result}")
+                raise Exception(f"Failed to acquire access token: {result.get('error_description', 'Unknown error')}")
+
     def send_messages(self, email_messages):
         """Send email messages using Microsoft Graph API"""
+        self.failed_messages = []
         if not email_messages:
             return 0
-        
-        access_token = self._get_access_token()
-        sent_count = 0
-        
+
+        # Se pide antes de enviar para que un error de autenticación se propague
+        self._get_access_token()
+        payloads = []
         for message in email_messages:
-            if self._send_single_message(message, access_token):
-                sent_count += 1
-        
-        return sent_count
-    
-    def _send_single_message(self, message, access_token):
-        """Send a single email message"""
-        try:
-            # Prepare recipients
-            to_recipients = [{"emailAddress": {"address": email}} for email in message.to]
-            cc_recipients = [{"emailAddress": {"address": email}} for email in message.cc] if message.cc else []
-            bcc_recipients = [{"emailAddress": {"address": email}} for email in message.bcc] if message.bcc else []
-            
-            # Prepare email body
-            body_content = {
-                "contentType": "HTML" if hasattr(message, 'alternatives') and message.alternatives else "Text",
-                "content": message.body
-            }
-            
-            # If there are HTML alternatives, use the first one
-            if hasattr(message, 'alternatives') and message.alternatives:
-                for content, mimetype in message.alternatives:
-                    if mimetype == 'text/html':
-                        body_content = {
-                            "contentType": "HTML",
-                            "content": content
+            try:
+                payload = self._message_payload(message)
+                payloads.append((message, payload, len(json.dumps(payload))))
+            except Exception as e:
+                logger.error(f"Exception preparing email: {str(e)}")
+                self._failed(message, f"{type(e).__name__}: {e}")
+
+        batches = self._batches(payloads)
+        if not batches:
+            return 0
+        if len(batches) == 1:
+            return self._send_batch(batches[0])
+        with ThreadPoolExecutor(max_workers=min(GRAPH_MAX_CONCURRENCY, len(batches))) as executor:
+            return sum(executor.map(self._send_batch, batches))
+
+    def _batches(self, payloads):
+        """Agrupa los mensajes en lotes de hasta GRAPH_BATCH_SIZE sin pasar de GRAPH_BATCH_MAX_BYTES."""
+        batches, current, size = [], [], 0
+        for message, payload, length in payloads:
+            if current and (len(current) >= GRAPH_BATCH_SIZE or size + length > GRAPH_BATCH_MAX_BYTES):
+                batches.append(current)
+                current, size = [], 0
+            current.append((message, payload))
+            size += length
+        if current:
+            batches.append(current)
+        return batches
+
+    def _failed(self, message, reason):
+        # list.append es atómico: los lotes en paralelo pueden registrar fallos a la vez
+        self.failed_messages.append((message, reason))
+
+    def _post(self, path, body, token):
+        return graph_session().post(
+            f"{self.graph_url}{path}",
+            headers={'Authorization': f'Bearer {token}', 'Content-Type': 'application/json'},
+            data=body,
+            timeout=GRAPH_TIMEOUT,
+        )
+
+    def _send_batch(self, batch):
+        """
+        Envía un lote; un lote de un mensaje (o uno demasiado grande para
+        $batch) va directo a sendMail. Devuelve cuántos mensajes se enviaron.
+        """
+        send_path = f"/users/{self.email_user}/sendMail"
+        pending = dict(enumerate(batch))
+        sent = 0
+        refreshed = False
+        error = None
+        for attempt in range(GRAPH_MAX_RETRIES + 1):
+            retry_after = None
+            try:
+                token = self._get_access_token()
+                if len(pending) == 1:
+                    (index, (message, payload)), = pending.items()
+                    response = self._post(send_path, json.dumps(payload), token)
+                    statuses = {index: (response.status_code, response.headers.get('Retry-After'), response.text)}
+                else:
+                    response = self._post('/$batch', json.dumps({
+                        "requests": [
+                            {
+                                "id": str(index),
+                                "method": "POST",
+                                "url": send_path,
+                                "headers": {"Content-Type": "application/json"},
+                                "body": payload,
+                            }
+                            for index, (message, payload) in pending.items()
+                        ]
+                    }), token)
+                    if response.status_code == 200:
+                        statuses = {
+                            int(item['id']): (
+                                item.get('status'),
+                                (item.get('headers') or {}).get('Retry-After'),
+                                item.get('body'),
+                            )
+                            for item in response.json().get('responses', [])
                         }
-                        break
-            
-            # Prepare attachments
-            attachments = []
-            if hasattr(message, 'attachments') and message.attachments:
-                for attachment in message.attachments:
-                    if hasattr(attachment, 'get_content'):
-                        # Django attachment object
-                        content = attachment.get_content()
-                        filename = attachment.get_filename()
-                        content_type = attachment.get_content_type()
                     else:
-                        # Simple tuple (filename, content, mimetype)
-                        filename, content, content_type = attachment
-                    
-                    import base64
-                    attachments.append({
-                        "@odata.type": "#microsoft.graph.fileAttachment",
-                        "name": filename,
-                        "contentType": content_type,
-                        "contentBytes": base64.b64encode(content).decode('utf-8')
-                    })
-            
-            # Construct the email
-            email_data = {
-                "message": {
-                    "subject": message.subject,
-                    "body": body_content,
-                    "toRecipients": to_recipients,
-                    "ccRecipients": cc_recipients,
-                    "bccRecipients": bcc_recipients,
-                    "attachments": attachments
-                }
-            }
-            
-            # Send the email
-            headers = {
-                'Authorization': f'Bearer {access_token}',
-                'Content-Type': 'application/json'
+                        # El $batch completo falló (p. ej. 429 a nivel de petición)
+                        statuses = {
+                            index: (response.status_code, response.headers.get('Retry-After'), response.text)
+                            for index in pending
+                        }
+            except Exception as e:
+                # Error de red o respuesta ilegible: se reintenta todo lo pendiente del lote
+                error = f"{type(e).__name__}: {e}"
+                logger.warning(f"Exception sending email (attempt {attempt + 1}): {error}")
+                if attempt < GRAPH_MAX_RETRIES:
+                    time.sleep(_retry_delay(None, attempt))
+                continue
+
+            error = 'retries exhausted'
+            retry = {}
+            for index, item in pending.items():
+                status, item_retry_after, detail = statuses.get(index, (None, None, 'sin respuesta en el $batch'))
+                message = item[0]
+                if status == 202:
+                    sent += 1
+                    logger.info(f"Email sent successfully to {', '.join(message.to)}")
+                elif status in RETRY_STATUSES or (status == 401 and not refreshed):
+                    retry[index] = item
+                    if item_retry_after is not None:
+                        retry_after = max(float(retry_after or 0), _retry_delay(item_retry_after, attempt))
+                else:
+                    logger.error(f"Failed to send email: {status} - {detail}")
+                    self._failed(message, f"{status} - {detail}")
+
+            if not retry:
+                return sent
+            if any(statuses[index][0] == 401 for index in retry):
+                # Token revocado o expirado antes de tiempo: uno nuevo y otro intento
+                _tokens.pop((self.tenant_id, self.client_id), None)
+                refreshed = True
+            if attempt < GRAPH_MAX_RETRIES and any(statuses[index][0] != 401 for index in retry):
+                time.sleep(retry_after if retry_after is not None else _retry_delay(None, attempt))
+            pending = retry
+
+        for message, _ in pending.values():
+            logger.error(f"Failed to send email to {', '.join(message.to)}: {error}")
+            self._failed(message, error)
+        return sent
+
+    def _message_payload(self, message):
+        """Cuerpo de sendMail de un mensaje"""
+        # Prepare recipients
+        to_recipients = [{"emailAddress": {"address": email}} for email in message.to]
+        cc_recipients = [{"emailAddress": {"address": email}} for email in message.cc] if message.cc else []
+        bcc_recipients = [{"emailAddress": {"address": email}} for email in message.bcc] if message.bcc else []
+
+        # Prepare email body
+        body_content = {
+            "contentType": "HTML" if hasattr(message, 'alternatives') and message.alternatives else "Text",
+            "content": message.body
+        }
+
+        # If there are HTML alternatives, use the first one
+        if hasattr(message, 'alternatives') and message.alternatives:
+            for content, mimetype in message.alternatives:
+                if mimetype == 'text/html':
+                    body_content = {
+                        "contentType": "HTML",
+                        "content": content
+                    }
+                    break
+
+        # Prepare attachments
+        attachments = []
+        if hasattr(message, 'attachments') and message.attachments:
+            for attachment in message.attachments:
+                if hasattr(attachment, 'get_content'):
+                    # Django attachment object
+                    content = attachment.get_content()
+                    filename = attachment.get_filename()
+                    content_type = attachment.get_content_type()
+                else:
+                    # Simple tuple (filename, content, mimetype)
+                    filename, content, content_type = attachment
+
+                if isinstance(content, str):
+                    content = content.encode('utf-8')
+                attachments.append({
+                    "@odata.type": "#microsoft.graph.fileAttachment",
+                    "name": filename,
+                    "contentType": content_type,
+                    "contentBytes": base64.b64encode(content).decode('utf-8')
+                })
+
+        # Construct the email
+        return {
+            "message": {
+                "subject": message.subject,
+                "body": body_content,
+                "toRecipients": to_recipients,
+                "ccRecipients": cc_recipients,
+                "bccRecipients": bcc_recipients,
+                "attachments": attachments
             }
-            
-            # Use the service account email to send
-            url = f"https://graph.microsoft.com/v1.0/users/{self.email_user}/sendMail"
-            
-            response = requests.post(url, headers=headers, data=json.dumps(email_data))
-            
-            if response.status_code == 202:  # Success
-                logger.info(f"Email sent successfully to {', '.join(message.to)}")
-                return True
-            else:
-                logger.error(f"Failed to send email: {response.status_code} - {response.text}")
-                return False
-                
-        except Exception as e:
-            logger.error(f"Exception sending email: {str(e)}")
-            return False
\ No newline at end of file
+        }
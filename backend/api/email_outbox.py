@@ -0,0 +1,256 @@
+"""
+Bandeja de salida de correos.
+
+`OutboxEmailBackend` es el EMAIL_BACKEND del proyecto: en lugar de hablar
+con Graph dentro de la petición (activación y restablecimiento de contraseña
+de djoser, avisos), guarda cada mensaje en EmailOutbox y encola su envío al
+confirmarse la transacción. La tarea `send_outbox_email_task` lo envía con
+el backend real (EMAIL_OUTBOX_BACKEND, por defecto el de Graph).
+
+- Si el envío falla se reintenta con espera exponencial; después de
+  EMAIL_OUTBOX_MAX_ATTEMPTS intentos el correo queda descartado (`dead`) y
+  se puede reintentar desde el admin.
+- Un mensaje idéntico (mismos destinatarios, asunto y cuerpo) o con la misma
+  llave explícita (encabezado X-Dedup-Key) dentro de EMAIL_OUTBOX_DEDUP_WINDOW
+  no se vuelve a encolar, p. ej. al pedir dos veces el correo de activación.
+  La base de datos lo garantiza: la llave es única entre los correos con
+  `dedup_active`, que se apaga al salir de la ventana o al descartarse.
+- `flush_email_outbox` (cada minuto en Celery beat) envía lo pendiente cuya
+  tarea no llegó a encolarse (broker caído) y recupera los correos de un
+  worker que murió a medio envío.
+- `prune_email_outbox` (cada noche) borra los correos enviados o descartados
+  hace más de EMAIL_OUTBOX_RETENTION_DAYS días, con todo y su contenido.
+"""
+import base64
+import hashlib
+import json
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.core.mail.backends.base import BaseEmailBackend
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from kombu.exceptions import OperationalError
+
+from api.models import EmailOutbox
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_DELIVERY_BACKEND = 'api.email_backends.MicrosoftGraphEmailBackend'
+DEFAULT_MAX_ATTEMPTS = 6
+DEFAULT_DEDUP_WINDOW = 600
+DEDUP_HEADER = 'X-Dedup-Key'
+RETRY_BASE_DELAY = 60
+RETRY_MAX_DELAY = 60 * 60
+# Un correo en `sending` por más tiempo se considera de un worker caído
+SENDING_TIMEOUT = 10 * 60
+FLUSH_BATCH_SIZE = 100
+DEFAULT_RETENTION_DAYS = 30
+PRUNE_CHUNK_SIZE = 500
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def _encode_attachment(attachment):
+    if hasattr(attachment, 'get_payload'):
+        # MIMEBase
+        filename = attachment.get_filename()
+        content = attachment.get_payload(decode=True) or b''
+        mimetype = attachment.get_content_type()
+    else:
+        filename, content, mimetype = attachment
+    if isinstance(content, str):
+        content = content.encode('utf-8')
+    return [filename, base64.b64encode(content).decode('ascii'), mimetype]
+
+
+def serialize_message(message):
+    """Mensaje de Django como dict que se puede guardar en JSON."""
+    return {
+        'subject': message.subject,
+        'body': message.body,
+        'from_email': message.from_email,
+        'to': list(message.to),
+        'cc': list(message.cc),
+        'bcc': list(message.bcc),
+        'reply_to': list(message.reply_to),
+        'headers': {k: v for k, v in message.extra_headers.items() if k != DEDUP_HEADER},
+        'alternatives': [list(alternative) for alternative in getattr(message, 'alternatives', [])],
+        'attachments': [_encode_attachment(attachment) for attachment in message.attachments],
+    }
+
+
+def deserialize_message(payload, connection=None):
+    message = EmailMultiAlternatives(
+        subject=payload['subject'],
+        body=payload['body'],
+        from_email=payload['from_email'],
+        to=payload['to'],
+        cc=payload['cc'],
+        bcc=payload['bcc'],
+        reply_to=payload['reply_to'],
+        headers=payload['headers'],
+        connection=connection,
+    )
+    for content, mimetype in payload['alternatives']:
+        message.attach_alternative(content, mimetype)
+    for filename, content, mimetype in payload['attachments']:
+        message.attach(filename, base64.b64decode(content), mimetype)
+    return message
+
+
+def dedup_key(message, payload):
+    """Llave explícita del encabezado X-Dedup-Key, o hash del contenido del mensaje."""
+    explicit = message.extra_headers.get(DEDUP_HEADER)
+    source = f"key:{explicit}" if explicit else json.dumps(payload, sort_keys=True)
+    return hashlib.sha256(source.encode()).hexdigest()
+
+
+def enqueue(message):
+    """Guarda el mensaje en la bandeja y encola su envío. Devuelve el renglón, o None si es duplicado."""
+    payload = serialize_message(message)
+    key = dedup_key(message, payload)
+    window = timezone.now() - timedelta(seconds=_setting('EMAIL_OUTBOX_DEDUP_WINDOW', DEFAULT_DEDUP_WINDOW))
+    # Un correo igual fuera de la ventana ya no bloquea la llave
+    EmailOutbox.objects.filter(dedup_key=key, dedup_active=True, created_at__lt=window).update(dedup_active=False)
+    try:
+        with transaction.atomic():
+            outbox = EmailOutbox.objects.create(
+                dedup_key=key,
+                subject=(message.subject or '')[:255],
+                recipients=', '.join(message.to + message.cc + message.bcc),
+                payload=payload,
+            )
+    except IntegrityError:
+        logger.info(f"Correo duplicado omitido: {message.subject} → {', '.join(message.to)}")
+        return None
+    transaction.on_commit(lambda: _dispatch(outbox.pk))
+    return outbox
+
+
+def _dispatch(outbox_id):
+    from api.tasks import send_outbox_email_task
+
+    try:
+        send_outbox_email_task.delay(outbox_id)
+    except OperationalError:
+        # El barrido periódico lo enviará cuando el broker vuelva
+        logger.warning(f"Broker no disponible; el correo {outbox_id} queda pendiente")
+
+
+def _claim(outbox_id):
+    """Marca el correo como `sending` si sigue pendiente; evita que dos workers lo envíen."""
+    now = timezone.now()
+    return EmailOutbox.objects.filter(
+        pk=outbox_id, status=EmailOutbox.PENDING, next_attempt_at__lte=now,
+    ).update(status=EmailOutbox.SENDING, updated_at=now)
+
+
+def deliver(outbox_id, connection=None):
+    """
+    Envía un correo de la bandeja con el backend real. Devuelve el estado
+    final, o None si otro worker ya lo tomó o todavía no le toca.
+    """
+    if not _claim(outbox_id):
+        return None
+    outbox = EmailOutbox.objects.get(pk=outbox_id)
+
+    error = ''
+    try:
+        if connection is None:
+            connection = get_connection(_setting('EMAIL_OUTBOX_BACKEND', DEFAULT_DELIVERY_BACKEND), fail_silently=False)
+        sent = deserialize_message(outbox.payload, connection=connection).send()
+        if not sent:
+            failed = getattr(connection, 'failed_messages', None)
+            error = failed[0][1] if failed else 'El backend de correo no confirmó el envío'
+    except Exception as e:
+        error = f"{type(e).__name__}: {e}"
+
+    now = timezone.now()
+    outbox.attempts += 1
+    if not error:
+        outbox.status = EmailOutbox.SENT
+        outbox.sent_at = now
+        outbox.last_error = ''
+    elif outbox.attempts >= _setting('EMAIL_OUTBOX_MAX_ATTEMPTS', DEFAULT_MAX_ATTEMPTS):
+        outbox.status = EmailOutbox.DEAD
+        outbox.dedup_active = False
+        outbox.last_error = error
+        logger.error(f"Correo {outbox.pk} descartado después de {outbox.attempts} intentos: {error}")
+    else:
+        outbox.status = EmailOutbox.PENDING
+        outbox.last_error = error
+        outbox.next_attempt_at = now + timedelta(
+            seconds=min(RETRY_BASE_DELAY * 2 ** (outbox.attempts - 1), RETRY_MAX_DELAY)
+        )
+        logger.warning(f"Correo {outbox.pk} falló (intento {outbox.attempts}), se reintentará: {error}")
+    outbox.save(update_fields=[
+        'status', 'dedup_active', 'attempts', 'last_error', 'next_attempt_at', 'sent_at', 'updated_at',
+    ])
+    return outbox.status
+
+
+def flush_email_outbox(limit=FLUSH_BATCH_SIZE):
+    """Envía los correos pendientes a los que ya les toca. Devuelve {estado: cantidad}."""
+    now = timezone.now()
+    # Correos de un worker que murió a medio envío
+    EmailOutbox.objects.filter(
+        status=EmailOutbox.SENDING, updated_at__lt=now - timedelta(seconds=SENDING_TIMEOUT),
+    ).update(status=EmailOutbox.PENDING, updated_at=now)
+
+    due = list(
+        EmailOutbox.objects.filter(status=EmailOutbox.PENDING, next_attempt_at__lte=now)
+        .order_by('next_attempt_at', 'id').values_list('id', flat=True)[:limit]
+    )
+    results = {}
+    for outbox_id in due:
+        status = deliver(outbox_id)
+        if status:
+            results[status] = results.get(status, 0) + 1
+    return results
+
+
+def prune_email_outbox(chunk_size=PRUNE_CHUNK_SIZE):
+    """Borra los correos enviados o descartados más viejos que la retención. Devuelve cuántos se borraron."""
+    cutoff = timezone.now() - timedelta(days=_setting('EMAIL_OUTBOX_RETENTION_DAYS', DEFAULT_RETENTION_DAYS))
+    old = EmailOutbox.objects.filter(status__in=[EmailOutbox.SENT, EmailOutbox.DEAD], updated_at__lt=cutoff)
+    deleted = 0
+    while True:
+        ids = list(old.values_list('id', flat=True)[:chunk_size])
+        if not ids:
+            return deleted
+        deleted += EmailOutbox.objects.filter(id__in=ids).delete()[0]
+
+
+def retry(queryset):
+    """Vuelve a poner en la cola los correos del queryset que no se enviaron (acción del admin)."""
+    ids = list(queryset.exclude(status__in=[EmailOutbox.SENT, EmailOutbox.SENDING]).values_list('id', flat=True))
+    EmailOutbox.objects.filter(id__in=ids).update(
+        status=EmailOutbox.PENDING, attempts=0, next_attempt_at=timezone.now(), updated_at=timezone.now(),
+    )
+    for outbox_id in ids:
+        transaction.on_commit(lambda outbox_id=outbox_id: _dispatch(outbox_id))
+    return len(ids)
+
+
+class OutboxEmailBackend(BaseEmailBackend):
+    """
+    Email backend that stores messages in the outbox and sends them
+    asynchronously through EMAIL_OUTBOX_BACKEND.
+    """
+
+    def send_messages(self, email_messages):
+        accepted = 0
+        for message in email_messages or []:
+            try:
+                enqueue(message)
+                accepted += 1
+            except Exception as e:
+                logger.error(f"No se pudo guardar el correo en la bandeja de salida: {e}")
+                if not self.fail_silently:
+                    raise
+        return accepted
@@ -0,0 +1,109 @@
+"""
+Campos dispersos (sparse fieldsets) para los serializers de la API.
+
+Los endpoints de lectura aceptan `?fields=a,b,c` para devolver solo esos campos
+y `?omit=a,b` para quitar campos de la respuesta. Los campos que no se piden no
+se calculan, así que sus SerializerMethodField y consultas se evitan.
+
+Cada serializer puede declarar en su Meta qué relaciones necesita cada campo:
+
+    class Meta:
+        fieldset_select_related = {'ciclo': ['userprofile__cycle']}
+        fieldset_prefetch_related = {'discapacidad': ['userprofile__disability']}
+        fieldset_annotations = {'pregunta_count': {'num_preguntas': Count('preguntas')}}
+
+y la vista ajusta su queryset con `Serializer.optimize_queryset(queryset, request)`
+para cargar solo las relaciones de los campos que se van a serializar.
+"""
+from rest_framework.permissions import SAFE_METHODS
+
+FIELDS_PARAM = 'fields'
+OMIT_PARAM = 'omit'
+
+
+def _split_names(value):
+    if not value:
+        return None
+    return {name.strip() for name in value.split(',') if name.strip()}
+
+
+def requested_fieldset(request, allow_unsafe=False):
+    """
+    Devuelve `(fields, omit)` pedidos en la query string. `fields` es None si
+    no se limitaron los campos. Solo aplica a peticiones de lectura, salvo
+    con `allow_unsafe` (p. ej. listas que se consultan por POST).
+    """
+    if request is None or (request.method not in SAFE_METHODS and not allow_unsafe):
+        return None, set()
+    params = request.query_params
+    return _split_names(params.get(FIELDS_PARAM)), _split_names(params.get(OMIT_PARAM)) or set()
+
+
+class SparseFieldsetsMixin:
+    """
+    Mixin para serializers que quita los campos no pedidos con `?fields=` y
+    `?omit=`. También acepta los argumentos `fields` y `omit` al instanciarlo.
+    Solo el serializer raíz (el que recibe la request en el contexto) lee
+    la query string; los serializers anidados devuelven todos sus campos.
+    """
+
+    def __init__(self, *args, fields=None, omit=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if fields is None and omit is None:
+            fields, omit = requested_fieldset(self.context.get('request'))
+        self._apply_fieldset(fields, set(omit or ()))
+
+    def _apply_fieldset(self, fields, omit):
+        for name in list(self.fields):
+            if (fields is not None and name not in fields) or name in omit:
+                self.fields.pop(name)
+
+    @classmethod
+    def selected_field_names(cls, request=None, fields=None, omit=None):
+        """Nombres de los campos que se serializarán para esta petición."""
+        if fields is None and omit is None:
+            fields, omit = requested_fieldset(request)
+        names = set(cls().fields)
+        if fields is not None:
+            names &= set(fields)
+        return names - set(omit or ())
+
+    @classmethod
+    def optimize_queryset(cls, queryset, request=None, fields=None, omit=None):
+        """
+        Agrega al queryset los select_related/prefetch_related (y anotaciones)
+        que necesitan los campos seleccionados, según el Meta del serializer.
+        """
+        selected = cls.selected_field_names(request, fields=fields, omit=omit)
+        meta = cls.Meta
+
+        select_related = [
+            lookup
+            for field, lookups in getattr(meta, 'fieldset_select_related', {}).items()
+            if field in selected
+            for lookup in lookups
+        ]
+        prefetch_related = [
+            lookup
+            for field, lookups in getattr(meta, 'fieldset_prefetch_related', {}).items()
+            if field in selected
+            for lookup in lookups
+        ]
+
+        annotations = {}
+        for field, field_annotations in getattr(meta, 'fieldset_annotations', {}).items():
+            if field in selected:
+                annotations.update(field_annotations)
+
+        if select_related:
+            queryset = queryset.select_related(*dict.fromkeys(select_related))
+        if prefetch_related:
+            queryset = queryset.prefetch_related(*dict.fromkeys(prefetch_related))
+        if annotations:
+            queryset = queryset.annotate(**annotations)
+        return queryset
+
+
+def prefixed(prefix, lookups):
+    """Antepone una relación a una lista de lookups, para reutilizarlos anidados."""
+    return [f'{prefix}__{lookup}' for lookup in lookups]
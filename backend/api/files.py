@@ -0,0 +1,68 @@
+"""
+Borrado de archivos reemplazados o huérfanos.
+
+Los modelos con archivos siguen sus campos de archivo con
+`FieldTrackerMixin` (api/tracking.py): el nombre anterior se conoce desde que
+se cargó la instancia, sin volver a leer el renglón en `pre_save`. Los
+archivos se borran en una tarea de Celery que se encola al confirmarse la
+transacción, así que un rollback no deja al renglón apuntando a un archivo
+borrado y la petición no espera al storage.
+"""
+import logging
+
+from django.core.files.storage import default_storage
+from django.db import models, transaction
+from kombu.exceptions import OperationalError
+
+logger = logging.getLogger(__name__)
+
+
+def delete_stored_files(names):
+    """Borra los archivos del storage; los errores se registran y no se propagan."""
+    deleted = 0
+    for name in names:
+        try:
+            default_storage.delete(name)
+            deleted += 1
+        except Exception as e:
+            logger.warning(f"No se pudo borrar el archivo {name}: {e}")
+    return deleted
+
+
+def _dispatch(names):
+    from api.tasks import delete_stored_files_task
+
+    try:
+        delete_stored_files_task.delay(names)
+    except OperationalError:
+        logger.warning("Broker no disponible; borrando los archivos en el proceso")
+        delete_stored_files(names)
+
+
+def delete_files_on_commit(names):
+    """
+    Encola el borrado de los archivos para cuando se confirme la transacción.
+
+    Los receptores de `post_save` y `post_delete` de los modelos con archivos
+    la llaman con `replaced_files(...)` o con el archivo del renglón borrado.
+    El nombre anterior ya lo tiene FieldTrackerMixin desde que se cargó la
+    instancia, así que no se vuelve a leer el renglón; y como el borrado
+    espera al commit, un rollback deja el archivo en su lugar.
+    """
+    names = [name for name in names if name]
+    if names:
+        transaction.on_commit(lambda: _dispatch(names))
+
+
+def replaced_files(instance, update_fields=None):
+    """
+    Nombres anteriores de los campos de archivo seguidos que cambiaron (se
+    reemplazó o quitó el archivo). Se llama desde `post_save`, cuando el
+    campo ya tiene el nombre del archivo nuevo.
+    """
+    return [
+        old
+        for name, (old, new) in instance.tracked_changes(update_fields).items()
+        if old and isinstance(instance._meta.get_field(name.removesuffix('_id')), models.FileField)
+    ]
+
@@ -0,0 +1,97 @@
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Count
+from rest_framework.test import APIClient
+
+from candidatos.models import UserProfile
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = (
+        'Mide bytes transferidos y CPU del servidor por petición en los endpoints '
+        'de lectura pesados: respuesta completa, comprimida con gzip y revalidación '
+        'con If-None-Match (304). Solo hace peticiones GET.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--email', help='Usuario (staff) con el que se hacen las peticiones')
+        parser.add_argument('--repeat', type=int, default=10)
+
+    def handle(self, *args, **options):
+        user = self._get_user(options['email'])
+        client = APIClient(SERVER_NAME='localhost')
+        client.force_authenticate(user)
+
+        sample_user = (
+            User.objects.annotate(total=Count('respuestas')).filter(total__gt=0).order_by('-total').first()
+        )
+        sample_center = UserProfile.objects.filter(user__center__isnull=False).values_list(
+            'user__center_id', flat=True
+        ).first()
+
+        urls = [
+            '/api/candidatos/lista/',
+            '/api/candidatos/lista-agencia/',
+            '/api/candidatos/statistics/?center_id=all',
+            '/api/discapacidad/disabilities/',
+            '/api/discapacidad/technical-aids-view/',
+            '/api/discapacidad/sis-aids-view/',
+            '/api/discapacidad/ch-items-view/',
+        ]
+        if sample_user:
+            urls += [
+                f'/api/cuestionarios/usuario/respuestas-unlocked-path/?usuario_id={sample_user.pk}',
+                f'/api/cuestionarios/kiki/reportes/?usuario_id={sample_user.pk}',
+            ]
+        if sample_center and not user.center_id:
+            self.stdout.write(self.style.WARNING('El usuario no tiene centro; las listas de candidatos saldrán vacías.'))
+
+        header = f"{'endpoint':<70} {'json':>10} {'gzip':>10} {'304':>6} {'cpu json':>9} {'cpu gzip':>9} {'cpu 304':>8}"
+        self.stdout.write(header)
+        self.stdout.write('-' * len(header))
+        for url in urls:
+            self._measure(client, url, options['repeat'])
+
+    def _get_user(self, email):
+        if email:
+            try:
+                return User.objects.get(email=email)
+            except User.DoesNotExist:
+                raise CommandError(f"No existe el usuario {email}")
+        user = User.objects.filter(is_staff=True, is_active=True).first()
+        if user is None:
+            raise CommandError('No hay usuarios staff; use --email.')
+        return user
+
+    def _measure(self, client, url, repeat):
+        plain, plain_cpu = self._timed(client, url, repeat)
+        if plain.status_code != 200:
+            self.stdout.write(f"{url:<70} HTTP {plain.status_code}")
+            return
+
+        compressed, gzip_cpu = self._timed(client, url, repeat, HTTP_ACCEPT_ENCODING='gzip')
+
+        etag = plain.get('ETag')
+        if etag:
+            revalidated, revalidate_cpu = self._timed(client, url, repeat, HTTP_IF_NONE_MATCH=etag)
+            not_modified = f"{len(revalidated.content)}B" if revalidated.status_code == 304 else str(revalidated.status_code)
+            revalidate_ms = f"{revalidate_cpu:.1f}"
+        else:
+            not_modified, revalidate_ms = '-', '-'
+
+        self.stdout.write(
+            f"{url[:70]:<70} {len(plain.content):>9}B {len(compressed.content):>9}B {not_modified:>6} "
+            f"{plain_cpu:>7.1f}ms {gzip_cpu:>7.1f}ms {revalidate_ms:>6}ms"
+        )
+
+    def _timed(self, client, url, repeat, **headers):
+        """CPU de proceso promedio por petición, en ms."""
+        response = None
+        start = time.process_time()
+        for _ in range(repeat):
+            response = client.get(url, **headers)
+        return response, (time.process_time() - start) / repeat * 1000
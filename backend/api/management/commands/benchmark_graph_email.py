@@ -0,0 +1,140 @@
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+from django.core.mail import EmailMessage
+from django.core.management.base import BaseCommand, CommandError
+from django.test import override_settings
+
+from api import email_backends
+from api.email_backends import MicrosoftGraphEmailBackend
+
+STUB_SETTINGS = {
+    'client_id': 'benchmark-client',
+    'client_secret': 'benchmark-secret',
+    'tenant_id': 'benchmark-tenant',
+    'email_user': 'buzon@benchmark.invalid',
+}
+
+
+class _GraphStub(BaseHTTPRequestHandler):
+    """Imita sendMail y $batch de Graph: latencia fija y 429 aleatorios por mensaje."""
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, *args):
+        pass
+
+    def _reply(self, status, body=b'', headers=None):
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _deliver(self, payload):
+        server = self.server
+        with server.lock:
+            if server.rng.random() < server.throttle_rate:
+                server.throttled += 1
+                return False
+            server.delivered.append(payload['message']['subject'])
+            return True
+
+    def do_POST(self):
+        server = self.server
+        body = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+        with server.lock:
+            server.requests += 1
+            server.connections.add(self.client_address)
+        time.sleep(server.latency)
+        if self.path.endswith('/$batch'):
+            responses = []
+            for item in body['requests']:
+                if self._deliver(item['body']):
+                    responses.append({'id': item['id'], 'status': 202})
+                else:
+                    responses.append({'id': item['id'], 'status': 429, 'headers': {'Retry-After': '0'}})
+            self._reply(200, json.dumps({'responses': responses}).encode(), {'Content-Type': 'application/json'})
+        elif self._deliver(body):
+            self._reply(202)
+        else:
+            self._reply(429, headers={'Retry-After': '0'})
+
+
+class Command(BaseCommand):
+    help = (
+        'Envía correos con MicrosoftGraphEmailBackend contra un servidor local '
+        'que imita Graph (latencia fija y respuestas 429 aleatorias) y lo '
+        'compara con el envío anterior, un POST a sendMail por mensaje sin '
+        'sesión compartida. Verifica que cada mensaje se entregue exactamente '
+        'una vez.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--messages', type=int, default=200)
+        parser.add_argument('--latency', type=float, default=0.02, help='Segundos por petición')
+        parser.add_argument('--throttle-rate', type=float, default=0.1, help='Proporción de mensajes con 429')
+
+    def handle(self, *args, **options):
+        server = ThreadingHTTPServer(('127.0.0.1', 0), _GraphStub)
+        server.latency = options['latency']
+        server.throttle_rate = options['throttle_rate']
+        server.lock = threading.Lock()
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        url = f"http://127.0.0.1:{server.server_port}/v1.0"
+
+        failures = []
+        self.stdout.write(f"{'envío':<10} {'peticiones':>10} {'conexiones':>10} {'429':>5} {'enviados':>9} {'s':>7}")
+        try:
+            with override_settings(MS_GRAPH_URL=url, **STUB_SETTINGS):
+                for label, send in (('anterior', self._legacy), ('actual', self._backend)):
+                    messages = [
+                        EmailMessage(f"mensaje {i}", 'Cuerpo', to=[f"destino{i}@benchmark.invalid"])
+                        for i in range(options['messages'])
+                    ]
+                    server.rng = random.Random(7)
+                    server.requests, server.throttled = 0, 0
+                    server.connections, server.delivered = set(), []
+                    start = time.perf_counter()
+                    sent = send(url, messages)
+                    elapsed = time.perf_counter() - start
+                    self.stdout.write(
+                        f"{label:<10} {server.requests:>10} {len(server.connections):>10} "
+                        f"{server.throttled:>5} {sent:>9} {elapsed:>7.2f}"
+                    )
+                    if label == 'actual':
+                        expected = sorted(message.subject for message in messages)
+                        if sent != len(messages) or sorted(server.delivered) != expected:
+                            failures.append(
+                                f"{sent} enviados y {len(server.delivered)} entregados de {len(messages)} mensajes"
+                            )
+        finally:
+            server.shutdown()
+            email_backends._tokens.pop((STUB_SETTINGS['tenant_id'], STUB_SETTINGS['client_id']), None)
+
+        if failures:
+            raise CommandError('; '.join(failures))
+        self.stdout.write(self.style.SUCCESS('Cada mensaje se entregó exactamente una vez'))
+
+    def _backend(self, url, messages):
+        # msal necesita red para pedir el token; se siembra uno en la caché del proceso
+        email_backends._tokens[(STUB_SETTINGS['tenant_id'], STUB_SETTINGS['client_id'])] = ('stub', time.time() + 3600)
+        return MicrosoftGraphEmailBackend().send_messages(messages)
+
+    def _legacy(self, url, messages):
+        """Envío anterior: un requests.post por mensaje, sin reintentos."""
+        backend = MicrosoftGraphEmailBackend()
+        sent = 0
+        for message in messages:
+            response = requests.post(
+                f"{url}/users/{STUB_SETTINGS['email_user']}/sendMail",
+                headers={'Authorization': 'Bearer stub', 'Content-Type': 'application/json'},
+                data=json.dumps(backend._message_payload(message)),
+            )
+            sent += response.status_code == 202
+        return sent
@@ -0,0 +1,85 @@
+import uuid
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Group
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from rest_framework.test import APIRequestFactory
+
+from agencia.management.commands.benchmark_skill_matching import count_queries
+from api.permissions import AgenciaLaboralPermission, GerentePermission, IsEmployer, PersonalPermission
+from api.roles import invalidate_roles
+
+User = get_user_model()
+
+# IsEmployer además busca el perfil de empleador (una consulta que no es de
+# roles), así que se verifica el resultado pero no entra en la cuenta
+PERMISSIONS = (PersonalPermission, GerentePermission, AgenciaLaboralPermission)
+ROLES = ('personal', 'gerente', 'agencia_laboral')
+
+
+class Command(BaseCommand):
+    help = (
+        'Cuenta las consultas de las comprobaciones de rol de api/permissions.py '
+        'por petición: con la caché de roles vacía, con la caché caliente (debe '
+        'ser cero) y después de cambiar los grupos de un usuario (la caché se '
+        'invalida). Compara cada resultado con las consultas de grupos directas. '
+        'Todos los datos se revierten al terminar.'
+    )
+
+    def handle(self, *args, **options):
+        factory = APIRequestFactory()
+        failures = []
+        with transaction.atomic():
+            tag = uuid.uuid4().hex[:8]
+            groups = {name: Group.objects.get_or_create(name=name)[0] for name in ROLES}
+            users = []
+            for i, roles in enumerate([(), ('personal',), ('gerente',), ('agencia_laboral',), ('personal', 'gerente')]):
+                user = User.objects.create(id=uuid.uuid4(), email=f"rol{i}-{tag}@benchmark.invalid")
+                user.groups.set([groups[name] for name in roles])
+                users.append(user)
+            invalidate_roles(user.pk for user in users)
+
+            for label in ('caché vacía', 'caché caliente'):
+                total = self._check(factory, users, failures, label)
+                self.stdout.write(f"{label:<30} {total:>3} consultas en {len(users)} peticiones")
+                if label == 'caché caliente' and total:
+                    failures.append(f"{total} consultas con la caché caliente")
+
+            # Cambio de grupos: la siguiente petición ve los grupos nuevos
+            users[1].groups.remove(groups['personal'])
+            groups['gerente'].user_set.add(users[3])
+            groups['agencia_laboral'].user_set.clear()
+            total = self._check(factory, users, failures, 'tras cambiar grupos')
+            self.stdout.write(f"{'tras cambiar grupos':<30} {total:>3} consultas en {len(users)} peticiones")
+
+            invalidate_roles(user.pk for user in users)
+            transaction.set_rollback(True)
+
+        if failures:
+            raise CommandError('; '.join(failures))
+        self.stdout.write(self.style.SUCCESS('Mismos permisos que con las consultas de grupos'))
+
+    def _check(self, factory, users, failures, label):
+        total = 0
+        for user in users:
+            # Cada petición carga su propia instancia del usuario
+            request = factory.get('/api/')
+            request.user = User.objects.get(pk=user.pk)
+            expected = self._expected(User.objects.get(pk=user.pk))
+            with count_queries() as queries:
+                got = [permission().has_permission(request, None) for permission in PERMISSIONS]
+            total += queries[0]
+            got.append(IsEmployer().has_permission(request, None))
+            if got != expected:
+                failures.append(f"{label}: {request.user.email} obtuvo {got}, se esperaba {expected}")
+        return total
+
+    def _expected(self, user):
+        names = set(user.groups.values_list('name', flat=True))
+        return [
+            user.is_staff or bool(names & {'gerente', 'personal'}),
+            user.is_staff or 'gerente' in names,
+            user.is_staff or bool(names & {'gerente', 'agencia_laboral'}),
+            user.is_staff or 'agencia_laboral' in names or hasattr(user, 'employer'),
+        ]
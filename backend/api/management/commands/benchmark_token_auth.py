@@ -0,0 +1,138 @@
+import time
+import uuid
+
+import jwt
+from asgiref.sync import async_to_sync
+from channels.db import database_sync_to_async
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.test import APIRequestFactory
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.tokens import AccessToken
+
+from agencia.management.commands.benchmark_skill_matching import count_queries
+from api import token_cache
+from api.authentication import MultipleAuthAuthentication
+from middleware.jwt_auth import JWTAuthMiddleware
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = (
+        'Mide el costo de autenticar una petición HTTP y una conexión websocket '
+        'con un JWT propio: flujo anterior (en HTTP se intentaba ADFS antes de '
+        'simplejwt; en websockets se identificaba el token con un salto a '
+        'database_sync_to_async) contra la caché de tokens validados. Con '
+        '--with-adfs el flujo anterior de HTTP incluye el intento de ADFS, que '
+        'necesita red para descargar la configuración del proveedor. Los datos '
+        'se borran al terminar.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=500)
+        parser.add_argument('--with-adfs', action='store_true')
+
+    def handle(self, *args, **options):
+        n = options['requests']
+        # El middleware usa database_sync_to_async, que cierra la conexión
+        # dentro de una transacción: los datos se borran al terminar
+        user = User.objects.create(id=uuid.uuid4(), email=f"token-{uuid.uuid4().hex[:8]}@benchmark.invalid")
+        token = str(AccessToken.for_user(user))
+        token_cache.forget(token)
+        try:
+            results = self._run(user, token, n, options['with_adfs'])
+        finally:
+            token_cache.forget(token)
+            user.delete()
+
+        self.stdout.write(f"{'flujo':<40} {'ms/auth':>9} {'consultas/auth':>15}")
+        for label, elapsed, queries, ok in results:
+            self.stdout.write(f"{label:<40} {elapsed / n * 1000:>9.3f} {queries / n:>15.2f}")
+        failed = [label for label, _, _, ok in results if not ok]
+        if failed:
+            raise CommandError(f"autenticación fallida en: {', '.join(failed)}")
+        self.stdout.write(self.style.SUCCESS('Mismo usuario en todos los flujos'))
+
+    def _run(self, user, token, n, with_adfs):
+        factory = APIRequestFactory()
+        header = {'HTTP_AUTHORIZATION': f'Bearer {token}'}
+        results = []
+
+        legacy = _LegacyHttpAuthentication(with_adfs)
+        results.append(self._measure(
+            'HTTP anterior' + (' (con ADFS)' if with_adfs else ' (sin intento de ADFS)'), n, user,
+            lambda: legacy.authenticate(factory.get('/api/', **header)),
+        ))
+
+        current = MultipleAuthAuthentication()
+        first = current.authenticate(factory.get('/api/', **header))
+        if first is None or first[0].pk != user.pk:
+            return results + [('HTTP nuevo (primera validación)', 0, 0, False)]
+        results.append(self._measure(
+            'HTTP nuevo (token en caché)', n, user,
+            lambda: current.authenticate(factory.get('/api/', **header)),
+        ))
+
+        middleware = JWTAuthMiddleware(None)
+        results.append(self._measure(
+            'websocket anterior', n, user,
+            lambda: (async_to_sync(_legacy_websocket_user)(token),),
+        ))
+        token_cache.forget(token)
+        results.append(self._measure(
+            'websocket nuevo (token en caché)', n, user,
+            lambda: (async_to_sync(middleware.authenticate_token)(token),),
+        ))
+        return results
+
+    def _measure(self, label, n, user, authenticate):
+        ok = True
+        with count_queries() as queries:
+            start = time.perf_counter()
+            for _ in range(n):
+                result = authenticate()
+                ok = ok and result is not None and getattr(result[0], 'pk', None) == user.pk
+            elapsed = time.perf_counter() - start
+        return label, elapsed, queries[0], ok
+
+
+class _LegacyHttpAuthentication:
+    """MultipleAuthAuthentication anterior: ADFS primero y después simplejwt."""
+
+    def __init__(self, with_adfs):
+        self.with_adfs = with_adfs
+        self.jwt_authentication = JWTAuthentication()
+        if with_adfs:
+            from django_auth_adfs.rest_framework import AdfsAccessTokenAuthentication
+            self.adfs_authentication = AdfsAccessTokenAuthentication()
+
+    def authenticate(self, request):
+        if self.with_adfs:
+            try:
+                if self.adfs_authentication.authenticate(request) is not None:
+                    return None
+            except Exception:
+                pass
+        try:
+            return self.jwt_authentication.authenticate(request)
+        except Exception:
+            return None
+
+
+@database_sync_to_async
+def _legacy_identify(token):
+    return jwt.decode(token, options={"verify_signature": False})
+
+
+@database_sync_to_async
+def _legacy_get_user(user_id):
+    return User.objects.get(id=user_id)
+
+
+async def _legacy_websocket_user(token):
+    """Flujo anterior del middleware: identificar el tipo (un salto a un hilo), verificar y cargar al usuario."""
+    await _legacy_identify(token)
+    data = jwt.decode(token, settings.SECRET_KEY, algorithms=["HS256"])
+    return await _legacy_get_user(data['user_id'])
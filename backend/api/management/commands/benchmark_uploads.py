@@ -0,0 +1,147 @@
+import hashlib
+import os
+import time
+import uuid
+from urllib.parse import urlsplit
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Group
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from rest_framework.test import APIClient
+
+from api.models import UploadSession
+from api.uploads import upload_storage
+from communications.models import ForumFile, ForumTopic
+
+User = get_user_model()
+
+MB = 1024 * 1024
+
+
+class Command(BaseCommand):
+    help = (
+        'Compara cuánto tiempo ocupa un worker de Django subir un adjunto grande '
+        'del foro por multipart (una sola petición con todo el archivo) contra la '
+        'subida por bloques con sesión, incluida una subida interrumpida que se '
+        'reanuda. Todos los datos y archivos se borran al terminar.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--size-mb', type=int, default=50)
+        parser.add_argument(
+            '--uplink-mbps', type=float, default=20,
+            help='Velocidad de subida del cliente para estimar la ocupación con la red real',
+        )
+
+    def handle(self, *args, **options):
+        size = options['size_mb'] * MB
+        content = os.urandom(size)
+        digest = hashlib.sha256(content).hexdigest()
+        stored = []
+        sessions = []
+        failures = []
+
+        try:
+            with transaction.atomic():
+                tag = uuid.uuid4().hex[:8]
+                group, _ = Group.objects.get_or_create(name='personal')
+                user = User.objects.create(id=uuid.uuid4(), email=f"subidas-{tag}@benchmark.invalid", password='!')
+                user.groups.add(group)
+                client = APIClient(SERVER_NAME='localhost')
+                client.force_authenticate(user)
+
+                # Multipart: el worker recibe y guarda el archivo completo en una petición
+                start = time.perf_counter()
+                response = client.post('/api/communications/forum/topics/', {
+                    'title': f"Tema {tag}", 'description': 'Benchmark',
+                    'files': SimpleUploadedFile('video.mp4', content, 'video/mp4'),
+                })
+                legacy_elapsed = time.perf_counter() - start
+                if response.status_code != 201:
+                    raise CommandError(f"La creación del tema respondió {response.status_code}")
+                stored += list(ForumFile.objects.filter(topic_id=response.json()['id']).values_list('file', flat=True))
+
+                topic = ForumTopic.objects.create(title=f"Tema {tag}", description='Benchmark', author=user)
+                timings, session = self._upload(client, topic, content)
+                stored.append(session.storage_name)
+                sessions.append(session)
+                name = session.storage_name
+                with default_storage.open(name) as saved:
+                    if hashlib.sha256(saved.read()).hexdigest() != digest:
+                        failures.append('el archivo subido por bloques no coincide con el original')
+                transaction.set_rollback(True)
+        finally:
+            for name in stored:
+                default_storage.delete(name)
+            # Los bloques se borran al confirmar, y aquí se revierte
+            for session in sessions:
+                upload_storage().discard(session)
+
+        chunk_times = timings['chunks']
+        control = timings['create'] + timings['status'] + timings['finalize']
+        self.stdout.write(f"Archivo de {options['size_mb']} MB")
+        self.stdout.write(f"  multipart: 1 petición de {legacy_elapsed * 1000:.0f} ms con el archivo completo")
+        self.stdout.write(
+            f"  por bloques: {len(chunk_times)} bloques de {timings['chunk_size'] // MB} MB, "
+            f"máximo {max(chunk_times) * 1000:.0f} ms por petición; abrir, reanudar y finalizar "
+            f"{control * 1000:.0f} ms (finalizar une los bloques en el storage local)"
+        )
+        uplink = options['uplink_mbps'] * 1_000_000 / 8
+        self.stdout.write(
+            f"  con un cliente a {options['uplink_mbps']:g} Mbps un worker queda ocupado: multipart "
+            f"{size / uplink:.1f} s seguidos; por bloques en este servidor hasta "
+            f"{timings['chunk_size'] / uplink:.1f} s por petición; con Azure los bloques van directo "
+            f"al storage y solo abrir y finalizar pasan por Django"
+        )
+        if failures:
+            raise CommandError('; '.join(failures))
+        self.stdout.write(self.style.SUCCESS('Subida por bloques reanudada y completa, con el mismo contenido'))
+
+    def _put(self, client, url, data):
+        parts = urlsplit(url)
+        return client.put(f"{parts.path}?{parts.query}", data=data, content_type='application/octet-stream')
+
+    def _upload(self, client, topic, content):
+        timings = {'chunks': []}
+        start = time.perf_counter()
+        response = client.post('/api/uploads/', {
+            'target': 'forum_topic_file', 'target_id': topic.pk, 'filename': 'video.mp4',
+            'size': len(content), 'content_type': 'video/mp4',
+        }, format='json')
+        timings['create'] = time.perf_counter() - start
+        if response.status_code != 201:
+            raise CommandError(f"Abrir la subida respondió {response.status_code}: {response.json()}")
+        session = response.json()
+        chunk_size = timings['chunk_size'] = session['chunk_size']
+
+        def send(chunks):
+            for chunk in chunks:
+                offset = chunk['index'] * chunk_size
+                start = time.perf_counter()
+                response = self._put(client, chunk['url'], content[offset:offset + chunk['size']])
+                timings['chunks'].append(time.perf_counter() - start)
+                if response.status_code != 201:
+                    raise CommandError(f"El bloque {chunk['index']} respondió {response.status_code}")
+
+        # Se interrumpe a la mitad y se reanuda con las URLs que devuelve el estado
+        half = len(session['chunks']) // 2
+        send(session['chunks'][:half])
+        start = time.perf_counter()
+        status = client.get(f"/api/uploads/{session['id']}/").json()
+        timings['status'] = time.perf_counter() - start
+        if status['received'] != list(range(half)):
+            raise CommandError(f"Bloques recibidos {status['received']}, se esperaban {half}")
+        send(status['chunks'])
+
+        start = time.perf_counter()
+        response = client.post(f"/api/uploads/{session['id']}/finalize/", format='json')
+        timings['finalize'] = time.perf_counter() - start
+        if response.status_code != 200:
+            raise CommandError(f"Finalizar respondió {response.status_code}: {response.json()}")
+        session = UploadSession.objects.get(pk=session['id'])
+        if not ForumFile.objects.filter(topic=topic, file=session.storage_name).exists():
+            raise CommandError('El archivo no quedó asignado al tema')
+        return timings, session
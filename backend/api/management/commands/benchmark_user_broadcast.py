@@ -0,0 +1,54 @@
+import uuid
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import update_last_login
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = (
+        'Cuenta las consultas a la tabla de usuarios en cada save de un '
+        'usuario: la señal de avisos por websocket ya no vuelve a leer el '
+        'renglón antes de guardarlo, así que solo debe quedar el UPDATE. '
+        'Todos los datos se revierten al terminar.'
+    )
+
+    def handle(self, *args, **options):
+        table = User._meta.db_table
+        failures = []
+        with transaction.atomic():
+            user = User.objects.create(
+                id=uuid.uuid4(), email=f"broadcast-{uuid.uuid4().hex[:8]}@benchmark.invalid"
+            )
+            user = User.objects.get(pk=user.pk)
+
+            def rename():
+                user.first_name = 'Benchmark'
+                user.save()
+
+            cases = (
+                ('último acceso', lambda: update_last_login(None, user)),
+                ('save sin cambios', lambda: user.save()),
+                ('cambio de nombre', rename),
+            )
+            for label, action in cases:
+                with CaptureQueriesContext(connection) as context:
+                    action()
+                user_queries = [q['sql'] for q in context.captured_queries if table in q['sql']]
+                selects = [sql for sql in user_queries if sql.lstrip().upper().startswith('SELECT')]
+                self.stdout.write(
+                    f"{label:<20} {len(context.captured_queries):>3} consultas, "
+                    f"{len(user_queries)} a {table} ({len(selects)} SELECT)"
+                )
+                if selects:
+                    failures.append(f"{label}: {len(selects)} SELECT a {table}")
+
+            transaction.set_rollback(True)
+
+        if failures:
+            raise CommandError('; '.join(failures))
+        self.stdout.write(self.style.SUCCESS('Ningún save vuelve a leer al usuario'))
@@ -0,0 +1,39 @@
+# Generated by Django 5.1.12 on 2026-10-19 15:24
+
+import django.db.models.deletion
+import uuid
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0003_email_outbox'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UploadSession',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('target', models.CharField(max_length=32)),
+                ('target_id', models.CharField(help_text='Llave del objeto al que se asigna el archivo', max_length=64)),
+                ('filename', models.CharField(max_length=255)),
+                ('content_type', models.CharField(blank=True, max_length=100)),
+                ('size', models.PositiveBigIntegerField()),
+                ('chunk_size', models.PositiveIntegerField()),
+                ('storage_name', models.CharField(help_text='Nombre del archivo en el storage', max_length=255)),
+                ('status', models.CharField(choices=[('pending', 'Pendiente'), ('complete', 'Completa')], default='pending', max_length=10)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('expires_at', models.DateTimeField(db_index=True)),
+                ('completed_at', models.DateTimeField(blank=True, null=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Subida de archivo',
+                'verbose_name_plural': 'Subidas de archivos',
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
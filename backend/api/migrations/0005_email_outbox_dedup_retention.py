@@ -0,0 +1,32 @@
+# Generated by Django 5.1.12 on 2026-10-19 16:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0004_upload_session'),
+    ]
+
+    operations = [
+        # Los correos ya guardados pueden repetir llave: entran inactivos
+        migrations.AddField(
+            model_name='emailoutbox',
+            name='dedup_active',
+            field=models.BooleanField(default=False, help_text='La llave bloquea mensajes iguales (dentro de la ventana y sin descartar)'),
+        ),
+        migrations.AlterField(
+            model_name='emailoutbox',
+            name='dedup_active',
+            field=models.BooleanField(default=True, help_text='La llave bloquea mensajes iguales (dentro de la ventana y sin descartar)'),
+        ),
+        migrations.AddIndex(
+            model_name='emailoutbox',
+            index=models.Index(fields=['status', 'updated_at'], name='email_outbox_prune_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='emailoutbox',
+            constraint=models.UniqueConstraint(condition=models.Q(('dedup_active', True)), fields=('dedup_key',), name='email_outbox_active_dedup_key'),
+        ),
+    ]
@@ -1,9 +1,11 @@
 import uuid
 from django.db import models
+from django.utils import timezone
 from django.contrib.auth.models import AbstractUser
 from django.contrib.auth.base_user import BaseUserManager
 from centros.models import Center
 from django.contrib.auth.models import Group
+from .tracking import FieldTrackerMixin
 
 class CustomUserManager(BaseUserManager): 
     def create_user(self, email, password=None, **extra_fields ): 
@@ -31,7 +33,13 @@ class CustomUserManager(BaseUserManager):
             
         return user
 
-class CustomUser(AbstractUser):
+class CustomUser(FieldTrackerMixin, AbstractUser):
+    # Cambios que se avisan por websocket (api/signals.py) y que actualizan el
+    # índice de búsqueda de candidatos (candidatos/signals.py)
+    tracked_fields = (
+        'email', 'is_active', 'is_staff', 'first_name', 'last_name', 'second_last_name', 'center_id',
+    )
+
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
 
     email = models.EmailField(max_length=200, unique=True)
@@ -52,4 +60,97 @@ class CustomUser(AbstractUser):
         return f'{self.email} ({groups_str})'
     
     pass
-    
\ No newline at end of file
+    
+
+class EmailOutbox(models.Model):
+    """
+    Correo pendiente de enviar (api/email_outbox.py). El backend de correo
+    guarda aquí cada mensaje y una tarea de Celery lo envía después.
+    """
+    PENDING = 'pending'
+    SENDING = 'sending'
+    SENT = 'sent'
+    DEAD = 'dead'
+    STATUS_CHOICES = [
+        (PENDING, 'Pendiente'),
+        (SENDING, 'Enviando'),
+        (SENT, 'Enviado'),
+        (DEAD, 'Descartado'),
+    ]
+
+    dedup_key = models.CharField(max_length=64, db_index=True, help_text="Mensajes iguales con la misma llave no se vuelven a encolar")
+    dedup_active = models.BooleanField(default=True, help_text="La llave bloquea mensajes iguales (dentro de la ventana y sin descartar)")
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=PENDING)
+    subject = models.CharField(max_length=255, blank=True)
+    recipients = models.TextField(blank=True)
+    payload = models.JSONField(help_text="Mensaje serializado")
+    attempts = models.PositiveIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-id']
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at'], name='email_outbox_due_idx'),
+            models.Index(fields=['status', 'updated_at'], name='email_outbox_prune_idx'),
+        ]
+        constraints = [
+            # Dos peticiones simultáneas con el mismo correo: solo una lo encola
+            models.UniqueConstraint(
+                fields=['dedup_key'], condition=models.Q(dedup_active=True), name='email_outbox_active_dedup_key',
+            ),
+        ]
+        verbose_name = 'Correo saliente'
+        verbose_name_plural = 'Correos salientes'
+
+    def __str__(self):
+        return f"{self.subject} → {self.recipients} ({self.get_status_display()})"
+
+
+class UploadSession(models.Model):
+    """
+    Subida de un archivo directo al storage (api/uploads.py). El cliente sube
+    el archivo por bloques a URLs firmadas de corta duración y al finalizar
+    el archivo se asigna al modelo destino (`target`).
+    """
+    PENDING = 'pending'
+    COMPLETE = 'complete'
+    STATUS_CHOICES = [
+        (PENDING, 'Pendiente'),
+        (COMPLETE, 'Completa'),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name='+')
+    target = models.CharField(max_length=32)
+    target_id = models.CharField(max_length=64, help_text="Llave del objeto al que se asigna el archivo")
+    filename = models.CharField(max_length=255)
+    content_type = models.CharField(max_length=100, blank=True)
+    size = models.PositiveBigIntegerField()
+    chunk_size = models.PositiveIntegerField()
+    storage_name = models.CharField(max_length=255, help_text="Nombre del archivo en el storage")
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=PENDING)
+    created_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField(db_index=True)
+    completed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        verbose_name = 'Subida de archivo'
+        verbose_name_plural = 'Subidas de archivos'
+
+    def __str__(self):
+        return f"{self.filename} ({self.target} {self.target_id}, {self.get_status_display()})"
+
+    @property
+    def chunk_count(self):
+        return max(1, -(-self.size // self.chunk_size))
+
+    def chunk_length(self, index):
+        """Tamaño esperado del bloque `index` (el último puede ser menor)."""
+        if index < self.chunk_count - 1:
+            return self.chunk_size
+        return self.size - self.chunk_size * (self.chunk_count - 1)
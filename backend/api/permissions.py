@@ -2,6 +2,7 @@ from rest_framework import permissions
 from agencia.models import Job
 from candidatos.models import UserProfile
 from centros.models import TransferRequest
+from api.roles import has_role
 
 class IsAdminUserOrReadOnly(permissions.IsAdminUser):
 
@@ -66,7 +67,7 @@ class GerentePermission(permissions.BasePermission):
 
         # All other methods require the user to be in the 'gerente' group
         # (or whatever group is allowed to perform these actions)
-        return request.user.groups.filter(name='gerente').exists()
+        return has_role(request.user, 'gerente')
 
     def has_object_permission(self, request, view, obj):
         # Admins have full access to any object
@@ -74,7 +75,7 @@ class GerentePermission(permissions.BasePermission):
             return True
 
         # Check if the user is a 'gerente'
-        if not request.user.groups.filter(name='gerente').exists():
+        if not has_role(request.user, 'gerente'):
             return False # Not a gerente, so no object permission
 
         # --- Logic for User objects (PUT/PATCH for 'personal' users in their center) ---
@@ -82,7 +83,7 @@ class GerentePermission(permissions.BasePermission):
         if hasattr(obj, 'groups') and hasattr(obj, 'center'): # Check if 'obj' is likely a User instance
             if request.method in ['PUT', 'PATCH']:
                 # Gerente can only update 'personal' users in their own center
-                return obj.groups.filter(name='personal').exists() and \
+                return has_role(obj, 'personal') and \
                        getattr(obj, 'center') == getattr(request.user, 'center')
             # For other methods on User objects (e.g., DELETE), deny by default
             return False # Or define specific logic for DELETE if needed
@@ -112,14 +113,10 @@ class PersonalPermission(permissions.BasePermission):
     Allows access if the user is staff, in the 'gerente' group, or in the 'personal' group.
     """
     def has_permission(self, request, view):
-        return request.user.is_staff or \
-               request.user.groups.filter(name='gerente').exists() or \
-               request.user.groups.filter(name='personal').exists()
+        return request.user.is_staff or has_role(request.user, 'gerente', 'personal')
 
     def has_object_permission(self, request, view, obj):
-        return request.user.is_staff or \
-               request.user.groups.filter(name='gerente').exists() or \
-               request.user.groups.filter(name='personal').exists()
+        return request.user.is_staff or has_role(request.user, 'gerente', 'personal')
 
 
 class AgenciaLaboralPermission(permissions.BasePermission):
@@ -127,21 +124,17 @@ class AgenciaLaboralPermission(permissions.BasePermission):
     Allows access if the user is staff, in the 'gerente' group, or in the 'agencia_laboral' group.
     """
     def has_permission(self, request, view):
-        return request.user.is_staff or \
-               request.user.groups.filter(name='gerente').exists() or \
-               request.user.groups.filter(name='agencia_laboral').exists()
+        return request.user.is_staff or has_role(request.user, 'gerente', 'agencia_laboral')
 
     def has_object_permission(self, request, view, obj):
-        return request.user.is_staff or \
-               request.user.groups.filter(name='gerente').exists() or \
-               request.user.groups.filter(name='agencia_laboral').exists()
+        return request.user.is_staff or has_role(request.user, 'gerente', 'agencia_laboral')
 
 class IsEmployer(permissions.BasePermission):
     """
     Only staff or users in the 'empleador' group (i.e. has an Employer)
     """
     def has_permission(self, request, view):
-        return request.user.is_staff or hasattr(request.user, 'employer') or request.user.groups.filter(name='agencia_laboral').exists()
+        return request.user.is_staff or has_role(request.user, 'agencia_laboral') or hasattr(request.user, 'employer')
     
 class IsEmployerOrReadOnly(permissions.BasePermission):
     """
@@ -156,7 +149,7 @@ class IsEmployerOrReadOnly(permissions.BasePermission):
 
         # For other methods (POST, PUT, PATCH, DELETE),
         # require staff status or an 'employer' attribute
-        return request.user.is_staff or hasattr(request.user, 'employer') or request.user.groups.filter(name='agencia_laboral').exists()
+        return request.user.is_staff or has_role(request.user, 'agencia_laboral') or hasattr(request.user, 'employer')
 
 class WorksInSameCompany(permissions.BasePermission):
     """
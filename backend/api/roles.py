@@ -0,0 +1,74 @@
+"""
+Roles (grupos de Django) de cada usuario.
+
+Las clases de api/permissions.py y las vistas preguntaban por cada rol con
+`user.groups.filter(name=...).exists()`, a veces varias veces por petición.
+`user_roles` resuelve el conjunto de nombres de grupo una vez por petición
+(se guarda en la instancia del usuario) y entre peticiones lo guarda en la
+caché. Los cambios de grupos (m2m_changed, y renombrar o borrar un grupo)
+invalidan la llave en api/signals.py.
+"""
+import logging
+
+from django.contrib.auth.models import Group
+from django.core.cache import cache
+from django.db import transaction
+
+logger = logging.getLogger(__name__)
+
+ROLES_KEY = 'auth:roles:{}'
+ROLES_TTL = 60 * 60 * 24
+
+
+def _key(user_id):
+    return ROLES_KEY.format(user_id)
+
+
+def user_roles(user):
+    """Nombres de los grupos del usuario (conjunto vacío si no está autenticado)."""
+    if user is None or not user.is_authenticated:
+        return frozenset()
+    roles = getattr(user, '_roles', None)
+    if roles is not None:
+        return roles
+
+    key = _key(user.pk)
+    try:
+        names = cache.get(key)
+    except Exception as e:
+        logger.warning(f"No se pudo leer la caché de roles: {e}")
+        names = None
+    if names is None:
+        names = list(Group.objects.filter(user__pk=user.pk).values_list('name', flat=True))
+        try:
+            cache.set(key, names, ROLES_TTL)
+        except Exception as e:
+            logger.warning(f"No se pudo guardar la caché de roles: {e}")
+
+    user._roles = frozenset(names)
+    return user._roles
+
+
+def has_role(user, *roles):
+    """True si el usuario pertenece a alguno de los grupos `roles`."""
+    return not user_roles(user).isdisjoint(roles)
+
+
+def invalidate_roles(user_ids):
+    """
+    Borra los roles en caché de los usuarios. Se borran de inmediato y otra
+    vez al confirmar la transacción, para que una lectura concurrente no
+    vuelva a guardar los grupos anteriores.
+    """
+    keys = [_key(user_id) for user_id in set(user_ids)]
+    if not keys:
+        return
+
+    def delete():
+        try:
+            cache.delete_many(keys)
+        except Exception as e:
+            logger.warning(f"No se pudo invalidar la caché de roles: {e}")
+
+    delete()
+    transaction.on_commit(delete)
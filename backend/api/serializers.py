@@ -99,3 +99,12 @@ class UserSerializer(serializers.ModelSerializer):
             instance.save()
 
         return instance
+
+
+class UploadSessionCreateSerializer(serializers.Serializer):
+    """Datos para abrir una subida directa al storage (api/uploads.py)."""
+    target = serializers.CharField(max_length=32)
+    target_id = serializers.CharField(max_length=64)
+    filename = serializers.CharField(max_length=255)
+    size = serializers.IntegerField(min_value=1)
+    content_type = serializers.CharField(max_length=100, required=False, allow_blank=True, default='')
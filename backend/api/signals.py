@@ -1,10 +1,10 @@
-from django.db.models.signals import pre_save, post_save, m2m_changed
+from django.db.models.signals import pre_save, post_save, pre_delete, m2m_changed
 from django.dispatch import receiver
 from django.contrib.auth import get_user_model
 from django.contrib.auth.models import Group
-from channels.layers import get_channel_layer
-from asgiref.sync import async_to_sync
-from .serializers import UserSerializer
+from notifications.channel_groups import request_group_refresh
+from .roles import invalidate_roles
+from .user_updates import queue_user_broadcast
 import logging
 
 logger = logging.getLogger(__name__)
@@ -28,80 +28,63 @@ def deactivate_staff_on_inactivity(sender, instance, **kwargs):
         except Group.DoesNotExist:
             pass
 
-@receiver(pre_save, sender=User)
-def broadcast_user_update(sender, instance, **kwargs):
-    try:
-        # Get the existing user from the database
-        db_user = User.objects.get(pk=instance.pk)
-    except User.DoesNotExist:
-        return  # Skip for new users (no existing user to compare against)
-
-    fields_to_watch = ['email', 'is_active', 'is_staff', 'first_name', 'last_name', 'center']
-    
-    # Check if any of the watched fields have changed
-    if not any(
-        getattr(db_user, field) != getattr(instance, field)
-        for field in fields_to_watch
-    ):
-        # If no significant changes, no need to broadcast
+@receiver(post_save, sender=User)
+def broadcast_user_update(sender, instance, created, update_fields=None, raw=False, **kwargs):
+    # Cambios contra los valores con los que se cargó la instancia
+    # (api/tracking.py, la copia se actualiza al terminar el save), sin
+    # volver a leer al usuario
+    if created or raw:
         return
+    changes = instance.tracked_changes(update_fields)
+    if not changes:
+        return
+
+    queue_user_broadcast(instance.pk, instance)
 
-    # If there are significant changes, flag the instance for broadcasting in post_save
-    instance._should_broadcast = True
+    # Center or staff changes move the user's notification broadcast groups
+    if 'center_id' in changes or 'is_staff' in changes:
+        request_group_refresh(instance.pk)
 
 @receiver(m2m_changed, sender=User.groups.through)
 def mark_user_for_broadcast_on_groups_change(sender, instance, action, **kwargs):
     # Only trigger if groups are added, removed, or cleared
     if action in ['post_add', 'post_remove', 'post_clear']:
-        instance._should_broadcast = True
+        # Roles changed: refresh the user's notification broadcast groups.
+        # From the Group side (group.user_set.add(...)) `instance` is the group
+        if not kwargs.get('reverse'):
+            queue_user_broadcast(instance.pk, instance)
+            request_group_refresh(instance.pk)
+        else:
+            for user_id in kwargs.get('pk_set') or ():
+                queue_user_broadcast(user_id)
+                request_group_refresh(user_id)
 
-@receiver(post_save, sender=User)
-def finalize_broadcast(sender, instance, **kwargs):
-    # Check the flag set in pre_save or m2m_changed
-    if getattr(instance, "_should_broadcast", False):
-        channel_layer = get_channel_layer()
+@receiver(m2m_changed, sender=User.groups.through)
+def invalidate_roles_on_groups_change(sender, instance, action, reverse, pk_set, **kwargs):
+    """Invalida los roles en caché (api/roles.py) de los usuarios afectados."""
+    if not reverse:
+        if action in ('post_add', 'post_remove', 'post_clear'):
+            instance._roles = None
+            invalidate_roles([instance.pk])
+        return
 
-        # --- NEW VALIDATION LOGIC ---
-        if channel_layer is None:
-            logger.warning(
-                "Channel layer is not configured. User update broadcast skipped for user ID %s.",
-                instance.id
-            )
-            return
+    # Desde el grupo: `instance` es el Group y pk_set los usuarios; un clear
+    # no trae pk_set, así que los miembros se leen antes de borrarlos
+    if action == 'pre_clear':
+        instance._roles_clear_user_ids = list(instance.user_set.values_list('pk', flat=True))
+    elif action == 'post_clear':
+        invalidate_roles(getattr(instance, '_roles_clear_user_ids', ()))
+    elif action in ('post_add', 'post_remove'):
+        invalidate_roles(pk_set or ())
 
-        group_name = f"user_{instance.id}_updates"
-        
-        try:
-            from api.serializers import UserSerializer # Example if UserSerializer is in api app
-            data = UserSerializer(instance).data
-        except ImportError:
-            logger.error("UserSerializer not found. Cannot serialize user data for broadcast.")
-            # Fallback to simple data if serializer is crucial and not found
-            data = {
-                'id': instance.id,
-                'email': instance.email,
-                'first_name': instance.first_name,
-                'last_name': instance.last_name,
-                'is_active': instance.is_active,
-                'is_staff': instance.is_staff,
-                'groups': [group.name for group in instance.groups.all()],
-            }
-        except Exception as e:
-            logger.error(f"Error serializing user data for broadcast: {e}")
-            data = {'id': instance.id, 'error': 'Serialization failed'}
+@receiver(post_save, sender=Group)
+def invalidate_roles_on_group_rename(sender, instance, created, raw=False, **kwargs):
+    if not created and not raw:
+        invalidate_roles(instance.user_set.values_list('pk', flat=True))
 
-
-        try:
-            async_to_sync(channel_layer.group_send)(
-                group_name,
-                {
-                    "type": "send_user_update",
-                    "data": data
-                }
-            )
-            logger.info("SIGNALS API ENCONTRO CAMBIOS y el broadcast fue enviado correctamente")
-        except Exception as e:
-            logger.error(f"Failed to send user update broadcast for user ID {instance.id}: {e}")
+@receiver(pre_delete, sender=Group)
+def invalidate_roles_on_group_delete(sender, instance, **kwargs):
+    invalidate_roles(instance.user_set.values_list('pk', flat=True))
 
 @receiver(pre_save, sender=User)
 def debug_user_signal(sender, instance, **kwargs):
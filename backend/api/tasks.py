@@ -0,0 +1,53 @@
+from celery import shared_task
+
+from api.files import delete_stored_files
+
+
+@shared_task
+def delete_stored_files_task(names):
+    """
+    Celery task that deletes replaced or orphaned files from storage.
+    """
+    return delete_stored_files(names)
+
+
+@shared_task
+def send_outbox_email_task(outbox_id):
+    """
+    Celery task that sends one queued outbox email with the delivery backend.
+    """
+    from api.email_outbox import deliver
+
+    return deliver(outbox_id)
+
+
+@shared_task
+def flush_email_outbox_task():
+    """
+    Celery task that sends due outbox emails (retries and messages whose
+    task was never enqueued) and returns the count per final status.
+    """
+    from api.email_outbox import flush_email_outbox
+
+    return flush_email_outbox()
+
+
+@shared_task
+def prune_email_outbox_task():
+    """
+    Celery task that deletes sent and dead outbox emails past the retention
+    period and returns how many were deleted.
+    """
+    from api.email_outbox import prune_email_outbox
+
+    return prune_email_outbox()
+
+
+@shared_task
+def prune_upload_sessions_task():
+    """
+    Celery task that deletes expired upload sessions and their staged chunks.
+    """
+    from api.uploads import prune_upload_sessions
+
+    return prune_upload_sessions()
@@ -1,3 +1,807 @@
-from django.test import TestCase
+import gzip
+import io
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+from datetime import timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
 
-# Create your tests here.
+import requests
+from asgiref.sync import async_to_sync
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Group
+from django.core import mail
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.mail.backends.base import BaseEmailBackend
+from django.db import IntegrityError, transaction
+from django.test import RequestFactory, TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+from rest_framework.request import Request
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from api import conditional, email_backends, email_outbox, files, token_cache, uploads
+from api.roles import has_role, user_roles
+from api.authentication import MultipleAuthAuthentication
+from api.email_backends import MicrosoftGraphEmailBackend
+from api.models import EmailOutbox, UploadSession
+from candidatos.models import UserProfile
+from communications.models import CommunicationPost, ForumFile, ForumTopic
+from cuestionarios.models import BaseCuestionarios, Cuestionario, ImagenOpcion, Pregunta
+from candidatos.serializers import CandidateListSerializer
+from discapacidad.models import Disability, DisabilityGroup
+from middleware.jwt_auth import JWTAuthMiddleware
+
+User = get_user_model()
+
+
+class TokenCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(email='tokens@benchmark.invalid', password='x')
+        self.refresh = RefreshToken.for_user(self.user)
+
+    def _http(self, token):
+        request = RequestFactory().get('/api/current-user/', HTTP_AUTHORIZATION=f'Bearer {token}')
+        return MultipleAuthAuthentication().authenticate(request)
+
+    def _websocket(self, token):
+        return async_to_sync(JWTAuthMiddleware(None).authenticate_token)(token)
+
+    def test_refresh_token_is_not_an_access_token(self):
+        token = str(self.refresh)
+        self.assertIsNone(self._http(token))
+        self.assertFalse(self._websocket(token).is_authenticated)
+        # Ni después de pasar por el websocket
+        self.assertIsNone(self._http(token))
+        self.assertIsNone(token_cache.cached_identity(token))
+
+    def test_access_token_validated_by_websocket_is_cached_for_http(self):
+        token = str(self.refresh.access_token)
+        self.assertEqual(self._websocket(token), self.user)
+        self.assertEqual(token_cache.cached_identity(token)['kind'], token_cache.JWT)
+        with self.assertNumQueries(1):
+            self.assertEqual(self._http(token), (self.user, token))
+
+    def test_cache_entry_of_another_kind_is_ignored(self):
+        token = str(self.refresh.access_token)
+        claims = dict(self.refresh.access_token.payload)
+        token_cache.remember(token, self.user, claims, token_cache.ADFS)
+        self.assertIsNone(token_cache.cached_identity(token))
+
+    def test_refresh_token_is_never_stored(self):
+        token = str(self.refresh)
+        token_cache.remember(token, self.user, dict(self.refresh.payload), token_cache.JWT)
+        self.assertIsNone(cache.get(token_cache._key(token)))
+
+
+class SparseFieldsetsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        group = DisabilityGroup.objects.create(name='Grupo')
+        disability = Disability.objects.create(name='Auditiva', group=group)
+        for i in range(20):
+            user = User.objects.create_user(email=f'candidato{i}@benchmark.invalid', password='x')
+            UserProfile.objects.create(user=user).disability.add(disability)
+
+    def _serialize(self, query=''):
+        request = Request(RequestFactory().get(f'/api/candidatos/dashboard-list/{query}'))
+        queryset = CandidateListSerializer.optimize_queryset(User.objects.order_by('email'), request)
+        return CandidateListSerializer(queryset, many=True, context={'request': request}).data
+
+    def test_all_fields_do_not_query_per_row(self):
+        # Usuarios con perfil, discapacidades prefetch
+        with self.assertNumQueries(2):
+            data = self._serialize()
+        self.assertEqual(len(data), 20)
+        self.assertEqual(data[0]['discapacidad'], 'Auditiva')
+
+    def test_fields_skip_unrequested_relations(self):
+        with self.assertNumQueries(1):
+            data = self._serialize('?fields=id,email')
+        self.assertEqual(set(data[0]), {'id', 'email'})
+
+    def test_omit_drops_prefetch(self):
+        with self.assertNumQueries(1):
+            data = self._serialize('?omit=discapacidad')
+        self.assertNotIn('discapacidad', data[0])
+        self.assertIn('ciclo', data[0])
+
+
+class ConditionalGetTests(TestCase):
+    URL = '/api/discapacidad/disability-groups/'
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user(email='catalogos@benchmark.invalid', password='x'))
+        DisabilityGroup.objects.create(name='Grupo')
+
+    def test_repeat_request_with_etag_is_not_modified(self):
+        response = self.client.get(self.URL)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['ETag'])
+        self.assertIn('Last-Modified', response)
+        with self.assertNumQueries(0):
+            again = self.client.get(self.URL, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(again.status_code, 304)
+
+    def test_write_invalidates_etag_after_commit(self):
+        etag = self.client.get(self.URL)['ETag']
+        with self.captureOnCommitCallbacks() as callbacks:
+            DisabilityGroup.objects.create(name='Otro grupo')
+            # Sin confirmar, la versión no cambia
+            self.assertEqual(self.client.get(self.URL, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        for callback in callbacks:
+            callback()
+        response = self.client.get(self.URL, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(len(response.json()), 2)
+
+    def test_if_modified_since_alone_is_not_enough(self):
+        last_modified = self.client.get(self.URL)['Last-Modified']
+        self.assertEqual(self.client.get(self.URL, HTTP_IF_MODIFIED_SINCE=last_modified).status_code, 200)
+
+    def test_cache_failure_does_not_break_writes_or_reads(self):
+        with mock.patch.object(conditional.cache, 'incr', side_effect=ConnectionError), \
+                self.captureOnCommitCallbacks(execute=True):
+            DisabilityGroup.objects.create(name='Sin caché')
+        with mock.patch.object(conditional.cache, 'get', side_effect=ConnectionError):
+            response = self.client.get(self.URL)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('ETag', response)
+
+    def test_large_json_responses_are_gzipped(self):
+        small = self.client.get(self.URL, HTTP_ACCEPT_ENCODING='gzip')
+        self.assertNotIn('Content-Encoding', small)
+        DisabilityGroup.objects.bulk_create([DisabilityGroup(name=f'Grupo de discapacidad {i:03d}') for i in range(60)])
+        conditional.bump_model_version(DisabilityGroup)
+        large = self.client.get(self.URL, HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(large['Content-Encoding'], 'gzip')
+        self.assertEqual(len(json.loads(gzip.decompress(large.content))), 61)
+
+
+class UserUpdateBroadcastTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(email='avisos@benchmark.invalid', password='x', first_name='Ana')
+
+    def _sent(self, send):
+        return [(instance.pk, instance.first_name) for (instance,), _ in send.call_args_list]
+
+    @mock.patch('api.user_updates.send_user_update')
+    def test_one_update_per_transaction_with_final_data(self, send):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.first_name = 'Ana María'
+            self.user.save()
+            self.user.last_name = 'López'
+            self.user.save()
+        self.assertEqual(self._sent(send), [(self.user.pk, 'Ana María')])
+
+    @mock.patch('api.user_updates.send_user_update')
+    def test_rolled_back_changes_are_not_broadcast_later(self, send):
+        with self.captureOnCommitCallbacks(execute=True):
+            try:
+                with transaction.atomic():
+                    stale = User.objects.get(pk=self.user.pk)
+                    stale.first_name = 'Revertido'
+                    stale.save()
+                    raise RuntimeError
+            except RuntimeError:
+                pass
+            # Desde el grupo no hay instancia del usuario: se carga al enviar
+            Group.objects.create(name='personal').user_set.add(self.user)
+        self.assertEqual(self._sent(send), [(self.user.pk, 'Ana')])
+
+
+class UserUpdateTransactionTests(TransactionTestCase):
+    """Transacciones externas reales: sin el atomic que envuelve a cada TestCase."""
+
+    def setUp(self):
+        self.user = User.objects.create_user(email='avisos@benchmark.invalid', password='x', first_name='Ana')
+
+    @mock.patch('api.user_updates.send_user_update')
+    def test_rolled_back_transaction_does_not_swallow_the_next_one(self, send):
+        try:
+            with transaction.atomic():
+                self.user.first_name = 'Revertido'
+                self.user.save()
+                raise RuntimeError
+        except RuntimeError:
+            pass
+        send.assert_not_called()
+
+        with transaction.atomic():
+            user = User.objects.get(pk=self.user.pk)
+            user.first_name = 'Confirmado'
+            user.save()
+            with transaction.atomic():
+                user.last_name = 'López'
+                user.save()
+        # Un aviso por bloque (transacción y savepoint), todos con los datos finales
+        self.assertEqual(
+            {(instance.first_name, instance.last_name) for (instance,), _ in send.call_args_list},
+            {('Confirmado', 'López')},
+        )
+
+    @mock.patch('api.user_updates.send_user_update')
+    def test_autocommit_save_is_sent_immediately(self, send):
+        self.user.first_name = 'Inmediato'
+        self.user.save()
+        self.assertEqual([instance.first_name for (instance,), _ in send.call_args_list], ['Inmediato'])
+
+class RolesCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(email='roles@benchmark.invalid', password='x')
+        self.personal = Group.objects.create(name='personal')
+        self.gerente = Group.objects.create(name='gerente')
+        self.user.groups.add(self.personal)
+
+    def _roles(self):
+        # Instancia nueva en cada petición, sin la copia guardada en el usuario
+        return user_roles(User.objects.get(pk=self.user.pk))
+
+    def test_warm_cache_does_not_query(self):
+        self.assertEqual(self._roles(), {'personal'})
+        user = User.objects.get(pk=self.user.pk)
+        with self.assertNumQueries(0):
+            self.assertTrue(has_role(user, 'personal', 'gerente'))
+            self.assertFalse(has_role(user, 'gerente'))
+            self.assertEqual(user_roles(user), {'personal'})
+
+    def test_groups_add_and_remove_from_the_user(self):
+        self._roles()
+        self.user.groups.add(self.gerente)
+        self.assertEqual(self._roles(), {'personal', 'gerente'})
+        self.user.groups.remove(self.personal)
+        self.assertEqual(self._roles(), {'gerente'})
+        self.user.groups.clear()
+        self.assertEqual(self._roles(), set())
+
+    def test_groups_add_and_clear_from_the_group(self):
+        self._roles()
+        self.gerente.user_set.add(self.user)
+        self.assertEqual(self._roles(), {'personal', 'gerente'})
+        self.personal.user_set.remove(self.user)
+        self.assertEqual(self._roles(), {'gerente'})
+        self.gerente.user_set.clear()
+        self.assertEqual(self._roles(), set())
+
+    def test_group_rename_and_delete(self):
+        self._roles()
+        self.personal.name = 'personal-centro'
+        self.personal.save()
+        self.assertEqual(self._roles(), {'personal-centro'})
+        self.personal.delete()
+        self.assertEqual(self._roles(), set())
+
+    def test_same_instance_sees_its_own_group_changes(self):
+        self.assertEqual(user_roles(self.user), {'personal'})
+        self.user.groups.add(self.gerente)
+        self.assertTrue(has_role(self.user, 'gerente'))
+
+
+GRAPH_SETTINGS = {
+    'client_id': 'test-client',
+    'client_secret': 'test-secret',
+    'tenant_id': 'test-tenant',
+    'email_user': 'buzon@benchmark.invalid',
+}
+
+
+class _GraphStub(BaseHTTPRequestHandler):
+    """
+    Imita sendMail y $batch de Graph. `server.respond(subject, token)`
+    decide el estado y los encabezados de cada mensaje.
+    """
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, *args):
+        pass
+
+    def _reply(self, status, body=b'', headers=None):
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _deliver(self, payload, token):
+        server = self.server
+        subject = payload['message']['subject']
+        with server.lock:
+            status, headers = server.respond(subject, token)
+            if status == 202:
+                server.delivered.append(subject)
+        return status, headers
+
+    def do_POST(self):
+        server = self.server
+        body = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+        token = self.headers['Authorization'].removeprefix('Bearer ')
+        if self.path.endswith('/$batch'):
+            with server.lock:
+                server.requests.append(len(body['requests']))
+            responses = []
+            for item in body['requests']:
+                status, headers = self._deliver(item['body'], token)
+                responses.append({'id': item['id'], 'status': status, 'headers': headers})
+            self._reply(200, json.dumps({'responses': responses}).encode(), {'Content-Type': 'application/json'})
+        else:
+            with server.lock:
+                server.requests.append(1)
+            status, headers = self._deliver(body, token)
+            self._reply(status, headers=headers)
+
+
+class GraphEmailBackendTests(TestCase):
+    def setUp(self):
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), _GraphStub)
+        self.server.lock = threading.Lock()
+        self.server.requests, self.server.delivered = [], []
+        self.server.respond = lambda subject, token: (202, {})
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+
+        settings_override = override_settings(
+            MS_GRAPH_URL=f"http://127.0.0.1:{self.server.server_port}/v1.0", **GRAPH_SETTINGS,
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        # msal necesita red para pedir el token; se siembra uno en la caché del proceso
+        self.token_key = (GRAPH_SETTINGS['tenant_id'], GRAPH_SETTINGS['client_id'])
+        email_backends._tokens[self.token_key] = ('valido', time.time() + 3600)
+        self.addCleanup(email_backends._tokens.pop, self.token_key, None)
+
+    def _send(self, count):
+        messages = [
+            mail.EmailMessage(f"mensaje {i}", 'Cuerpo', to=[f"destino{i}@benchmark.invalid"])
+            for i in range(count)
+        ]
+        sent = MicrosoftGraphEmailBackend().send_messages(messages)
+        return sent, sorted(message.subject for message in messages)
+
+    def test_messages_are_split_in_batches(self):
+        sent, subjects = self._send(45)
+        self.assertEqual(sent, 45)
+        self.assertEqual(sorted(self.server.requests), [5, 20, 20])
+        self.assertEqual(sorted(self.server.delivered), subjects)
+
+    def test_batches_are_split_by_size(self):
+        with mock.patch.object(email_backends, 'GRAPH_BATCH_MAX_BYTES', 1000):
+            sent, subjects = self._send(10)
+        self.assertEqual(sent, 10)
+        self.assertTrue(all(size < 10 for size in self.server.requests))
+        self.assertEqual(sorted(self.server.delivered), subjects)
+
+    @mock.patch.object(email_backends.time, 'sleep')
+    def test_throttled_messages_wait_for_retry_after(self, sleep):
+        throttled = set()
+
+        def respond(subject, token):
+            # Cada mensaje impar se rechaza una vez
+            if int(subject.split()[1]) % 2 and subject not in throttled:
+                throttled.add(subject)
+                return 429, {'Retry-After': '3'}
+            return 202, {}
+
+        self.server.respond = respond
+        sent, subjects = self._send(20)
+        self.assertEqual(sent, 20)
+        self.assertEqual(self.server.requests, [20, 10])
+        sleep.assert_called_once_with(3.0)
+        # Cada mensaje se entrega exactamente una vez
+        self.assertEqual(sorted(self.server.delivered), subjects)
+
+    @mock.patch.object(email_backends.time, 'sleep')
+    @mock.patch.object(email_backends.msal, 'ConfidentialClientApplication')
+    def test_rejected_token_is_refreshed(self, client_application, sleep):
+        client_application.return_value.acquire_token_for_client.return_value = {
+            'access_token': 'nuevo', 'expires_in': 3600,
+        }
+        self.server.respond = lambda subject, token: (202, {}) if token == 'nuevo' else (401, {})
+        sent, subjects = self._send(3)
+        self.assertEqual(sent, 3)
+        client_application.assert_called_once()
+        self.assertEqual(email_backends._tokens[self.token_key][0], 'nuevo')
+        self.assertEqual(sorted(self.server.delivered), subjects)
+        sleep.assert_not_called()
+
+    def _failing_post(self, fails):
+        """_post que lanza ConnectionError mientras `fails(body)` lo indique."""
+        original = MicrosoftGraphEmailBackend._post
+
+        def post(backend, path, body, token):
+            if fails(body):
+                raise requests.ConnectionError('conexión reiniciada')
+            return original(backend, path, body, token)
+        return mock.patch.object(MicrosoftGraphEmailBackend, '_post', post)
+
+    @mock.patch.object(email_backends.time, 'sleep')
+    def test_network_errors_are_retried(self, sleep):
+        failures = iter([True])
+        with self._failing_post(lambda body: '"mensaje 0"' in body and next(failures, False)):
+            sent, subjects = self._send(45)
+        self.assertEqual(sent, 45)
+        self.assertEqual(sorted(self.server.delivered), subjects)
+        sleep.assert_called_once()
+
+    @mock.patch.object(email_backends.time, 'sleep')
+    def test_failures_are_reported_per_message_and_other_batches_continue(self, sleep):
+        self.server.respond = lambda subject, token: (400, {}) if subject == 'mensaje 1' else (202, {})
+        backend = MicrosoftGraphEmailBackend()
+        messages = [
+            mail.EmailMessage(f"mensaje {i}", 'Cuerpo', to=[f"destino{i}@benchmark.invalid"]) for i in range(45)
+        ]
+        with self._failing_post(lambda body: '"mensaje 20"' in body):
+            sent = backend.send_messages(messages)
+        failed = {message.subject: reason for message, reason in backend.failed_messages}
+        self.assertEqual(sent, 24)
+        self.assertEqual(set(failed), {'mensaje 1'} | {f"mensaje {i}" for i in range(20, 40)})
+        self.assertTrue(failed['mensaje 1'].startswith('400'))
+        self.assertIn('ConnectionError', failed['mensaje 20'])
+        self.assertEqual(len(self.server.delivered), 24)
+        self.assertEqual(sleep.call_count, email_backends.GRAPH_MAX_RETRIES)
+
+
+class FailingEmailBackend(BaseEmailBackend):
+    def send_messages(self, email_messages):
+        raise ConnectionError('Graph no disponible')
+
+
+@override_settings(
+    EMAIL_BACKEND='api.email_outbox.OutboxEmailBackend',
+    EMAIL_OUTBOX_BACKEND='django.core.mail.backends.locmem.EmailBackend',
+)
+class EmailOutboxTests(TestCase):
+    def setUp(self):
+        patcher = mock.patch.object(email_outbox, '_dispatch')
+        self.dispatch = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _send(self, subject='Activa tu cuenta', body='Cuerpo', headers=None):
+        message = mail.EmailMultiAlternatives(
+            subject, body, 'no-reply@benchmark.invalid', ['destino@benchmark.invalid'], headers=headers,
+        )
+        message.attach_alternative('<p>Cuerpo</p>', 'text/html')
+        message.attach('datos.txt', b'contenido', 'text/plain')
+        with self.captureOnCommitCallbacks(execute=True):
+            message.send()
+
+    def test_message_is_queued_and_delivered(self):
+        self._send()
+        outbox = EmailOutbox.objects.get()
+        self.assertEqual(outbox.status, EmailOutbox.PENDING)
+        self.assertEqual(mail.outbox, [])
+        self.dispatch.assert_called_once_with(outbox.pk)
+
+        self.assertEqual(email_outbox.deliver(outbox.pk), EmailOutbox.SENT)
+        # Ya enviado: otro worker no lo vuelve a enviar
+        self.assertIsNone(email_outbox.deliver(outbox.pk))
+        self.assertEqual(len(mail.outbox), 1)
+        sent = mail.outbox[0]
+        self.assertEqual((sent.subject, sent.to), ('Activa tu cuenta', ['destino@benchmark.invalid']))
+        self.assertEqual(sent.alternatives[0][1], 'text/html')
+        self.assertEqual(sent.attachments[0][:2], ('datos.txt', 'contenido'))
+
+    def test_duplicates_are_not_queued(self):
+        self._send()
+        self._send()
+        self._send(headers={email_outbox.DEDUP_HEADER: 'activacion'})
+        self._send(body='Otro cuerpo', headers={email_outbox.DEDUP_HEADER: 'activacion'})
+        self.assertEqual(EmailOutbox.objects.count(), 2)
+
+        # Fuera de la ventana o descartado sí se vuelve a encolar
+        EmailOutbox.objects.update(created_at=timezone.now() - timedelta(hours=1))
+        self._send()
+        EmailOutbox.objects.filter(status=EmailOutbox.PENDING).update(status=EmailOutbox.DEAD, dedup_active=False)
+        self._send()
+        self.assertEqual(EmailOutbox.objects.count(), 4)
+
+    def test_dedup_key_is_unique_while_active(self):
+        self._send()
+        first = EmailOutbox.objects.get()
+        # Lo que haría una segunda petición simultánea que no vio el primer renglón
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            EmailOutbox.objects.create(dedup_key=first.dedup_key, payload={})
+        with mock.patch.object(EmailOutbox.objects, 'create', side_effect=IntegrityError):
+            self.assertIsNone(email_outbox.enqueue(mail.EmailMessage('Otro', 'Cuerpo', to=['a@benchmark.invalid'])))
+
+    @override_settings(EMAIL_OUTBOX_BACKEND='api.tests.FailingEmailBackend', EMAIL_OUTBOX_MAX_ATTEMPTS=1)
+    def test_dead_email_releases_its_key(self):
+        self._send()
+        self.assertEqual(email_outbox.deliver(EmailOutbox.objects.get().pk), EmailOutbox.DEAD)
+        self._send()
+        self.assertEqual(EmailOutbox.objects.filter(status=EmailOutbox.PENDING).count(), 1)
+
+    def test_prune_keeps_recent_and_unsent_emails(self):
+        for subject in ('Viejo enviado', 'Viejo descartado', 'Viejo pendiente', 'Reciente'):
+            self._send(subject=subject)
+        old = timezone.now() - timedelta(days=email_outbox.DEFAULT_RETENTION_DAYS + 1)
+        EmailOutbox.objects.filter(subject='Viejo enviado').update(status=EmailOutbox.SENT, updated_at=old)
+        EmailOutbox.objects.filter(subject='Viejo descartado').update(status=EmailOutbox.DEAD, updated_at=old)
+        EmailOutbox.objects.filter(subject='Viejo pendiente').update(updated_at=old)
+        EmailOutbox.objects.filter(subject='Reciente').update(status=EmailOutbox.SENT)
+        self.assertEqual(email_outbox.prune_email_outbox(chunk_size=1), 2)
+        self.assertEqual(
+            sorted(EmailOutbox.objects.values_list('subject', flat=True)), ['Reciente', 'Viejo pendiente'],
+        )
+
+    @override_settings(EMAIL_OUTBOX_BACKEND='api.tests.FailingEmailBackend', EMAIL_OUTBOX_MAX_ATTEMPTS=2)
+    def test_failures_are_retried_until_dead(self):
+        self._send()
+        outbox = EmailOutbox.objects.get()
+        self.assertEqual(email_outbox.deliver(outbox.pk), EmailOutbox.PENDING)
+        outbox.refresh_from_db()
+        self.assertEqual(outbox.attempts, 1)
+        self.assertIn('Graph no disponible', outbox.last_error)
+        self.assertGreater(outbox.next_attempt_at, timezone.now())
+        # Todavía no le toca
+        self.assertEqual(email_outbox.flush_email_outbox(), {})
+
+        EmailOutbox.objects.update(next_attempt_at=timezone.now())
+        self.assertEqual(email_outbox.flush_email_outbox(), {EmailOutbox.DEAD: 1})
+        outbox.refresh_from_db()
+        self.assertEqual((outbox.status, outbox.attempts), (EmailOutbox.DEAD, 2))
+
+    def test_flush_recovers_emails_of_a_dead_worker(self):
+        self._send()
+        EmailOutbox.objects.update(
+            status=EmailOutbox.SENDING,
+            updated_at=timezone.now() - timedelta(seconds=email_outbox.SENDING_TIMEOUT + 1),
+        )
+        self.assertEqual(email_outbox.flush_email_outbox(), {EmailOutbox.SENT: 1})
+        self.assertEqual(len(mail.outbox), 1)
+
+    def test_admin_retry(self):
+        self._send()
+        self._send(subject='Enviado')
+        dead, sent = EmailOutbox.objects.order_by('id')
+        EmailOutbox.objects.filter(pk=dead.pk).update(status=EmailOutbox.DEAD, attempts=6)
+        EmailOutbox.objects.filter(pk=sent.pk).update(status=EmailOutbox.SENT)
+        self.dispatch.reset_mock()
+
+        admin = User.objects.create_superuser(email='admin@benchmark.invalid', password='x')
+        self.client.force_login(admin)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post('/admin/api/emailoutbox/', {
+                'action': 'retry_emails', '_selected_action': [dead.pk, sent.pk],
+            })
+        self.assertEqual(response.status_code, 302)
+        dead.refresh_from_db()
+        self.assertEqual((dead.status, dead.attempts), (EmailOutbox.PENDING, 0))
+        self.assertEqual(EmailOutbox.objects.get(pk=sent.pk).status, EmailOutbox.SENT)
+        self.dispatch.assert_called_once_with(dead.pk)
+        self.assertEqual(email_outbox.deliver(dead.pk), EmailOutbox.SENT)
+
+
+class AzureUploadStorageTests(TestCase):
+    """Las SAS de escritura nunca apuntan al nombre final del archivo."""
+
+    def setUp(self):
+        user = User.objects.create_user(email='subidas@benchmark.invalid', password='x')
+        self.session = UploadSession.objects.create(
+            user=user, target='forum_topic_file', target_id='1', filename='informe.pdf', content_type='application/pdf',
+            size=10, chunk_size=4, storage_name='forum_files/1/abc_informe.pdf', expires_at=timezone.now(),
+        )
+        patcher = mock.patch.object(uploads, 'default_storage')
+        self.storage = patcher.start()
+        self.addCleanup(patcher.stop)
+        self.storage._get_valid_path.side_effect = lambda name: name
+        self.storage.url.side_effect = lambda name, expire=None, mode='r': f"https://cuenta/{name}?sp={mode}"
+        self.blobs = {}
+        self.storage.client.get_blob_client.side_effect = lambda name: self.blobs.setdefault(name, mock.Mock())
+
+    def test_blocks_are_staged_and_copied_to_the_final_name(self):
+        storage = uploads.AzureUploadStorage()
+        staging = f"{uploads.STAGING_PREFIX}{self.session.pk.hex}"
+        urls = [storage.chunk_url(self.session, index, None) for index in range(self.session.chunk_count)]
+        self.assertTrue(all(url.startswith(f"https://cuenta/{staging}?sp=cw&comp=block") for url in urls))
+        self.assertFalse(any(self.session.storage_name in url for url in urls))
+
+        self.assertEqual(storage.commit(self.session), self.session.storage_name)
+        committed = self.blobs[staging].commit_block_list.call_args.args[0]
+        self.assertEqual([block.id for block in committed], [uploads.block_id(i) for i in range(3)])
+        copy = self.blobs[self.session.storage_name].upload_blob_from_url
+        copy.assert_called_once()
+        self.assertEqual(copy.call_args.args[0], f"https://cuenta/{staging}?sp=r")
+        self.assertFalse(copy.call_args.kwargs['overwrite'])
+
+        storage.discard(self.session)
+        self.blobs[staging].delete_blob.assert_called_once_with()
+        self.blobs[self.session.storage_name].delete_blob.assert_not_called()
+
+
+class LocalUploadSessionTests(TestCase):
+    """Subida por bloques de punta a punta con FileSystemStorage y URLs firmadas."""
+
+    def setUp(self):
+        media, temp = tempfile.mkdtemp(), tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media, ignore_errors=True)
+        self.addCleanup(shutil.rmtree, temp, ignore_errors=True)
+        overrides = override_settings(MEDIA_ROOT=media, UPLOAD_SESSION_TEMP_DIR=temp, UPLOAD_SESSION_CHUNK_SIZE=4)
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        self.media, self.temp = media, temp
+
+        personal = Group.objects.create(name='personal')
+        self.author = User.objects.create_user(email='autor@benchmark.invalid', password='x')
+        self.author.groups.add(personal)
+        self.topic = ForumTopic.objects.create(title='Tema', description='Descripción', author=self.author)
+        self.client = APIClient()
+        self.client.force_authenticate(self.author)
+
+    def _create(self, target, target_id, filename, size):
+        return self.client.post('/api/uploads/', {
+            'target': target, 'target_id': str(target_id), 'filename': filename, 'size': size,
+        }, format='json')
+
+    def _put(self, chunk, content):
+        return self.client.generic('PUT', chunk['url'], content, content_type='application/octet-stream')
+
+    def _finalize(self, session_id, **data):
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.post(f'/api/uploads/{session_id}/finalize/', data, format='json')
+
+    def _upload(self, target, target_id, filename, content):
+        session = self._create(target, target_id, filename, len(content)).json()
+        for chunk in session['chunks']:
+            start = chunk['index'] * session['chunk_size']
+            self.assertEqual(self._put(chunk, content[start:start + chunk['size']]).status_code, 201)
+        return session['id']
+
+    def test_resume_and_finalize(self):
+        content = b'0123456789'
+        response = self._create('forum_topic_file', self.topic.pk, 'notas.txt', len(content))
+        self.assertEqual(response.status_code, 201)
+        session = response.json()
+        self.assertEqual([chunk['index'] for chunk in session['chunks']], [0, 1, 2])
+        first, second, last = session['chunks']
+        self.assertEqual(self._put(first, content[:4]).status_code, 201)
+        self.assertEqual(self._put(last, content[8:]).status_code, 201)
+
+        # Al reanudar solo se piden los bloques que faltan
+        status = self.client.get(f"/api/uploads/{session['id']}/").json()
+        self.assertEqual(status['received'], [0, 2])
+        self.assertEqual([chunk['index'] for chunk in status['chunks']], [1])
+        response = self._finalize(session['id'])
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['missing_chunks'], ['1'])
+
+        self.assertEqual(self._put(status['chunks'][0], content[4:8]).status_code, 201)
+        response = self._finalize(session['id'])
+        self.assertEqual(response.status_code, 200)
+        forum_file = ForumFile.objects.get(topic=self.topic)
+        with forum_file.file.open('rb') as stored:
+            self.assertEqual(stored.read(), content)
+        self.assertEqual(forum_file.original_name, 'notas.txt')
+        # Los bloques se borran al confirmar
+        self.assertFalse(os.path.exists(os.path.join(self.temp, session['id'].replace('-', ''))))
+        self.assertEqual(self._finalize(session['id']).status_code, 400)
+
+    def test_chunk_url_is_signed_and_sized(self):
+        session = self._create('forum_topic_file', self.topic.pk, 'notas.txt', 10).json()
+        first, second, _ = session['chunks']
+        forged = {'url': first['url'].replace('/chunks/0/', '/chunks/1/')}
+        self.assertEqual(self._put(forged, b'4567').status_code, 403)
+        self.assertEqual(self._put({'url': first['url'].split('?')[0]}, b'0123').status_code, 403)
+        self.assertEqual(self._put(second, b'45').status_code, 400)
+        self.assertEqual(self._put(second, b'456789').status_code, 400)
+        self.assertEqual(self.client.get(f"/api/uploads/{session['id']}/").json()['received'], [])
+
+    def test_target_permissions(self):
+        other = User.objects.create_user(email='otro@benchmark.invalid', password='x')
+        other.groups.add(Group.objects.get(name='personal'))
+        self.client.force_authenticate(other)
+        self.assertEqual(self._create('forum_topic_file', self.topic.pk, 'notas.txt', 10).status_code, 403)
+        self.assertEqual(self._create('post_attachment', 1, 'anuncio.pdf', 10).status_code, 404)
+        self.assertEqual(self._create('desconocido', 1, 'notas.txt', 10).status_code, 400)
+        # La sesión de otro usuario no se puede consultar ni finalizar
+        self.client.force_authenticate(self.author)
+        session_id = self._upload('forum_topic_file', self.topic.pk, 'notas.txt', b'0123456789')
+        self.client.force_authenticate(other)
+        self.assertEqual(self._finalize(session_id).status_code, 404)
+
+    def test_images_are_verified(self):
+        staff = User.objects.create_user(email='staff@benchmark.invalid', password='x', is_staff=True)
+        self.client.force_authenticate(staff)
+        base = BaseCuestionarios.objects.create(nombre='Base')
+        cuestionario = Cuestionario.objects.create(nombre='Cuestionario', base_cuestionario=base)
+        pregunta = Pregunta.objects.create(cuestionario=cuestionario, texto='¿Cuál?', tipo='imagen')
+
+        self.assertEqual(self._create('imagen_opcion', pregunta.pk, 'notas.txt', 10).status_code, 400)
+        session_id = self._upload('imagen_opcion', pregunta.pk, 'falsa.png', b'no es una imagen')
+        response = self._finalize(session_id)
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(ImagenOpcion.objects.exists())
+        self.assertEqual(os.listdir(os.path.join(self.media, 'preguntas_con_imagenes')), [])
+
+        from PIL import Image
+
+        png = io.BytesIO()
+        Image.new('RGB', (2, 2), 'red').save(png, format='PNG')
+        session_id = self._upload('imagen_opcion', pregunta.pk, 'roja.png', png.getvalue())
+        response = self._finalize(session_id, descripcion='Roja')
+        self.assertEqual(response.status_code, 200)
+        imagen = ImagenOpcion.objects.get(pregunta=pregunta)
+        self.assertEqual(imagen.descripcion, 'Roja')
+        with imagen.imagen.open('rb') as stored:
+            self.assertEqual(stored.read(), png.getvalue())
+
+    def test_abort_discards_chunks(self):
+        session_id = self._upload('forum_topic_file', self.topic.pk, 'notas.txt', b'0123456789')
+        self.assertTrue(os.listdir(self.temp))
+        self.assertEqual(self.client.delete(f'/api/uploads/{session_id}/').status_code, 204)
+        self.assertEqual(os.listdir(self.temp), [])
+        self.assertFalse(UploadSession.objects.exists())
+
+
+class ReplacedFilesTests(TestCase):
+    """El archivo anterior se borra al confirmar, nunca antes ni tras un rollback."""
+
+    def setUp(self):
+        media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media, ignore_errors=True)
+        overrides = override_settings(MEDIA_ROOT=media)
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        patcher = mock.patch.object(files, '_dispatch', side_effect=files.delete_stored_files)
+        self.dispatch = patcher.start()
+        self.addCleanup(patcher.stop)
+
+        author = User.objects.create_user(email='anuncios@benchmark.invalid', password='x')
+        self.post = CommunicationPost.objects.create(title='Aviso', message='Mensaje', created_by=author)
+        self.post.attachment.save('anterior.pdf', ContentFile(b'anterior'))
+        self.post = CommunicationPost.objects.get(pk=self.post.pk)
+        self.old_name = self.post.attachment.name
+
+    def _replace(self):
+        self.post.attachment.save('nuevo.pdf', ContentFile(b'nuevo'))
+        return self.post.attachment.name
+
+    def test_old_file_is_deleted_after_commit(self):
+        with self.captureOnCommitCallbacks(execute=False) as callbacks:
+            new_name = self._replace()
+            self.assertTrue(default_storage.exists(self.old_name))
+        for callback in callbacks:
+            callback()
+        self.assertFalse(default_storage.exists(self.old_name))
+        self.assertTrue(default_storage.exists(new_name))
+
+    def test_old_file_is_kept_on_rollback(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            try:
+                with transaction.atomic():
+                    self._replace()
+                    raise RuntimeError
+            except RuntimeError:
+                pass
+        self.dispatch.assert_not_called()
+        self.assertTrue(default_storage.exists(self.old_name))
+        self.assertEqual(CommunicationPost.objects.get(pk=self.post.pk).attachment.name, self.old_name)
+
+    def test_deleted_row_deletes_its_file_after_commit(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.post.delete()
+        self.assertFalse(default_storage.exists(self.old_name))
+
+    def test_replaced_files_only_lists_changed_file_fields(self):
+        self.post.title = 'Otro título'
+        self.assertEqual(files.replaced_files(self.post), [])
+        self.post.attachment = 'communications/otro.pdf'
+        self.assertEqual(files.replaced_files(self.post, update_fields=['title']), [])
+        self.assertEqual(files.replaced_files(self.post, update_fields=['attachment']), [self.old_name])
+        self.assertEqual(files.replaced_files(self.post), [self.old_name])
+        self.post.attachment = None
+        self.assertEqual(files.replaced_files(self.post), [self.old_name])
+        # Un renglón nuevo no reemplaza nada
+        self.assertEqual(files.replaced_files(CommunicationPost(title='Nuevo', attachment='x.pdf')), [])
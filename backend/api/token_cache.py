@@ -0,0 +1,108 @@
+"""
+Caché compartida de tokens validados.
+
+MultipleAuthAuthentication (HTTP) y JWTAuthMiddleware (websockets) validan
+el mismo tipo de tokens: los de ADFS/Entra ID y los JWT propios de
+simplejwt. Una vez validado un token se guarda en la caché, con la llave del
+hash del token y hasta su `exp`, el ID del usuario y los claims
+decodificados. Las peticiones siguientes con el mismo token solo cargan al
+usuario por llave primaria, sin volver a verificar la firma ni pasar por el
+backend de ADFS (que además actualiza al usuario en cada autenticación).
+
+El tipo de token se decide con el encabezado y el emisor sin verificar
+(`token_kind`), así que un JWT propio nunca llega a la validación de ADFS.
+La entrada guarda el tipo y se compara en cada lectura. De los JWT propios
+solo se guardan los de acceso: un refresh token no debe servir como token
+de acceso aunque lo haya validado el websocket.
+"""
+import hashlib
+import logging
+import time
+
+import jwt
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+
+logger = logging.getLogger(__name__)
+
+TOKEN_KEY = 'auth:token:{}'
+
+ADFS = 'adfs'
+JWT = 'jwt'
+ADFS_ISSUERS = ('https://login.microsoftonline.com/', 'https://sts.windows.net/')
+
+
+def _key(token):
+    if isinstance(token, bytes):
+        token = token.decode('utf-8', 'ignore')
+    return TOKEN_KEY.format(hashlib.sha256(token.encode()).hexdigest())
+
+
+def token_kind(token):
+    """
+    ADFS o JWT según el algoritmo del encabezado y el emisor, sin verificar
+    la firma. Los tokens que no se pueden decodificar se tratan como JWT,
+    cuya validación falla sin consultar a ADFS.
+    """
+    try:
+        header = jwt.get_unverified_header(token)
+        claims = jwt.decode(token, options={"verify_signature": False})
+    except jwt.PyJWTError:
+        return JWT
+    if str(claims.get('iss', '')).startswith(ADFS_ISSUERS):
+        return ADFS
+    if 'user_id' in claims or str(header.get('alg', '')).startswith('HS'):
+        return JWT
+    return ADFS
+
+
+def _cacheable(kind, claims):
+    """Los JWT propios solo se guardan si son de acceso (no refresh)."""
+    return kind == ADFS or claims.get(jwt_settings.TOKEN_TYPE_CLAIM) == 'access'
+
+
+def remember(token, user, claims, kind):
+    """Guarda el usuario y los claims de un token ya validado hasta su expiración."""
+    ttl = int(claims.get('exp', 0) - time.time())
+    if ttl <= 0 or not _cacheable(kind, claims):
+        return
+    try:
+        cache.set(_key(token), {'user_id': str(user.pk), 'kind': kind, 'claims': claims}, ttl)
+    except Exception as e:
+        logger.warning(f"No se pudo guardar el token validado en caché: {e}")
+
+
+def cached_identity(token):
+    """{'user_id', 'claims'} de un token validado antes, o None."""
+    try:
+        identity = cache.get(_key(token))
+    except Exception as e:
+        logger.warning(f"No se pudo leer la caché de tokens: {e}")
+        return None
+    if identity is None or identity['claims'].get('exp', 0) <= time.time():
+        return None
+    kind = identity.get('kind')
+    if kind != token_kind(token) or not _cacheable(kind, identity['claims']):
+        return None
+    return identity
+
+
+def cached_user(token):
+    """Usuario activo de un token validado antes, o None para validarlo de nuevo."""
+    identity = cached_identity(token)
+    if identity is None:
+        return None
+    User = get_user_model()
+    try:
+        user = User.objects.get(pk=identity['user_id'])
+    except User.DoesNotExist:
+        user = None
+    if user is None or not user.is_active:
+        forget(token)
+        return None
+    return user
+
+
+def forget(token):
+    cache.delete(_key(token))
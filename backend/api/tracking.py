@@ -0,0 +1,80 @@
+"""
+Seguimiento de cambios de campos sin consultas.
+
+`FieldTrackerMixin` guarda los valores de `tracked_fields` cuando la
+instancia se carga de la base de datos (`from_db`) y después de cada save,
+así que las señales pueden saber qué cambió comparando contra esa copia en
+lugar de volver a leer el renglón.
+
+De los campos de archivo (FileField/ImageField) se guarda el nombre en el
+storage, así que reemplazar o quitar el archivo cuenta como cambio
+(api/files.py lo usa para borrar el archivo anterior).
+"""
+from django.core.files import File
+from django.db.models import DEFERRED
+
+
+def _value(value):
+    # Un FieldFile es mutable (el save del campo le cambia el nombre), se
+    # compara por nombre
+    if isinstance(value, File):
+        return value.name or None
+    return value
+
+
+class FieldTrackerMixin:
+    # attname de los campos a seguir (p. ej. 'center_id' para una FK)
+    tracked_fields = ()
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._snapshot_tracked_fields()
+        return instance
+
+    def _snapshot_tracked_fields(self, fields=None):
+        # Los campos diferidos (no cargados) no se guardan y no cuentan como cambio
+        snapshot = getattr(self, '_tracked_values', None) or {}
+        for name in self.tracked_fields:
+            if fields is not None and not self._field_in(name, fields):
+                continue
+            value = self.__dict__.get(name, DEFERRED)
+            if value is DEFERRED:
+                snapshot.pop(name, None)
+            else:
+                snapshot[name] = _value(value)
+        self._tracked_values = snapshot
+
+    @staticmethod
+    def _field_in(attname, fields):
+        return attname in fields or attname.removesuffix('_id') in fields
+
+    def tracked_changes(self, update_fields=None):
+        """
+        {campo: (anterior, nuevo)} de los campos seguidos que cambiaron desde
+        que se cargó o guardó la instancia. Con `update_fields` solo cuentan
+        los campos que se van a guardar. Una instancia nueva no tiene cambios.
+        """
+        snapshot = getattr(self, '_tracked_values', None)
+        if snapshot is None or self._state.adding:
+            return {}
+        changes = {}
+        for name, old in snapshot.items():
+            if update_fields is not None and not self._field_in(name, update_fields):
+                continue
+            new = self.__dict__.get(name, DEFERRED)
+            if new is DEFERRED:
+                continue
+            new = _value(new)
+            if new != old:
+                changes[name] = (old, new)
+        return changes
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        update_fields = kwargs.get('update_fields')
+        self._snapshot_tracked_fields(None if update_fields is None else set(update_fields))
+
+    def refresh_from_db(self, using=None, fields=None, **kwargs):
+        super().refresh_from_db(using=using, fields=fields, **kwargs)
+        self._snapshot_tracked_fields(None if fields is None else set(fields))
@@ -0,0 +1,160 @@
+"""
+Destinos de las subidas directas al storage (api/uploads.py).
+
+Cada destino dice a qué objeto se asigna el archivo (`target_id`), quién
+puede subirlo, en qué carpeta del storage queda y cómo se asigna al
+finalizar. Los permisos son los mismos de las vistas que reciben el archivo
+por multipart.
+"""
+from django.core.exceptions import ValidationError as DjangoValidationError
+from rest_framework.exceptions import NotFound, PermissionDenied
+
+from api.permissions import IsInSameCenter
+from api.roles import has_role
+from candidatos.models import UserProfile
+from communications.models import CommunicationPost, ForumFile, ForumReply, ForumTopic
+from cuestionarios.models import ImagenOpcion, Pregunta
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.gif', '.webp')
+
+
+class UploadTarget:
+    model = None
+    field_name = None
+    image = False
+
+    @property
+    def field(self):
+        return self.model._meta.get_field(self.field_name)
+
+    def get_object(self, target_id):
+        raise NotImplementedError
+
+    def check_permission(self, request, obj):
+        raise NotImplementedError
+
+    def prefix(self, obj):
+        raise NotImplementedError
+
+    def attach(self, session, obj, data):
+        """Asigna el archivo ya guardado (`session.storage_name`) y devuelve la instancia con el campo."""
+        raise NotImplementedError
+
+    def _get(self, queryset, **lookup):
+        try:
+            return queryset.get(**lookup)
+        except (queryset.model.DoesNotExist, ValueError, DjangoValidationError):
+            raise NotFound(f"{queryset.model._meta.verbose_name} no encontrado")
+
+
+def _is_personal(user):
+    return user.is_staff or has_role(user, 'gerente', 'personal')
+
+
+class ForumTopicFileTarget(UploadTarget):
+    model = ForumFile
+    field_name = 'file'
+
+    def get_object(self, target_id):
+        return self._get(ForumTopic.objects.all(), pk=target_id)
+
+    def check_permission(self, request, obj):
+        if not _is_personal(request.user) or (obj.author_id != request.user.pk and not request.user.is_staff):
+            raise PermissionDenied('Solo el autor puede adjuntar archivos al tema')
+
+    def prefix(self, obj):
+        return f'forum_files/{obj.pk}/'
+
+    def attach(self, session, obj, data):
+        return ForumFile.objects.create(topic=obj, file=session.storage_name, original_name=session.filename)
+
+
+class ForumReplyFileTarget(UploadTarget):
+    model = ForumFile
+    field_name = 'file'
+
+    def get_object(self, target_id):
+        return self._get(ForumReply.objects.all(), pk=target_id)
+
+    def check_permission(self, request, obj):
+        if not _is_personal(request.user) or (obj.author_id != request.user.pk and not request.user.is_staff):
+            raise PermissionDenied('Solo el autor puede adjuntar archivos a la respuesta')
+
+    def prefix(self, obj):
+        return f'forum_files/{obj.topic_id}/'
+
+    def attach(self, session, obj, data):
+        return ForumFile.objects.create(reply=obj, file=session.storage_name, original_name=session.filename)
+
+
+class PostAttachmentTarget(UploadTarget):
+    model = CommunicationPost
+    field_name = 'attachment'
+
+    def get_object(self, target_id):
+        return self._get(CommunicationPost.objects.all(), pk=target_id)
+
+    def check_permission(self, request, obj):
+        if not request.user.is_staff:
+            raise PermissionDenied('Solo los administradores pueden adjuntar archivos a los anuncios')
+
+    def prefix(self, obj):
+        return 'communications/'
+
+    def attach(self, session, obj, data):
+        # El adjunto anterior se borra al confirmar (api/files.py)
+        obj.attachment = session.storage_name
+        obj.save(update_fields=['attachment'])
+        return obj
+
+
+class ProfilePhotoTarget(UploadTarget):
+    model = UserProfile
+    field_name = 'photo'
+    image = True
+
+    def get_object(self, target_id):
+        return self._get(UserProfile.objects.select_related('user__center'), user_id=target_id)
+
+    def check_permission(self, request, obj):
+        # Mismos permisos que CandidatePhotoUploadAPIView
+        if not _is_personal(request.user) or not IsInSameCenter().has_object_permission(request, None, obj):
+            raise PermissionDenied('No puede cambiar la foto de este candidato')
+
+    def prefix(self, obj):
+        return 'user_photos/'
+
+    def attach(self, session, obj, data):
+        obj.photo = session.storage_name
+        obj.save(update_fields=['photo'])
+        return obj
+
+
+class ImagenOpcionTarget(UploadTarget):
+    model = ImagenOpcion
+    field_name = 'imagen'
+    image = True
+
+    def get_object(self, target_id):
+        return self._get(Pregunta.objects.all(), pk=target_id)
+
+    def check_permission(self, request, obj):
+        if not request.user.is_staff:
+            raise PermissionDenied('Solo los administradores pueden subir imágenes de preguntas')
+
+    def prefix(self, obj):
+        return 'preguntas_con_imagenes/'
+
+    def attach(self, session, obj, data):
+        return ImagenOpcion.objects.create(
+            pregunta=obj, imagen=session.storage_name, descripcion=str(data.get('descripcion', ''))[:255],
+        )
+
+
+TARGETS = {
+    'forum_topic_file': ForumTopicFileTarget(),
+    'forum_reply_file': ForumReplyFileTarget(),
+    'post_attachment': PostAttachmentTarget(),
+    'profile_photo': ProfilePhotoTarget(),
+    'imagen_opcion': ImagenOpcionTarget(),
+}
@@ -0,0 +1,340 @@
+"""
+Subidas directas al storage, por bloques y reanudables.
+
+Los archivos grandes (adjuntos del foro y de anuncios, fotos de perfil,
+imágenes de preguntas) ya no pasan por los workers de Django:
+
+1. `create_session` valida el destino (api/upload_targets.py), reserva el
+   nombre del archivo y crea un UploadSession.
+2. El cliente sube cada bloque de `chunk_size` bytes con un PUT a la URL
+   firmada de ese bloque. Las URLs duran UPLOAD_URL_TTL segundos;
+   `session_status` devuelve los bloques que ya llegaron y URLs nuevas para
+   los que faltan, así que una subida interrumpida se reanuda desde ahí.
+3. `finalize_session` une los bloques en el storage y asigna el archivo al
+   objeto destino.
+
+Con Azure Storage (producción) las URLs son SAS con permiso de escritura de
+un blob de preparación propio de la sesión (`upload_sessions/<id>`), nunca
+del nombre final: cada bloque es un Put Block directo a Azure y al finalizar
+se confirma la lista de bloques (Put Block List) y el blob se copia dentro
+de Azure al nombre final, sin que el contenido pase por el servidor. Una SAS
+que siga vigente después de finalizar no puede cambiar el archivo ya
+verificado y asignado. Los bloques sin confirmar los descarta Azure a los 7
+días.
+
+Con otro storage (FileSystemStorage en desarrollo) las URLs apuntan a
+`UploadChunkView`, firmadas con django.core.signing; los bloques se guardan
+en UPLOAD_SESSION_TEMP_DIR y se unen en el storage al finalizar.
+"""
+import base64
+import logging
+import os
+import shutil
+import tempfile
+import uuid
+from datetime import timedelta
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core import signing
+from django.core.exceptions import SuspiciousFileOperation
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.text import get_valid_filename
+from rest_framework.exceptions import ValidationError
+
+from api.models import UploadSession
+from api.upload_targets import IMAGE_EXTENSIONS, TARGETS
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CHUNK_SIZE = 4 * 1024 * 1024
+DEFAULT_MAX_SIZE = 200 * 1024 * 1024
+DEFAULT_MAX_IMAGE_SIZE = 10 * 1024 * 1024
+# Duración de las URLs de escritura y de la sesión completa
+DEFAULT_URL_TTL = 15 * 60
+DEFAULT_SESSION_LIFETIME = 24 * 60 * 60
+SIGNING_SALT = 'api.uploads.chunk'
+COPY_BUFFER_SIZE = 1024 * 1024
+PRUNE_CHUNK_SIZE = 500
+STAGING_PREFIX = 'upload_sessions/'
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def _using_azure():
+    return (
+        hasattr(settings, 'STORAGES')
+        and settings.STORAGES.get('default', {}).get('BACKEND') == 'storages.backends.azure_storage.AzureStorage'
+    )
+
+
+def block_id(index):
+    """ID de bloque de Azure: todos deben tener el mismo largo dentro de un blob."""
+    return base64.b64encode(f"{index:06d}".encode()).decode()
+
+
+class AzureUploadStorage:
+    """Bloques directo a un blob de preparación con URLs SAS; el servidor solo confirma y copia."""
+
+    def _staging_name(self, session):
+        return f"{STAGING_PREFIX}{session.pk.hex}"
+
+    def _blob(self, name):
+        # El storage normaliza el nombre (prefijo `location`) igual que al leerlo
+        return default_storage.client.get_blob_client(default_storage._get_valid_path(name))
+
+    def chunk_url(self, session, index, request):
+        url = default_storage.url(
+            self._staging_name(session), expire=_setting('UPLOAD_URL_TTL', DEFAULT_URL_TTL), mode='cw',
+        )
+        return f"{url}&comp=block&blockid={quote(block_id(index), safe='')}"
+
+    def staged_chunks(self, session):
+        from azure.core.exceptions import ResourceNotFoundError
+
+        try:
+            _, uncommitted = self._blob(self._staging_name(session)).get_block_list('uncommitted')
+        except ResourceNotFoundError:
+            return {}
+        chunks = {}
+        for block in uncommitted:
+            try:
+                chunks[int(base64.b64decode(block.id))] = block.size
+            except ValueError:
+                continue
+        return chunks
+
+    def commit(self, session):
+        from azure.storage.blob import BlobBlock, ContentSettings
+
+        staging_name = self._staging_name(session)
+        content_settings = ContentSettings(content_type=session.content_type or None)
+        self._blob(staging_name).commit_block_list(
+            [BlobBlock(block_id=block_id(index)) for index in range(session.chunk_count)],
+            content_settings=content_settings,
+        )
+        # Put Blob From URL es síncrono: al volver el archivo final ya está completo.
+        # La SAS de lectura del origen solo tiene que durar lo que dura la copia.
+        source_url = default_storage.url(staging_name, expire=_setting('UPLOAD_URL_TTL', DEFAULT_URL_TTL))
+        self._blob(session.storage_name).upload_blob_from_url(
+            source_url, overwrite=False, content_settings=content_settings,
+        )
+        return session.storage_name
+
+    def discard(self, session):
+        from azure.core.exceptions import ResourceNotFoundError
+
+        try:
+            self._blob(self._staging_name(session)).delete_blob()
+        except ResourceNotFoundError:
+            pass
+
+
+class LocalUploadStorage:
+    """Bloques en un directorio temporal, recibidos por UploadChunkView."""
+
+    def _dir(self, session):
+        base = _setting('UPLOAD_SESSION_TEMP_DIR', os.path.join(tempfile.gettempdir(), 'upload_sessions'))
+        return os.path.join(base, session.pk.hex)
+
+    def _path(self, session, index):
+        return os.path.join(self._dir(session), f"{index:06d}")
+
+    def chunk_url(self, session, index, request):
+        token = signing.dumps({'session': session.pk.hex, 'index': index}, salt=SIGNING_SALT)
+        url = reverse('upload-chunk', kwargs={'session_id': session.pk, 'index': index})
+        url = f"{url}?token={token}"
+        return request.build_absolute_uri(url) if request is not None else url
+
+    def write_chunk(self, session, index, stream):
+        """Guarda el bloque; un bloque incompleto no cuenta como recibido."""
+        os.makedirs(self._dir(session), exist_ok=True)
+        path = self._path(session, index)
+        partial = f"{path}.{uuid.uuid4().hex}.part"
+        expected, written = session.chunk_length(index), 0
+        try:
+            with open(partial, 'wb') as out:
+                while written <= expected:
+                    data = stream.read(min(COPY_BUFFER_SIZE, expected + 1 - written))
+                    if not data:
+                        break
+                    out.write(data)
+                    written += len(data)
+            if written != expected:
+                raise ValidationError(f"El bloque {index} debe tener {expected} bytes")
+            os.replace(partial, path)
+        finally:
+            if os.path.exists(partial):
+                os.remove(partial)
+        return written
+
+    def staged_chunks(self, session):
+        directory = self._dir(session)
+        if not os.path.isdir(directory):
+            return {}
+        return {
+            int(name): os.path.getsize(os.path.join(directory, name))
+            for name in os.listdir(directory) if name.isdigit()
+        }
+
+    def commit(self, session):
+        assembled = os.path.join(self._dir(session), 'assembled')
+        with open(assembled, 'wb') as out:
+            for index in range(session.chunk_count):
+                with open(self._path(session, index), 'rb') as chunk:
+                    shutil.copyfileobj(chunk, out, COPY_BUFFER_SIZE)
+        with open(assembled, 'rb') as content:
+            return default_storage.save(session.storage_name, File(content))
+
+    def discard(self, session):
+        shutil.rmtree(self._dir(session), ignore_errors=True)
+
+
+def upload_storage():
+    return AzureUploadStorage() if _using_azure() else LocalUploadStorage()
+
+
+def _storage_name(target, obj, filename):
+    """Nombre único dentro de la carpeta del destino, sin pasar del max_length del campo."""
+    prefix = f"{target.prefix(obj)}{uuid.uuid4().hex[:12]}_"
+    try:
+        name = get_valid_filename(os.path.basename(filename))
+    except SuspiciousFileOperation:
+        name = 'archivo'
+    stem, ext = os.path.splitext(name)
+    room = target.field.max_length - len(prefix) - len(ext)
+    if room < 1:
+        raise ValidationError({'filename': 'El nombre del archivo es demasiado largo'})
+    return f"{prefix}{stem[:room]}{ext}"
+
+
+def create_session(request, target, target_id, filename, size, content_type=''):
+    upload_target = TARGETS.get(target)
+    if upload_target is None:
+        raise ValidationError({'target': f"Destino no válido. Opciones: {', '.join(sorted(TARGETS))}"})
+    obj = upload_target.get_object(target_id)
+    upload_target.check_permission(request, obj)
+
+    max_size = (
+        _setting('UPLOAD_SESSION_MAX_IMAGE_SIZE', DEFAULT_MAX_IMAGE_SIZE) if upload_target.image
+        else _setting('UPLOAD_SESSION_MAX_SIZE', DEFAULT_MAX_SIZE)
+    )
+    if size > max_size:
+        raise ValidationError({'size': f"El archivo no puede pasar de {max_size // (1024 * 1024)} MB"})
+    if upload_target.image and not filename.lower().endswith(IMAGE_EXTENSIONS):
+        raise ValidationError({'filename': 'El archivo debe ser una imagen'})
+
+    return UploadSession.objects.create(
+        user=request.user,
+        target=target,
+        target_id=str(target_id),
+        filename=os.path.basename(filename)[:255],
+        content_type=content_type[:100],
+        size=size,
+        chunk_size=_setting('UPLOAD_SESSION_CHUNK_SIZE', DEFAULT_CHUNK_SIZE),
+        storage_name=_storage_name(upload_target, obj, filename),
+        expires_at=timezone.now() + timedelta(seconds=_setting('UPLOAD_SESSION_LIFETIME', DEFAULT_SESSION_LIFETIME)),
+    )
+
+
+def session_status(session, request=None):
+    """Bloques recibidos y URLs nuevas para los que faltan."""
+    data = {
+        'id': str(session.pk),
+        'target': session.target,
+        'target_id': session.target_id,
+        'filename': session.filename,
+        'size': session.size,
+        'chunk_size': session.chunk_size,
+        'chunk_count': session.chunk_count,
+        'status': session.status,
+        'expires_at': session.expires_at,
+        'received': [],
+        'chunks': [],
+    }
+    if session.status != UploadSession.PENDING:
+        return data
+    storage = upload_storage()
+    staged = storage.staged_chunks(session)
+    data['received'] = sorted(index for index, size in staged.items() if size == session.chunk_length(index))
+    received = set(data['received'])
+    data['chunks'] = [
+        {'index': index, 'size': session.chunk_length(index), 'url': storage.chunk_url(session, index, request)}
+        for index in range(session.chunk_count) if index not in received
+    ]
+    return data
+
+
+def _verify_image(name):
+    from PIL import Image
+
+    try:
+        with default_storage.open(name) as content:
+            Image.open(content).verify()
+    except Exception:
+        raise ValidationError({'filename': 'El archivo debe ser una imagen válida'})
+
+
+def finalize_session(session_id, request, data=None):
+    """
+    Une los bloques en el storage y asigna el archivo al destino. Devuelve la
+    instancia del modelo con el archivo.
+    """
+    with transaction.atomic():
+        # Bloquea la sesión: dos llamadas simultáneas no asignan el archivo dos veces
+        session = UploadSession.objects.select_for_update().get(pk=session_id)
+        if session.status != UploadSession.PENDING:
+            raise ValidationError({'status': 'La subida ya se finalizó'})
+        if session.expires_at <= timezone.now():
+            raise ValidationError({'status': 'La subida expiró'})
+        target = TARGETS[session.target]
+        obj = target.get_object(session.target_id)
+        target.check_permission(request, obj)
+
+        storage = upload_storage()
+        staged = storage.staged_chunks(session)
+        missing = [index for index in range(session.chunk_count) if staged.get(index) != session.chunk_length(index)]
+        if missing:
+            raise ValidationError({'missing_chunks': missing})
+
+        session.storage_name = storage.commit(session)
+        if target.image:
+            try:
+                _verify_image(session.storage_name)
+            except ValidationError:
+                default_storage.delete(session.storage_name)
+                raise
+
+        instance = target.attach(session, obj, data or {})
+        session.status = UploadSession.COMPLETE
+        session.completed_at = timezone.now()
+        session.save(update_fields=['storage_name', 'status', 'completed_at'])
+        transaction.on_commit(lambda: storage.discard(session))
+    return instance
+
+
+def abort_session(session):
+    if session.status == UploadSession.PENDING:
+        upload_storage().discard(session)
+    session.delete()
+
+
+def prune_upload_sessions(chunk_size=PRUNE_CHUNK_SIZE):
+    """Borra las sesiones expiradas y sus bloques sin unir. Devuelve cuántas se borraron."""
+    storage = upload_storage()
+    deleted = 0
+    while True:
+        expired = list(UploadSession.objects.filter(expires_at__lt=timezone.now())[:chunk_size])
+        if not expired:
+            return deleted
+        for session in expired:
+            if session.status == UploadSession.PENDING:
+                storage.discard(session)
+        UploadSession.objects.filter(pk__in=[session.pk for session in expired]).delete()
+        deleted += len(expired)
@@ -1,9 +1,10 @@
 from django.urls import path, include 
-from .views import VerUsuarios, get_current_user, UserViewSet, MediaSASTokenView, health_check
+from .views import VerUsuarios, get_current_user, UserViewSet, MediaSASTokenView, UploadSessionViewSet, health_check, upload_chunk
 from rest_framework.routers import DefaultRouter
 
 router = DefaultRouter()
 router.register(r'users', UserViewSet, basename='user')
+router.register(r'uploads', UploadSessionViewSet, basename='upload-session')
 
 urlpatterns = [
     path('usuarios/', VerUsuarios.as_view(), name='VerUsuarios'),
@@ -11,5 +12,6 @@ urlpatterns = [
     path('current-user/', get_current_user, name='get_current_user'),
     path('media-sas/', MediaSASTokenView.as_view(), name='media_sas_token'),
     path('health/', health_check, name='health_check'),
+    path('uploads/<uuid:session_id>/chunks/<int:index>/', upload_chunk, name='upload-chunk'),
     path('', include(router.urls)),
 ]
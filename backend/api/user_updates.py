@@ -0,0 +1,129 @@
+"""
+Avisos por websocket de cambios en los usuarios (UserUpdateConsumer).
+
+Las señales de api/signals.py encolan al usuario con `queue_user_broadcast`
+y el aviso sale al confirmarse la transacción, una sola vez por usuario
+aunque se haya guardado varias veces o cambiado sus grupos en la misma
+transacción, y con los datos finales. Si la transacción (o el savepoint)
+se revierte no se avisa nada, y lo encolado en ella no se mezcla con la
+siguiente.
+"""
+import logging
+import threading
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.contrib.auth import get_user_model
+from django.db import transaction
+
+logger = logging.getLogger(__name__)
+
+_local = threading.local()
+
+
+def user_updates_group_name(user_id):
+    return f"user_{user_id}_updates"
+
+
+class _PendingBroadcasts:
+    """
+    Usuarios a avisar cuando se confirme un bloque atómico: user_id ->
+    instancia más reciente (None para cargarla al enviar). Cada bloque tiene
+    su propio lote, registrado con un solo on_commit.
+    """
+
+    def __init__(self, key):
+        self.key = key
+        self.users = {}
+
+    def __call__(self):
+        batches = getattr(_local, 'batches', {})
+        if batches.get(self.key) is self:
+            del batches[self.key]
+        users, self.users = self.users, {}
+        missing = [user_id for user_id, instance in users.items() if instance is None]
+        if missing:
+            loaded = {str(pk): user for pk, user in get_user_model().objects.in_bulk(missing).items()}
+            users.update((user_id, loaded.get(str(user_id))) for user_id in missing)
+        for instance in users.values():
+            if instance is not None:
+                send_user_update(instance)
+
+
+def _block_key(connection):
+    """
+    Identifica el bloque atómico abierto: el bloque más externo y sus
+    savepoints. Django no reutiliza los IDs de savepoint de una conexión, así
+    que un lote registrado dentro de un savepoint revertido (cuyo on_commit
+    Django ya descartó) no vuelve a coincidir con ningún bloque abierto.
+    """
+    outermost = connection.atomic_blocks[0] if connection.atomic_blocks else None
+    return outermost, tuple(connection.savepoint_ids)
+
+
+def queue_user_broadcast(user_id, instance=None):
+    """Encola el aviso del usuario para cuando se confirme la transacción."""
+    connection = transaction.get_connection()
+    if not connection.in_atomic_block:
+        # Fuera de una transacción se envía de inmediato; lo encolado en
+        # transacciones anteriores ya se envió o se revirtió
+        _local.batches = {}
+        pending = _PendingBroadcasts(None)
+        pending.users[user_id] = instance
+        pending()
+        return
+
+    key = _block_key(connection)
+    batches = getattr(_local, 'batches', {})
+    if any(other[0] is not key[0] for other in batches):
+        # Otra transacción externa: los lotes que quedaron son de una revertida
+        batches = {}
+    _local.batches = batches
+    pending = batches.get(key)
+    if pending is None:
+        pending = batches[key] = _PendingBroadcasts(key)
+        transaction.on_commit(pending)
+    if instance is not None or user_id not in pending.users:
+        pending.users[user_id] = instance
+
+
+def _serialize(instance):
+    try:
+        from api.serializers import UserSerializer
+        return UserSerializer(instance).data
+    except ImportError:
+        logger.error("UserSerializer not found. Cannot serialize user data for broadcast.")
+        # Fallback to simple data if serializer is crucial and not found
+        return {
+            'id': instance.id,
+            'email': instance.email,
+            'first_name': instance.first_name,
+            'last_name': instance.last_name,
+            'is_active': instance.is_active,
+            'is_staff': instance.is_staff,
+            'groups': [group.name for group in instance.groups.all()],
+        }
+    except Exception as e:
+        logger.error(f"Error serializing user data for broadcast: {e}")
+        return {'id': instance.id, 'error': 'Serialization failed'}
+
+
+def send_user_update(instance):
+    channel_layer = get_channel_layer()
+    if channel_layer is None:
+        logger.warning(
+            "Channel layer is not configured. User update broadcast skipped for user ID %s.",
+            instance.id
+        )
+        return
+
+    try:
+        async_to_sync(channel_layer.group_send)(
+            user_updates_group_name(instance.id),
+            {
+                "type": "send_user_update",
+                "data": _serialize(instance)
+            }
+        )
+    except Exception as e:
+        logger.error(f"Failed to send user update broadcast for user ID {instance.id}: {e}")
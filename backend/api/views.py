@@ -1,9 +1,10 @@
 from rest_framework import viewsets
 from rest_framework.response import Response
-from .serializers import UserSerializer
+from .serializers import UploadSessionCreateSerializer, UserSerializer
 from .models import *
 from rest_framework.permissions import IsAdminUser, IsAuthenticated
 from .permissions import IsInSameCenter, GerentePermission
+from .roles import has_role
 from django.contrib.auth import get_user_model
 from django.contrib.auth.models import Group
 
@@ -22,6 +23,14 @@ from django.views.decorators.csrf import csrf_exempt
 import logging
 import os
 
+from django.core import signing
+from django.utils import timezone
+from rest_framework.exceptions import ValidationError
+
+from . import uploads
+from .upload_targets import TARGETS
+from .utils import get_media_url_with_sas
+
 logger = logging.getLogger(__name__)
 
 User = get_user_model()
@@ -67,7 +76,7 @@ class UserViewSet(viewsets.ModelViewSet):
         user = self.request.user
         if user.is_staff:
             return User.objects.all()
-        elif user.groups.filter(name='gerente').exists():
+        elif has_role(user, 'gerente'):
             try:
                 personal_group = Group.objects.get(name='personal')
                 return User.objects.filter((Q(groups=personal_group) | Q(id=user.id)) & Q(center=user.center)).distinct()
@@ -76,7 +85,7 @@ class UserViewSet(viewsets.ModelViewSet):
         return User.objects.none()
 
     def create(self, request, *args, **kwargs):
-        if not request.user.is_staff and not request.user.groups.filter(name='gerente').exists():
+        if not request.user.is_staff and not has_role(request.user, 'gerente'):
             return Response(status=status.HTTP_403_FORBIDDEN)
 
         is_staff_requested = request.data.get('is_staff', False)
@@ -116,9 +125,9 @@ class UserViewSet(viewsets.ModelViewSet):
     def update(self, request, *args, **kwargs):
         user_to_update = self.get_object()
 
-        if not request.user.is_staff and request.user.groups.filter(name='gerente').exists():
+        if not request.user.is_staff and has_role(request.user, 'gerente'):
             # Gerentes can only update 'personal' users in their center
-            if not user_to_update.groups.filter(name='personal').exists() or getattr(user_to_update, 'center') != getattr(request.user, 'center'):
+            if not has_role(user_to_update, 'personal') or getattr(user_to_update, 'center') != getattr(request.user, 'center'):
                 return Response(status=status.HTTP_403_FORBIDDEN)
             # Gerentes cannot change the is_staff status
             if 'is_staff' in request.data and request.data['is_staff'] != user_to_update.is_staff:
@@ -291,4 +300,75 @@ def health_check(request):
             
     except Exception as e:
         logger.error(f"Health check failed: {e}")
-        return HttpResponse("Service Unavailable", status=503)
\ No newline at end of file
+        return HttpResponse("Service Unavailable", status=503)
+
+class UploadSessionViewSet(viewsets.GenericViewSet):
+    """
+    Subidas directas al storage por bloques (api/uploads.py).
+
+    POST /uploads/ abre la subida y devuelve las URLs de los bloques;
+    GET /uploads/<id>/ devuelve los bloques recibidos y URLs nuevas para
+    reanudar; POST /uploads/<id>/finalize/ asigna el archivo al destino;
+    DELETE /uploads/<id>/ cancela la subida.
+    """
+    permission_classes = [IsAuthenticated]
+    serializer_class = UploadSessionCreateSerializer
+
+    def get_queryset(self):
+        return UploadSession.objects.filter(user=self.request.user)
+
+    def create(self, request):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        session = uploads.create_session(request, **serializer.validated_data)
+        return Response(uploads.session_status(session, request), status=status.HTTP_201_CREATED)
+
+    def retrieve(self, request, pk=None):
+        return Response(uploads.session_status(self.get_object(), request))
+
+    def destroy(self, request, pk=None):
+        uploads.abort_session(self.get_object())
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+    @action(detail=True, methods=['post'])
+    def finalize(self, request, pk=None):
+        session = self.get_object()
+        instance = uploads.finalize_session(session.pk, request, request.data)
+        field_file = getattr(instance, TARGETS[session.target].field_name)
+        return Response({
+            'id': str(session.pk),
+            'status': UploadSession.COMPLETE,
+            'object_id': str(instance.pk),
+            'file_url': get_media_url_with_sas(field_file) or request.build_absolute_uri(field_file.url),
+        })
+
+
+@csrf_exempt
+@require_http_methods(["PUT"])
+def upload_chunk(request, session_id, index):
+    """
+    Recibe un bloque de una subida cuando el storage no es Azure. La URL va
+    firmada (la entrega UploadSessionViewSet), igual que una SAS de Azure,
+    así que no lleva otra autenticación.
+    """
+    try:
+        claims = signing.loads(
+            request.GET.get('token', ''), salt=uploads.SIGNING_SALT,
+            max_age=getattr(settings, 'UPLOAD_URL_TTL', uploads.DEFAULT_URL_TTL),
+        )
+    except signing.BadSignature:
+        return JsonResponse({'error': 'URL de subida no válida o expirada'}, status=403)
+    if claims.get('session') != session_id.hex or claims.get('index') != index:
+        return JsonResponse({'error': 'URL de subida no válida o expirada'}, status=403)
+
+    session = UploadSession.objects.filter(pk=session_id, status=UploadSession.PENDING).first()
+    if session is None or session.expires_at <= timezone.now():
+        return JsonResponse({'error': 'La subida no existe o ya terminó'}, status=404)
+    if not 0 <= index < session.chunk_count:
+        return JsonResponse({'error': 'Bloque fuera de rango'}, status=400)
+
+    try:
+        size = uploads.LocalUploadStorage().write_chunk(session, index, request)
+    except ValidationError as e:
+        return JsonResponse({'error': e.detail[0]}, status=400)
+    return JsonResponse({'index': index, 'size': size}, status=201)
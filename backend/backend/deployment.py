@@ -40,6 +40,7 @@ logger.info("Azure App Service configuration loaded")
 MIDDLEWARE = [
     'middleware.dynamic_host.DynamicHostMiddleware',  # Add this first
     'corsheaders.middleware.CorsMiddleware',
+    'middleware.json_compression.JSONGZipMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
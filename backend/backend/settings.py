@@ -132,6 +132,7 @@ AUTHENTICATION_BACKENDS = [
 
 MIDDLEWARE = [
     'corsheaders.middleware.CorsMiddleware',
+    'middleware.json_compression.JSONGZipMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.locale.LocaleMiddleware',
@@ -204,7 +205,10 @@ DOMAIN = os.getenv('DOMAIN')
 SITE_NAME = os.getenv('SITE_NAME')
 
 # Email
-EMAIL_BACKEND = 'api.email_backends.MicrosoftGraphEmailBackend'
+# Los correos se guardan en la bandeja de salida (api/email_outbox.py) y una
+# tarea de Celery los envía con EMAIL_OUTBOX_BACKEND
+EMAIL_BACKEND = 'api.email_outbox.OutboxEmailBackend'
+EMAIL_OUTBOX_BACKEND = 'api.email_backends.MicrosoftGraphEmailBackend'
 DEFAULT_FROM_EMAIL = email_user
 SERVER_EMAIL = email_user
 
@@ -116,4 +116,10 @@ admin.site.register(Domicile, DomicileAdmin)
 admin.site.register(TAidCandidateHistory, TAidCandidateHistoryAdmin)
 admin.site.register(CHAidCandidateHistory)
 admin.site.register(JobHistory, JobHistoryAdmin)
-admin.site.register(CandidatoHabilidadEvaluada, CandidatoHabilidadEvaluadaAdmin)
\ No newline at end of file
+admin.site.register(CandidatoHabilidadEvaluada, CandidatoHabilidadEvaluadaAdmin)
+
+@admin.register(CandidateCohort)
+class CandidateCohortAdmin(admin.ModelAdmin):
+    list_display = ['token', 'name', 'owner', 'center', 'is_materialized', 'size', 'expires_at']
+    list_filter = ['is_materialized', 'center']
+    search_fields = ('token', 'name', 'owner__email')
@@ -0,0 +1,274 @@
+"""
+Cohortes de candidatos guardadas en el servidor.
+
+En lugar de descargar listas de ids y volver a enviarlas en cada petición, el
+frontend crea una cohorte (una definición de filtros o un conjunto de ids
+materializado) y usa su token en los endpoints de dashboard, estadísticas y
+exportación. Las cohortes expiran después de su TTL y los resultados calculados
+sobre ellas pueden guardarse en caché por token.
+"""
+import hashlib
+import json
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+from rest_framework.exceptions import NotFound, PermissionDenied, ValidationError
+
+from .models import CandidateCohort, CandidateCohortMember, UserProfile
+
+User = get_user_model()
+
+CANDIDATOS_GROUP = 'candidatos'
+
+DEFAULT_TTL = timedelta(hours=12)
+MAX_TTL = timedelta(days=7)
+
+# Tiempo que se guardan en caché los resultados calculados sobre una cohorte
+RESULT_CACHE_SECONDS = 120
+
+# Una cohorte de dashboard se reutiliza mientras le quede al menos este tiempo
+REUSE_MIN_REMAINING = timedelta(hours=1)
+BUCKET_KEY = 'cohort:buckets:{}:{}:{}'
+
+MAX_MATERIALIZED_IDS = 100000
+BULK_BATCH_SIZE = 1000
+
+# Filtros aceptados en una cohorte no materializada
+FILTER_FIELDS = {'stage', 'agency_state', 'cycle_id', 'is_active', 'start_date', 'end_date'}
+
+
+def _parse_ttl(ttl_minutes):
+    if ttl_minutes in (None, ''):
+        return DEFAULT_TTL
+    try:
+        ttl = timedelta(minutes=int(ttl_minutes))
+    except (TypeError, ValueError):
+        raise ValidationError({"ttl_minutes": "Debe ser un número entero de minutos."})
+    if ttl <= timedelta(0):
+        raise ValidationError({"ttl_minutes": "Debe ser mayor que cero."})
+    return min(ttl, MAX_TTL)
+
+
+def clean_filters(filters):
+    """Valida una definición de filtros y devuelve solo las claves conocidas."""
+    if not isinstance(filters, dict):
+        raise ValidationError({"filters": "Debe ser un objeto."})
+
+    unknown = set(filters) - FILTER_FIELDS
+    if unknown:
+        raise ValidationError({"filters": f"Filtros no soportados: {', '.join(sorted(unknown))}"})
+
+    cleaned = {}
+    for key in ('stage', 'agency_state'):
+        value = filters.get(key)
+        if value:
+            cleaned[key] = [value] if isinstance(value, str) else [str(v) for v in value]
+    if filters.get('cycle_id'):
+        cleaned['cycle_id'] = filters['cycle_id']
+    if filters.get('is_active') is not None:
+        cleaned['is_active'] = filters['is_active'] in (True, 'true', 'True', '1', 1)
+    for key in ('start_date', 'end_date'):
+        if filters.get(key):
+            if parse_date(str(filters[key])) is None:
+                raise ValidationError({"filters": f"Fecha inválida en {key}."})
+            cleaned[key] = str(filters[key])
+    return cleaned
+
+
+def filters_q(filters, prefix=''):
+    """
+    Q equivalente a una definición de filtros. `prefix` permite aplicarla
+    desde UserProfile ('') o desde User ('userprofile__').
+    """
+    q = Q()
+    if 'stage' in filters:
+        q &= Q(**{f'{prefix}stage__in': filters['stage']})
+    if 'agency_state' in filters:
+        q &= Q(**{f'{prefix}agency_state__in': filters['agency_state']})
+    if 'cycle_id' in filters:
+        q &= Q(**{f'{prefix}cycle_id': filters['cycle_id']})
+    if 'start_date' in filters:
+        q &= Q(**{f'{prefix}registration_date__gte': parse_date(filters['start_date'])})
+    if 'end_date' in filters:
+        q &= Q(**{f'{prefix}registration_date__lte': parse_date(filters['end_date'])})
+    return q
+
+
+def create_cohort(owner, ids=None, filters=None, name='', ttl_minutes=None, verified=False):
+    """
+    Crea una cohorte a partir de una lista de ids (se materializa) o de una
+    definición de filtros (se evalúa al consultarla). Los candidatos siempre
+    se limitan al centro del usuario, salvo para el staff, o cuando los ids
+    los calculó el servidor (`verified`). Un usuario que no es staff y no
+    tiene centro no puede crear cohortes sin `verified`: sin centro la
+    cohorte abarcaría todos.
+    """
+    if ids is None and filters is None:
+        raise ValidationError({"detail": "Se requiere 'ids' o 'filters'."})
+
+    expires_at = timezone.now() + _parse_ttl(ttl_minutes)
+    center = None if owner.is_staff else owner.center
+    if center is None and not owner.is_staff and not verified:
+        raise PermissionDenied("Su usuario no tiene un centro asignado.")
+
+    if ids is not None:
+        if not isinstance(ids, list):
+            raise ValidationError({"ids": "Debe ser una lista."})
+        if len(ids) > MAX_MATERIALIZED_IDS:
+            raise ValidationError({"ids": f"Máximo {MAX_MATERIALIZED_IDS} candidatos por cohorte."})
+        with transaction.atomic():
+            cohort = CandidateCohort.objects.create(
+                owner=owner, center=center, name=name or '', expires_at=expires_at, is_materialized=True,
+            )
+            cohort.size = _materialize(cohort, ids, verified)
+            cohort.save(update_fields=['size'])
+        return cohort
+
+    return CandidateCohort.objects.create(
+        owner=owner, center=center, name=name or '', expires_at=expires_at,
+        filters=clean_filters(filters),
+    )
+
+
+def _materialize(cohort, ids, verified=False):
+    """
+    Guarda como miembros los ids que son candidatos visibles para la cohorte.
+    Los ids `verified` se guardan tal cual: el servidor ya decidió quién entra
+    (p. ej. los candidatos de otro centro con una canalización pendiente).
+    """
+    unique_ids = list(dict.fromkeys(str(pk) for pk in ids))
+    total = 0
+    for i in range(0, len(unique_ids), BULK_BATCH_SIZE):
+        chunk = unique_ids[i:i + BULK_BATCH_SIZE]
+        if verified:
+            valid_ids = chunk
+        else:
+            try:
+                users = User.objects.filter(pk__in=chunk, groups__name=CANDIDATOS_GROUP)
+                if cohort.center_id:
+                    users = users.filter(center_id=cohort.center_id)
+                valid_ids = list(users.values_list('pk', flat=True))
+            except (ValueError, TypeError, DjangoValidationError):
+                raise ValidationError({"ids": "Contiene ids inválidos."})
+        CandidateCohortMember.objects.bulk_create(
+            [CandidateCohortMember(cohort=cohort, user_id=pk) for pk in valid_ids],
+            batch_size=BULK_BATCH_SIZE,
+        )
+        total += len(valid_ids)
+    return total
+
+
+def _bucket_key(owner, name, ids):
+    digest = hashlib.md5(json.dumps(sorted(str(pk) for pk in ids)).encode()).hexdigest()
+    return BUCKET_KEY.format(owner.pk, name, digest)
+
+
+def bucket_cohorts(owner, buckets):
+    """
+    {nombre: token} de cohortes materializadas para listas de ids calculadas
+    por el servidor ({nombre: ids}). Reutiliza la cohorte vigente del mismo
+    usuario con los mismos ids, así que repetir la petición no crea cohortes
+    nuevas mientras los grupos no cambien.
+    """
+    keys = {name: _bucket_key(owner, name, ids) for name, ids in buckets.items()}
+    known = cache.get_many(list(keys.values()))
+    reusable = set(
+        CandidateCohort.objects.filter(
+            token__in=list(known.values()), owner=owner,
+            expires_at__gt=timezone.now() + REUSE_MIN_REMAINING,
+        ).values_list('token', flat=True)
+    ) if known else set()
+
+    tokens = {}
+    for name, ids in buckets.items():
+        token = known.get(keys[name])
+        if token not in reusable:
+            token = create_cohort(owner, ids=ids, name=name, verified=True).token
+            cache.set(keys[name], token, int(DEFAULT_TTL.total_seconds()))
+        tokens[name] = token
+    return tokens
+
+
+def get_cohort(token, user):
+    """
+    Devuelve la cohorte vigente con ese token si el usuario puede usarla:
+    su creador, el personal del mismo centro o el staff.
+    """
+    cohort = CandidateCohort.objects.filter(token=token).first()
+    if cohort is None or cohort.is_expired:
+        raise NotFound("La cohorte no existe o ya expiró.")
+    if not user.is_staff and cohort.owner_id != user.pk and (
+        cohort.center_id is None or cohort.center_id != user.center_id
+    ):
+        raise PermissionDenied("No tiene acceso a esta cohorte.")
+    return cohort
+
+
+def get_request_cohort(request):
+    """Cohorte indicada en la petición (`cohort` en query params o body), o None."""
+    token = request.query_params.get('cohort')
+    if not token and isinstance(request.data, dict):
+        token = request.data.get('cohort')
+    if not token:
+        return None
+    return get_cohort(token, request.user)
+
+
+def cohort_users(cohort):
+    """Queryset de User con los candidatos de la cohorte."""
+    if cohort.is_materialized:
+        return User.objects.filter(cohort_memberships__cohort=cohort)
+
+    users = User.objects.filter(groups__name=CANDIDATOS_GROUP)
+    if cohort.center_id:
+        users = users.filter(center_id=cohort.center_id)
+    if 'is_active' in cohort.filters:
+        users = users.filter(is_active=cohort.filters['is_active'])
+    return users.filter(filters_q(cohort.filters, prefix='userprofile__'))
+
+
+def cohort_profiles(cohort):
+    """Queryset de UserProfile con los candidatos de la cohorte."""
+    if cohort.is_materialized:
+        return UserProfile.objects.filter(user__cohort_memberships__cohort=cohort)
+    return UserProfile.objects.filter(user__in=cohort_users(cohort).values('pk'))
+
+
+def cohort_cache_key(cohort, scope, params=None):
+    """Clave de caché para un resultado calculado sobre una cohorte."""
+    digest = hashlib.md5(json.dumps(params or {}, sort_keys=True, default=str).encode()).hexdigest()
+    return f"cohort:{cohort.token}:{scope}:{digest}"
+
+
+def cached_for_cohort(cohort, scope, params, compute):
+    """
+    Devuelve el resultado guardado en caché para la cohorte o lo calcula con
+    `compute()`. La caché nunca dura más que la cohorte.
+    """
+    key = cohort_cache_key(cohort, scope, params)
+    result = cache.get(key)
+    if result is None:
+        result = compute()
+        timeout = min(RESULT_CACHE_SECONDS, max(int((cohort.expires_at - timezone.now()).total_seconds()), 1))
+        cache.set(key, result, timeout)
+    return result
+
+
+def purge_expired_cohorts(chunk_size=BULK_BATCH_SIZE):
+    """Elimina las cohortes expiradas (y sus miembros) por lotes. Devuelve cuántas borró."""
+    deleted = 0
+    while True:
+        ids = list(
+            CandidateCohort.objects.filter(expires_at__lte=timezone.now()).values_list('pk', flat=True)[:chunk_size]
+        )
+        if not ids:
+            return deleted
+        CandidateCohortMember.objects.filter(cohort_id__in=ids).delete()
+        CandidateCohort.objects.filter(pk__in=ids).delete()
+        deleted += len(ids)
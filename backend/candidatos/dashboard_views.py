@@ -8,8 +8,19 @@ from cuestionarios.models import EstadoCuestionario, BaseCuestionarios
 from rest_framework.permissions import IsAuthenticated
 from django.db.models import Q
 from .serializers import CandidateListSerializer
+from api.fieldsets import requested_fieldset
+from api.conditional import ConditionalGetMixin
+from .views import CANDIDATE_LIST_DEPENDENCIES
 from rest_framework import generics
 from django.contrib.auth import get_user_model
+from .cohorts import (
+    bucket_cohorts,
+    cached_for_cohort,
+    cohort_users,
+    create_cohort,
+    get_cohort,
+    get_request_cohort,
+)
 
 User = get_user_model()
 
@@ -17,6 +28,25 @@ class DashboardStatsView(APIView):
     permission_classes = [IsAuthenticated]
 
     def get(self, request):
+        """
+        Acepta `cohort` para limitar las estadísticas a una cohorte guardada
+        (el resultado se guarda en caché por cohorte) y `user_cohorts=true`
+        para devolver tokens de cohorte en lugar de las listas de ids.
+        """
+        cohort = get_request_cohort(request)
+        if cohort is not None:
+            params = {key: request.GET.get(key) for key in ('start_date', 'end_date', 'cycle_id')}
+            params['center'] = request.user.center_id
+            data = cached_for_cohort(cohort, 'dashboard-stats', params, lambda: self._build_stats(request, cohort))
+        else:
+            data = self._build_stats(request)
+
+        if request.GET.get('user_cohorts') in ('true', '1'):
+            data = dict(data)
+            data['user_cohorts'] = bucket_cohorts(request.user, data.pop('user_pks'))
+        return Response(data)
+
+    def _build_stats(self, request, cohort=None):
         start_date = request.GET.get("start_date")
         end_date = request.GET.get("end_date")
         cycle_id = request.GET.get("cycle_id")
@@ -42,6 +72,12 @@ class DashboardStatsView(APIView):
             (Q(user__center=current_center) | Q(pk__in=users_pending_transfer_to_center_ids)) & Q(stage='Can')
         ).distinct() # Use distinct to avoid duplicates if a user somehow meets both criteria
 
+        if cohort is not None:
+            cohort_ids = cohort_users(cohort).values('pk')
+            users = users.filter(user__in=cohort_ids)
+            inactive_users = inactive_users.filter(user__in=cohort_ids)
+            canalizacion_users = canalizacion_users.filter(user__in=cohort_ids)
+
         date_filtered_users = users  # Initialize with all users
         canalizacion_date_filtered_users = canalizacion_users  # Initialize with all users
 
@@ -285,13 +321,19 @@ class DashboardStatsView(APIView):
             }
         }
 
-        return Response(data)
+        return data
 
-class CandidateListDashboardView(generics.ListAPIView):
+class CandidateListDashboardView(ConditionalGetMixin, generics.ListAPIView):
     serializer_class = CandidateListSerializer
     permission_classes = [IsAuthenticated]
+    conditional_models = CANDIDATE_LIST_DEPENDENCIES
 
     def get_queryset(self):
+        # A saved cohort replaces the posted id list
+        cohort = get_request_cohort(self.request)
+        if cohort is not None:
+            return self._optimize(cohort_users(cohort).filter(groups__name='candidatos'))
+
         # Support both GET (for backward compatibility) and POST (for large requests)
         if self.request.method == 'POST':
             user_ids = self.request.data.get('ids', [])
@@ -299,9 +341,68 @@ class CandidateListDashboardView(generics.ListAPIView):
             user_ids = self.request.query_params.getlist('ids')
         
         if user_ids:
-            return User.objects.filter(id__in=user_ids, groups__name='candidatos')
+            return self._optimize(User.objects.filter(id__in=user_ids, groups__name='candidatos'))
         return User.objects.none()
+
+    def _optimize(self, queryset):
+        fields, omit = requested_fieldset(self.request, allow_unsafe=True)
+        return self.get_serializer_class().optimize_queryset(queryset, fields=fields, omit=omit)
+
+    def get_serializer(self, *args, **kwargs):
+        # POST is only used here to send long id lists, so it also honors ?fields=/?omit=
+        kwargs['fields'], kwargs['omit'] = requested_fieldset(self.request, allow_unsafe=True)
+        return super().get_serializer(*args, **kwargs)
     
     def post(self, request, *args, **kwargs):
         """Handle POST requests for large ID lists"""
-        return self.list(request, *args, **kwargs)
\ No newline at end of file
+        return self.list(request, *args, **kwargs)
+
+
+class CandidateCohortCreateView(APIView):
+    """
+    Crea una cohorte guardada en el servidor.
+    Body: {"ids": [...]} para materializar una lista de candidatos, o
+    {"filters": {"stage": ..., "agency_state": ..., "cycle_id": ..., "is_active": ...,
+    "start_date": ..., "end_date": ...}} para guardar una definición de filtros.
+    Opcionales: "name" y "ttl_minutes".
+    """
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        cohort = create_cohort(
+            request.user,
+            ids=request.data.get('ids'),
+            filters=request.data.get('filters'),
+            name=request.data.get('name', ''),
+            ttl_minutes=request.data.get('ttl_minutes'),
+        )
+        return Response(_cohort_data(cohort), status=201)
+
+
+class CandidateCohortDetailView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, token):
+        cohort = get_cohort(token, request.user)
+        data = _cohort_data(cohort)
+        if not cohort.is_materialized:
+            data['size'] = cohort_users(cohort).count()
+        return Response(data)
+
+    def delete(self, request, token):
+        cohort = get_cohort(token, request.user)
+        if cohort.owner_id != request.user.pk and not request.user.is_staff:
+            return Response({"detail": "Solo quien creó la cohorte puede eliminarla."}, status=403)
+        cohort.delete()
+        return Response(status=204)
+
+
+def _cohort_data(cohort):
+    return {
+        "token": cohort.token,
+        "name": cohort.name,
+        "materialized": cohort.is_materialized,
+        "filters": cohort.filters,
+        "size": cohort.size,
+        "expires_at": cohort.expires_at,
+    }
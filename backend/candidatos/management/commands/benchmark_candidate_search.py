@@ -0,0 +1,133 @@
+import random
+import time
+import uuid
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Group
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Q
+
+from candidatos.models import UserProfile
+from candidatos.search import fold_text, rebuild_search_index, search_candidates
+from centros.models import Center
+
+User = get_user_model()
+
+FIRST_NAMES = ['José', 'María', 'Jesús', 'Ángel', 'Sofía', 'Andrés', 'Inés', 'Raúl', 'Mónica', 'Ramón',
+               'Lucía', 'Martín', 'Verónica', 'Óscar', 'Noemí', 'Joaquín', 'Begoña', 'Iñaki', 'Rocío', 'Germán',
+               'Guadalupe', 'Ximena', 'Fernanda', 'Emiliano', 'Valentina', 'Santiago', 'Regina', 'Leonardo',
+               'Itzel', 'Héctor', 'Citlali', 'Rubén', 'Araceli', 'Efraín', 'Yolanda', 'Tomás']
+LAST_NAMES = ['Pérez', 'Hernández', 'Martínez', 'González', 'Rodríguez', 'López', 'Sánchez', 'Ramírez',
+              'Gutiérrez', 'Jiménez', 'Muñoz', 'Domínguez', 'Vázquez', 'Núñez', 'Ibáñez', 'Peña', 'Ordóñez',
+              'Cervantes', 'Villaseñor', 'Quiñones', 'Zúñiga', 'Olvera', 'Bermúdez', 'Cárdenas', 'Echeverría',
+              'Saldaña', 'Alarcón', 'Barragán', 'Medrano', 'Xochipa', 'Tlapale', 'Acuña', 'Galván', 'Ledesma']
+
+
+class Command(BaseCommand):
+    help = (
+        'Compara el typeahead del índice de búsqueda contra los filtros icontains '
+        'sobre usuarios sintéticos. Todos los datos se revierten al terminar.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=50000)
+        parser.add_argument('--queries', type=int, default=50)
+        parser.add_argument('--seed', type=int, default=7)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+
+        with transaction.atomic():
+            center = Center.objects.create(name=f"Benchmark {uuid.uuid4()}")
+            users = self._create_users(options['users'], center, rng)
+            self.stdout.write(f"Usuarios sintéticos: {len(users)}")
+
+            start = time.perf_counter()
+            rebuild_search_index(users=User.objects.filter(center=center))
+            self.stdout.write(f"Construcción del índice: {time.perf_counter() - start:.2f}s")
+
+            queries = self._sample_queries(users, options['queries'], rng)
+            # Con nombres sintéticos repetidos, cualquier homónimo cuenta como acierto
+            name_by_pk = {user.pk: self._name_key(user) for user in users}
+            candidates = User.objects.filter(groups__name='candidatos', center=center)
+
+            legacy_time, legacy_hits = 0.0, 0
+            index_time, index_hits = 0.0, 0
+            for query, expected in queries:
+                start = time.perf_counter()
+                found = list(
+                    candidates.filter(
+                        Q(first_name__icontains=query) | Q(last_name__icontains=query) |
+                        Q(second_last_name__icontains=query) | Q(email__icontains=query) |
+                        Q(userprofile__curp__icontains=query)
+                    ).values_list('pk', flat=True)[:10]
+                )
+                legacy_time += time.perf_counter() - start
+                legacy_hits += self._is_hit(found, expected, name_by_pk)
+
+                start = time.perf_counter()
+                found = [row['id'] for row in search_candidates(query, center=center, limit=10)]
+                index_time += time.perf_counter() - start
+                index_hits += self._is_hit(found, expected, name_by_pk)
+
+            total = len(queries)
+            self.stdout.write(
+                f"icontains: {legacy_time / total * 1000:.1f} ms/consulta, encontrados {legacy_hits}/{total}"
+            )
+            self.stdout.write(
+                f"índice:    {index_time / total * 1000:.1f} ms/consulta, encontrados {index_hits}/{total}"
+            )
+            transaction.set_rollback(True)
+
+    def _create_users(self, count, center, rng):
+        group, _ = Group.objects.get_or_create(name='candidatos')
+        users = [
+            User(
+                id=uuid.uuid4(),
+                email=f"bench{i}@benchmark.invalid",
+                password='!',
+                first_name=rng.choice(FIRST_NAMES),
+                last_name=rng.choice(LAST_NAMES),
+                second_last_name=rng.choice(LAST_NAMES),
+                center=center,
+            )
+            for i in range(count)
+        ]
+        User.objects.bulk_create(users, batch_size=1000)
+        UserProfile.objects.bulk_create(
+            [UserProfile(user=user, curp=f"BENC{i:06d}HDFRRN0{i % 10}") for i, user in enumerate(users)],
+            batch_size=1000,
+        )
+        User.groups.through.objects.bulk_create(
+            [User.groups.through(customuser_id=user.pk, group_id=group.pk) for user in users],
+            batch_size=1000,
+        )
+        return users
+
+    def _name_key(self, user):
+        return fold_text(f"{user.first_name} {user.last_name} {user.second_last_name}")
+
+    def _is_hit(self, found, expected, name_by_pk):
+        return any(pk == expected or name_by_pk.get(pk) == expected for pk in found)
+
+    def _sample_queries(self, users, count, rng):
+        """Mezcla búsquedas sin acentos, con faltas de ortografía, por correo y por CURP."""
+        queries = []
+        for index in rng.sample(range(len(users)), min(count, len(users))):
+            user = users[index]
+            kind = rng.randrange(4)
+            if kind == 0:
+                query = f"{user.first_name} {user.last_name} {user.second_last_name}".translate(
+                    str.maketrans('áéíóúñÁÉÍÓÚÑ', 'aeiounAEIOUN')
+                )
+                queries.append((query, self._name_key(user)))
+            elif kind == 1:
+                surname = user.last_name
+                query = f"{user.first_name} {surname[:-2]}{surname[-1]}{surname[-2]} {user.second_last_name}"
+                queries.append((query, self._name_key(user)))
+            elif kind == 2:
+                queries.append((user.email.split('@')[0], user.pk))
+            else:
+                queries.append((f"BENC{index:06d}", user.pk))
+        return queries
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+from candidatos.search import rebuild_search_index
+
+
+class Command(BaseCommand):
+    help = 'Reconstruye el índice de búsqueda de candidatos (nombre, CURP y correo sin acentos)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=2000, help='Usuarios procesados por lote')
+
+    def handle(self, *args, **options):
+        self.stdout.write('Reconstruyendo índice de búsqueda de candidatos...')
+        total = rebuild_search_index(chunk_size=options['chunk_size'], stdout=self.stdout)
+        self.stdout.write(self.style.SUCCESS(f'✅ Índice reconstruido: {total} entradas'))
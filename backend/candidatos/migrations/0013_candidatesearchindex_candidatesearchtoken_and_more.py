@@ -0,0 +1,70 @@
+# Generated by Django 5.1.12 on 2026-10-19 14:17
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0002_initial'),
+        ('candidatos', '0012_alter_historicaluserprofile_stage_and_more'),
+        ('centros', '0002_alter_center_location'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CandidateSearchIndex',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='search_index', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('is_candidate', models.BooleanField(default=False)),
+                ('full_name_key', models.CharField(help_text='Nombre(s) y apellidos normalizados', max_length=255)),
+                ('surname_key', models.CharField(help_text='Apellidos y nombre(s) normalizados', max_length=255)),
+                ('curp_key', models.CharField(blank=True, db_index=True, default='', max_length=18)),
+                ('email_key', models.CharField(blank=True, db_index=True, default='', max_length=200)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('center', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='centros.center')),
+            ],
+            options={
+                'verbose_name': 'Candidate Search Index',
+                'verbose_name_plural': 'Candidate Search Index',
+            },
+        ),
+        migrations.CreateModel(
+            name='CandidateSearchToken',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('token', models.CharField(max_length=64)),
+                ('entry', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='tokens', to='candidatos.candidatesearchindex')),
+            ],
+            options={
+                'verbose_name': 'Candidate Search Token',
+            },
+        ),
+        migrations.CreateModel(
+            name='CandidateSearchTrigram',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('trigram', models.CharField(max_length=3)),
+                ('token', models.CharField(max_length=64)),
+            ],
+            options={
+                'verbose_name': 'Candidate Search Trigram',
+                'indexes': [models.Index(fields=['token'], name='candidatos__token_8771ae_idx')],
+                'unique_together': {('trigram', 'token')},
+            },
+        ),
+        migrations.AddIndex(
+            model_name='candidatesearchindex',
+            index=models.Index(fields=['center', 'full_name_key'], name='candidatos__center__76198c_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='candidatesearchindex',
+            index=models.Index(fields=['center', 'surname_key'], name='candidatos__center__63b2a7_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='candidatesearchtoken',
+            index=models.Index(fields=['token', 'entry'], name='candidatos__token_9fcb1c_idx'),
+        ),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 5.1.12 on 2026-10-19 14:22
+
+import candidatos.models
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('candidatos', '0013_candidatesearchindex_candidatesearchtoken_and_more'),
+        ('centros', '0002_alter_center_location'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CandidateCohort',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('token', models.CharField(default=candidatos.models._new_cohort_token, editable=False, max_length=64, unique=True)),
+                ('name', models.CharField(blank=True, default='', max_length=255)),
+                ('filters', models.JSONField(blank=True, default=dict, help_text='Definición de filtros (cohortes no materializadas)')),
+                ('is_materialized', models.BooleanField(default=False)),
+                ('size', models.PositiveIntegerField(default=0, help_text='Número de candidatos al materializar')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('expires_at', models.DateTimeField(db_index=True)),
+                ('center', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='candidate_cohorts', to='centros.center')),
+                ('owner', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='candidate_cohorts', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Candidate Cohort',
+                'verbose_name_plural': 'Candidate Cohorts',
+            },
+        ),
+        migrations.CreateModel(
+            name='CandidateCohortMember',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('cohort', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='members', to='candidatos.candidatecohort')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='cohort_memberships', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Candidate Cohort Member',
+                'unique_together': {('cohort', 'user')},
+            },
+        ),
+    ]
@@ -1,9 +1,12 @@
 from django.db import models
+from api.tracking import FieldTrackerMixin
 from django.core.validators import RegexValidator
 from discapacidad.models import Disability, TechnicalAid, SISHelp, CHItem
 from agencia.models import Job, Habilidad
 from centros.models import Center
 from django.conf import settings
+from django.utils import timezone
+import secrets
 
 from simple_history.models import HistoricalRecords # type: ignore
 
@@ -87,7 +90,10 @@ class Medication(models.Model):
         return f"{self.name} , Dosis: {self.dose} ({self.reason})"
 
 
-class UserProfile(models.Model):
+class UserProfile(FieldTrackerMixin, models.Model):
+    # El archivo anterior se borra al reemplazarlo (api/files.py)
+    tracked_fields = ('photo',)
+
     user = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True)
 
     BLOOD_TYPE_CHOICES = [
@@ -404,4 +410,123 @@ class JobHistoryComment(models.Model):
         ordering = ['created_at'] # Order comments by creation date, oldest first
 
     def __str__(self):
-        return f"Comment on {self.job_history.id} by {self.author.get_full_name() if self.author else 'Unknown'} at {self.created_at.strftime('%Y-%m-%d %H:%M')}"
\ No newline at end of file
+        return f"Comment on {self.job_history.id} by {self.author.get_full_name() if self.author else 'Unknown'} at {self.created_at.strftime('%Y-%m-%d %H:%M')}"
+
+
+class CandidateSearchIndex(models.Model):
+    """
+    Índice desnormalizado para la búsqueda rápida de candidatos.
+    Guarda el nombre, CURP y correo ya normalizados (minúsculas y sin acentos),
+    junto con el centro y si el usuario es candidato, para resolver el typeahead
+    sobre columnas indexadas sin recorrer los joins de CustomUser/UserProfile.
+    Se mantiene desde candidatos/signals.py y se reconstruye con
+    `python manage.py rebuild_candidate_search_index`.
+    """
+    user = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True, related_name='search_index')
+    center = models.ForeignKey(Center, on_delete=models.SET_NULL, null=True, blank=True)
+    is_candidate = models.BooleanField(default=False)
+
+    full_name_key = models.CharField(max_length=255, help_text="Nombre(s) y apellidos normalizados")
+    surname_key = models.CharField(max_length=255, help_text="Apellidos y nombre(s) normalizados")
+    curp_key = models.CharField(max_length=18, blank=True, default='', db_index=True)
+    email_key = models.CharField(max_length=200, blank=True, default='', db_index=True)
+
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = 'Candidate Search Index'
+        verbose_name_plural = 'Candidate Search Index'
+        indexes = [
+            models.Index(fields=['center', 'full_name_key']),
+            models.Index(fields=['center', 'surname_key']),
+        ]
+
+    def __str__(self):
+        return f"{self.full_name_key} ({self.email_key})"
+
+
+class CandidateSearchToken(models.Model):
+    """
+    Palabras normalizadas del nombre de cada entrada del índice de búsqueda.
+    """
+    entry = models.ForeignKey(CandidateSearchIndex, on_delete=models.CASCADE, related_name='tokens')
+    token = models.CharField(max_length=64)
+
+    class Meta:
+        verbose_name = 'Candidate Search Token'
+        indexes = [
+            models.Index(fields=['token', 'entry']),
+        ]
+
+    def __str__(self):
+        return f"{self.token} → {self.entry_id}"
+
+
+class CandidateSearchTrigram(models.Model):
+    """
+    Vocabulario de trigramas: relaciona cada trigrama con las palabras de nombre
+    que lo contienen. Como el vocabulario de nombres es pequeño comparado con el
+    número de candidatos, permite encontrar palabras mal escritas rápidamente.
+    """
+    trigram = models.CharField(max_length=3)
+    token = models.CharField(max_length=64)
+
+    class Meta:
+        verbose_name = 'Candidate Search Trigram'
+        unique_together = ['trigram', 'token']
+        indexes = [
+            models.Index(fields=['token']),
+        ]
+
+    def __str__(self):
+        return f"{self.trigram} → {self.token}"
+
+
+def _new_cohort_token():
+    return secrets.token_urlsafe(24)
+
+
+class CandidateCohort(models.Model):
+    """
+    Cohorte de candidatos guardada en el servidor.
+    Puede ser una definición de filtros (se evalúa en cada consulta) o un
+    conjunto de ids materializado en CandidateCohortMember. El frontend envía
+    el token en lugar de la lista completa de ids. Expira en `expires_at`.
+    """
+    token = models.CharField(max_length=64, unique=True, default=_new_cohort_token, editable=False)
+    owner = models.ForeignKey(User, on_delete=models.CASCADE, related_name='candidate_cohorts')
+    center = models.ForeignKey(Center, on_delete=models.CASCADE, null=True, blank=True, related_name='candidate_cohorts')
+    name = models.CharField(max_length=255, blank=True, default='')
+
+    filters = models.JSONField(default=dict, blank=True, help_text="Definición de filtros (cohortes no materializadas)")
+    is_materialized = models.BooleanField(default=False)
+    size = models.PositiveIntegerField(default=0, help_text="Número de candidatos al materializar")
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField(db_index=True)
+
+    class Meta:
+        verbose_name = 'Candidate Cohort'
+        verbose_name_plural = 'Candidate Cohorts'
+
+    @property
+    def is_expired(self):
+        return self.expires_at <= timezone.now()
+
+    def __str__(self):
+        return f"{self.name or self.token} ({self.owner_id})"
+
+
+class CandidateCohortMember(models.Model):
+    """
+    Candidato que pertenece a una cohorte materializada.
+    """
+    cohort = models.ForeignKey(CandidateCohort, on_delete=models.CASCADE, related_name='members')
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='cohort_memberships')
+
+    class Meta:
+        verbose_name = 'Candidate Cohort Member'
+        unique_together = ['cohort', 'user']
+
+    def __str__(self):
+        return f"{self.cohort_id} → {self.user_id}"
@@ -0,0 +1,335 @@
+"""
+Búsqueda de candidatos insensible a acentos.
+
+El índice (CandidateSearchIndex, CandidateSearchToken y CandidateSearchTrigram)
+guarda nombre, CURP y correo normalizados para resolver el typeahead en dos pasos:
+  1. Coincidencias por prefijo sobre columnas indexadas.
+  2. Si faltan resultados, coincidencias aproximadas: cada palabra buscada se
+     compara por trigramas contra el vocabulario de palabras de nombres y los
+     candidatos se ordenan por la similitud de sus palabras. Sirve para nombres
+     mal escritos ("Jose Peres" → "José Pérez").
+"""
+import re
+import unicodedata
+
+from django.contrib.auth import get_user_model
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Case, Count, F, FloatField, Max, Q, Value, When
+
+from .models import CandidateSearchIndex, CandidateSearchToken, CandidateSearchTrigram
+
+User = get_user_model()
+
+CANDIDATOS_GROUP = 'candidatos'
+
+# Similitud (Jaccard de trigramas) mínima para considerar dos palabras parecidas
+TOKEN_MIN_SIMILARITY = 0.25
+MAX_SIMILAR_TOKENS = 8
+MIN_FUZZY_WORD_LENGTH = 3
+TOKEN_MAX_LENGTH = 64
+
+# Límite de parámetros por consulta en SQL Server (2100)
+IN_CLAUSE_CHUNK = 1000
+
+
+def fold_text(value):
+    """
+    Normaliza un texto para búsqueda: minúsculas, sin acentos ni diéresis
+    (la ñ se vuelve n) y con espacios colapsados.
+    """
+    if not value:
+        return ''
+    decomposed = unicodedata.normalize('NFKD', str(value))
+    stripped = ''.join(c for c in decomposed if not unicodedata.combining(c)).lower()
+    stripped = re.sub(r'[^a-z0-9@._\- ]+', ' ', stripped)
+    return re.sub(r'\s+', ' ', stripped).strip()
+
+
+def name_tokens(value):
+    """Palabras normalizadas de un nombre, sin repetir."""
+    return {word[:TOKEN_MAX_LENGTH] for word in fold_text(value).split(' ') if word}
+
+
+def word_trigrams(word):
+    """Trigramas de una palabra con un espacio de relleno en cada borde."""
+    padded = f" {word} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def build_search_keys(user, profile=None):
+    """Calcula las columnas del índice para un usuario."""
+    if profile is None:
+        profile = getattr(user, 'userprofile', None)
+
+    first_name = fold_text(user.first_name)
+    surnames = fold_text(f"{user.last_name or ''} {user.second_last_name or ''}")
+
+    return {
+        'center_id': user.center_id,
+        'full_name_key': f"{first_name} {surnames}".strip()[:255],
+        'surname_key': f"{surnames} {first_name}".strip()[:255],
+        'curp_key': fold_text(profile.curp if profile else '')[:18],
+        'email_key': fold_text(user.email)[:200],
+    }
+
+
+def refresh_search_entry(user, profile=None):
+    """
+    Crea o actualiza la entrada del índice de un usuario.
+    Solo reescribe las palabras del nombre cuando éste cambió.
+    """
+    keys = build_search_keys(user, profile)
+
+    with transaction.atomic():
+        entry = CandidateSearchIndex.objects.filter(user=user).first()
+        if entry is None:
+            is_candidate = user.groups.filter(name=CANDIDATOS_GROUP).exists()
+            entry = CandidateSearchIndex.objects.create(user=user, is_candidate=is_candidate, **keys)
+            name_changed = True
+        else:
+            if all(getattr(entry, field) == value for field, value in keys.items()):
+                return entry
+            name_changed = entry.full_name_key != keys['full_name_key']
+            for field, value in keys.items():
+                setattr(entry, field, value)
+            entry.save()
+
+        if name_changed:
+            tokens = name_tokens(entry.full_name_key)
+            entry.tokens.all().delete()
+            CandidateSearchToken.objects.bulk_create([
+                CandidateSearchToken(entry=entry, token=token) for token in tokens
+            ])
+            _ensure_vocabulary(tokens)
+    return entry
+
+
+def refresh_candidate_flags(user_ids):
+    """Sincroniza `is_candidate` con la pertenencia al grupo 'candidatos'."""
+    user_ids = list(user_ids)
+    candidate_ids = set(
+        User.objects.filter(pk__in=user_ids, groups__name=CANDIDATOS_GROUP).values_list('pk', flat=True)
+    )
+    CandidateSearchIndex.objects.filter(user_id__in=candidate_ids).update(is_candidate=True)
+    CandidateSearchIndex.objects.filter(user_id__in=user_ids).exclude(
+        user_id__in=candidate_ids
+    ).update(is_candidate=False)
+
+
+def rebuild_search_index(users=None, chunk_size=IN_CLAUSE_CHUNK, stdout=None):
+    """
+    Reconstruye el índice completo (o el de los usuarios indicados) por lotes.
+    Devuelve el número de entradas escritas.
+    """
+    if users is None:
+        users = User.objects.all()
+    users = users.select_related('userprofile').order_by('pk')
+
+    total = 0
+    batch = []
+    for user in users.iterator(chunk_size=chunk_size):
+        batch.append(user)
+        if len(batch) >= chunk_size:
+            total += _write_index_batch(batch)
+            batch = []
+            if stdout:
+                stdout.write(f"  {total} entradas indexadas...")
+    if batch:
+        total += _write_index_batch(batch)
+    return total
+
+
+def _write_index_batch(users):
+    user_ids = [user.pk for user in users]
+    candidate_ids = set(
+        User.objects.filter(pk__in=user_ids, groups__name=CANDIDATOS_GROUP).values_list('pk', flat=True)
+    )
+    entries = [
+        CandidateSearchIndex(user=user, is_candidate=user.pk in candidate_ids, **build_search_keys(user))
+        for user in users
+    ]
+    tokens_by_entry = [(entry, name_tokens(entry.full_name_key)) for entry in entries]
+
+    with transaction.atomic():
+        CandidateSearchIndex.objects.filter(user_id__in=user_ids).delete()
+        CandidateSearchIndex.objects.bulk_create(entries)
+        CandidateSearchToken.objects.bulk_create(
+            [CandidateSearchToken(entry=entry, token=token) for entry, tokens in tokens_by_entry for token in tokens],
+            batch_size=5000,
+        )
+        _ensure_vocabulary(set().union(*(tokens for _, tokens in tokens_by_entry)))
+    return len(entries)
+
+
+def _ensure_vocabulary(tokens):
+    """Registra los trigramas de las palabras que aún no están en el vocabulario."""
+    tokens = list(tokens)
+    for i in range(0, len(tokens), IN_CLAUSE_CHUNK):
+        chunk = tokens[i:i + IN_CLAUSE_CHUNK]
+        known = set(
+            CandidateSearchTrigram.objects.filter(token__in=chunk).values_list('token', flat=True).distinct()
+        )
+        rows = [
+            CandidateSearchTrigram(trigram=trigram, token=token)
+            for token in chunk if token not in known
+            for trigram in word_trigrams(token)
+        ]
+        if not rows:
+            continue
+        if connection.features.supports_ignore_conflicts:
+            CandidateSearchTrigram.objects.bulk_create(rows, batch_size=5000, ignore_conflicts=True)
+            continue
+        # SQL Server no admite ignore_conflicts: si otro proceso registró la
+        # misma palabra entre la consulta y el insert, se crean uno por uno
+        try:
+            with transaction.atomic():
+                CandidateSearchTrigram.objects.bulk_create(rows, batch_size=5000)
+        except IntegrityError:
+            for row in rows:
+                CandidateSearchTrigram.objects.get_or_create(trigram=row.trigram, token=row.token)
+
+
+def _prefix_q(field, prefix):
+    """
+    Filtro por prefijo que puede usar el índice de la columna en cualquier motor:
+    un rango [prefijo, siguiente prefijo) en lugar de LIKE, que SQLite no indexa.
+    """
+    last = prefix[-1]
+    if last.isalnum() and last not in 'z9':
+        upper = prefix[:-1] + chr(ord(last) + 1)
+        return Q(**{f'{field}__gte': prefix, f'{field}__lt': upper})
+    return Q(**{f'{field}__startswith': prefix})
+
+
+def _similar_tokens(word, allow_prefix=False):
+    """
+    Palabras del vocabulario parecidas a `word`, con su similitud (0 a 1).
+    Con `allow_prefix` también cuentan las palabras que empiezan con `word`,
+    para la última palabra que el usuario sigue escribiendo.
+    """
+    trigrams = word_trigrams(word)
+    rows = (
+        CandidateSearchTrigram.objects.filter(trigram__in=trigrams)
+        .values('token')
+        .annotate(shared=Count('id'))
+        .order_by('-shared')[:MAX_SIMILAR_TOKENS * 5]
+    )
+
+    similar = {}
+    for row in rows:
+        token = row['token']
+        union = len(trigrams) + len(word_trigrams(token)) - row['shared']
+        similarity = row['shared'] / union if union else 0
+        if similarity >= TOKEN_MIN_SIMILARITY:
+            similar[token] = round(similarity, 3)
+
+    if allow_prefix:
+        prefixed = (
+            CandidateSearchTrigram.objects.filter(_prefix_q('token', word))
+            .values_list('token', flat=True)
+            .distinct()[:MAX_SIMILAR_TOKENS]
+        )
+        for token in prefixed:
+            similar[token] = 1.0
+
+    # Si la palabra existe tal cual, no se expande a variantes parecidas
+    if similar.get(word) == 1.0:
+        return {token: similarity for token, similarity in similar.items() if similarity == 1.0}
+
+    best = sorted(similar.items(), key=lambda item: item[1], reverse=True)[:MAX_SIMILAR_TOKENS]
+    return dict(best)
+
+
+def _fuzzy_matches(words, center, exclude, limit):
+    """
+    Candidatos cuyas palabras de nombre se parecen a las palabras buscadas.
+    El puntaje es el promedio, por palabra buscada, de la mejor similitud
+    encontrada entre las palabras del candidato.
+    """
+    similar_by_word = [
+        _similar_tokens(word, allow_prefix=(i == len(words) - 1))
+        for i, word in enumerate(words)
+    ]
+    similar_by_word = [similar for similar in similar_by_word if similar]
+    if not similar_by_word:
+        return []
+
+    all_tokens = set().union(*similar_by_word)
+    annotations = {
+        f'w{i}': Max(Case(
+            *[When(token=token, then=Value(similarity)) for token, similarity in similar.items()],
+            default=Value(0.0),
+            output_field=FloatField(),
+        ))
+        for i, similar in enumerate(similar_by_word)
+    }
+
+    postings = CandidateSearchToken.objects.filter(token__in=all_tokens, entry__is_candidate=True)
+    if center is not None:
+        postings = postings.filter(entry__center=center)
+    if exclude:
+        postings = postings.exclude(entry_id__in=exclude)
+
+    rows = list(
+        postings.values('entry_id')
+        .annotate(**annotations)
+        .annotate(score=sum(F(name) for name in annotations) / len(words))
+        .filter(score__gte=TOKEN_MIN_SIMILARITY)
+        .order_by('-score')[:limit]
+    )
+    entries = CandidateSearchIndex.objects.select_related('user').in_bulk([row['entry_id'] for row in rows])
+    return [
+        (entries[row['entry_id']], round(row['score'], 3), 'similar')
+        for row in rows if row['entry_id'] in entries
+    ]
+
+
+def search_candidates(query, center=None, limit=10):
+    """
+    Devuelve hasta `limit` candidatos que coinciden con `query` (nombre, CURP
+    o correo), ordenados por relevancia. Si se indica `center`, solo busca
+    entre los candidatos de ese centro.
+    """
+    folded = fold_text(query)
+    if not folded:
+        return []
+
+    entries = CandidateSearchIndex.objects.filter(is_candidate=True)
+    if center is not None:
+        entries = entries.filter(center=center)
+
+    prefix_filter = (
+        _prefix_q('full_name_key', folded) |
+        _prefix_q('surname_key', folded) |
+        _prefix_q('curp_key', folded) |
+        _prefix_q('email_key', folded)
+    )
+    results = [
+        (entry, 1.0, 'prefijo')
+        for entry in entries.filter(prefix_filter).select_related('user').order_by('full_name_key')[:limit]
+    ]
+
+    # La búsqueda aproximada solo aplica a palabras de nombre, no a CURP ni correos
+    words = [
+        word for word in folded.split(' ')
+        if len(word) >= MIN_FUZZY_WORD_LENGTH and not re.search(r'[0-9@]', word)
+    ]
+    if len(results) < limit and words:
+        results += _fuzzy_matches(
+            words,
+            center=center,
+            exclude=[entry.pk for entry, _, _ in results],
+            limit=limit - len(results),
+        )
+
+    return [
+        {
+            'id': entry.user_id,
+            'nombre_completo': f"{entry.user.first_name} {entry.user.last_name} {entry.user.second_last_name or ''}".strip(),
+            'curp': entry.curp_key.upper() or None,
+            'email': entry.user.email,
+            'score': score,
+            'coincidencia': match_type,
+        }
+        for entry, score, match_type in results
+    ]
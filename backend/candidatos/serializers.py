@@ -8,6 +8,7 @@ from discapacidad.models import TechnicalAid, SISHelp, CHItem
 from discapacidad.serializers import TechnicalAidSerializer, SISHelpFlatSerializer, CHItemSerializer
 from .models import UserProfile, EmergencyContact, Cycle, Domicile, Medication, Disability, TAidCandidateHistory, SISAidCandidateHistory, CHAidCandidateHistory, CandidatoHabilidadEvaluada
 from api.fields import SASImageField, SASFileField
+from api.fieldsets import SparseFieldsetsMixin
 from .error_handling import SpanishValidationError, translate_field_name, translate_error_message, validate_required_fields, validate_field_format
 import json
 
@@ -113,7 +114,7 @@ class CurrentUserProfileSerializer(serializers.ModelSerializer):
         disabilities = obj.disability.all()
         return ", ".join(disability.name for disability in disabilities) if disabilities else "Sin discapacidad"
 
-class UserProfileSerializer(serializers.ModelSerializer):
+class UserProfileSerializer(SparseFieldsetsMixin, serializers.ModelSerializer):
     user = UserSerializer(read_only=True)
     disability_name = serializers.SerializerMethodField()
     cycle = CycleSerializer(read_only=True)
@@ -126,6 +127,18 @@ class UserProfileSerializer(serializers.ModelSerializer):
         model = UserProfile
         fields = '__all__'
         read_only_fields = ['user']
+        fieldset_select_related = {
+            'user': ['user'],
+            'cycle': ['cycle'],
+            'domicile': ['domicile'],
+        }
+        fieldset_prefetch_related = {
+            'disability': ['disability'],
+            'disability_name': ['disability'],
+            'emergency_contacts': ['emergency_contacts__domicile'],
+            'medications': ['medications'],
+            'habilidades_evaluadas': ['habilidades_evaluadas'],
+        }
 
     def get_disability_name(self, obj):
         disabilities = obj.disability.all()
@@ -181,7 +194,7 @@ class CandidatePhotoSerializer(serializers.ModelSerializer):
         model = UserProfile
         fields = ['photo']
 
-class CandidateListSerializer(serializers.ModelSerializer):
+class CandidateListSerializer(SparseFieldsetsMixin, serializers.ModelSerializer):
     nombre_completo = serializers.SerializerMethodField()
     edad = serializers.SerializerMethodField()
     discapacidad = serializers.SerializerMethodField()
@@ -195,6 +208,19 @@ class CandidateListSerializer(serializers.ModelSerializer):
     class Meta:
         model = User
         fields = ['id', 'nombre_completo', 'edad', 'discapacidad', 'fecha_registro', 'telefono', 'email', 'estado', 'ciclo', 'municipio', 'domicile']
+        fieldset_select_related = {
+            'edad': ['userprofile'],
+            'discapacidad': ['userprofile'],
+            'fecha_registro': ['userprofile'],
+            'telefono': ['userprofile'],
+            'estado': ['userprofile'],
+            'ciclo': ['userprofile__cycle'],
+            'municipio': ['userprofile__domicile'],
+            'domicile': ['userprofile__domicile'],
+        }
+        fieldset_prefetch_related = {
+            'discapacidad': ['userprofile__disability'],
+        }
 
     def get_nombre_completo(self, obj):
         return f"{obj.first_name} {obj.last_name} {obj.second_last_name}"
@@ -1,76 +1,49 @@
 # candidatos/signals.py
 
-import os
-from django.db.models.signals import post_delete, pre_save
+from django.db.models.signals import post_delete, post_save, m2m_changed
 from django.dispatch import receiver
-from django.conf import settings
+from api.files import delete_files_on_commit, replaced_files
+from django.contrib.auth import get_user_model
 from .models import UserProfile	
+from .search import refresh_search_entry, refresh_candidate_flags
+
+User = get_user_model()
 
 @receiver(post_delete, sender=UserProfile)
 def delete_photo_on_delete(sender, instance, **kwargs):
-    if instance.photo:
-        # Check if we're using cloud storage (Azure)
-        using_cloud_storage = (
-            hasattr(settings, "STORAGES")
-            and settings.STORAGES.get("default", {}).get("BACKEND")
-               == "storages.backends.azure_storage.AzureStorage"
-        )
-        
-        if using_cloud_storage:
-            # For cloud storage, use the storage's delete method
-            try:
-                instance.photo.delete(save=False)
-            except Exception as e:
-                # Log the error but don't raise it to avoid breaking the deletion
-                print(f"Error deleting photo from cloud storage: {e}")
-        else:
-            # For local storage, use the traditional file system approach
-            try:
-                if os.path.isfile(instance.photo.path):
-                    os.remove(instance.photo.path)
-            except (NotImplementedError, AttributeError):
-                # If path is not available, try using the storage's delete method
-                try:
-                    instance.photo.delete(save=False)
-                except Exception as e:
-                    print(f"Error deleting photo: {e}")
+    delete_files_on_commit([instance.photo.name])
+
+@receiver(post_save, sender=UserProfile)
+def delete_old_photo_on_update(sender, instance, created, update_fields=None, raw=False, **kwargs):
+    if created or raw:
+        return
+    delete_files_on_commit(replaced_files(instance, update_fields))
 
-@receiver(pre_save, sender=UserProfile)
-def delete_old_photo_on_update(sender, instance, **kwargs):
-    if not instance.pk:
-        return  # Skip on creation
+# Campos del usuario que entran en el índice (search.build_search_keys)
+SEARCH_USER_FIELDS = {'first_name', 'last_name', 'second_last_name', 'email', 'center_id'}
 
-    try:
-        old_instance = UserProfile.objects.get(pk=instance.pk)
-    except UserProfile.DoesNotExist:
+@receiver(post_save, sender=User)
+def update_search_index_on_user_save(sender, instance, created, update_fields=None, raw=False, **kwargs):
+    if raw:
         return
+    # update_last_login y los saves de ADFS no tocan el nombre ni el correo
+    if not created and not SEARCH_USER_FIELDS & instance.tracked_changes(update_fields).keys():
+        return
+    refresh_search_entry(instance)
 
-    old_file = old_instance.photo
-    new_file = instance.photo
+@receiver(post_save, sender=UserProfile)
+def update_search_index_on_profile_save(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    refresh_search_entry(instance.user, profile=instance)
 
-    if old_file and old_file != new_file:
-        # Check if we're using cloud storage (Azure)
-        using_cloud_storage = (
-            hasattr(settings, "STORAGES")
-            and settings.STORAGES.get("default", {}).get("BACKEND")
-               == "storages.backends.azure_storage.AzureStorage"
-        )
-        
-        if using_cloud_storage:
-            # For cloud storage, use the storage's delete method
-            try:
-                old_file.delete(save=False)
-            except Exception as e:
-                # Log the error but don't raise it to avoid breaking the update
-                print(f"Error deleting old photo from cloud storage: {e}")
-        else:
-            # For local storage, use the traditional file system approach
-            try:
-                if os.path.isfile(old_file.path):
-                    os.remove(old_file.path)
-            except (NotImplementedError, AttributeError):
-                # If path is not available, try using the storage's delete method
-                try:
-                    old_file.delete(save=False)
-                except Exception as e:
-                    print(f"Error deleting old photo: {e}")
\ No newline at end of file
+@receiver(m2m_changed, sender=User.groups.through)
+def update_search_index_on_groups_change(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if reverse:
+        # group.user_set.add(...) / remove(...)
+        if pk_set:
+            refresh_candidate_flags(pk_set)
+    else:
+        refresh_candidate_flags([instance.pk])
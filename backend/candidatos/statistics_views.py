@@ -7,6 +7,10 @@ from django.db.models.functions import Extract, TruncMonth, TruncYear
 from django.utils.dateparse import parse_date
 from django.contrib.auth import get_user_model
 from .models import UserProfile
+from .cohorts import cached_for_cohort, cohort_users, get_request_cohort
+from .models import Domicile
+from api.conditional import conditional_get
+from discapacidad.models import DisabilityGroup
 from centros.models import Center, TransferRequest
 from discapacidad.models import Disability
 from agencia.models import Job, Habilidad
@@ -19,10 +23,14 @@ User = get_user_model()
 class StatisticsView(APIView):
     permission_classes = [IsAuthenticated, IsAdminUser]
 
+    @conditional_get(
+        User, UserProfile, Domicile, Center, TransferRequest, Job,
+        EstadoCuestionario, BaseCuestionarios, Disability, DisabilityGroup,
+    )
     def get(self, request):
         """
         Get comprehensive statistics for candidatos data.
-        Supports filtering by center and date range.
+        Supports filtering by center, date range and a saved cohort (`cohort`).
         """
         # Get filter parameters
         center_id = request.GET.get('center_id')
@@ -61,6 +69,21 @@ class StatisticsView(APIView):
                 return Response({"error": "Invalid date format"}, status=400)
 
 
+        cohort = get_request_cohort(request)
+        if cohort is not None:
+            base_queryset = base_queryset.filter(user__in=cohort_users(cohort).values('pk'))
+            params = {'center_id': center_id, 'start_date': start_date, 'end_date': end_date,
+                      'user_center': request.user.center_id}
+            stats_data = cached_for_cohort(
+                cohort, 'statistics', params,
+                lambda: self._build_stats(base_queryset, centers, start_date, end_date),
+            )
+        else:
+            stats_data = self._build_stats(base_queryset, centers, start_date, end_date)
+
+        return Response(stats_data)
+
+    def _build_stats(self, base_queryset, centers, start_date, end_date):
         # Get statistics data
         stats_data = {
             'overview': self._get_overview_stats(base_queryset),
@@ -74,8 +97,7 @@ class StatisticsView(APIView):
             'timeline': self._get_timeline_stats(base_queryset),
             'centers': self._get_center_comparison_stats(centers, start_date, end_date),
         }
-
-        return Response(stats_data)
+        return stats_data
 
     def _get_overview_stats(self, queryset):
         """Get overall statistics"""
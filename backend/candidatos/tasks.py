@@ -0,0 +1,10 @@
+from celery import shared_task
+from candidatos.cohorts import purge_expired_cohorts
+
+
+@shared_task
+def purge_expired_candidate_cohorts():
+    """
+    Celery task that deletes expired candidate cohorts.
+    """
+    return purge_expired_cohorts()
@@ -1,3 +1,154 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Group, update_last_login
+from django.core.cache import cache
+from django.db import connection
 from django.test import TestCase
+from rest_framework.test import APIClient
+
+from centros.models import Center
+
+from .cohorts import CANDIDATOS_GROUP, cohort_users, create_cohort
+from .models import CandidateCohort, CandidateSearchIndex, CandidateSearchTrigram
+from .search import _ensure_vocabulary, search_candidates, word_trigrams
+
+User = get_user_model()
+
+
+class CandidateSearchIndexTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            email='ana@benchmark.invalid', password='x', first_name='Ana', last_name='López', is_staff=True,
+        )
+
+    def test_vocabulary_without_ignore_conflicts(self):
+        # SQL Server: sin ignore_conflicts y con una palabra registrada a medias
+        CandidateSearchTrigram.objects.create(trigram='mar', token='marisol')
+        with mock.patch.object(connection.features, 'supports_ignore_conflicts', False), \
+                mock.patch('candidatos.search.CandidateSearchTrigram.objects.filter') as known:
+            known.return_value.values_list.return_value.distinct.return_value = []
+            _ensure_vocabulary(['marisol'])
+        self.assertEqual(
+            set(CandidateSearchTrigram.objects.filter(token='marisol').values_list('trigram', flat=True)),
+            set(word_trigrams('marisol')),
+        )
+
+    def test_last_login_does_not_refresh_index(self):
+        with mock.patch('candidatos.signals.refresh_search_entry') as refresh:
+            update_last_login(None, self.user)
+            self.user.is_superuser = True
+            self.user.save()
+        refresh.assert_not_called()
+
+    def test_name_change_refreshes_index(self):
+        self.user.second_last_name = 'Pérez'
+        self.user.save(update_fields=['second_last_name'])
+        entry = CandidateSearchIndex.objects.get(user=self.user)
+        self.assertEqual(entry.full_name_key, 'ana lopez perez')
+
+    def test_negative_limit(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        response = client.get('/api/candidatos/buscar/', {'q': 'ana', 'limit': -5})
+        self.assertEqual(response.status_code, 200)
+
+
+class CandidateSearchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.center = Center.objects.create(name='Centro')
+        cls.other_center = Center.objects.create(name='Otro centro')
+        group = Group.objects.create(name='candidatos')
+        cls.candidates = {}
+        for email, first_name, last_name, center in [
+            ('jose@benchmark.invalid', 'José', 'Pérez', cls.center),
+            ('maria@benchmark.invalid', 'María', 'Núñez', cls.center),
+            ('lucia@benchmark.invalid', 'Lucía', 'Lozano', cls.other_center),
+        ]:
+            user = User.objects.create_user(
+                email=email, password='x', first_name=first_name, last_name=last_name, center=center,
+            )
+            user.groups.add(group)
+            cls.candidates[first_name] = user
+        cls.personal = Group.objects.create(name='personal')
+
+    def _search(self, query, **kwargs):
+        return [(row['id'], row['coincidencia']) for row in search_candidates(query, **kwargs)]
+
+    def test_accents_are_folded_both_ways(self):
+        jose, maria = self.candidates['José'], self.candidates['María']
+        self.assertEqual(self._search('jose perez'), [(jose.pk, 'prefijo')])
+        self.assertEqual(self._search('JOSÉ PÉREZ'), [(jose.pk, 'prefijo')])
+        self.assertEqual(self._search('nunez'), [(maria.pk, 'prefijo')])
+
+    def test_prefix_matches_name_surname_and_email(self):
+        jose = self.candidates['José']
+        self.assertEqual(self._search('jo'), [(jose.pk, 'prefijo')])
+        self.assertEqual(self._search('pe'), [(jose.pk, 'prefijo')])
+        self.assertEqual(self._search('jose@bench'), [(jose.pk, 'prefijo')])
+
+    def test_misspelled_names_match_by_trigrams(self):
+        jose = self.candidates['José']
+        results = search_candidates('Jose Peres')
+        self.assertEqual([(row['id'], row['coincidencia']) for row in results], [(jose.pk, 'similar')])
+        self.assertLess(results[0]['score'], 1.0)
+        self.assertEqual(self._search('xyzw'), [])
+
+    def test_search_is_scoped_to_the_center(self):
+        lucia = self.candidates['Lucía']
+        self.assertEqual(self._search('lucia', center=self.center), [])
+        self.assertEqual(self._search('lucia', center=self.other_center), [(lucia.pk, 'prefijo')])
+
+    def test_personal_without_center_sees_nothing(self):
+        user = User.objects.create_user(email='sincentro@benchmark.invalid', password='x')
+        user.groups.add(self.personal)
+        client = APIClient()
+        client.force_authenticate(user)
+        self.assertEqual(client.get('/api/candidatos/buscar/', {'q': 'lucia'}).json(), [])
+
+        user.center = self.center
+        user.save()
+        client.force_authenticate(User.objects.get(pk=user.pk))
+        self.assertEqual(client.get('/api/candidatos/buscar/', {'q': 'maria'}).json()[0]['id'], str(self.candidates['María'].pk))
+        self.assertEqual(client.get('/api/candidatos/buscar/', {'q': 'lucia'}).json(), [])
+
+
+class DashboardCohortTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.center = Center.objects.create(name='Centro')
+        self.other_center = Center.objects.create(name='Otro centro')
+        self.user = User.objects.create_user(email='personal@benchmark.invalid', password='x', center=self.center)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_user_cohorts_are_reused(self):
+        first = self.client.get('/api/candidatos/dashboard-stats/', {'user_cohorts': 'true'}).json()
+        count = CandidateCohort.objects.count()
+        self.assertEqual(count, len(first['user_cohorts']))
+        second = self.client.get('/api/candidatos/dashboard-stats/', {'user_cohorts': 'true'}).json()
+        self.assertEqual(first['user_cohorts'], second['user_cohorts'])
+        self.assertEqual(CandidateCohort.objects.count(), count)
+
+    def test_verified_ids_are_not_filtered_by_center(self):
+        # Candidato de otro centro con una canalización pendiente hacia éste
+        other = User.objects.create_user(email='otro@benchmark.invalid', password='x', center=self.other_center)
+        cohort = create_cohort(self.user, ids=[other.pk], name='haciaOrganizacion', verified=True)
+        self.assertEqual(list(cohort_users(cohort)), [other])
+        self.assertEqual(create_cohort(self.user, ids=[other.pk]).size, 0)
+
+    def test_owner_without_center_cannot_create_cohorts(self):
+        candidate = User.objects.create_user(email='candidato@benchmark.invalid', password='x', center=self.other_center)
+        candidate.groups.add(Group.objects.get_or_create(name=CANDIDATOS_GROUP)[0])
+        owner = User.objects.create_user(email='sincentro@benchmark.invalid', password='x')
+        client = APIClient()
+        client.force_authenticate(owner)
+        self.assertEqual(client.post('/api/candidatos/cohortes/', {'ids': [str(candidate.pk)]}, format='json').status_code, 403)
+        self.assertEqual(client.post('/api/candidatos/cohortes/', {'filters': {}}, format='json').status_code, 403)
+        self.assertFalse(CandidateCohort.objects.exists())
 
-# Create your tests here.
+        # Los ids calculados por el servidor sí se aceptan, y el staff abarca todos los centros
+        self.assertEqual(create_cohort(owner, ids=[candidate.pk], verified=True).size, 1)
+        owner.is_staff = True
+        self.assertEqual(create_cohort(owner, ids=[candidate.pk]).size, 1)
@@ -1,6 +1,7 @@
 from django.urls import path
 from .views import (
     CandidateListAPIView,
+    CandidateSearchAPIView,
     CandidateProfileRetrieveAPIView,
     CandidateCreateAPIView,
     CandidateUpdateAPIView,
@@ -20,7 +21,7 @@ from .views import (
     JobHistoryViewSet,
     CandidateEmploymentUpdateView,
     CandidateEmploymentRemovalUpdateView,
-    JobHistoryCommentCreateView,
+    JobHistoryCommentListCreateView,
     CandidateListAgencyAPIView,
     CandidateAgencyProfileRetrieveAPIView,
     BulkCandidateUploadView,
@@ -43,6 +44,8 @@ from .views import (
 from .dashboard_views import (
     DashboardStatsView,
     CandidateListDashboardView,
+    CandidateCohortCreateView,
+    CandidateCohortDetailView,
 )
 from .statistics_views import (
     StatisticsView,
@@ -59,6 +62,7 @@ router.register(r'historial-empleos', JobHistoryViewSet, basename='job_history')
 
 urlpatterns = [
     path('lista/', CandidateListAPIView.as_view(), name='candidate-list'),
+    path('buscar/', CandidateSearchAPIView.as_view(), name='candidate-search'),
     path('profiles/<uuid:uid>/', CandidateProfileRetrieveAPIView.as_view(), name='candidate-profile'),
     path('profiles/me/', CurrentUserProfileAPIView.as_view(), name='my-candidate-profile'),
     path('crear/', CandidateCreateAPIView.as_view(), name='candidate-create'),
@@ -69,7 +73,7 @@ urlpatterns = [
 
     path('employment/<uuid:pk>/', CandidateEmploymentUpdateView.as_view(), name='candidate-employment-update'),
     path('employment/remove/<uuid:pk>/', CandidateEmploymentRemovalUpdateView.as_view(), name='candidate-employment-remove'),
-    path('employment/comments/<int:job_history_pk>/', JobHistoryCommentCreateView.as_view(), name='jobhistory-comment-create'),
+    path('employment/comments/<int:job_history_pk>/', JobHistoryCommentListCreateView.as_view(), name='jobhistory-comment-create'),
 
     path('lista-agencia/', CandidateListAgencyAPIView.as_view(), name='candidate-agency-list'),
     path('profile-agencia/<uuid:uid>/', CandidateAgencyProfileRetrieveAPIView.as_view(), name='candidate-agency-profile'),
@@ -87,6 +91,8 @@ urlpatterns = [
 
     path('dashboard-stats/', DashboardStatsView.as_view(), name='dashboard'),
     path('dashboard-list/', CandidateListDashboardView.as_view(), name='dashboard-list'),
+    path('cohortes/', CandidateCohortCreateView.as_view(), name='cohort-create'),
+    path('cohortes/<str:token>/', CandidateCohortDetailView.as_view(), name='cohort-detail'),
     
     # Statistics endpoints
     path('statistics/', StatisticsView.as_view(), name='statistics'),
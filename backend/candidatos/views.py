@@ -10,6 +10,7 @@ from rest_framework.response import Response
 from rest_framework.decorators import action
 from rest_framework.exceptions import NotFound, PermissionDenied
 from rest_framework.permissions import IsAuthenticated, AllowAny
+from rest_framework.pagination import CursorPagination
 from api.permissions import CombinedJobAccessPermission, IsInSameCenter, PersonalPermission, GerentePermission
 from .models import UserProfile, Cycle, TAidCandidateHistory, SISAidCandidateHistory, CHAidCandidateHistory, Domicile, JobHistory
 from .serializers import CandidateCentroSerializer, CandidateListSerializer, UserProfileSerializer, CandidateCreateSerializer, CycleSerializer
@@ -26,6 +27,12 @@ from django.contrib.auth.tokens import default_token_generator
 from django.core.files.storage import default_storage
 from django.core.files.base import ContentFile
 from .utils import process_excel_file
+from .search import search_candidates
+from .models import Medication
+from api.conditional import ConditionalGetMixin
+from discapacidad.models import Disability
+from agencia.models import Job, Company, JobHabilidadRequerida
+from centros.models import Location
 from .error_handling import format_validation_errors, handle_serializer_errors, handle_exception_errors, create_error_response
 import json
 from django.shortcuts import get_object_or_404
@@ -34,6 +41,12 @@ from rest_framework.parsers import MultiPartParser
 
 User = get_user_model()
 
+# Modelos de los que dependen las listas de candidatos (para ETag/304)
+CANDIDATE_LIST_DEPENDENCIES = (User, UserProfile, Domicile, Cycle, Disability)
+CANDIDATE_AGENCY_LIST_DEPENDENCIES = CANDIDATE_LIST_DEPENDENCIES + (
+    Medication, JobHistory, Job, Company, Location, JobHabilidadRequerida,
+)
+
 
 class BulkCandidateUploadView(APIView):
 
@@ -143,9 +156,10 @@ class CycleListViewSet(viewsets.ModelViewSet):
     def perform_update(self, serializer):
         serializer.save(center=self.request.user.center)
 
-class CandidateListAPIView(generics.ListAPIView):
+class CandidateListAPIView(ConditionalGetMixin, generics.ListAPIView):
     permission_classes = [IsAuthenticated, PersonalPermission]
     serializer_class = CandidateListSerializer
+    conditional_models = CANDIDATE_LIST_DEPENDENCIES
 
     def get_queryset(self):
         print(f"DEBUG: CandidateListAPIView - User: {self.request.user.email}")
@@ -157,14 +171,40 @@ class CandidateListAPIView(generics.ListAPIView):
                 center=self.request.user.center
             )
             print(f"DEBUG: CandidateListAPIView - Found {queryset.count()} candidates")
-            return queryset
+            return self.get_serializer_class().optimize_queryset(queryset, self.request)
         else:
             print(f"DEBUG: CandidateListAPIView - User not authenticated or no center")
             return User.objects.none()
     
-class CandidateListAgencyAPIView(generics.ListAPIView):
+class CandidateSearchAPIView(APIView):
+    """
+    Typeahead de candidatos por nombre, CURP o correo, insensible a acentos.
+    GET /api/candidatos/buscar/?q=<texto>&limit=<n>
+    """
+    permission_classes = [IsAuthenticated, PersonalPermission]
+    max_limit = 50
+
+    def get(self, request):
+        query = request.query_params.get('q', '').strip()
+        try:
+            limit = max(1, min(int(request.query_params.get('limit', 10)), self.max_limit))
+        except ValueError:
+            limit = 10
+
+        if not query:
+            return Response([])
+
+        center = request.user.center
+        if center is None and not request.user.is_staff:
+            # Sin centro no hay candidatos visibles, igual que en CandidateListAPIView
+            return Response([])
+
+        return Response(search_candidates(query, center=center, limit=limit))
+    
+class CandidateListAgencyAPIView(ConditionalGetMixin, generics.ListAPIView):
     permission_classes = [IsAuthenticated, PersonalPermission]
     serializer_class = CandidateListAgencySerializer
+    conditional_models = CANDIDATE_AGENCY_LIST_DEPENDENCIES
 
     def get_queryset(self):
         queryset = UserProfile.objects.all()
@@ -207,8 +247,9 @@ class CandidateProfileRetrieveAPIView(generics.RetrieveAPIView):
 
     def get_object(self):
         uid = self.kwargs.get('uid')
+        queryset = self.get_serializer_class().optimize_queryset(UserProfile.objects.all(), self.request)
         try:
-            return UserProfile.objects.get(user__id=uid)
+            return queryset.get(user__id=uid)
         except UserProfile.DoesNotExist:
             from rest_framework.exceptions import NotFound
             raise NotFound("Candidate profile not found.")
@@ -444,27 +485,45 @@ class CandidateEmploymentRemovalUpdateView(generics.UpdateAPIView):
         context['request'] = self.request
         return context
     
-class JobHistoryCommentCreateView(generics.CreateAPIView):
+class JobHistoryCommentPagination(CursorPagination):
+    """
+    Paginación por cursor del historial de comentarios, del más reciente al
+    más antiguo. El cursor no se desfasa cuando se agregan comentarios nuevos
+    mientras se recorren las páginas.
+    """
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    ordering = ('-created_at', '-id')
+
+
+class JobHistoryCommentListCreateView(generics.ListCreateAPIView):
     """
-    API view to create a new comment for a specific JobHistory entry.
+    API view to list (cursor-paginated) and create comments for a specific JobHistory entry.
     Requires the job_history_id in the URL.
     """
     serializer_class = JobHistoryCommentSerializer
+    pagination_class = JobHistoryCommentPagination
     permission_classes = [IsAuthenticated, CombinedJobAccessPermission] # Either PersonalPermission and IsInSameCenter or EmployerPermission and WorksInSameCompany
 
-    def perform_create(self, serializer):
+    def get_job_history(self):
         # Get the job_history_id from the URL kwargs
         job_history_id = self.kwargs.get('job_history_pk')
         try:
-            job_history = JobHistory.objects.get(pk=job_history_id)
+            job_history = JobHistory.objects.select_related('candidate', 'job').get(pk=job_history_id)
         except JobHistory.DoesNotExist:
             raise Http404("JobHistory not found.")
 
         self.check_object_permissions(self.request, job_history)
+        return job_history
 
+    def get_queryset(self):
+        return self.get_job_history().comments.select_related('author')
+
+    def perform_create(self, serializer):
         # Set the job_history and author before saving
         serializer.save(
-            job_history=job_history,
+            job_history=self.get_job_history(),
             author=self.request.user # Set the author to the authenticated user
         )
 
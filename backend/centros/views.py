@@ -6,10 +6,12 @@ from .serializers import LocationSerializer, CenterSerializer
 from .transfer_serializers import TransferRequestSerializer
 from api.serializers import UserSerializer
 from api.permissions import PersonalPermission, GerentePermission
+from api.roles import has_role
 from django.db.models import Q
 from django.utils import timezone
 from django.contrib.auth.models import Group
-from notifications.views import send_notification_to_user
+from notifications.channel_groups import center_group_name, center_role_group_name
+from notifications.services.fanout import notify_users
 from django.contrib.auth import get_user_model
 
 User = get_user_model()
@@ -36,7 +38,7 @@ class TransferRequestViewSet(viewsets.ModelViewSet):
 
     def get_queryset(self):
         user = self.request.user
-        if user.groups.filter(name='gerente').exists() or user.is_staff:
+        if has_role(user, 'gerente') or user.is_staff:
             # Gerentes can see requests they sent or requests for users in their center
             personal_group = Group.objects.get(name='personal')
             return TransferRequest.objects.filter(
@@ -45,13 +47,13 @@ class TransferRequestViewSet(viewsets.ModelViewSet):
         return TransferRequest.objects.none()
 
     def create(self, request, *args, **kwargs):
-        if not request.user.groups.filter(name='gerente').exists() and not request.user.is_staff:
+        if not has_role(request.user, 'gerente') and not request.user.is_staff:
             return Response(status=status.HTTP_403_FORBIDDEN)
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
 
         requested_user = serializer.validated_data['requested_user']
-        if not requested_user.groups.filter(name='personal').exists():
+        if not has_role(requested_user, 'personal'):
             return Response({"detail": "Solo puedes canalizar a personal del sistema."}, status=status.HTTP_403_FORBIDDEN)
         
         self.perform_create(serializer)
@@ -71,9 +73,12 @@ class TransferRequestViewSet(viewsets.ModelViewSet):
             f"Para: {transfer_request.destination_center.name}"
         )
 
-        # Enviamos notificación a cada uno
-        for u in destinatarios:
-            send_notification_to_user(u.id, mensaje, link='/configuracion-del-centro')
+        # Enviamos notificación a todos en un solo envío masivo; el grupo del
+        # centro incluye a los destinatarios y solo ellos tienen notificación
+        notify_users(
+            destinatarios, mensaje, link='/configuracion-del-centro',
+            group=center_group_name(transfer_request.destination_center_id),
+        )
         # ----------------------------------------------------
         return Response(serializer.data, status=status.HTTP_201_CREATED)
     
@@ -83,7 +88,7 @@ class TransferRequestViewSet(viewsets.ModelViewSet):
         transfer_request = self.get_object()
         user = request.user
 
-        if not user.groups.filter(name='gerente').exists() and not user.is_staff:
+        if not has_role(user, 'gerente') and not user.is_staff:
             return Response({"detail": "Solo gerentes pueden responder a una solicitud de traslado."}, status=status.HTTP_403_FORBIDDEN)
 
         if transfer_request.status != 'pending':
@@ -93,7 +98,7 @@ class TransferRequestViewSet(viewsets.ModelViewSet):
             return Response({"detail": "Solo puedes aceptar solicitudes de usuarios trasladados a tu centro."}, status=status.HTTP_403_FORBIDDEN)
 
         requested_user = transfer_request.requested_user
-        if not requested_user.groups.filter(name='personal').exists():
+        if not has_role(requested_user, 'personal'):
             return Response({"detail": "Solo puedes canalizar a personal del sistema."}, status=status.HTTP_403_FORBIDDEN)
         
         destination_center = transfer_request.destination_center
@@ -134,7 +139,7 @@ class TransferRequestViewSet(viewsets.ModelViewSet):
         transfer_request = self.get_object()
         user = request.user
 
-        if not user.groups.filter(name='gerente').exists() and not user.is_staff:
+        if not has_role(user, 'gerente') and not user.is_staff:
             return Response({"detail": "Solo gerentes pueden responder a una solicitud de traslado."}, status=status.HTTP_403_FORBIDDEN)
 
         if transfer_request.status != 'pending':
@@ -144,7 +149,7 @@ class TransferRequestViewSet(viewsets.ModelViewSet):
             return Response({"detail": "Solo puedes aceptar solicitudes de usuarios trasladados desde o hacia tu centro."}, status=status.HTTP_403_FORBIDDEN)
 
         requested_user = transfer_request.requested_user
-        if not requested_user.groups.filter(name='personal').exists():
+        if not has_role(requested_user, 'personal'):
             return Response({"detail": "Solo puedes canalizar a personal del sistema."}, status=status.HTTP_403_FORBIDDEN)
         
         transfer_request.status = 'declined'
@@ -159,7 +164,7 @@ class CanalizarCandidatoViewSet(viewsets.ModelViewSet):
 
     def get_queryset(self):
         user = self.request.user
-        if user.groups.filter(name='personal').exists() or user.is_staff:
+        if has_role(user, 'personal') or user.is_staff:
             # Get direction parameter (incoming or outgoing)
             direction = self.request.query_params.get('direction', None)
             
@@ -187,7 +192,7 @@ class CanalizarCandidatoViewSet(viewsets.ModelViewSet):
         return TransferRequest.objects.none()
 
     def create(self, request, *args, **kwargs):
-        if not request.user.groups.filter(name='personal').exists() and not request.user.is_staff:
+        if not has_role(request.user, 'personal') and not request.user.is_staff:
             return Response(status=status.HTTP_403_FORBIDDEN)
         
         serializer = self.get_serializer(data=request.data)
@@ -212,9 +217,12 @@ class CanalizarCandidatoViewSet(viewsets.ModelViewSet):
         )
 
         link = f"/candidatos/visualizar/{candidato.id}/"
-        # Enviamos notificación a cada uno
-        for u in destinatarios:
-            send_notification_to_user(u.id, mensaje, link=link)
+        # Enviamos notificación a todos en un solo envío masivo, al grupo del
+        # personal del centro de destino
+        notify_users(
+            destinatarios, mensaje, link=link,
+            group=center_role_group_name(transfer_request.destination_center_id, personal_group.id),
+        )
         # ----------------------------------------------------
 
         return Response(serializer.data, status=status.HTTP_201_CREATED)
@@ -225,7 +233,7 @@ class CanalizarCandidatoViewSet(viewsets.ModelViewSet):
         transfer_request = self.get_object()
         user = request.user
 
-        if not user.groups.filter(name='personal').exists() and not user.is_staff:
+        if not has_role(user, 'personal') and not user.is_staff:
             return Response({"detail": "Solo personal del sistema puede responder a una canalización."}, status=status.HTTP_403_FORBIDDEN)
 
         if transfer_request.status != 'pending':
@@ -235,7 +243,7 @@ class CanalizarCandidatoViewSet(viewsets.ModelViewSet):
             return Response({"detail": "Solo puedes aceptar solicitudes de candidatos canalizados a tu centro."}, status=status.HTTP_403_FORBIDDEN)
 
         requested_user = transfer_request.requested_user
-        if not requested_user.groups.filter(name='candidatos').exists():
+        if not has_role(requested_user, 'candidatos'):
             return Response({"detail": "Solo puedes canalizar a candidatos."}, status=status.HTTP_403_FORBIDDEN)
         
         destination_center = transfer_request.destination_center
@@ -276,7 +284,7 @@ class CanalizarCandidatoViewSet(viewsets.ModelViewSet):
         transfer_request = self.get_object()
         user = request.user
 
-        if not user.groups.filter(name='personal').exists() and not user.is_staff:
+        if not has_role(user, 'personal') and not user.is_staff:
             return Response({"detail": "Solo personal del sistema puede responder a una canalización."}, status=status.HTTP_403_FORBIDDEN)
 
         if transfer_request.status != 'pending':
@@ -286,7 +294,7 @@ class CanalizarCandidatoViewSet(viewsets.ModelViewSet):
             return Response({"detail": "Solo puedes rechazar solicitudes de candidatos canalizados desde o hacia tu centro"}, status=status.HTTP_403_FORBIDDEN)
 
         requested_user = transfer_request.requested_user
-        if not requested_user.groups.filter(name='candidatos').exists():
+        if not has_role(requested_user, 'candidatos'):
             return Response({"detail": "Solo puedes canalizar a candidatos."}, status=status.HTTP_403_FORBIDDEN)
         
         transfer_request.status = 'declined'
@@ -298,7 +306,7 @@ class CanalizarCandidatoViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=['get'], url_path='incoming-for-candidate/(?P<candidate_uid>[^/.]+)')
     def incoming_for_candidate(self, request, candidate_uid=None):
         user = request.user
-        if not (user.groups.filter(name='personal').exists() or user.is_staff):
+        if not (has_role(user, 'personal') or user.is_staff):
             return Response({"detail": "Permiso denegado."}, status=status.HTTP_403_FORBIDDEN)
 
         try:
@@ -308,7 +316,7 @@ class CanalizarCandidatoViewSet(viewsets.ModelViewSet):
             # or some other unique identifier for a candidate.
             candidate_user = User.objects.get(pk=candidate_uid)
             candidato_group = Group.objects.get(name='candidatos')
-            if not candidate_user.groups.filter(name='candidatos').exists():
+            if not has_role(candidate_user, 'candidatos'):
                 return Response({"detail": "El UID proporcionado no corresponde a un candidato."}, status=status.HTTP_404_NOT_FOUND)
 
         except User.DoesNotExist:
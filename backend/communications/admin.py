@@ -2,10 +2,12 @@ from django.contrib import admin
 from .models import *
 
 class ForumTopicAdmin(admin.ModelAdmin):
-    list_display = ('title', 'author', 'created_at', 'updated_at', 'is_pinned', 'is_locked', 'views')
+    list_display = ('title', 'author', 'created_at', 'last_activity_at', 'reply_count', 'is_pinned', 'is_locked', 'views')
     search_fields = ('title', 'author__username', 'author__first_name', 'author__last_name')
     list_filter = ('is_pinned', 'is_locked', 'created_at', 'updated_at', 'author__center')
-    readonly_fields = ('created_at', 'updated_at', 'views')
+    readonly_fields = (
+        'created_at', 'updated_at', 'views', 'reply_count', 'last_reply_at', 'last_reply_author', 'last_activity_at',
+    )
 
 class ForumReplyAdmin(admin.ModelAdmin):
     list_display = ('topic', 'author', 'created_at', 'updated_at', 'is_edited')
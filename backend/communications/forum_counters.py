@@ -0,0 +1,109 @@
+"""
+Contadores desnormalizados de los temas del foro.
+
+ForumTopic guarda `reply_count`, `last_reply_at`, `last_reply_author` y
+`last_activity_at` para que el listado no cuente ni busque la última
+respuesta de cada tema. Las señales de communications/signals.py llaman a
+`reply_created` y `reply_deleted` dentro de la transacción de la respuesta;
+los incrementos son UPDATE con F() sobre el renglón del tema, así que dos
+respuestas simultáneas no se pisan. `repair_topic_counters` recalcula todo
+desde las respuestas (comando repair_forum_counters).
+"""
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Count, F, Max, OuterRef, Q, Subquery, UUIDField
+
+from .models import ForumReply, ForumTopic
+
+REPAIR_CHUNK_SIZE = 500
+# Un tema sin respuestas toma la fecha de creación; el default del campo
+# difiere de created_at por microsegundos
+ACTIVITY_TOLERANCE = timedelta(seconds=1)
+
+
+def reply_created(reply):
+    with transaction.atomic():
+        ForumTopic.objects.filter(pk=reply.topic_id).update(reply_count=F('reply_count') + 1)
+        # Solo si es la más reciente (las respuestas pueden confirmarse en otro orden)
+        ForumTopic.objects.filter(
+            Q(last_reply_at__isnull=True) | Q(last_reply_at__lte=reply.created_at), pk=reply.topic_id,
+        ).update(
+            last_reply_at=reply.created_at,
+            last_reply_author_id=reply.author_id,
+            last_activity_at=reply.created_at,
+        )
+
+
+def reply_deleted(reply):
+    with transaction.atomic():
+        ForumTopic.objects.filter(pk=reply.topic_id, reply_count__gt=0).update(
+            reply_count=F('reply_count') - 1
+        )
+        topic = (
+            ForumTopic.objects.filter(pk=reply.topic_id)
+            .values('last_reply_at', 'created_at').first()
+        )
+        # Sin tema (se está borrando en cascada) o no era la última respuesta
+        if topic is None or (topic['last_reply_at'] or reply.created_at) > reply.created_at:
+            return
+        # Era la última respuesta: la anterior pasa a ser la última
+        last = (
+            ForumReply.objects.filter(topic_id=reply.topic_id)
+            .order_by('-created_at', '-id').values('created_at', 'author_id').first()
+        )
+        ForumTopic.objects.filter(pk=reply.topic_id).update(
+            last_reply_at=last['created_at'] if last else None,
+            last_reply_author_id=last['author_id'] if last else None,
+            last_activity_at=last['created_at'] if last else topic['created_at'],
+        )
+
+
+def _expected(queryset):
+    last_reply = ForumReply.objects.filter(topic=OuterRef('pk')).order_by('-created_at', '-id')
+    return queryset.annotate(
+        expected_count=Count('replies'),
+        expected_last_at=Max('replies__created_at'),
+        # Sin output_field, SQLite devuelve el UUID del autor como texto
+        expected_last_author=Subquery(last_reply.values('author_id')[:1], output_field=UUIDField()),
+    )
+
+
+def repair_topic_counters(chunk_size=REPAIR_CHUNK_SIZE, dry_run=False, stdout=None):
+    """
+    Recalcula los contadores de todos los temas por bloques de IDs y corrige
+    los que no coinciden. Devuelve {'checked', 'repaired'}.
+    """
+    checked = repaired = 0
+    last_id = 0
+    while True:
+        rows = list(
+            _expected(ForumTopic.objects.filter(id__gt=last_id).order_by('id')).values(
+                'id', 'created_at', 'reply_count', 'last_reply_at', 'last_reply_author_id', 'last_activity_at',
+                'expected_count', 'expected_last_at', 'expected_last_author',
+            )[:chunk_size]
+        )
+        if not rows:
+            break
+        last_id = rows[-1]['id']
+        checked += len(rows)
+        for row in rows:
+            expected = {
+                'reply_count': row['expected_count'],
+                'last_reply_at': row['expected_last_at'],
+                'last_reply_author_id': row['expected_last_author'],
+            }
+            stale = {field: value for field, value in expected.items() if row[field] != value}
+            if row['expected_last_at']:
+                if row['last_activity_at'] != row['expected_last_at']:
+                    stale['last_activity_at'] = row['expected_last_at']
+            elif abs(row['last_activity_at'] - row['created_at']) > ACTIVITY_TOLERANCE:
+                stale['last_activity_at'] = row['created_at']
+            if not stale:
+                continue
+            repaired += 1
+            if stdout:
+                stdout.write(f"Tema {row['id']}: {', '.join(f'{field}={value}' for field, value in stale.items())}")
+            if not dry_run:
+                ForumTopic.objects.filter(pk=row['id']).update(**stale)
+    return {'checked': checked, 'repaired': repaired}
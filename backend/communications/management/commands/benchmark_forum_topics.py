@@ -0,0 +1,141 @@
+import random
+import time
+import uuid
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Group
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from rest_framework.test import APIClient
+
+from agencia.management.commands.benchmark_skill_matching import count_queries
+from communications.forum_counters import repair_topic_counters
+from communications.models import ForumReply, ForumTopic
+
+User = get_user_model()
+
+# Consultas máximas de una página del listado de temas (sesión, roles,
+# temas fijados y sus archivos, página y sus archivos) sin importar su tamaño
+QUERY_BUDGET = 8
+PAGE_SIZE = 200
+
+
+class Command(BaseCommand):
+    help = (
+        'Verifica el presupuesto de consultas de una página de 200 temas del foro, '
+        'que los contadores desnormalizados coincidan con las respuestas (después '
+        'de crear y borrar respuestas) y que el recorrido por cursor no repita ni '
+        'omita temas. Todos los datos se revierten al terminar.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--topics', type=int, default=PAGE_SIZE)
+        parser.add_argument('--max-replies', type=int, default=6)
+        parser.add_argument('--seed', type=int, default=3)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        failures = []
+
+        with transaction.atomic():
+            tag = uuid.uuid4().hex[:8]
+            group, _ = Group.objects.get_or_create(name='personal')
+            authors = [
+                User.objects.create(
+                    id=uuid.uuid4(), email=f"foro{i}-{tag}@benchmark.invalid", password='!',
+                    first_name='Autor', last_name=str(i),
+                )
+                for i in range(5)
+            ]
+            for author in authors:
+                author.groups.add(group)
+            client = APIClient(SERVER_NAME='localhost')
+            client.force_authenticate(authors[0])
+
+            topics = self._create_topics(options['topics'], options['max_replies'], authors, rng, tag)
+            ids = {topic.pk for topic in topics}
+
+            with count_queries() as legacy_queries:
+                expected = self._legacy(ids)
+
+            url = f'/api/communications/forum/topics/?page_size={PAGE_SIZE}'
+            client.get(url)  # roles en caché, como en una sesión
+            with count_queries() as queries:
+                start = time.perf_counter()
+                response = client.get(url)
+                elapsed = time.perf_counter() - start
+            if response.status_code != 200:
+                raise CommandError(f"{url} respondió {response.status_code}")
+
+            data = response.json()
+            listed = {
+                topic['id']: (topic['reply_count'], topic['last_reply_at'], topic['last_reply_author'])
+                for topic in data['pinned'] + data['results'] if topic['id'] in ids
+            }
+            self.stdout.write(
+                f"{len(data['results'])} temas y {len(data['pinned'])} fijados: {queries[0]} consultas "
+                f"en {elapsed * 1000:.1f} ms (cálculo anterior por tema: {legacy_queries[0]} consultas)"
+            )
+            if queries[0] > QUERY_BUDGET:
+                failures.append(f"{queries[0]} consultas (presupuesto {QUERY_BUDGET})")
+            if listed != expected:
+                failures.append(f"contadores distintos al cálculo desde las respuestas en {len(set(listed.items()) ^ set(expected.items()))} temas")
+
+            failures += self._check_pages(client, ids)
+
+            result = repair_topic_counters(dry_run=True, stdout=self.stdout)
+            self.stdout.write(f"Reparación: {result['checked']} temas revisados, {result['repaired']} con diferencias")
+            if result['repaired']:
+                failures.append(f"{result['repaired']} temas con contadores desfasados")
+            transaction.set_rollback(True)
+
+        if failures:
+            raise CommandError('; '.join(failures))
+        self.stdout.write(self.style.SUCCESS(
+            f"Presupuesto de {QUERY_BUDGET} consultas respetado; contadores correctos y cursor completo"
+        ))
+
+    def _create_topics(self, count, max_replies, authors, rng, tag):
+        topics = []
+        for i in range(count):
+            topic = ForumTopic.objects.create(
+                title=f"Tema {i} {tag}", description='Benchmark', author=rng.choice(authors),
+                is_pinned=i % 50 == 0,
+            )
+            for _ in range(rng.randint(0, max_replies)):
+                ForumReply.objects.create(topic=topic, author=rng.choice(authors), content='Respuesta')
+            topics.append(topic)
+        # Se borran algunas respuestas, entre ellas la última de algunos temas
+        replies = list(ForumReply.objects.filter(topic__in=topics))
+        for reply in rng.sample(replies, len(replies) // 5):
+            reply.delete()
+        return topics
+
+    def _legacy(self, ids):
+        """Contadores calculados por tema desde las respuestas, como antes."""
+        expected = {}
+        for topic in ForumTopic.objects.filter(pk__in=ids).select_related('author'):
+            last_reply = topic.replies.order_by('-created_at').select_related('author').first()
+            author = last_reply.author if last_reply else topic.author
+            expected[topic.pk] = (
+                topic.replies.count(),
+                (last_reply.created_at if last_reply else topic.created_at).isoformat().replace('+00:00', 'Z'),
+                f"{author.first_name} {author.last_name}",
+            )
+        return expected
+
+    def _check_pages(self, client, ids):
+        """Recorre el listado completo en páginas pequeñas siguiendo el cursor `next`."""
+        seen, pages = [], 0
+        url = '/api/communications/forum/topics/?page_size=7'
+        while url:
+            response = client.get(url)
+            if response.status_code != 200:
+                return [f"la página {pages + 1} respondió {response.status_code}"]
+            data = response.json()
+            seen += [topic['id'] for topic in data.get('pinned', []) + data['results'] if topic['id'] in ids]
+            url, pages = data['next'], pages + 1
+        self.stdout.write(f"Recorrido por cursor: {len(seen)} temas en {pages} páginas")
+        if sorted(seen) != sorted(ids):
+            return [f"el recorrido por cursor devolvió {len(seen)} temas de {len(ids)}"]
+        return []
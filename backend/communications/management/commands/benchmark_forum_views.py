@@ -0,0 +1,92 @@
+import time
+import uuid
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Group
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from communications.models import ForumTopic
+from communications.view_counts import flush_view_counts
+
+User = get_user_model()
+
+TOPIC_TABLE = ForumTopic._meta.db_table
+
+
+def _topic_writes(captured):
+    return sum(1 for query in captured if query['sql'].lstrip().upper().startswith('UPDATE') and TOPIC_TABLE in query['sql'])
+
+
+class Command(BaseCommand):
+    help = (
+        'Compara las escrituras sobre la tabla de temas al abrir temas del foro '
+        '(antes: un UPDATE por vista) con el conteo diferido, y verifica que el '
+        'flush guarde todas las vistas. Todos los datos se revierten al terminar.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--topics', type=int, default=20)
+        parser.add_argument('--views', type=int, default=500)
+
+    def handle(self, *args, **options):
+        topic_count, view_count = options['topics'], options['views']
+        # Vistas que estaban en la caché antes del benchmark
+        flush_view_counts()
+
+        with transaction.atomic():
+            tag = uuid.uuid4().hex[:8]
+            group, _ = Group.objects.get_or_create(name='personal')
+            user = User.objects.create(id=uuid.uuid4(), email=f"vistas-{tag}@benchmark.invalid", password='!')
+            user.groups.add(group)
+            client = APIClient(SERVER_NAME='localhost')
+            client.force_authenticate(user)
+            topics = [
+                ForumTopic.objects.create(title=f"Tema {i} {tag}", description='Benchmark', author=user)
+                for i in range(topic_count)
+            ]
+            # Temas populares: el primero recibe la mitad de las vistas
+            visits = [topics[0].pk if i % 2 == 0 else topics[i % topic_count].pk for i in range(view_count)]
+            expected = {topic.pk: visits.count(topic.pk) for topic in topics}
+
+            # Conteo anterior: guardar el tema en cada vista
+            with CaptureQueriesContext(connection) as legacy:
+                for topic_id in visits:
+                    topic = ForumTopic.objects.get(pk=topic_id)
+                    topic.views += 1
+                    topic.save(update_fields=['views'])
+            ForumTopic.objects.filter(pk__in=expected).update(views=0)
+
+            failures = []
+            last_views = {}
+            with CaptureQueriesContext(connection) as reads:
+                start = time.perf_counter()
+                for topic_id in visits:
+                    response = client.get(f'/api/communications/forum/topics/{topic_id}/')
+                    if response.status_code != 200:
+                        raise CommandError(f"El tema {topic_id} respondió {response.status_code}")
+                    last_views[topic_id] = response.json()['views']
+                elapsed = time.perf_counter() - start
+            if last_views != {topic_id: count for topic_id, count in expected.items() if count}:
+                failures.append('las respuestas no muestran las vistas acumuladas')
+
+            with CaptureQueriesContext(connection) as flush:
+                result = flush_view_counts()
+            saved = dict(ForumTopic.objects.filter(pk__in=expected).values_list('pk', 'views'))
+
+            self.stdout.write(
+                f"{view_count} vistas en {topic_count} temas: {_topic_writes(reads.captured_queries)} UPDATE "
+                f"durante las lecturas ({elapsed * 1000:.1f} ms) y {_topic_writes(flush.captured_queries)} "
+                f"en el flush; antes {_topic_writes(legacy.captured_queries)} UPDATE"
+            )
+            if _topic_writes(reads.captured_queries):
+                failures.append('las lecturas escriben en la tabla de temas')
+            if saved != expected or result['views'] != view_count:
+                failures.append(f"el flush guardó {sum(saved.values())} vistas de {view_count}")
+            transaction.set_rollback(True)
+
+        if failures:
+            raise CommandError('; '.join(failures))
+        self.stdout.write(self.style.SUCCESS('Todas las vistas guardadas sin escribir el tema en cada lectura'))
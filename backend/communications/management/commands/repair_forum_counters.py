@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from communications.forum_counters import REPAIR_CHUNK_SIZE, repair_topic_counters
+
+
+class Command(BaseCommand):
+    help = "Recompute the denormalized reply counters of forum topics and fix the ones that drifted"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--chunk-size", type=int, default=REPAIR_CHUNK_SIZE)
+        parser.add_argument("--dry-run", action="store_true", help="Report differences without fixing them")
+
+    def handle(self, *args, **options):
+        result = repair_topic_counters(
+            chunk_size=options["chunk_size"],
+            dry_run=options["dry_run"],
+            stdout=self.stdout,
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"{result['checked']} temas revisados, {result['repaired']} "
+            f"{'con diferencias' if options['dry_run'] else 'reparados'}"
+        ))
@@ -0,0 +1,54 @@
+# Generated by Django 5.1.12 on 2026-10-19 15:18
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def backfill_counters(apps, schema_editor):
+    ForumTopic = apps.get_model('communications', 'ForumTopic')
+    ForumReply = apps.get_model('communications', 'ForumReply')
+    replies = ForumReply.objects.filter(topic=OuterRef('pk'))
+    last_reply = replies.order_by('-created_at', '-id')
+    reply_count = replies.order_by().values('topic').annotate(count=Count('id')).values('count')
+    ForumTopic.objects.update(
+        reply_count=Coalesce(Subquery(reply_count), 0),
+        last_reply_at=Subquery(last_reply.values('created_at')[:1]),
+        last_reply_author=Subquery(last_reply.values('author_id')[:1]),
+        last_activity_at=Coalesce(Subquery(last_reply.values('created_at')[:1]), 'created_at'),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('communications', '0002_forumtopic_forumreply_forumfile'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='forumtopic',
+            name='last_activity_at',
+            field=models.DateTimeField(db_index=True, default=django.utils.timezone.now),
+        ),
+        migrations.AddField(
+            model_name='forumtopic',
+            name='last_reply_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='forumtopic',
+            name='last_reply_author',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='forumtopic',
+            name='reply_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_counters, migrations.RunPython.noop),
+    ]
@@ -1,11 +1,16 @@
 # communications/models.py
 from django.db import models
+from api.tracking import FieldTrackerMixin
 from django.contrib.auth import get_user_model
+from django.utils import timezone
 import os
 
 User = get_user_model()
 
-class CommunicationPost(models.Model):
+class CommunicationPost(FieldTrackerMixin, models.Model):
+    # El archivo anterior se borra al reemplazarlo (api/files.py)
+    tracked_fields = ('attachment',)
+
     title = models.CharField(max_length=255)
     message = models.TextField()
     created_at = models.DateTimeField(auto_now_add=True)
@@ -47,20 +52,23 @@ class ForumTopic(models.Model):
     is_locked = models.BooleanField(default=False)
     views = models.IntegerField(default=0)
 
+    # Desnormalizados; se mantienen al crear y borrar respuestas
+    # (communications/forum_counters.py) y se reparan con repair_forum_counters
+    reply_count = models.PositiveIntegerField(default=0)
+    last_reply_at = models.DateTimeField(null=True, blank=True)
+    last_reply_author = models.ForeignKey(
+        User, on_delete=models.SET_NULL, null=True, blank=True, related_name='+'
+    )
+    # Última respuesta o, sin respuestas, la creación del tema; es la llave
+    # del cursor del listado
+    last_activity_at = models.DateTimeField(default=timezone.now, db_index=True)
+
     class Meta:
         ordering = ['-is_pinned', '-updated_at']
 
     def __str__(self):
         return f"[{self.author.center.name if self.author.center else 'Sin centro'}] {self.title}"
 
-    @property
-    def reply_count(self):
-        return self.replies.count()
-
-    @property
-    def last_reply(self):
-        return self.replies.order_by('-created_at').first()
-
 class ForumReply(models.Model):
     topic = models.ForeignKey(ForumTopic, on_delete=models.CASCADE, related_name='replies')
     author = models.ForeignKey(User, on_delete=models.CASCADE, related_name='forum_replies')
@@ -75,7 +83,10 @@ class ForumReply(models.Model):
     def __str__(self):
         return f"Reply to '{self.topic.title}' by {self.author.first_name} {self.author.last_name}"
 
-class ForumFile(models.Model):
+class ForumFile(FieldTrackerMixin, models.Model):
+    # El archivo anterior se borra al reemplazarlo (api/files.py)
+    tracked_fields = ('file',)
+
     FILE_TYPES = [
         ('image', 'Image'),
         ('pdf', 'PDF'),
@@ -78,7 +78,7 @@ class ForumTopicSerializer(serializers.ModelSerializer):
     author_name = serializers.SerializerMethodField()
     author_center = serializers.SerializerMethodField()
     author_id = serializers.IntegerField(source='author.id', read_only=True)
-    reply_count = serializers.ReadOnlyField()
+    reply_count = serializers.IntegerField(read_only=True)
     last_reply_at = serializers.SerializerMethodField()
     last_reply_author = serializers.SerializerMethodField()
     files = ForumFileSerializer(many=True, read_only=True)
@@ -98,15 +98,16 @@ class ForumTopicSerializer(serializers.ModelSerializer):
     def get_author_center(self, obj):
         return obj.author.center.name if obj.author.center else "Sin centro"
 
+    # Columnas desnormalizadas del tema (communications/forum_counters.py);
+    # el listado carga last_reply_author con select_related
     def get_last_reply_at(self, obj):
-        last_reply = obj.last_reply
-        return last_reply.created_at if last_reply else obj.created_at
+        return obj.last_reply_at or obj.created_at
 
     def get_last_reply_author(self, obj):
-        last_reply = obj.last_reply
-        if last_reply:
-            return f"{last_reply.author.first_name} {last_reply.author.last_name}"
-        return f"{obj.author.first_name} {obj.author.last_name}"
+        author = obj.last_reply_author if obj.last_reply_at else obj.author
+        if author is None:
+            return ""
+        return f"{author.first_name} {author.last_name}"
 
     def get_can_edit(self, obj):
         request = self.context.get('request')
@@ -1,143 +1,36 @@
-import os
-from django.db.models.signals import pre_save, post_delete
+from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
-from django.conf import settings
-from .models import CommunicationPost, ForumFile
+from api.files import delete_files_on_commit, replaced_files
+from .forum_counters import reply_created, reply_deleted
+from .models import CommunicationPost, ForumFile, ForumReply
 
 @receiver(post_delete, sender=CommunicationPost)
 def delete_attachment_on_delete(sender, instance, **kwargs):
-    if instance.attachment:
-        # Check if we're using cloud storage (Azure)
-        using_cloud_storage = (
-            hasattr(settings, "STORAGES")
-            and settings.STORAGES.get("default", {}).get("BACKEND")
-               == "storages.backends.azure_storage.AzureStorage"
-        )
-        
-        if using_cloud_storage:
-            # For cloud storage, use the storage's delete method
-            try:
-                instance.attachment.delete(save=False)
-            except Exception as e:
-                # Log the error but don't raise it to avoid breaking the deletion
-                print(f"Error deleting attachment from cloud storage: {e}")
-        else:
-            # For local storage, use the traditional file system approach
-            try:
-                if os.path.isfile(instance.attachment.path):
-                    os.remove(instance.attachment.path)
-            except (NotImplementedError, AttributeError):
-                # If path is not available, try using the storage's delete method
-                try:
-                    instance.attachment.delete(save=False)
-                except Exception as e:
-                    print(f"Error deleting attachment: {e}")
+    delete_files_on_commit([instance.attachment.name])
 
-@receiver(pre_save, sender=CommunicationPost)
-def delete_old_attachment_on_update(sender, instance, **kwargs):
-    if not instance.pk:
-        return  # Skip on creation
-
-    try:
-        old_instance = CommunicationPost.objects.get(pk=instance.pk)
-    except CommunicationPost.DoesNotExist:
+@receiver(post_save, sender=CommunicationPost)
+def delete_old_attachment_on_update(sender, instance, created, update_fields=None, raw=False, **kwargs):
+    if created or raw:
         return
-
-    old_file = old_instance.attachment
-    new_file = instance.attachment
-
-    if old_file and old_file != new_file:
-        # Check if we're using cloud storage (Azure)
-        using_cloud_storage = (
-            hasattr(settings, "STORAGES")
-            and settings.STORAGES.get("default", {}).get("BACKEND")
-               == "storages.backends.azure_storage.AzureStorage"
-        )
-        
-        if using_cloud_storage:
-            # For cloud storage, use the storage's delete method
-            try:
-                old_file.delete(save=False)
-            except Exception as e:
-                # Log the error but don't raise it to avoid breaking the update
-                print(f"Error deleting old attachment from cloud storage: {e}")
-        else:
-            # For local storage, use the traditional file system approach
-            try:
-                if os.path.isfile(old_file.path):
-                    os.remove(old_file.path)
-            except (NotImplementedError, AttributeError):
-                # If path is not available, try using the storage's delete method
-                try:
-                    old_file.delete(save=False)
-                except Exception as e:
-                    print(f"Error deleting old attachment: {e}")
+    delete_files_on_commit(replaced_files(instance, update_fields))
 
 @receiver(post_delete, sender=ForumFile)
 def delete_forum_file_on_delete(sender, instance, **kwargs):
-    if instance.file:
-        # Check if we're using cloud storage (Azure)
-        using_cloud_storage = (
-            hasattr(settings, "STORAGES")
-            and settings.STORAGES.get("default", {}).get("BACKEND")
-               == "storages.backends.azure_storage.AzureStorage"
-        )
-        
-        if using_cloud_storage:
-            # For cloud storage, use the storage's delete method
-            try:
-                instance.file.delete(save=False)
-            except Exception as e:
-                # Log the error but don't raise it to avoid breaking the deletion
-                print(f"Error deleting forum file from cloud storage: {e}")
-        else:
-            # For local storage, use the traditional file system approach
-            try:
-                if os.path.isfile(instance.file.path):
-                    os.remove(instance.file.path)
-            except (NotImplementedError, AttributeError):
-                # If path is not available, try using the storage's delete method
-                try:
-                    instance.file.delete(save=False)
-                except Exception as e:
-                    print(f"Error deleting forum file: {e}")
+    delete_files_on_commit([instance.file.name])
 
-@receiver(pre_save, sender=ForumFile)
-def delete_old_forum_file_on_update(sender, instance, **kwargs):
-    if not instance.pk:
-        return  # Skip on creation
-
-    try:
-        old_instance = ForumFile.objects.get(pk=instance.pk)
-    except ForumFile.DoesNotExist:
+@receiver(post_save, sender=ForumFile)
+def delete_old_forum_file_on_update(sender, instance, created, update_fields=None, raw=False, **kwargs):
+    if created or raw:
         return
+    delete_files_on_commit(replaced_files(instance, update_fields))
+
+# Contadores desnormalizados del tema (communications/forum_counters.py)
 
-    old_file = old_instance.file
-    new_file = instance.file
+@receiver(post_save, sender=ForumReply)
+def update_topic_counters_on_reply(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        reply_created(instance)
 
-    if old_file and old_file != new_file:
-        # Check if we're using cloud storage (Azure)
-        using_cloud_storage = (
-            hasattr(settings, "STORAGES")
-            and settings.STORAGES.get("default", {}).get("BACKEND")
-               == "storages.backends.azure_storage.AzureStorage"
-        )
-        
-        if using_cloud_storage:
-            # For cloud storage, use the storage's delete method
-            try:
-                old_file.delete(save=False)
-            except Exception as e:
-                # Log the error but don't raise it to avoid breaking the update
-                print(f"Error deleting old forum file from cloud storage: {e}")
-        else:
-            # For local storage, use the traditional file system approach
-            try:
-                if os.path.isfile(old_file.path):
-                    os.remove(old_file.path)
-            except (NotImplementedError, AttributeError):
-                # If path is not available, try using the storage's delete method
-                try:
-                    old_file.delete(save=False)
-                except Exception as e:
-                    print(f"Error deleting old forum file: {e}")
+@receiver(post_delete, sender=ForumReply)
+def update_topic_counters_on_reply_delete(sender, instance, **kwargs):
+    reply_deleted(instance)
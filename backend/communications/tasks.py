@@ -0,0 +1,12 @@
+from celery import shared_task
+
+from .view_counts import flush_view_counts
+
+
+@shared_task
+def flush_forum_view_counts_task():
+    """
+    Celery task that writes the buffered forum topic views to the database
+    and returns how many topics and views were flushed.
+    """
+    return flush_view_counts()
@@ -1,3 +1,189 @@
-from django.test import TestCase
+import uuid
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Group
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+
+from . import view_counts
+from .forum_counters import repair_topic_counters
+from .models import ForumReply, ForumTopic
+
+User = get_user_model()
+
+TOPICS_URL = '/api/communications/forum/topics/'
+
+
+def _author(index):
+    return User.objects.create(
+        id=uuid.uuid4(), email=f"foro{index}@benchmark.invalid", password='!',
+        first_name='Autor', last_name=str(index),
+    )
+
+
+class ForumTopicCountersTests(TestCase):
+    def setUp(self):
+        self.authors = [_author(i) for i in range(3)]
+        self.topic = ForumTopic.objects.create(title='Tema', description='Descripción', author=self.authors[0])
+
+    def _counters(self):
+        topic = ForumTopic.objects.get(pk=self.topic.pk)
+        return topic.reply_count, topic.last_reply_at, topic.last_reply_author_id, topic.last_activity_at
+
+    def test_counters_follow_reply_create_and_delete(self):
+        first = ForumReply.objects.create(topic=self.topic, author=self.authors[1], content='Primera')
+        second = ForumReply.objects.create(topic=self.topic, author=self.authors[2], content='Segunda')
+        self.assertEqual(
+            self._counters(), (2, second.created_at, self.authors[2].pk, second.created_at),
+        )
+
+        # Borrar una respuesta anterior no cambia la última
+        first.delete()
+        self.assertEqual(self._counters()[:3], (1, second.created_at, self.authors[2].pk))
+
+        third = ForumReply.objects.create(topic=self.topic, author=self.authors[1], content='Tercera')
+        third.delete()
+        self.assertEqual(
+            self._counters(), (1, second.created_at, self.authors[2].pk, second.created_at),
+        )
+
+        # Sin respuestas la actividad vuelve a la creación del tema
+        second.delete()
+        self.assertEqual(self._counters(), (0, None, None, ForumTopic.objects.get(pk=self.topic.pk).created_at))
+        self.assertEqual(repair_topic_counters(dry_run=True)['repaired'], 0)
+
+    def test_repair_fixes_drifted_counters(self):
+        reply = ForumReply.objects.create(topic=self.topic, author=self.authors[1], content='Respuesta')
+        ForumTopic.objects.filter(pk=self.topic.pk).update(reply_count=7, last_reply_author=None)
+        self.assertEqual(repair_topic_counters()['repaired'], 1)
+        self.assertEqual(self._counters()[:3], (1, reply.created_at, self.authors[1].pk))
+
+
+class ForumTopicListTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.authors = [_author(i) for i in range(5)]
+        group = Group.objects.create(name='personal')
+        for author in cls.authors:
+            author.groups.add(group)
+        for i in range(200):
+            topic = ForumTopic.objects.create(
+                title=f"Tema {i}", description='Descripción', author=cls.authors[i % 5], is_pinned=i % 50 == 0,
+            )
+            for n in range(i % 3):
+                ForumReply.objects.create(topic=topic, author=cls.authors[(i + n) % 5], content='Respuesta')
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.authors[0])
+        self.client.get(TOPICS_URL)  # roles en caché, como en una sesión
+
+    def test_page_query_budget_does_not_depend_on_its_size(self):
+        # Temas fijados y sus archivos, página y sus archivos
+        with self.assertNumQueries(4):
+            small = self.client.get(TOPICS_URL, {'page_size': 10}).json()
+        with self.assertNumQueries(4):
+            data = self.client.get(TOPICS_URL, {'page_size': 200}).json()
+        self.assertEqual(len(small['results']), 10)
+        self.assertEqual(len(data['pinned']), 4)
+        self.assertEqual(len(data['results']), 196)
+
+        for item in data['pinned'] + data['results']:
+            topic = ForumTopic.objects.get(pk=item['id'])
+            last_reply = topic.replies.order_by('-created_at').select_related('author').first()
+            self.assertEqual(item['reply_count'], topic.replies.count())
+            if last_reply:
+                author = last_reply.author
+                self.assertEqual(item['last_reply_author'], f"{author.first_name} {author.last_name}")
+
+    def test_cursor_walks_every_topic_once(self):
+        seen, url = [], f"{TOPICS_URL}?page_size=7"
+        while url:
+            data = self.client.get(url).json()
+            seen += [topic['id'] for topic in data.get('pinned', []) + data['results']]
+            url = data['next']
+        self.assertEqual(sorted(seen), sorted(ForumTopic.objects.values_list('id', flat=True)))
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class ForumViewCountTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.author = _author(0)
+        self.author.groups.add(Group.objects.create(name='personal'))
+        self.topics = [
+            ForumTopic.objects.create(title=f"Tema {i}", description='Descripción', author=self.author)
+            for i in range(3)
+        ]
+
+    def _views(self):
+        return list(ForumTopic.objects.filter(pk__in=[t.pk for t in self.topics]).order_by('id').values_list('views', flat=True))
+
+    def test_views_are_buffered_until_flush(self):
+        first, second, _ = self.topics
+        with self.assertNumQueries(0):
+            self.assertEqual(view_counts.record_view(first.pk), 1)
+            self.assertEqual(view_counts.record_view(first.pk), 2)
+            self.assertEqual(view_counts.record_view(second.pk), 1)
+            self.assertEqual(view_counts.record_view(first.pk), 3)
+        self.assertEqual(self._views(), [0, 0, 0])
+
+        self.assertEqual(view_counts.flush_view_counts(), {'topics': 2, 'views': 4})
+        self.assertEqual(self._views(), [3, 1, 0])
+        # Lo acumulado ya se guardó
+        self.assertEqual(view_counts.flush_view_counts(), {'topics': 0, 'views': 0})
+        self.assertEqual(view_counts.record_view(first.pk), 1)
+
+    def test_flush_groups_topics_by_delta(self):
+        for topic, count in zip(self.topics, (2, 2, 5)):
+            for _ in range(count):
+                view_counts.record_view(topic.pk)
+        # Un UPDATE por delta distinto, dentro de la transacción
+        with self.assertNumQueries(4):
+            result = view_counts.flush_view_counts()
+        self.assertEqual(result, {'topics': 3, 'views': 9})
+        self.assertEqual(self._views(), [2, 2, 5])
+
+    def test_cache_failure_writes_directly(self):
+        with mock.patch.object(view_counts.cache, 'get', side_effect=ConnectionError):
+            self.assertEqual(view_counts.record_view(self.topics[0].pk), 0)
+        self.assertEqual(self._views(), [1, 0, 0])
+
+    def test_retrieve_shows_pending_views_without_writing_the_topic(self):
+        client = APIClient()
+        client.force_authenticate(self.author)
+        url = f"{TOPICS_URL}{self.topics[0].pk}/"
+        self.assertEqual(client.get(url).json()['views'], 1)
+        self.assertEqual(client.get(url).json()['views'], 2)
+        self.assertEqual(self._views()[0], 0)
+        view_counts.flush_view_counts()
+        self.assertEqual(self._views()[0], 2)
+        self.assertEqual(client.get(url).json()['views'], 3)
+
+    def _redis_client(self, locked=False, leftover=None):
+        """Cliente de Redis simulado: el candado del flush y una copia que dejó un flush interrumpido."""
+        client = mock.Mock()
+        client.lock.return_value.acquire.return_value = not locked
+        client.exists.return_value = leftover is not None
+        client.hgetall.return_value = {str(k).encode(): str(v).encode() for k, v in (leftover or {}).items()}
+        return client
+
+    def test_overlapping_flush_is_skipped(self):
+        client = self._redis_client(locked=True, leftover={self.topics[0].pk: 3})
+        with mock.patch.object(view_counts, '_redis', return_value=client):
+            self.assertEqual(view_counts.flush_view_counts(), {'topics': 0, 'views': 0})
+        client.hgetall.assert_not_called()
+        client.rename.assert_not_called()
+        self.assertEqual(self._views(), [0, 0, 0])
+
+    def test_leftover_copy_is_applied_once_under_the_lock(self):
+        client = self._redis_client(leftover={self.topics[0].pk: 3, self.topics[2].pk: 1})
+        with mock.patch.object(view_counts, '_redis', return_value=client):
+            self.assertEqual(view_counts.flush_view_counts(), {'topics': 2, 'views': 4})
+        client.rename.assert_not_called()
+        client.delete.assert_called_once_with(view_counts.cache.make_key(view_counts.FLUSHING_KEY))
+        client.lock.return_value.release.assert_called_once_with()
+        self.assertEqual(self._views(), [3, 0, 1])
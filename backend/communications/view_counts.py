@@ -0,0 +1,126 @@
+"""
+Conteo diferido de vistas de los temas del foro.
+
+Abrir un tema ya no escribe su renglón: `record_view` suma la vista en un
+hash de Redis (HINCRBY, atómico entre workers) y `flush_view_counts`
+(cada minuto en Celery beat) pasa lo acumulado a ForumTopic.views con
+UPDATE ... SET views = views + n, un UPDATE por cada delta distinto y por
+bloques de IDs.
+
+Para vaciar el hash sin perder las vistas que llegan mientras tanto, se
+renombra (RENAME es atómico) y se procesa la copia; si un flush muere a
+medias, la copia se procesa en el siguiente. Un candado de Redis evita que
+dos flushes simultáneos procesen la misma copia y sumen las vistas dos
+veces; si el proceso que lo tiene muere, el candado expira solo.
+
+Con una caché que no es Redis (LocMemCache en desarrollo) las vistas se
+acumulan en la caché local con un candado del proceso. Si la caché falla,
+la vista se escribe directo en la base de datos.
+"""
+import logging
+import threading
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F
+
+from .models import ForumTopic
+
+logger = logging.getLogger(__name__)
+
+PENDING_KEY = 'forum:views:pending'
+FLUSHING_KEY = 'forum:views:flushing'
+FLUSH_LOCK_KEY = 'forum:views:flush-lock'
+# Más que lo que tarda un flush; solo importa si el proceso muere con el candado
+FLUSH_LOCK_TIMEOUT = 10 * 60
+FLUSH_CHUNK_SIZE = 500
+
+_local_lock = threading.Lock()
+
+
+def _redis():
+    """Cliente de Redis de la caché por defecto, o None si la caché no es Redis."""
+    try:
+        from django_redis import get_redis_connection
+        return get_redis_connection('default')
+    except (ImportError, NotImplementedError):
+        return None
+
+
+def record_view(topic_id):
+    """Suma una vista al tema. Devuelve cuántas vistas suyas faltan por guardar (incluida esta)."""
+    try:
+        client = _redis()
+        if client is not None:
+            return client.hincrby(cache.make_key(PENDING_KEY), topic_id, 1)
+        with _local_lock:
+            pending = cache.get(PENDING_KEY) or {}
+            pending[topic_id] = pending.get(topic_id, 0) + 1
+            cache.set(PENDING_KEY, pending, None)
+            return pending[topic_id]
+    except Exception as e:
+        logger.warning(f"No se pudo acumular la vista del tema {topic_id}; se guarda directo: {e}")
+        ForumTopic.objects.filter(pk=topic_id).update(views=F('views') + 1)
+        return 0
+
+
+def _take_pending(client):
+    """Saca las vistas acumuladas como {topic_id: vistas}."""
+    if client is None:
+        with _local_lock:
+            pending = cache.get(PENDING_KEY) or {}
+            cache.delete(PENDING_KEY)
+        return pending, None
+
+    pending_key, flushing_key = cache.make_key(PENDING_KEY), cache.make_key(FLUSHING_KEY)
+    # Una copia que quedó de un flush interrumpido se procesa antes de renombrar otra
+    if not client.exists(flushing_key):
+        if not client.exists(pending_key):
+            return {}, None
+        client.rename(pending_key, flushing_key)
+    pending = {int(topic_id): int(count) for topic_id, count in client.hgetall(flushing_key).items()}
+    return pending, lambda: client.delete(flushing_key)
+
+
+def flush_view_counts(chunk_size=FLUSH_CHUNK_SIZE):
+    """
+    Guarda en ForumTopic.views las vistas acumuladas. Devuelve
+    {'topics', 'views'}: temas actualizados y vistas sumadas (cero si otro
+    flush está en curso).
+    """
+    client = _redis()
+    if client is None:
+        return _apply(*_take_pending(None), chunk_size)
+
+    lock = client.lock(cache.make_key(FLUSH_LOCK_KEY), timeout=FLUSH_LOCK_TIMEOUT)
+    if not lock.acquire(blocking=False):
+        logger.info("Otro flush de vistas está en curso; se omite este")
+        return {'topics': 0, 'views': 0}
+    try:
+        return _apply(*_take_pending(client), chunk_size)
+    finally:
+        try:
+            lock.release()
+        except Exception as e:
+            # Expiró mientras tanto; otro flush pudo haberlo tomado
+            logger.warning(f"No se pudo liberar el candado del flush de vistas: {e}")
+
+
+def _apply(pending, done, chunk_size):
+    """Suma `pending` a ForumTopic.views y, ya confirmado, llama a `done` para soltar la copia."""
+    by_delta = {}
+    for topic_id, count in pending.items():
+        if count > 0:
+            by_delta.setdefault(count, []).append(topic_id)
+
+    topics = 0
+    # Todo o nada: si falla, la copia se vuelve a procesar completa
+    with transaction.atomic():
+        for delta, topic_ids in by_delta.items():
+            for start in range(0, len(topic_ids), chunk_size):
+                topics += ForumTopic.objects.filter(pk__in=topic_ids[start:start + chunk_size]).update(
+                    views=F('views') + delta
+                )
+    if done:
+        done()
+    return {'topics': topics, 'views': sum(pending.values())}
@@ -6,12 +6,15 @@ from rest_framework.parsers import MultiPartParser, FormParser
 from django.db import transaction
 from django.shortcuts import get_object_or_404
 from django.contrib.auth.models import Group
-from django.db.models import Q
+from django.db.models import Prefetch, Q
+from rest_framework.pagination import CursorPagination
 
 from .models import CenterMessage, CommunicationPost, ForumTopic, ForumReply, ForumFile
 from .serializers import CenterMessageSerializer, CommunicationPostSerializer, ForumTopicSerializer, ForumTopicDetailSerializer, ForumReplySerializer, ForumFileSerializer
+from .view_counts import record_view
 from api.permissions import GerentePermission, IsAdminUserOrReadOnly, PersonalPermission
-from notifications.views import send_notification_to_user  # adjust import path if needed
+from notifications.channel_groups import role_group_name
+from notifications.services.fanout import notify_users
 from django.contrib.auth import get_user_model
 
 User = get_user_model()
@@ -24,20 +27,20 @@ class CommunicationPostViewSet(viewsets.ModelViewSet):
     def perform_create(self, serializer):
         post = serializer.save(created_by=self.request.user)
 
-        try:
-            personal_group = Group.objects.get(name='personal')
-            recipients = User.objects.filter(groups=personal_group).exclude(id=self.request.user.id).distinct()
-
-            mensaje = f"Nuevo anuncio: {post.title}"
-
-            for user in recipients:
-                if hasattr(user, 'notification_settings') and not user.notification_settings.receive_announcement_notifications:
-                    return
-
-                send_notification_to_user(user.id, mensaje, link='/anuncios')
-
-        except Group.DoesNotExist:
-            pass  # optionally log this
+        # Las preferencias de cada destinatario se filtran en la consulta; el
+        # aviso por websocket sale en una tarea de Celery con un solo
+        # group_send al grupo del rol
+        personal_group = Group.objects.filter(name='personal').first()
+        if personal_group is None:
+            return
+        recipients = User.objects.filter(groups=personal_group).exclude(id=self.request.user.id)
+        notify_users(
+            recipients,
+            f"Nuevo anuncio: {post.title}",
+            link='/anuncios',
+            setting='receive_announcement_notifications',
+            group=role_group_name(personal_group.id),
+        )
 
     def create(self, request, *args, **kwargs):
         serializer = self.get_serializer(data=request.data)
@@ -46,14 +49,54 @@ class CommunicationPostViewSet(viewsets.ModelViewSet):
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
 
+class ForumTopicPagination(CursorPagination):
+    """
+    Temas por cursor, del de actividad más reciente al más antiguo. El cursor
+    de DRF solo usa el primer campo de orden, así que los temas fijados no
+    entran en el recorrido: la primera página los trae aparte en `pinned`.
+    """
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 200
+    ordering = ('-last_activity_at', '-id')
+    # Temas fijados ya serializados; ForumTopicViewSet.list los asigna en la primera página
+    pinned = None
+
+    def get_paginated_response(self, data):
+        response = super().get_paginated_response(data)
+        if self.pinned is not None:
+            response.data['pinned'] = self.pinned
+        return response
+
+
 class ForumTopicViewSet(viewsets.ModelViewSet):
     queryset = ForumTopic.objects.all()
     serializer_class = ForumTopicSerializer
     permission_classes = [IsAuthenticated, PersonalPermission]  # Add GerentePermission if needed
     parser_classes = [MultiPartParser, FormParser]
+    pagination_class = ForumTopicPagination
 
     def get_queryset(self):
-        return ForumTopic.objects.all().order_by('-is_pinned', '-updated_at')
+        queryset = ForumTopic.objects.select_related('author__center', 'last_reply_author').prefetch_related('files')
+        if self.action == 'retrieve':
+            return queryset.prefetch_related(
+                Prefetch('replies', queryset=ForumReply.objects.select_related('author__center').prefetch_related('files'))
+            )
+        if self.action == 'list':
+            return queryset.filter(is_pinned=False)
+        return queryset.order_by('-is_pinned', '-updated_at')
+
+    def list(self, request, *args, **kwargs):
+        pinned = None
+        if self.paginator.cursor_query_param not in request.query_params:
+            pinned_topics = (
+                ForumTopic.objects.filter(is_pinned=True)
+                .select_related('author__center', 'last_reply_author').prefetch_related('files')
+                .order_by('-last_activity_at', '-id')
+            )
+            pinned = self.get_serializer(pinned_topics, many=True).data
+        self.paginator.pinned = pinned
+        return super().list(request, *args, **kwargs)
 
     def get_serializer_class(self):
         if self.action == 'retrieve':
@@ -74,10 +117,10 @@ class ForumTopicViewSet(viewsets.ModelViewSet):
 
     def retrieve(self, request, *args, **kwargs):
         topic = self.get_object()
-        # Increment view count
-        topic.views += 1
-        topic.save(update_fields=['views'])
-        return super().retrieve(request, *args, **kwargs)
+        # La vista se acumula en Redis y se guarda en el siguiente flush
+        topic.views += record_view(topic.pk)
+        serializer = self.get_serializer(topic)
+        return Response(serializer.data)
 
     @action(detail=True, methods=['post'])
     def reply(self, request, pk=None):
@@ -116,15 +159,12 @@ class ForumTopicViewSet(viewsets.ModelViewSet):
             # Update topic's updated_at timestamp
             topic.save(update_fields=['updated_at'])
 
-        try:
-            recepient = topic.author
-            if recepient.id != request.user.id:
-                if hasattr(recepient, 'notification_settings') and not recepient.notification_settings.receive_forum_notifications:
-                    return
-                
-                send_notification_to_user(recepient.id, f"Nuevo mensaje en el foro: {topic.title} - Por: {request.user.first_name} {request.user.last_name}", link='/foro')
-        except User.DoesNotExist:
-            pass  # optionally log this
+        notify_users(
+            User.objects.filter(id=topic.author_id).exclude(id=request.user.id),
+            f"Nuevo mensaje en el foro: {topic.title} - Por: {request.user.first_name} {request.user.last_name}",
+            link='/foro',
+            setting='receive_forum_notifications',
+        )
         
         serializer = ForumReplySerializer(reply, context={'request': request})
         return Response(serializer.data, status=status.HTTP_201_CREATED)
@@ -0,0 +1,245 @@
+"""
+Exportación en streaming de respuestas de cuestionarios (CSV y NDJSON).
+
+A diferencia de ReporteCuestionariosView, que arma toda la lista en memoria,
+aquí las respuestas se leen con `QuerySet.iterator(chunk_size=...)` como
+tuplas ya unidas (JOIN) con el cuestionario, la pregunta y el usuario, y cada
+fila se escribe en cuanto se lee. La memoria usada no depende del número de
+filas: solo se guardan en memoria los catálogos de opciones y subitems SIS
+de las preguntas que van apareciendo.
+"""
+import csv
+import json
+
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db.models import Exists, OuterRef
+from django.utils.dateparse import parse_date
+from rest_framework.exceptions import ValidationError
+
+from candidatos.cohorts import cohort_users
+from discapacidad.models import SISAid
+
+from .models import EstadoCuestionario, Opcion, Respuesta
+
+EXPORT_CHUNK_SIZE = 2000
+
+EXPORT_COLUMNS = [
+    'respuesta_id',
+    'usuario_id',
+    'usuario_email',
+    'centro_id',
+    'cuestionario_id',
+    'cuestionario_nombre',
+    'base_cuestionario_id',
+    'base_cuestionario',
+    'pregunta_id',
+    'texto_pregunta',
+    'tipo_pregunta',
+    'respuesta_texto',
+    'opciones_ids',
+    'valor_original',
+]
+
+# Columnas leídas de la base de datos, en el orden de la tupla de values_list()
+_QUERY_FIELDS = (
+    'id',
+    'usuario_id',
+    'usuario__email',
+    'usuario__center_id',
+    'cuestionario_id',
+    'cuestionario__nombre',
+    'cuestionario__base_cuestionario_id',
+    'cuestionario__base_cuestionario__nombre',
+    'pregunta_id',
+    'pregunta__texto',
+    'pregunta__tipo',
+    'respuesta',
+)
+
+# Filtros simples: parámetro de la query string -> lookup sobre Respuesta
+_ID_FILTERS = {
+    'usuario_id': 'usuario_id',
+    'cuestionario_id': 'cuestionario_id',
+    'base_cuestionario_id': 'cuestionario__base_cuestionario_id',
+    'center_id': 'usuario__center_id',
+    'cycle_id': 'usuario__userprofile__cycle_id',
+}
+
+OPCION_TIPOS = ('multiple', 'dropdown')
+CHECKBOX_TIPOS = ('checkbox', 'checklist')
+SIS_TIPOS = ('sis', 'sis2')
+
+
+def _parse_date_param(params, name):
+    value = params.get(name)
+    if not value:
+        return None
+    parsed = parse_date(value)
+    if parsed is None:
+        raise ValidationError({name: 'Formato de fecha inválido, use AAAA-MM-DD.'})
+    return parsed
+
+
+def filter_respuestas(params, cohort=None):
+    """
+    Queryset de respuestas para exportar según los filtros de la query string:
+    usuario_id, cuestionario_id, base_cuestionario_id, center_id, cycle_id,
+    fecha_desde/fecha_hasta y una cohorte de candidatos.
+
+    Respuesta no guarda fecha; el rango de fechas se aplica sobre la fecha en
+    que el usuario finalizó el cuestionario (EstadoCuestionario.fecha_finalizado).
+    """
+    respuestas = Respuesta.objects.all()
+
+    lookups = {lookup: params.get(param) for param, lookup in _ID_FILTERS.items() if params.get(param)}
+    if lookups:
+        try:
+            respuestas = respuestas.filter(**lookups)
+        except (ValueError, DjangoValidationError):
+            raise ValidationError({'detail': 'Alguno de los IDs de filtro no es válido.'})
+
+    fecha_desde = _parse_date_param(params, 'fecha_desde')
+    fecha_hasta = _parse_date_param(params, 'fecha_hasta')
+    if fecha_desde or fecha_hasta:
+        estados = EstadoCuestionario.objects.filter(
+            usuario_id=OuterRef('usuario_id'),
+            cuestionario_id=OuterRef('cuestionario_id'),
+        )
+        if fecha_desde:
+            estados = estados.filter(fecha_finalizado__date__gte=fecha_desde)
+        if fecha_hasta:
+            estados = estados.filter(fecha_finalizado__date__lte=fecha_hasta)
+        respuestas = respuestas.filter(Exists(estados))
+
+    if cohort is not None:
+        respuestas = respuestas.filter(usuario__in=cohort_users(cohort).values('pk'))
+
+    return respuestas
+
+
+class RespuestaTextResolver:
+    """
+    Convierte el valor guardado de una respuesta en texto legible, con la
+    misma lógica que ReporteCuestionariosSerializer.get_respuesta, pero
+    cargando las opciones una sola vez por pregunta en lugar de una consulta
+    por respuesta.
+    """
+
+    def __init__(self):
+        self._opciones_por_pregunta = {}
+        self._opciones = {}
+        self._subitems = {}
+
+    def _opciones_de(self, pregunta_id):
+        opciones = self._opciones_por_pregunta.get(pregunta_id)
+        if opciones is None:
+            opciones = list(Opcion.objects.filter(pregunta_id=pregunta_id).order_by('id').values_list('id', 'texto'))
+            self._opciones_por_pregunta[pregunta_id] = opciones
+            self._opciones.update(opciones)
+        return opciones
+
+    def _subitems_de(self, ids):
+        faltantes = [pk for pk in ids if pk not in self._subitems]
+        if faltantes:
+            self._subitems.update(SISAid.objects.filter(id__in=faltantes).values_list('id', 'sub_item'))
+        return [(pk, self._subitems[pk]) for pk in ids if pk in self._subitems]
+
+    def resolve(self, pregunta_id, tipo, valor):
+        """Devuelve `(texto, opciones_ids)` para una respuesta."""
+        if valor is None or valor == '':
+            return None, []
+
+        if tipo in OPCION_TIPOS:
+            opciones = self._opciones_de(pregunta_id)
+            try:
+                indice = int(valor)
+            except (TypeError, ValueError):
+                return valor, []
+            if 0 <= indice < len(opciones):
+                opcion_id, texto = opciones[indice]
+                return texto, [opcion_id]
+            return valor, []
+
+        if tipo in CHECKBOX_TIPOS:
+            try:
+                ids = json.loads(valor) if isinstance(valor, str) else valor
+                if not isinstance(ids, list):
+                    return valor, []
+                self._opciones_de(pregunta_id)
+                ids = [int(pk) for pk in ids]
+            except (json.JSONDecodeError, TypeError, ValueError):
+                return valor, []
+            seleccionadas = [pk for pk in ids if pk in self._opciones]
+            return ', '.join(self._opciones[pk] for pk in seleccionadas), seleccionadas
+
+        if tipo in SIS_TIPOS:
+            try:
+                datos = json.loads(valor) if isinstance(valor, str) else valor
+                ids = [int(pk) for pk in datos.get('subitems', [])]
+            except (json.JSONDecodeError, AttributeError, TypeError, ValueError):
+                return valor, []
+            subitems = self._subitems_de(ids)
+            return ', '.join(texto for _, texto in subitems), [pk for pk, _ in subitems]
+
+        return valor, []
+
+
+def iter_export_rows(respuestas, chunk_size=EXPORT_CHUNK_SIZE):
+    """Genera un diccionario por respuesta con las columnas de EXPORT_COLUMNS."""
+    resolver = RespuestaTextResolver()
+    rows = respuestas.order_by('id').values_list(*_QUERY_FIELDS).iterator(chunk_size=chunk_size)
+    for (
+        respuesta_id, usuario_id, email, centro_id, cuestionario_id, cuestionario_nombre,
+        base_id, base_nombre, pregunta_id, texto_pregunta, tipo, valor,
+    ) in rows:
+        texto, opciones_ids = resolver.resolve(pregunta_id, tipo, valor)
+        yield {
+            'respuesta_id': respuesta_id,
+            'usuario_id': str(usuario_id),
+            'usuario_email': email,
+            'centro_id': centro_id,
+            'cuestionario_id': cuestionario_id,
+            'cuestionario_nombre': cuestionario_nombre,
+            'base_cuestionario_id': base_id,
+            'base_cuestionario': base_nombre,
+            'pregunta_id': pregunta_id,
+            'texto_pregunta': texto_pregunta,
+            'tipo_pregunta': tipo,
+            'respuesta_texto': texto,
+            'opciones_ids': opciones_ids,
+            'valor_original': valor,
+        }
+
+
+class _Echo:
+    """Pseudo-buffer para csv.writer: devuelve la línea en vez de guardarla."""
+
+    def write(self, value):
+        return value
+
+
+def _json_cell(value):
+    if value is None:
+        return ''
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, ensure_ascii=False)
+    return value
+
+
+def stream_csv(rows):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(EXPORT_COLUMNS)
+    for row in rows:
+        row['opciones_ids'] = ';'.join(str(pk) for pk in row['opciones_ids'])
+        yield writer.writerow([_json_cell(row[column]) for column in EXPORT_COLUMNS])
+
+
+def stream_ndjson(rows):
+    for row in rows:
+        yield json.dumps(row, ensure_ascii=False, default=str) + '\n'
+
+
+EXPORT_FORMATS = {
+    'csv': ('text/csv; charset=utf-8', stream_csv),
+    'ndjson': ('application/x-ndjson; charset=utf-8', stream_ndjson),
+}
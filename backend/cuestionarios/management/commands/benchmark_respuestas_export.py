@@ -0,0 +1,143 @@
+import time
+import tracemalloc
+import uuid
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from centros.models import Center
+from cuestionarios.exports import EXPORT_FORMATS, filter_respuestas, iter_export_rows
+from cuestionarios.models import BaseCuestionarios, Cuestionario, Opcion, Pregunta, Respuesta
+from cuestionarios.serializers import ReporteCuestionariosSerializer
+
+User = get_user_model()
+
+PREGUNTAS = 50
+TIPOS = ['multiple', 'checkbox', 'abierta', 'numero', 'dropdown']
+BATCH_SIZE = 5000
+
+
+class Command(BaseCommand):
+    help = (
+        'Genera respuestas sintéticas (1,000,000 por defecto) y mide la exportación '
+        'en streaming CSV/NDJSON: filas por segundo, bytes y memoria pico. Compara '
+        'con ReporteCuestionariosSerializer sobre una muestra. Todos los datos se '
+        'revierten al terminar.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=1_000_000)
+        parser.add_argument('--legacy-rows', type=int, default=5000,
+                            help='Respuestas para medir el reporte JSON actual (0 para omitirlo)')
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            center = Center.objects.create(name=f"Benchmark {uuid.uuid4()}")
+            start = time.perf_counter()
+            self._create_answers(options['rows'], center)
+            self.stdout.write(f"Respuestas sintéticas: {options['rows']} ({time.perf_counter() - start:.1f}s)")
+
+            respuestas = filter_respuestas({'center_id': str(center.pk)})
+            for formato, (_, stream) in EXPORT_FORMATS.items():
+                rows, size, elapsed = self._export(stream, respuestas, header=formato == 'csv')
+                self.stdout.write(
+                    f"{formato:<7} {rows} filas, {size / 1024 / 1024:.1f} MB, {elapsed:.1f}s "
+                    f"({rows / elapsed:,.0f} filas/s)"
+                )
+
+            self._report_memory(respuestas)
+            if options['legacy_rows']:
+                self._report_legacy(respuestas, options['legacy_rows'])
+            transaction.set_rollback(True)
+
+    def _create_answers(self, total, center):
+        base = BaseCuestionarios.objects.create(nombre=f"bench-{uuid.uuid4().hex[:20]}", estado_desbloqueo='Reg')
+        cuestionario = Cuestionario.objects.create(nombre=base.nombre, base_cuestionario=base, activo=True)
+        preguntas = Pregunta.objects.bulk_create([
+            Pregunta(cuestionario=cuestionario, texto=f"Pregunta {i}", tipo=TIPOS[i % len(TIPOS)])
+            for i in range(PREGUNTAS)
+        ])
+        opciones = Opcion.objects.bulk_create([
+            Opcion(pregunta=pregunta, texto=f"Opción {j} de {pregunta.texto}", valor=j)
+            for pregunta in preguntas
+            for j in range(4)
+        ])
+        opcion_ids = {}
+        for opcion in opciones:
+            opcion_ids.setdefault(opcion.pregunta_id, []).append(opcion.pk)
+
+        users = [
+            User(id=uuid.uuid4(), email=f"export{i}@benchmark.invalid", password='!', center=center)
+            for i in range((total + PREGUNTAS - 1) // PREGUNTAS)
+        ]
+        User.objects.bulk_create(users, batch_size=1000)
+
+        batch = []
+        created = 0
+        for user in users:
+            for i, pregunta in enumerate(preguntas):
+                if created >= total:
+                    break
+                batch.append(Respuesta(
+                    cuestionario=cuestionario,
+                    pregunta=pregunta,
+                    usuario=user,
+                    respuesta=self._answer(pregunta, opcion_ids, i + created),
+                ))
+                created += 1
+                if len(batch) >= BATCH_SIZE:
+                    Respuesta.objects.bulk_create(batch)
+                    batch = []
+        if batch:
+            Respuesta.objects.bulk_create(batch)
+
+    def _answer(self, pregunta, opcion_ids, seed):
+        if pregunta.tipo in ('multiple', 'dropdown'):
+            return str(seed % 4)
+        if pregunta.tipo == 'checkbox':
+            return opcion_ids[pregunta.pk][: 1 + seed % 3]
+        if pregunta.tipo == 'numero':
+            return str(seed % 100)
+        return f"Respuesta abierta {seed}"
+
+    def _export(self, stream, respuestas, header=False):
+        lines = size = 0
+        start = time.perf_counter()
+        for chunk in stream(iter_export_rows(respuestas)):
+            size += len(chunk.encode())
+            lines += 1
+        return lines - int(header), size, time.perf_counter() - start
+
+    def _report_memory(self, respuestas):
+        """Memoria pico de Python medida en varios puntos de la exportación CSV."""
+        total = respuestas.count()
+        checkpoints = {max(1, total // 10), max(1, total // 2), total}
+        tracemalloc.start()
+        try:
+            for index, _ in enumerate(EXPORT_FORMATS['csv'][1](iter_export_rows(respuestas))):
+                if index in checkpoints:
+                    _, peak = tracemalloc.get_traced_memory()
+                    self.stdout.write(f"memoria pico tras {index} filas: {peak / 1024 / 1024:.1f} MB")
+        finally:
+            tracemalloc.stop()
+
+    def _report_legacy(self, respuestas, limit):
+        ids = list(respuestas.order_by('id').values_list('id', flat=True)[:limit])
+        queryset = respuestas.filter(id__lte=ids[-1]).select_related(
+            'usuario', 'cuestionario', 'cuestionario__base_cuestionario', 'pregunta'
+        )
+
+        tracemalloc.start()
+        start = time.perf_counter()
+        try:
+            data = ReporteCuestionariosSerializer(queryset, many=True).data
+            elapsed = time.perf_counter() - start
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        rows = len(data)
+        self.stdout.write(
+            f"reporte JSON actual: {rows} filas en {elapsed:.1f}s ({rows / elapsed:,.0f} filas/s), "
+            f"memoria pico {peak / 1024 / 1024:.1f} MB (~{peak / max(rows, 1) / 1024:.1f} KB por fila)"
+        )
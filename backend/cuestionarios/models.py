@@ -1,4 +1,5 @@
 from django.db import models
+from api.tracking import FieldTrackerMixin
 from django.core.validators import MinValueValidator
 from django.utils.translation import gettext_lazy as _
 from api.models import CustomUser
@@ -362,7 +363,10 @@ class EstadoCuestionario(models.Model):
         return f"{self.usuario.email} - {self.cuestionario.nombre} - {self.estado}"
     
 
-class ImagenOpcion(models.Model):
+class ImagenOpcion(FieldTrackerMixin, models.Model):
+    # El archivo anterior se borra al reemplazarlo (api/files.py)
+    tracked_fields = ('imagen',)
+
     pregunta = models.ForeignKey(Pregunta, on_delete=models.CASCADE, related_name='imagenes')
     imagen = models.ImageField(upload_to='preguntas_con_imagenes/')
     descripcion = models.CharField(max_length=255, blank=True)
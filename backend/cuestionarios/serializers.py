@@ -8,7 +8,9 @@ from api.models import CustomUser
 #     RelacionDePuntuacionesYPercentiles,
 #     CalculoDeIndiceDeNecesidadesDeApoyo
 # )
+from django.db.models import Count, Prefetch
 from api.fields import SASImageField
+from api.fieldsets import SparseFieldsetsMixin, prefixed
 from .profile_fields import get_field_metadata, get_field_choices
 
 class DesbloqueoPreguntaSerializer(serializers.ModelSerializer):
@@ -48,7 +50,17 @@ class PreguntaImagenSerializer(serializers.ModelSerializer):
         model = ImagenOpcion
         fields = ['imagen']
 
-class PreguntaSerializer(serializers.ModelSerializer):
+# Relaciones que usan los serializers anidados de opciones y desbloqueos
+DESBLOQUEO_PREFETCH = ['pregunta_origen', 'opcion_desbloqueadora', 'pregunta_desbloqueada']
+OPCION_PREFETCH = ['desbloqueos', *prefixed('desbloqueos', DESBLOQUEO_PREFETCH)]
+PREGUNTA_PREFETCH = [
+    'opciones', *prefixed('opciones', OPCION_PREFETCH),
+    'imagenes',
+    'desbloqueos_recibidos', *prefixed('desbloqueos_recibidos', DESBLOQUEO_PREFETCH),
+]
+
+
+class PreguntaSerializer(SparseFieldsetsMixin, serializers.ModelSerializer):
     """Serializador para preguntas dentro de un cuestionario."""
     opciones = OpcionSerializer(many=True, read_only=True)
     imagenes = ImagenOpcionSerializer(many=True, read_only=True)
@@ -71,6 +83,11 @@ class PreguntaSerializer(serializers.ModelSerializer):
             'profile_field_config',
             'profile_field_metadata',
         ]
+        fieldset_prefetch_related = {
+            'opciones': ['opciones', *prefixed('opciones', OPCION_PREFETCH)],
+            'imagenes': ['imagenes'],
+            'desbloqueos_recibidos': ['desbloqueos_recibidos', *prefixed('desbloqueos_recibidos', DESBLOQUEO_PREFETCH)],
+        }
     
     def get_profile_field_metadata(self, obj):
         """Get metadata for profile field questions."""
@@ -83,7 +100,7 @@ class PreguntaSerializer(serializers.ModelSerializer):
                 return metadata
         return None
 
-class CuestionarioSerializer(serializers.ModelSerializer):
+class CuestionarioSerializer(SparseFieldsetsMixin, serializers.ModelSerializer):
     """Serializador para cuestionarios con preguntas asociadas."""
     pregunta_count = serializers.SerializerMethodField()
     preguntas = PreguntaSerializer(many=True, read_only=True)
@@ -99,8 +116,18 @@ class CuestionarioSerializer(serializers.ModelSerializer):
             'preguntas',
             'pregunta_count',
         ]
+        fieldset_prefetch_related = {
+            'preguntas': ['preguntas', *prefixed('preguntas', PREGUNTA_PREFETCH)],
+        }
+        fieldset_annotations = {
+            'pregunta_count': {'num_preguntas': Count('preguntas')},
+        }
 
     def get_pregunta_count(self, obj):
+        # Usa la anotación de optimize_queryset cuando está disponible
+        num_preguntas = getattr(obj, 'num_preguntas', None)
+        if num_preguntas is not None:
+            return num_preguntas
         return obj.preguntas.count()
 
 # class BaseCuestionariosSerializer(serializers.ModelSerializer):
@@ -117,7 +144,7 @@ class CuestionarioSerializer(serializers.ModelSerializer):
 #             'cuestionarios',
 #         ]
 
-class BaseCuestionariosSerializer(serializers.ModelSerializer):
+class BaseCuestionariosSerializer(SparseFieldsetsMixin, serializers.ModelSerializer):
     """Serializador para la base de cuestionarios."""
     cuestionarios = CuestionarioSerializer(many=True, read_only=True)
 
@@ -135,6 +162,14 @@ class BaseCuestionariosSerializer(serializers.ModelSerializer):
             'inicio',
             'cuestionarios',  # Lista de cuestionarios asociados
         ]
+        fieldset_prefetch_related = {
+            'cuestionarios': [
+                # El CuestionarioSerializer anidado usa la anotación para pregunta_count
+                Prefetch('cuestionarios', queryset=Cuestionario.objects.annotate(num_preguntas=Count('preguntas'))),
+                'cuestionarios__preguntas',
+                *prefixed('cuestionarios__preguntas', PREGUNTA_PREFETCH),
+            ],
+        }
 
     def get_responsable_nombre(self, obj):
         """Devuelve el nombre completo del responsable."""
@@ -1,3 +1,148 @@
+import csv
+import io
+import json
+import uuid
+from datetime import date, datetime, timezone as dt_timezone
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.http import StreamingHttpResponse
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from candidatos.models import Cycle, UserProfile
+from centros.models import Center
+
+from .exports import EXPORT_COLUMNS, filter_respuestas
+from .models import BaseCuestionarios, Cuestionario, EstadoCuestionario, Opcion, Pregunta, Respuesta
+from .serializers import BaseCuestionariosSerializer
+
+User = get_user_model()
+
+EXPORT_URL = '/api/cuestionarios/kiki/reportes/exportar/'
+
+
+class ExportarRespuestasTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.center = Center.objects.create(name='Centro A')
+        cls.other_center = Center.objects.create(name='Centro B')
+        cls.cycle = Cycle.objects.create(name='Ciclo', start_date=date(2026, 1, 1), center=cls.center)
+
+        base = BaseCuestionarios.objects.create(nombre='Entrevista')
+        cls.cuestionario = Cuestionario.objects.create(nombre='Entrevista v1', base_cuestionario=base, activo=True)
+        cls.other_cuestionario = Cuestionario.objects.create(nombre='Entrevista v2', base_cuestionario=base, version=2)
+        cls.multiple = Pregunta.objects.create(cuestionario=cls.cuestionario, texto='¿Turno?', tipo='multiple')
+        cls.checkbox = Pregunta.objects.create(cuestionario=cls.cuestionario, texto='¿Días?', tipo='checkbox')
+        cls.abierta = Pregunta.objects.create(cuestionario=cls.cuestionario, texto='Comentarios', tipo='abierta')
+        cls.turnos = [Opcion.objects.create(pregunta=cls.multiple, texto=texto) for texto in ('Mañana', 'Tarde')]
+        cls.dias = [Opcion.objects.create(pregunta=cls.checkbox, texto=texto) for texto in ('Lunes', 'Martes', 'Jueves')]
+
+        cls.ana = User.objects.create(id=uuid.uuid4(), email='ana@benchmark.invalid', password='!', center=cls.center)
+        UserProfile.objects.create(user=cls.ana, cycle=cls.cycle)
+        cls.luis = User.objects.create(id=uuid.uuid4(), email='luis@benchmark.invalid', password='!', center=cls.other_center)
+        for usuario, turno, dias, fecha in (
+            (cls.ana, '1', [cls.dias[0].pk, cls.dias[2].pk], datetime(2026, 3, 10, 12, tzinfo=dt_timezone.utc)),
+            (cls.luis, '0', [cls.dias[1].pk], datetime(2026, 5, 20, 12, tzinfo=dt_timezone.utc)),
+        ):
+            Respuesta.objects.create(cuestionario=cls.cuestionario, pregunta=cls.multiple, usuario=usuario, respuesta=turno)
+            Respuesta.objects.create(cuestionario=cls.cuestionario, pregunta=cls.checkbox, usuario=usuario, respuesta=dias)
+            Respuesta.objects.create(cuestionario=cls.cuestionario, pregunta=cls.abierta, usuario=usuario, respuesta='Sin comentarios')
+            EstadoCuestionario.objects.create(
+                usuario=usuario, cuestionario=cls.cuestionario, estado='finalizado', fecha_finalizado=fecha,
+            )
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user(email='analista@benchmark.invalid', password='x'))
+
+    def _users(self, **params):
+        return sorted({email for email in filter_respuestas(params).values_list('usuario__email', flat=True)})
+
+    def test_filters(self):
+        both = ['ana@benchmark.invalid', 'luis@benchmark.invalid']
+        self.assertEqual(self._users(), both)
+        self.assertEqual(self._users(cuestionario_id=str(self.cuestionario.pk)), both)
+        self.assertEqual(self._users(cuestionario_id=str(self.other_cuestionario.pk)), [])
+        self.assertEqual(self._users(center_id=str(self.center.pk)), ['ana@benchmark.invalid'])
+        self.assertEqual(self._users(cycle_id=str(self.cycle.pk)), ['ana@benchmark.invalid'])
+        self.assertEqual(self._users(usuario_id=str(self.luis.pk)), ['luis@benchmark.invalid'])
+        # Fecha en que se finalizó el cuestionario, con ambos extremos incluidos
+        self.assertEqual(self._users(fecha_desde='2026-03-10', fecha_hasta='2026-04-30'), ['ana@benchmark.invalid'])
+        self.assertEqual(self._users(fecha_desde='2026-05-20'), ['luis@benchmark.invalid'])
+        self.assertEqual(self._users(fecha_hasta='2026-03-09'), [])
+
+    def test_invalid_filters_are_rejected(self):
+        self.assertEqual(self.client.get(EXPORT_URL, {'fecha_desde': '10/03/2026'}).status_code, 400)
+        self.assertEqual(self.client.get(EXPORT_URL, {'center_id': 'abc'}).status_code, 400)
+        self.assertEqual(self.client.get(EXPORT_URL, {'formato': 'xlsx'}).status_code, 400)
+
+    def test_csv_is_streamed_with_question_and_option_text(self):
+        response = self.client.get(EXPORT_URL, {'center_id': self.center.pk})
+        self.assertIsInstance(response, StreamingHttpResponse)
+        self.assertEqual(response['Content-Type'], 'text/csv; charset=utf-8')
+        self.assertIn('attachment; filename="respuestas_', response['Content-Disposition'])
+        # Las filas, más las opciones de cada pregunta una sola vez
+        with self.assertNumQueries(3):
+            content = b''.join(response.streaming_content).decode()
+        rows = list(csv.DictReader(io.StringIO(content)))
+        self.assertEqual(list(rows[0]), EXPORT_COLUMNS)
+        by_question = {row['texto_pregunta']: row for row in rows}
+        self.assertEqual(set(by_question), {'¿Turno?', '¿Días?', 'Comentarios'})
+        self.assertEqual(by_question['¿Turno?']['respuesta_texto'], 'Tarde')
+        self.assertEqual(by_question['¿Turno?']['opciones_ids'], str(self.turnos[1].pk))
+        self.assertEqual(by_question['¿Días?']['respuesta_texto'], 'Lunes, Jueves')
+        self.assertEqual(by_question['¿Días?']['opciones_ids'], f"{self.dias[0].pk};{self.dias[2].pk}")
+        self.assertEqual(by_question['Comentarios']['respuesta_texto'], 'Sin comentarios')
+        self.assertTrue(all(row['cuestionario_nombre'] == 'Entrevista v1' for row in rows))
+        self.assertTrue(all(row['base_cuestionario'] == 'Entrevista' for row in rows))
+        self.assertTrue(all(row['usuario_email'] == 'ana@benchmark.invalid' for row in rows))
+
+    def test_ndjson_is_streamed_one_object_per_line(self):
+        response = self.client.get(EXPORT_URL, {'formato': 'ndjson'})
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson; charset=utf-8')
+        rows = [json.loads(line) for line in b''.join(response.streaming_content).decode().splitlines()]
+        self.assertEqual(len(rows), 6)
+        self.assertEqual([row['respuesta_id'] for row in rows], sorted(row['respuesta_id'] for row in rows))
+        luis_dias = next(row for row in rows if row['usuario_email'] == 'luis@benchmark.invalid' and row['pregunta_id'] == self.checkbox.pk)
+        self.assertEqual((luis_dias['respuesta_texto'], luis_dias['opciones_ids']), ('Martes', [self.dias[1].pk]))
+        self.assertEqual(luis_dias['valor_original'], [self.dias[1].pk])
+
+
+class BaseCuestionariosListTests(TestCase):
+    """El listado de bases con sus cuestionarios anidados no consulta por cuestionario."""
+
+    def _create(self, bases, cuestionarios):
+        for b in range(bases):
+            base = BaseCuestionarios.objects.create(nombre=f"Base {uuid.uuid4().hex[:8]}")
+            for c in range(cuestionarios):
+                cuestionario = Cuestionario.objects.create(nombre=f"{base.nombre} v{c}", base_cuestionario=base, version=c + 1)
+                for _ in range(c + 1):
+                    Pregunta.objects.create(cuestionario=cuestionario, texto='Pregunta', tipo='abierta')
+        return base
+
+    def _queries(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response.json(), len(queries)
+
+    def test_query_count_does_not_grow_with_cuestionarios(self):
+        self._create(1, 1)
+        _, few = self._queries('/api/cuestionarios/')
+        base = self._create(3, 4)
+        data, many = self._queries('/api/cuestionarios/')
+        self.assertEqual(many, few)
+        counts = {c['nombre']: c['pregunta_count'] for b in data for c in b['cuestionarios']}
+        self.assertEqual(counts[f"{base.nombre} v3"], 4)
+        self.assertTrue(all(count == len(c['preguntas']) for b in data for c in b['cuestionarios'] for count in [c['pregunta_count']]))
+
+        detail, _ = self._queries(f"/api/cuestionarios/base/{base.pk}/")
+        self.assertEqual([c['pregunta_count'] for c in detail['cuestionarios']], [1, 2, 3, 4])
 
-# Create your tests here.
+    def test_nested_pregunta_count_is_annotated(self):
+        base = self._create(1, 2)
+        base = BaseCuestionariosSerializer.optimize_queryset(BaseCuestionarios.objects.all()).get(pk=base.pk)
+        self.assertEqual([c.num_preguntas for c in base.cuestionarios.all()], [1, 2])
@@ -72,6 +72,7 @@ urlpatterns = [
     
     # Ruta para reportes de cuestionarios
     path('kiki/reportes/', views.ReporteCuestionariosView.as_view(), name='reporte_cuestionarios'),
+    path('kiki/reportes/exportar/', views.ExportarRespuestasView.as_view(), name='exportar_respuestas'),
     
     # Rutas para carga masiva de respuestas
     path('carga-masiva-respuestas/', views.CargaMasivaRespuestasView.as_view(), name='carga_masiva_respuestas'),
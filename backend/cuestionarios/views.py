@@ -14,9 +14,14 @@ from rest_framework import generics
 from django.http import JsonResponse
 from django.views.decorators.csrf import csrf_exempt
 from api.models import CustomUser
+from candidatos.cohorts import cohort_users, get_request_cohort
+from candidatos.models import UserProfile
+from api.conditional import conditional_get
+from .exports import EXPORT_FORMATS, filter_respuestas, iter_export_rows
 from datetime import datetime, date
+from django.utils import timezone
 import json
-from django.http import FileResponse, FileResponse, Http404
+from django.http import FileResponse, FileResponse, Http404, StreamingHttpResponse
 import unicodedata
 import re
 import traceback
@@ -36,6 +41,9 @@ from .models import (
     ImagenOpcion,
 )
 
+# Modelos de los que dependen las respuestas serializadas con sus preguntas
+RESPUESTA_DEPENDENCIES = (Respuesta, Pregunta, Opcion, DesbloqueoPregunta, Cuestionario, BaseCuestionarios)
+
 from .serializers import (
     CuestionarioSerializer, PreguntaSerializer, RespuestaSerializer, 
     OpcionSerializer, UsuarioRespuestaSerializer, DesbloqueoPreguntaSerializer, 
@@ -90,12 +98,14 @@ class CuestionarioSeleccion(APIView):
     def get(self, request, id=None):
         if id:
             # Handle request for a single item by ID
-            base_cuestionario = get_object_or_404(BaseCuestionarios, id=id)
-            serializer = BaseCuestionariosSerializer(base_cuestionario)
+            base_cuestionario = get_object_or_404(
+                BaseCuestionariosSerializer.optimize_queryset(BaseCuestionarios.objects.all(), request), id=id
+            )
+            serializer = BaseCuestionariosSerializer(base_cuestionario, context={'request': request})
             return Response(serializer.data, status=status.HTTP_200_OK)
         else:
             # Handle list request, with optional filtering
-            base_cuestionarios = BaseCuestionarios.objects.all()
+            base_cuestionarios = BaseCuestionariosSerializer.optimize_queryset(BaseCuestionarios.objects.all(), request)
             
             # Get the 'estado_desbloqueo' parameter from the URL query string
             estado_desbloqueo = request.query_params.get('estado_desbloqueo', None)
@@ -105,7 +115,7 @@ class CuestionarioSeleccion(APIView):
                 base_cuestionarios = base_cuestionarios.filter(estado_desbloqueo=estado_desbloqueo)
 
             # Serialize the filtered or complete queryset
-            serializer = BaseCuestionariosSerializer(base_cuestionarios, many=True)
+            serializer = BaseCuestionariosSerializer(base_cuestionarios, many=True, context={'request': request})
             return Response(serializer.data, status=status.HTTP_200_OK)
     
 class CrearNuevaVersionCuestionario(APIView):
@@ -223,8 +233,8 @@ class CuestionarioSeleccionVisualizacion(APIView):
     permission_classes = [permissions.AllowAny]
 
     def get(self, request, pk):
-        cuestionario = get_object_or_404(Cuestionario, pk=pk)
-        serializer = CuestionarioSerializer(cuestionario)
+        cuestionario = get_object_or_404(CuestionarioSerializer.optimize_queryset(Cuestionario.objects.all(), request), pk=pk)
+        serializer = CuestionarioSerializer(cuestionario, context={'request': request})
         return Response(serializer.data)
 
 class PreguntaSeleccion(APIView):
@@ -232,8 +242,8 @@ class PreguntaSeleccion(APIView):
     permission_classes = [permissions.AllowAny]
 
     def get(self, request):
-        preguntas = Pregunta.objects.all()
-        serializer = PreguntaSerializer(preguntas, many=True)
+        preguntas = PreguntaSerializer.optimize_queryset(Pregunta.objects.all(), request)
+        serializer = PreguntaSerializer(preguntas, many=True, context={'request': request})
         return Response(serializer.data)
     
 
@@ -1016,8 +1026,8 @@ class CrearCuestionario(APIView):
 
     def get(self, request):
         """Lista todos los cuestionarios"""
-        cuestionarios = Cuestionario.objects.all()
-        serializer = CuestionarioSerializer(cuestionarios, many=True)
+        cuestionarios = CuestionarioSerializer.optimize_queryset(Cuestionario.objects.all(), request)
+        serializer = CuestionarioSerializer(cuestionarios, many=True, context={'request': request})
         return Response(serializer.data, status=status.HTTP_200_OK)
 
     def post(self, request):
@@ -1067,8 +1077,8 @@ class PreguntasCuestionarioView(APIView):
     permission_classes = [permissions.AllowAny]
 
     def get(self, request, cuestionario_id):
-        preguntas = Pregunta.objects.filter(cuestionario_id=cuestionario_id)
-        serializer = PreguntaSerializer(preguntas, many=True)
+        preguntas = PreguntaSerializer.optimize_queryset(Pregunta.objects.filter(cuestionario_id=cuestionario_id), request)
+        serializer = PreguntaSerializer(preguntas, many=True, context={'request': request})
         return Response(serializer.data, status=status.HTTP_200_OK)
     
 class RespuestasUsuarioDesbloqueadasView(APIView):
@@ -1146,6 +1156,7 @@ class EditarCuestionarioView(generics.UpdateAPIView):
 class RespuestasUnlockedPathView(APIView):
     permission_classes = [permissions.IsAuthenticated]
 
+    @conditional_get(*RESPUESTA_DEPENDENCIES)
     def get(self, request):
         # Obtener los parámetros de consulta
         usuario_id = request.query_params.get('usuario_id')
@@ -1575,13 +1586,20 @@ class ReporteCuestionariosView(APIView):
     No requiere parámetros obligatorios, pero se pueden filtrar por:
     - usuario_id: Filtrar por usuario específico
     - cuestionario_id: Filtrar por cuestionario específico
+    - cohort: Token de una cohorte de candidatos guardada
     """
     permission_classes = [permissions.IsAuthenticated]
 
+    @conditional_get(
+        *RESPUESTA_DEPENDENCIES,
+        # Una cohorte por filtros cambia cuando cambian los perfiles
+        extra_models=lambda request: (CustomUser, UserProfile) if request.query_params.get('cohort') else (),
+    )
     def get(self, request):
         # Obtener parámetros opcionales
         usuario_id = request.query_params.get('usuario_id')
         cuestionario_id = request.query_params.get('cuestionario_id')
+        cohort = get_request_cohort(request)
 
         # Obtener todas las respuestas
         respuestas = Respuesta.objects.select_related(
@@ -1613,12 +1631,48 @@ class ReporteCuestionariosView(APIView):
                     status=status.HTTP_400_BAD_REQUEST
                 )
 
+        # Filtrar por los candidatos de la cohorte si está presente
+        if cohort is not None:
+            respuestas = respuestas.filter(usuario__in=cohort_users(cohort).values('pk'))
+
         # Serializar las respuestas
         serializer = ReporteCuestionariosSerializer(respuestas, many=True)
         
         return Response(serializer.data, status=status.HTTP_200_OK)
 
 
+class ExportarRespuestasView(APIView):
+    """
+    Exporta las respuestas de cuestionarios en streaming, para análisis de datos.
+
+    Parámetros:
+    - formato: 'csv' (por defecto) o 'ndjson'
+    - cuestionario_id, base_cuestionario_id, usuario_id, center_id, cycle_id
+    - fecha_desde / fecha_hasta (AAAA-MM-DD): fecha de finalización del cuestionario
+    - cohort: Token de una cohorte de candidatos guardada
+
+    Las filas se generan conforme se leen de la base de datos, así que la
+    memoria del servidor no crece con el tamaño del reporte.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request):
+        formato = request.query_params.get('formato', 'csv').lower()
+        if formato not in EXPORT_FORMATS:
+            return Response(
+                {"detail": f"Formato no soportado. Use uno de: {', '.join(EXPORT_FORMATS)}."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        respuestas = filter_respuestas(request.query_params, cohort=get_request_cohort(request))
+        content_type, stream = EXPORT_FORMATS[formato]
+
+        response = StreamingHttpResponse(stream(iter_export_rows(respuestas)), content_type=content_type)
+        nombre = f"respuestas_{timezone.now():%Y%m%d_%H%M}.{formato}"
+        response['Content-Disposition'] = f'attachment; filename="{nombre}"'
+        return response
+
+
 def procesar_respuesta_simplificada(respuesta, tipo):
     """Procesa la respuesta de forma simplificada para compatibilidad con Microsoft SQL Server"""
     
@@ -12,9 +12,20 @@ from .serializers import ImpedimentSerializer, TechnicalAidSerializer
 from .serializers import SISGroupSerializer, SISItemSerializer, SISAidSerializer, SISHelpSerializer, SISHelpFlatSerializer
 from .serializers import CHGroupSerializer, CHItemSerializer
 from collections import defaultdict
+from api.conditional import ConditionalGetMixin, conditional_get
 
+# Los catálogos cambian poco; cualquier cambio en ellos invalida los ETags de todos
+CATALOG_MODELS = (
+    DisabilityGroup, Disability, Impediment, TechnicalAid, TechnicalAidImpediment, TechnicalAidLink,
+    SISGroup, SISItem, SISAid, SISHelp, CHGroup, CHItem,
+)
 
-class DisabilityGroupViewSet(viewsets.ModelViewSet):
+
+class CatalogConditionalGetMixin(ConditionalGetMixin):
+    conditional_models = CATALOG_MODELS
+
+
+class DisabilityGroupViewSet(CatalogConditionalGetMixin, viewsets.ModelViewSet):
     queryset = DisabilityGroup.objects.all()
     serializer_class = DisabilityGroupSerializer
     permission_classes = [permissions.IsAuthenticated, IsAdminUserOrReadOnly]
@@ -24,7 +35,7 @@ class DisabilityGroupViewSet(viewsets.ModelViewSet):
         self.perform_destroy(instance)
         return Response(status=status.HTTP_204_NO_CONTENT)
 
-class DisabilityViewSet(viewsets.ModelViewSet):
+class DisabilityViewSet(CatalogConditionalGetMixin, viewsets.ModelViewSet):
     queryset = Disability.objects.all()
     serializer_class = DisabilitySerializer
     permission_classes = [permissions.IsAuthenticated, IsAdminUserOrReadOnly]
@@ -34,12 +45,12 @@ class DisabilityViewSet(viewsets.ModelViewSet):
         self.perform_destroy(instance)
         return Response(status=status.HTTP_204_NO_CONTENT)
     
-class ImpedimentViewSet(viewsets.ModelViewSet):
+class ImpedimentViewSet(CatalogConditionalGetMixin, viewsets.ModelViewSet):
     queryset = Impediment.objects.all()
     serializer_class = ImpedimentSerializer
     permission_classes = [permissions.IsAuthenticated, IsAdminUserOrReadOnly]
 
-class TechnicalAidViewSet(viewsets.ModelViewSet):
+class TechnicalAidViewSet(CatalogConditionalGetMixin, viewsets.ModelViewSet):
     queryset = TechnicalAid.objects.all()
     serializer_class = TechnicalAidSerializer
     permission_classes = [permissions.IsAuthenticated, IsAdminUserOrReadOnly]
@@ -173,7 +184,7 @@ class TechnicalAidViewSet(viewsets.ModelViewSet):
         self.perform_update(serializer)
         return Response(serializer.data)
     
-class SISGroupViewSet(viewsets.ModelViewSet):
+class SISGroupViewSet(CatalogConditionalGetMixin, viewsets.ModelViewSet):
     queryset = SISGroup.objects.all()
     serializer_class = SISGroupSerializer
     permission_classes = [permissions.IsAuthenticated, IsAdminUserOrReadOnly]
@@ -183,7 +194,7 @@ class SISGroupViewSet(viewsets.ModelViewSet):
         self.perform_destroy(instance)
         return Response(status=status.HTTP_204_NO_CONTENT)
 
-class SISItemViewSet(viewsets.ModelViewSet):
+class SISItemViewSet(CatalogConditionalGetMixin, viewsets.ModelViewSet):
     queryset = SISItem.objects.all()
     serializer_class = SISItemSerializer
     permission_classes = [permissions.IsAuthenticated, IsAdminUserOrReadOnly]
@@ -194,7 +205,7 @@ class SISItemViewSet(viewsets.ModelViewSet):
         return Response(status=status.HTTP_204_NO_CONTENT)
     
 
-class SISAidViewSet(viewsets.ModelViewSet):
+class SISAidViewSet(CatalogConditionalGetMixin, viewsets.ModelViewSet):
     queryset = SISAid.objects.select_related("item").prefetch_related("ayudas")
     permission_classes = [permissions.IsAuthenticated, IsAdminUserOrReadOnly]
     serializer_class = SISAidSerializer
@@ -229,6 +240,7 @@ class SISAidViewSet(viewsets.ModelViewSet):
         return Response(serializer.data, status=200)
     
     @action(detail=False, methods=['get'], url_path='ayudas-flat')
+    @conditional_get(*CATALOG_MODELS)
     def list_ayudas_flat(self, request):
         """
         GET /api/sis-aids/ayudas-flat/?items=1,2
@@ -251,7 +263,7 @@ class SISAidViewSet(viewsets.ModelViewSet):
         return Response(ser.data, status=200)
 
 # ---- ReadOnly viewsets for TechnicalAid and CHItem ----
-class TechnicalAidViewReadOnly(viewsets.ReadOnlyModelViewSet):
+class TechnicalAidViewReadOnly(CatalogConditionalGetMixin, viewsets.ReadOnlyModelViewSet):
     queryset = TechnicalAid.objects.prefetch_related(
         "technicalaidimpediment_set__impediment", "links"
     )
@@ -260,13 +272,13 @@ class TechnicalAidViewReadOnly(viewsets.ReadOnlyModelViewSet):
 
 
 
-class CHItemViewReadOnly(viewsets.ReadOnlyModelViewSet):
+class CHItemViewReadOnly(CatalogConditionalGetMixin, viewsets.ReadOnlyModelViewSet):
     queryset = CHItem.objects.select_related("group")
     serializer_class = CHItemSerializer
     permission_classes = [permissions.IsAuthenticated, IsAdminUserOrReadOnly]
 
 
-class SISHelpViewSet(viewsets.ModelViewSet):
+class SISHelpViewSet(CatalogConditionalGetMixin, viewsets.ModelViewSet):
     """
     List, retrieve, create, update & delete SISHelp objects directly.
     """
@@ -281,6 +293,7 @@ class SISHelpViewSet(viewsets.ModelViewSet):
 class SISAidViewCOMPLETOSet(viewsets.ViewSet):
     permission_classes = [permissions.IsAuthenticated, IsAdminUserOrReadOnly]
 
+    @conditional_get(*CATALOG_MODELS)
     def list(self, request):
         item_ids = request.query_params.get("items")
         queryset = SISAid.objects.select_related("item").prefetch_related("ayudas")
@@ -303,7 +316,7 @@ class SISAidViewCOMPLETOSet(viewsets.ViewSet):
     
 #######
     
-class CHGroupViewSet(viewsets.ModelViewSet):
+class CHGroupViewSet(CatalogConditionalGetMixin, viewsets.ModelViewSet):
     queryset = CHGroup.objects.all()
     serializer_class = CHGroupSerializer
     permission_classes = [permissions.IsAuthenticated, IsAdminUserOrReadOnly]
@@ -313,7 +326,7 @@ class CHGroupViewSet(viewsets.ModelViewSet):
         self.perform_destroy(instance)
         return Response(status=status.HTTP_204_NO_CONTENT)
 
-class CHItemViewSet(viewsets.ModelViewSet):
+class CHItemViewSet(CatalogConditionalGetMixin, viewsets.ModelViewSet):
     queryset = CHItem.objects.all()
     serializer_class = CHItemSerializer
     permission_classes = [permissions.IsAuthenticated, IsAdminUserOrReadOnly]
@@ -0,0 +1,31 @@
+from django.conf import settings
+from django.middleware.gzip import GZipMiddleware
+
+# Tipos de contenido que vale la pena comprimir (JSON y texto se reducen 80-95%)
+COMPRESSIBLE_CONTENT_TYPES = (
+    'application/json',
+    'application/x-ndjson',
+    'text/csv',
+    'text/plain',
+    'text/html',
+)
+
+
+class JSONGZipMiddleware(GZipMiddleware):
+    """
+    GZip limitado a respuestas JSON/texto. A diferencia de GZipMiddleware no
+    intenta comprimir PDFs, imágenes ni Excel (ya vienen comprimidos y solo
+    gastaría CPU) ni respuestas pequeñas, donde el ahorro no compensa.
+    El tamaño mínimo se configura con JSON_GZIP_MIN_LENGTH (bytes).
+    """
+
+    def process_response(self, request, response):
+        content_type = response.get('Content-Type', '').split(';')[0].strip().lower()
+        if content_type not in COMPRESSIBLE_CONTENT_TYPES:
+            return response
+
+        min_length = getattr(settings, 'JSON_GZIP_MIN_LENGTH', 1024)
+        if not response.streaming and len(response.content) < min_length:
+            return response
+
+        return super().process_response(request, response)
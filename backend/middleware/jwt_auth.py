@@ -1,15 +1,20 @@
 from urllib.parse import parse_qs
 from channels.auth import AuthMiddlewareStack
+from asgiref.sync import sync_to_async
 from channels.db import database_sync_to_async
-from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.contrib.auth.models import AnonymousUser, Group
 from django.db import close_old_connections
 import jwt
 import logging
-import time
 from urllib.parse import unquote
 from django_auth_adfs.rest_framework import AdfsAccessTokenAuthentication
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+from rest_framework_simplejwt.tokens import AccessToken
+
+from api import token_cache
+from api.roles import has_role
 
 logger = logging.getLogger(__name__)
 User = get_user_model()
@@ -67,17 +72,8 @@ class JWTAuthMiddleware:
             if token:
                 logger.debug(f"Attempting authentication with token (first 10 chars): {token[:10] if len(token) > 10 else token}...")
                 
-                # Determine token type by inspection
-                token_type = await self.identify_token_type(token)
-                logger.debug(f"Identified token type: {token_type}")
-                
-                if token_type == 'adfs':
-                    # Try ADFS Authentication
-                    user = await self.authenticate_adfs(token)
-                else:
-                    # Try JWT Authentication
-                    user = await self.authenticate_jwt(token)
-                    
+                user = await self.authenticate_token(token)
+
                 logger.debug(f"Final auth result: {user.is_authenticated}, User: {user.username if user.is_authenticated else 'Anonymous'}")
             else:
                 logger.debug("No authentication token found in request")
@@ -105,75 +101,46 @@ class JWTAuthMiddleware:
         # Continue processing the connection
         return await self.app(scope, receive, send)
 
-    @database_sync_to_async
-    def identify_token_type(self, token):
-        """Identify the token as either ADFS or JWT by examining its structure."""
-        try:
-            # Try to decode without verification first to check structure
-            decoded = jwt.decode(token, options={"verify_signature": False})
-            
-            # Check for ADFS-specific claims
-            if 'iss' in decoded and decoded['iss'].startswith('https://login.microsoftonline.com/'):
-                logger.debug(f"Token identified as ADFS token based on issuer: {decoded.get('iss')}")
-                return 'adfs'
-            
-            # Check if token contains user_id claim which would be our JWT token
-            if 'user_id' in decoded:
-                logger.debug("Token identified as app JWT token (contains user_id)")
-                return 'jwt'
-                
-            # If we're not sure, default to ADFS for broader compatibility
-            logger.debug("Token type uncertain, defaulting to ADFS")
-            return 'adfs'
-        except Exception as e:
-            logger.debug(f"Error identifying token type: {str(e)}")
-            # Default to JWT if we can't identify it
-            return 'jwt'
+    async def authenticate_token(self, token):
+        """Usuario del token: de la caché de tokens validados o validándolo según su tipo."""
+        # Token validado antes (api/token_cache.py): solo se carga el usuario
+        user = await database_sync_to_async(token_cache.cached_user)(token)
+        if user is not None:
+            return user
+
+        # Determine token type by inspection (sin verificar, sin base de datos)
+        token_type = token_cache.token_kind(token)
+        logger.debug(f"Identified token type: {token_type}")
+
+        if token_type == token_cache.ADFS:
+            # Try ADFS Authentication
+            return await self.authenticate_adfs(token)
+        # Try JWT Authentication
+        return await self.authenticate_jwt(token)
 
     async def authenticate_jwt(self, token):
-        """Authenticate user based on JWT."""
+        """
+        Authenticate user based on a simplejwt access token. AccessToken
+        verifies signature, expiration and `token_type`, so a refresh token
+        is rejected here as in MultipleAuthAuthentication.
+        """
         try:
             logger.debug("Attempting JWT token authentication")
-            # Use a more permissive approach with error handling
-            data = None
-            try:
-                # First try with our app's SECRET_KEY
-                data = jwt.decode(token, settings.SECRET_KEY, algorithms=["HS256"])
-                logger.debug("Token decoded successfully with SECRET_KEY")
-            except jwt.InvalidAlgorithmError:
-                # If algorithm mismatch, try to identify the correct algorithm
-                try:
-                    # Peek at the header to see what algorithm is specified
-                    header = jwt.get_unverified_header(token)
-                    alg = header.get('alg', 'HS256')
-                    logger.debug(f"Token uses algorithm: {alg}")
-                    
-                    # Try with the detected algorithm
-                    data = jwt.decode(token, settings.SECRET_KEY, algorithms=[alg])
-                    logger.debug(f"Token decoded successfully with algorithm {alg}")
-                except Exception as inner_e:
-                    logger.debug(f"Failed to decode with detected algorithm: {str(inner_e)}")
-                    return AnonymousUser()
-            except Exception as e:
-                logger.debug(f"Failed to decode JWT token: {str(e)}")
-                return AnonymousUser()
-                
-            # Check if token is expired
-            if data and 'exp' in data and data['exp'] < time.time():
-                logger.debug(f"JWT token expired")
-                return AnonymousUser()
-                
-            if data and 'user_id' in data:
-                user = await self.get_user(data['user_id'])
-                logger.debug(f"JWT auth result for user_id {data['user_id']}: {user.is_authenticated}")
-                return user
-            else:
-                logger.debug("No user_id found in JWT token")
-                return AnonymousUser()
-        except Exception as e:
+            data = AccessToken(token).payload
+        except TokenError as e:
             logger.debug(f"JWT token validation failed: {str(e)}")
             return AnonymousUser()
 
+        user_id = data.get(jwt_settings.USER_ID_CLAIM)
+        if user_id is None:
+            logger.debug("No user_id found in JWT token")
+            return AnonymousUser()
+        user = await self.get_user(user_id)
+        logger.debug(f"JWT auth result for user_id {user_id}: {user.is_authenticated}")
+        if user.is_authenticated:
+            await sync_to_async(token_cache.remember)(token, user, dict(data), token_cache.JWT)
+        return user
+
     @database_sync_to_async
     def authenticate_adfs(self, token):
         """Authenticate user based on ADFS token and ensure user is in 'personal' group."""
@@ -214,6 +181,9 @@ class JWTAuthMiddleware:
                 
                 # Ensure the user is in the 'personal' group
                 self.add_to_personal_group(user)
+                token_cache.remember(
+                    token, user, jwt.decode(token, options={"verify_signature": False}), token_cache.ADFS,
+                )
                 return user
             except Exception as auth_ex:
                 logger.debug(f"ADFS authentication failed: {str(auth_ex)}")
@@ -223,12 +193,11 @@ class JWTAuthMiddleware:
             logger.error(f"ADFS Authentication error: {str(e)}", exc_info=True)
             return AnonymousUser()
     
-    @database_sync_to_async
     def add_to_personal_group(self, user):
         """Add the user to the 'personal' group."""
         try:
-            personal_group, _ = Group.objects.get_or_create(name='personal')
-            if personal_group not in user.groups.all():
+            if not has_role(user, 'personal'):
+                personal_group, _ = Group.objects.get_or_create(name='personal')
                 user.groups.add(personal_group)
                 user.save(update_fields=['last_login'])
                 logger.debug(f"User {user.username} added to 'personal' group")
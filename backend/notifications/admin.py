@@ -17,7 +17,12 @@ class BimonthlyCommentReminderAdmin(admin.ModelAdmin):
     is_overdue.boolean = True
     is_overdue.short_description = 'Overdue'
 
+class NotificationPruneRunAdmin(admin.ModelAdmin):
+    list_display = ('started_at', 'duration_seconds', 'read_deleted', 'unread_deleted', 'chunks', 'complete')
+    readonly_fields = [f.name for f in NotificationPruneRun._meta.fields]
+
 # Register your models here.
 admin.site.register(Notification)
 admin.site.register(Settings, SettingsAdmin)
-admin.site.register(BimonthlyCommentReminder, BimonthlyCommentReminderAdmin)
\ No newline at end of file
+admin.site.register(BimonthlyCommentReminder, BimonthlyCommentReminderAdmin)
+admin.site.register(NotificationPruneRun, NotificationPruneRunAdmin)
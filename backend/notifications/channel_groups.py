@@ -0,0 +1,74 @@
+"""
+Grupos de channels para notificaciones.
+
+Además de su grupo personal, cada conexión de NotificationConsumer se une a
+los grupos de su centro, de sus roles (grupos de Django y staff) y de cada
+combinación centro–rol. Un envío dirigido a "todo el personal del centro X"
+sale entonces con un solo group_send en lugar de uno por usuario.
+
+Cuando cambian el centro, is_staff o los grupos de un usuario, se envía un
+evento `refresh_groups` a su grupo personal y cada conexión abierta vuelve a
+calcular sus grupos (api/signals.py).
+"""
+import logging
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Group
+from django.db import transaction
+
+logger = logging.getLogger(__name__)
+
+STAFF_ROLE = 'staff'
+
+
+def user_group_name(user_id):
+    """Grupo de channels de las notificaciones de un usuario."""
+    return f"user_{user_id}_notifications"
+
+
+def center_group_name(center_id):
+    return f"center_{center_id}_notifications"
+
+
+def role_group_name(role):
+    """`role` es el ID de un Group de Django o STAFF_ROLE."""
+    return f"role_{role}_notifications"
+
+
+def center_role_group_name(center_id, role):
+    return f"center_{center_id}_role_{role}_notifications"
+
+
+def user_broadcast_groups(user_id):
+    """Grupos de difusión (sin el personal) a los que pertenece el usuario."""
+    User = get_user_model()
+    row = User.objects.filter(pk=user_id).values_list('center_id', 'is_staff').first()
+    if row is None:
+        return set()
+    center_id, is_staff = row
+    roles = list(Group.objects.filter(user__pk=user_id).values_list('id', flat=True))
+    if is_staff:
+        roles.append(STAFF_ROLE)
+
+    groups = {role_group_name(role) for role in roles}
+    if center_id is not None:
+        groups.add(center_group_name(center_id))
+        groups.update(center_role_group_name(center_id, role) for role in roles)
+    return groups
+
+
+def _send_refresh(user_id):
+    channel_layer = get_channel_layer()
+    if channel_layer is None:
+        return
+    try:
+        async_to_sync(channel_layer.group_send)(user_group_name(user_id), {'type': 'refresh_groups'})
+    except Exception as e:
+        logger.info(f"No se pudo avisar el cambio de grupos a user_{user_id}: {e}")
+
+
+def request_group_refresh(user_id):
+    """Pide a las conexiones del usuario recalcular sus grupos al confirmar la transacción."""
+    transaction.on_commit(lambda: _send_refresh(user_id))
@@ -1,7 +1,50 @@
 import json
+from datetime import timedelta
+from urllib.parse import parse_qs
+
 from channels.generic.websocket import AsyncWebsocketConsumer
 from channels.exceptions import DenyConnection
+from channels.db import database_sync_to_async
 from asgiref.sync import sync_to_async
+from django.core.cache import cache
+from django.utils import timezone
+
+from .channel_groups import user_broadcast_groups, user_group_name
+from .counters import unread_count
+from .models import Notification
+from .services.fanout import broadcast_recipient_key
+
+# Reenvío al reconectar: notificaciones por consulta y máximo por conexión
+REPLAY_BATCH_SIZE = 100
+REPLAY_LIMIT = 500
+# Una notificación puede confirmarse después de otra con ID mayor; las de
+# este margen se reenvían aunque su ID no pase el cursor (el cliente descarta
+# las repetidas por ID)
+REPLAY_GRACE = timedelta(seconds=30)
+
+REPLAY_FIELDS = ('id', 'message', 'link', 'type', 'is_read', 'created_at')
+
+
+def _replay_query(user_id, after, limit):
+    """Notificaciones del usuario con ID mayor que `after`, en orden de ID."""
+    return list(
+        Notification.objects.filter(user_id=user_id, id__gt=after)
+        .order_by('id').values(*REPLAY_FIELDS)[:limit]
+    )
+
+
+def _replay_grace(user_id, after):
+    """Notificaciones recientes con ID menor o igual que `after`."""
+    return list(
+        Notification.objects.filter(user_id=user_id, id__lte=after, created_at__gte=timezone.now() - REPLAY_GRACE)
+        .order_by('id').values(*REPLAY_FIELDS)
+    )
+
+
+def _batch_notification_id(batch, user_id):
+    """ID de la notificación del usuario en un envío masivo, o None."""
+    return Notification.objects.filter(batch=batch, user_id=user_id).values_list('id', flat=True).first()
+
 
 class NotificationConsumer(AsyncWebsocketConsumer):
     async def connect(self):
@@ -14,10 +57,22 @@ class NotificationConsumer(AsyncWebsocketConsumer):
             raise DenyConnection("User not authenticated")
 
         # now safe to grab user.id
-        self.group_name = f"user_{user.id}_notifications"
+        self.user_id = user.id
+        self.group_name = user_group_name(user.id)
         await self.channel_layer.group_add(self.group_name, self.channel_name)
+
+        # Grupos de difusión: centro, roles y centro–rol (channel_groups.py)
+        self.broadcast_groups = set()
+        await self.refresh_groups({})
         await self.accept()
 
+        # El cliente que reconecta indica el último ID que vio (`?after=`);
+        # el grupo ya está unido, así que lo que llegue durante el reenvío
+        # no se pierde
+        after = parse_qs(self.scope.get('query_string', b'').decode()).get('after')
+        if after and after[0].isdigit():
+            await self.replay(int(after[0]))
+
         # if you really want logging, only print primitives:
         print(f"WebSocket connected for user id: {user.id}")
 
@@ -26,15 +81,104 @@ class NotificationConsumer(AsyncWebsocketConsumer):
         is_auth = await sync_to_async(lambda: user.is_authenticated)()
         if is_auth:
             await self.channel_layer.group_discard(self.group_name, self.channel_name)
+            for group in getattr(self, 'broadcast_groups', ()):
+                await self.channel_layer.group_discard(group, self.channel_name)
 
         print(f"WebSocket disconnected for user id: {user.id}")
 
+    async def refresh_groups(self, event):
+        """Ajusta los grupos de difusión al centro, roles y staff actuales del usuario."""
+        wanted = await database_sync_to_async(user_broadcast_groups)(self.user_id)
+        for group in wanted - self.broadcast_groups:
+            await self.channel_layer.group_add(group, self.channel_name)
+        for group in self.broadcast_groups - wanted:
+            await self.channel_layer.group_discard(group, self.channel_name)
+        self.broadcast_groups = wanted
+
+    async def replay(self, after):
+        """
+        Reenvía en bloques las notificaciones posteriores al cursor `after`.
+        Si faltan más de REPLAY_LIMIT se pide al cliente recargar la lista
+        (`resync`) en lugar de reenviarlas todas.
+        """
+        for notification in await database_sync_to_async(_replay_grace)(self.user_id, after):
+            await self._send_replayed(notification)
+
+        cursor, sent = after, 0
+        while sent < REPLAY_LIMIT:
+            batch = await database_sync_to_async(_replay_query)(
+                self.user_id, cursor, min(REPLAY_BATCH_SIZE, REPLAY_LIMIT - sent)
+            )
+            for notification in batch:
+                await self._send_replayed(notification)
+            if batch:
+                cursor = batch[-1]['id']
+                sent += len(batch)
+            if len(batch) < REPLAY_BATCH_SIZE:
+                break
+        else:
+            pending = await database_sync_to_async(
+                lambda: Notification.objects.filter(user_id=self.user_id, id__gt=cursor).exists()
+            )()
+            if pending:
+                await self.send(text_data=json.dumps({
+                    'type': 'resync',
+                    'unread_count': await database_sync_to_async(unread_count)(self.user_id),
+                }))
+                return
+
+        await self.send(text_data=json.dumps({
+            'type': 'replay_done',
+            'cursor': cursor,
+            'replayed': sent,
+            'unread_count': await database_sync_to_async(unread_count)(self.user_id),
+        }))
+
+    async def _send_replayed(self, notification):
+        await self.send_notification({
+            'notification': {**notification, 'created_at': notification['created_at'].isoformat()},
+            'replayed': True,
+        })
+
     async def send_notification(self, event):
         notification = event['notification']
         await self.send(text_data=json.dumps({
             'type': 'notification',
             'id': notification['id'],
+            # Cursor del flujo: el ID es creciente; el cliente lo envía como
+            # `?after=` al reconectar
+            'cursor': notification['id'],
             'message': notification['message'],
             'link': notification['link'],
             'created_at': notification['created_at'],
+            'is_read': notification.get('is_read', False),
+            'replayed': event.get('replayed', False),
+        }))
+
+    async def send_broadcast(self, event):
+        """
+        Difusión a un grupo: solo se envía si el usuario tiene una
+        notificación en ese envío, y con el ID de la suya. El ID se lee de la
+        caché (fanout._cache_recipients); si no está (caché caída, llave
+        expulsada o miembro del grupo que no es destinatario) se busca en la
+        base de datos con el índice (batch, user).
+        """
+        notification_id = None
+        if event.get('cached', False):
+            try:
+                notification_id = await cache.aget(broadcast_recipient_key(event['batch'], self.user_id))
+            except Exception:
+                pass
+        if notification_id is None:
+            notification_id = await database_sync_to_async(_batch_notification_id)(event['batch'], self.user_id)
+        if notification_id is None:
+            return
+        await self.send_notification({'notification': {**event['notification'], 'id': notification_id}})
+
+    async def unread_count(self, event):
+        """Cambio del contador de no leídas (notifications/counters.py)."""
+        await self.send(text_data=json.dumps({
+            'type': 'unread_count',
+            'delta': event['delta'],
+            'count': event['count'],
         }))
@@ -0,0 +1,140 @@
+"""
+Contadores de notificaciones sin leer por usuario.
+
+El contador vive en la caché (Redis en producción) y se ajusta con INCRBY
+al crear, leer o descartar notificaciones, de modo que la campana de la
+barra superior no cuenta renglones en cada consulta. Si la llave no existe
+(caché reiniciada o expirada) se reconstruye con un COUNT y solo entonces;
+los ajustes a una llave inexistente se ignoran porque el COUNT siguiente ya
+los incluye. La llave expira cada UNREAD_TTL para corregir cualquier desfase
+entre una reconstrucción y un ajuste concurrente.
+
+Cada ajuste se avisa por websocket al grupo personal del usuario con el
+delta y el valor nuevo (NotificationConsumer.unread_count).
+"""
+import logging
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.core.cache import cache
+from django.db import transaction
+
+from notifications.channel_groups import user_group_name
+from notifications.models import Notification
+
+logger = logging.getLogger(__name__)
+
+UNREAD_KEY = 'notifications:unread:{}'
+UNREAD_TTL = 60 * 60 * 6
+# Llaves por llamada al script de Redis
+ADJUST_CHUNK_SIZE = 1000
+
+# INCRBY solo sobre las llaves que existen; devuelve el valor nuevo o -1
+_ADJUST_SCRIPT = """
+local result = {}
+for i, key in ipairs(KEYS) do
+    if redis.call('EXISTS', key) == 1 then
+        result[i] = redis.call('INCRBY', key, ARGV[1])
+    else
+        result[i] = -1
+    end
+end
+return result
+"""
+
+
+def _key(user_id):
+    return UNREAD_KEY.format(user_id)
+
+
+def unread_count(user_id):
+    """Notificaciones sin leer del usuario; un COUNT solo si no está en caché."""
+    key = _key(user_id)
+    count = cache.get(key)
+    if count is None:
+        count = Notification.objects.filter(user_id=user_id, is_read=False).count()
+        cache.add(key, count, UNREAD_TTL)
+        count = cache.get(key, count)
+    return count
+
+
+def _redis_client():
+    """Cliente de Redis de django_redis, o None con otros backends de caché."""
+    client = getattr(cache, 'client', None)
+    if client is None or not hasattr(client, 'get_client'):
+        return None
+    return client.get_client(write=True)
+
+
+def _incr(user_ids, delta):
+    """Aplica el delta y devuelve {user_id: valor nuevo} de las llaves existentes."""
+    redis = _redis_client()
+    if redis is None:
+        counts = {}
+        for user_id in user_ids:
+            try:
+                counts[user_id] = cache.incr(_key(user_id), delta)
+            except ValueError:
+                pass
+        return counts
+
+    script = redis.register_script(_ADJUST_SCRIPT)
+    counts = {}
+    for start in range(0, len(user_ids), ADJUST_CHUNK_SIZE):
+        chunk = user_ids[start:start + ADJUST_CHUNK_SIZE]
+        values = script(keys=[cache.make_key(_key(user_id)) for user_id in chunk], args=[delta])
+        counts.update((user_id, int(value)) for user_id, value in zip(chunk, values) if int(value) >= 0)
+    return counts
+
+
+def _push(counts, delta):
+    channel_layer = get_channel_layer()
+    if channel_layer is None:
+        return
+    for user_id, count in counts.items():
+        try:
+            async_to_sync(channel_layer.group_send)(
+                user_group_name(user_id),
+                {'type': 'unread_count', 'delta': delta, 'count': count},
+            )
+        except Exception as e:
+            logger.info(f"No se pudo avisar el contador a user_{user_id}: {e}")
+
+
+def adjust_unread(user_ids, delta, push=False):
+    """
+    Suma `delta` al contador de cada usuario al confirmarse la transacción.
+    Con `push` se avisa el valor nuevo por websocket (pensado para las
+    lecturas de un usuario); los avisos de notificación nueva no lo
+    necesitan porque el cliente ya suma uno.
+    """
+    user_ids = list(user_ids)
+    if not user_ids or not delta:
+        return
+
+    def apply():
+        try:
+            counts = _incr(user_ids, delta)
+        except Exception as e:
+            # Sin caché el contador se reconstruye en la siguiente lectura
+            logger.warning(f"No se pudo ajustar el contador de no leídas: {e}")
+            try:
+                cache.delete_many([_key(user_id) for user_id in user_ids])
+            except Exception:
+                pass
+            return
+        if push:
+            # Las llaves que no existían se reconstruyen para avisar el valor
+            for user_id in user_ids:
+                if user_id not in counts:
+                    counts[user_id] = unread_count(user_id)
+            _push(counts, delta)
+
+    transaction.on_commit(apply)
+
+
+def invalidate_unread(user_ids):
+    """Borra los contadores; la siguiente lectura los reconstruye con un COUNT."""
+    keys = [_key(user_id) for user_id in set(user_ids)]
+    if keys:
+        transaction.on_commit(lambda: cache.delete_many(keys))
@@ -0,0 +1,157 @@
+import asyncio
+import time
+import uuid
+
+from asgiref.sync import async_to_sync
+from channels.db import database_sync_to_async
+from channels.layers import get_channel_layer
+from channels.testing import WebsocketCommunicator
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Group
+from django.core.management.base import BaseCommand, CommandError
+from django.test import override_settings
+
+from centros.models import Center
+from notifications.channel_groups import center_group_name, center_role_group_name, role_group_name
+from notifications.consumers import NotificationConsumer
+from notifications.models import Notification, Settings
+from notifications.services import fanout
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = (
+        'Conecta consumidores de notificaciones sintéticos sobre la capa de channels '
+        'en memoria y compara la difusión a un grupo de centro/rol (un group_send) '
+        'contra el envío por usuario. Verifica que cada destinatario reciba el ID de '
+        'su notificación, que los demás no reciban nada y que los grupos se ajusten '
+        'al cambiar el centro o los roles. Los datos se borran al terminar (los '
+        'consumidores usan sus propias conexiones, así que no se puede revertir una '
+        'transacción).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--connections', type=int, default=200)
+
+    def handle(self, *args, **options):
+        tag = uuid.uuid4().hex[:8]
+        layers = {'default': {'BACKEND': 'channels.layers.InMemoryChannelLayer', 'CONFIG': {'capacity': 10_000}}}
+        with override_settings(CHANNEL_LAYERS=layers):
+            try:
+                failures = async_to_sync(self._run)(options['connections'], tag)
+            finally:
+                User.objects.filter(email__endswith=f"-{tag}@benchmark.invalid").delete()
+                Center.objects.filter(name__startswith=f"bench-{tag}").delete()
+                Group.objects.filter(name=f"bench-{tag}").delete()
+        if failures:
+            raise CommandError('; '.join(failures))
+        self.stdout.write(self.style.SUCCESS('Difusión por grupos correcta'))
+
+    async def _run(self, count, tag):
+        center, other_center, role, users = await database_sync_to_async(self._create_data)(count, tag)
+        layer = get_channel_layer()
+        sends = [0]
+        original_group_send = layer.group_send
+
+        async def counting_group_send(group, message):
+            sends[0] += 1
+            return await original_group_send(group, message)
+
+        layer.group_send = counting_group_send
+        communicators = {}
+        try:
+            for user in users:
+                communicator = WebsocketCommunicator(NotificationConsumer.as_asgi(), '/ws/notifications/')
+                communicator.scope['user'] = user
+                connected, _ = await communicator.connect()
+                if not connected:
+                    return [f"no se pudo conectar {user.email}"]
+                communicators[user.pk] = communicator
+
+            failures = []
+            recipients = User.objects.filter(center=center, groups=role)
+            for mode, group in (
+                ('por usuario', None),
+                ('grupo centro-rol', center_role_group_name(center.id, role.id)),
+                ('grupo centro', center_group_name(center.id)),
+            ):
+                received, expected, elapsed = await self._broadcast(communicators, sends, recipients, group)
+                self.stdout.write(
+                    f"{mode:<17} {len(expected):>5} notificaciones, {sends[0]:>5} group_send, "
+                    f"{len(received):>5} recibidas en {elapsed * 1000:.0f} ms"
+                )
+                if received != expected:
+                    failures.append(f"{mode}: {len(received)} recibidas, {len(expected)} esperadas o IDs distintos")
+
+            # Cambio de centro y de roles: las conexiones abiertas ajustan sus grupos
+            moved, demoted = await database_sync_to_async(self._change_memberships)(center, other_center, role)
+            await asyncio.sleep(0.2)
+            checks = (
+                ('cambio de centro (sale)', User.objects.filter(pk=moved.pk), center_group_name(center.id), False),
+                ('cambio de centro (entra)', User.objects.filter(pk=moved.pk), center_group_name(other_center.id), True),
+                ('quitar rol', User.objects.filter(pk=demoted.pk), role_group_name(role.id), False),
+            )
+            for label, target, group, should_receive in checks:
+                received, expected, _ = await self._broadcast(communicators, sends, target, group)
+                if bool(received) != should_receive or (should_receive and received != expected):
+                    failures.append(f"{label}: la conexión no actualizó sus grupos")
+            return failures
+        finally:
+            layer.group_send = original_group_send
+            for communicator in communicators.values():
+                await communicator.disconnect()
+
+    async def _broadcast(self, communicators, sends, recipients, group):
+        """Crea un envío, lo difunde y devuelve lo recibido y lo esperado como {(usuario, id)}."""
+        batch = await database_sync_to_async(self._notify)(recipients)
+        sends[0] = 0
+        start = time.perf_counter()
+        await database_sync_to_async(fanout.push_notification_batch)(batch, group)
+        received = set()
+        for user_id, communicator in communicators.items():
+            while not await communicator.receive_nothing(timeout=0.01, interval=0.002):
+                message = await communicator.receive_json_from()
+                received.add((str(user_id), message['id']))
+        elapsed = time.perf_counter() - start
+        expected = await database_sync_to_async(
+            lambda: {(str(u), pk) for u, pk in Notification.objects.filter(batch=batch).values_list('user_id', 'id')}
+        )()
+        return received, expected, elapsed
+
+    def _notify(self, recipients):
+        """notify_users sin encolar la tarea: el envío se hace aquí para medirlo."""
+        original_dispatch = fanout._dispatch
+        fanout._dispatch = lambda batch, group=None: None
+        try:
+            fanout.notify_users(recipients, 'Aviso de benchmark', link='/anuncios')
+        finally:
+            fanout._dispatch = original_dispatch
+        return Notification.objects.filter(user__in=recipients).latest('id').batch
+
+    def _create_data(self, count, tag):
+        center = Center.objects.create(name=f"bench-{tag}-a")
+        other_center = Center.objects.create(name=f"bench-{tag}-b")
+        role = Group.objects.create(name=f"bench-{tag}")
+        users = []
+        for i in range(count):
+            # Mitad del centro con el rol, un cuarto del centro sin rol y un cuarto de otro centro con el rol
+            in_center, with_role = i % 4 != 3, i % 4 in (0, 1, 3)
+            user = User.objects.create(
+                id=uuid.uuid4(), email=f"difusion{i}-{tag}@benchmark.invalid", password='!',
+                center=center if in_center else other_center,
+            )
+            if with_role:
+                user.groups.add(role)
+            if i % 10 == 0:
+                Settings.objects.create(user=user, receive_notifications=False)
+            users.append(user)
+        return center, other_center, role, users
+
+    def _change_memberships(self, center, other_center, role):
+        moved = User.objects.filter(center=center, groups=role, notification_settings__isnull=True).first()
+        moved.center = other_center
+        moved.save()
+        demoted = User.objects.filter(center=center, groups=role, notification_settings__isnull=True).first()
+        demoted.groups.remove(role)
+        return moved, demoted
@@ -0,0 +1,108 @@
+import random
+import time
+import uuid
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from agencia.management.commands.benchmark_skill_matching import count_queries
+from notifications.models import Notification, Settings
+from notifications.services import fanout
+from notifications.views import send_notification_to_user
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = (
+        'Compara el envío masivo de notificaciones (una consulta de preferencias, '
+        'bulk_create y group_send por bloques en Celery) contra el ciclo anterior '
+        'de send_notification_to_user por destinatario, con 2,000 destinatarios '
+        'sintéticos. Todos los datos se revierten al terminar.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--recipients', type=int, default=2000)
+        parser.add_argument('--opt-out', type=float, default=0.1,
+                            help='Proporción de destinatarios que desactivan los anuncios')
+        parser.add_argument('--seed', type=int, default=7)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        with transaction.atomic():
+            recipients, expected = self._create_data(options['recipients'], options['opt_out'], rng)
+            self.stdout.write(f"Destinatarios: {options['recipients']}, aceptan anuncios: {len(expected)}")
+
+            # Petición: preferencias + bulk_create; el aviso por websocket se
+            # encola con on_commit, que aquí no se ejecuta (se revierte todo)
+            with count_queries() as queries:
+                start = time.perf_counter()
+                created = fanout.notify_users(
+                    recipients, 'Nuevo anuncio: benchmark', link='/anuncios',
+                    setting='receive_announcement_notifications',
+                )
+                request_time = time.perf_counter() - start
+            dispatched = list(
+                Notification.objects.filter(user__in=recipients).values_list('batch', flat=True).distinct()
+            )
+            self.stdout.write(
+                f"nuevo (petición): {created} notificaciones en {request_time * 1000:.0f} ms con {queries[0]} consultas"
+            )
+
+            # Tarea de Celery: group_send por bloques
+            start = time.perf_counter()
+            pushed = sum(fanout.push_notification_batch(batch) for batch in dispatched)
+            self.stdout.write(f"nuevo (tarea): {pushed} avisos por websocket en {(time.perf_counter() - start) * 1000:.0f} ms")
+
+            got = set(Notification.objects.filter(batch__in=dispatched).values_list('user_id', flat=True))
+            Notification.objects.filter(batch__in=dispatched).delete()
+
+            # Ciclo anterior, sin el `return` que cortaba el envío
+            with count_queries() as queries:
+                start = time.perf_counter()
+                for user in recipients:
+                    if hasattr(user, 'notification_settings') and not user.notification_settings.receive_announcement_notifications:
+                        continue
+                    send_notification_to_user(user.id, 'Nuevo anuncio: benchmark', link='/anuncios')
+                legacy_time = time.perf_counter() - start
+            legacy = set(Notification.objects.filter(user__in=recipients).values_list('user_id', flat=True))
+            self.stdout.write(
+                f"anterior (petición, websocket incluido): {len(legacy)} notificaciones en "
+                f"{legacy_time * 1000:.0f} ms con {queries[0]} consultas"
+            )
+
+            transaction.set_rollback(True)
+
+        if got != expected or legacy != expected:
+            raise CommandError(
+                f"destinatarios distintos: nuevo {len(got)}, anterior {len(legacy)}, esperados {len(expected)}"
+            )
+        self.stdout.write(self.style.SUCCESS('Mismos destinatarios que el ciclo anterior'))
+
+    def _create_data(self, count, opt_out, rng):
+        tag = uuid.uuid4().hex[:8]
+        users = [
+            User(id=uuid.uuid4(), email=f"aviso{i}-{tag}@benchmark.invalid", password='!',
+                 first_name='Personal', last_name=str(i))
+            for i in range(count)
+        ]
+        User.objects.bulk_create(users, batch_size=1000)
+        # Un tercio sin Settings; del resto, algunos desactivan anuncios o todo
+        settings = []
+        expected = set()
+        for user in users:
+            roll = rng.random()
+            if roll < 1 / 3:
+                expected.add(user.pk)
+                continue
+            announcements = rng.random() >= opt_out
+            everything = rng.random() >= 0.02
+            settings.append(Settings(
+                user=user, receive_notifications=everything, receive_announcement_notifications=announcements
+            ))
+            if announcements and everything:
+                expected.add(user.pk)
+        Settings.objects.bulk_create(settings, batch_size=1000)
+        return User.objects.filter(email__endswith=f"-{tag}@benchmark.invalid"), expected
+
@@ -0,0 +1,154 @@
+import time
+import uuid
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from agencia.management.commands.benchmark_skill_matching import count_queries
+from agencia.models import Company, Employer, Job
+from candidatos.models import JobHistory, UserProfile
+from notifications.models import BimonthlyCommentReminder
+from notifications.services.reminders import bimonthly_period, process_bimonthly_reminders
+
+User = get_user_model()
+
+COMPANIES = 5
+
+
+class Command(BaseCommand):
+    help = (
+        'Compara el planificador de recordatorios bimestrales con el recorrido '
+        'anterior (un Employer y un get_or_create por empleo activo): número de '
+        'consultas, tiempo y recordatorios que toca enviar. Todos los datos se '
+        'revierten al terminar.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', default='50,200,1000', help='Empleos activos por escenario')
+
+    def handle(self, *args, **options):
+        sizes = [int(size) for size in options['sizes'].split(',')]
+        failures = []
+        self.stdout.write(
+            f"{'empleos':>8} {'consultas':>10} {'ms':>8} {'anterior':>9} {'ms':>8} {'enviados':>9}"
+        )
+        for size in sizes:
+            with transaction.atomic():
+                job_ids = self._create(size)
+
+                # El recorrido anterior (sin enviar) define qué toca enviar
+                sid = transaction.savepoint()
+                with count_queries() as legacy_queries:
+                    start = time.perf_counter()
+                    expected = self._legacy(job_ids)
+                    legacy_elapsed = time.perf_counter() - start
+                transaction.savepoint_rollback(sid)
+
+                before = timezone.now()
+                with count_queries() as queries:
+                    start = time.perf_counter()
+                    metrics = process_bimonthly_reminders(stdout=_Null())
+                    elapsed = time.perf_counter() - start
+                sent = set(
+                    BimonthlyCommentReminder.objects.filter(job_id__in=job_ids, last_reminder_sent__gte=before)
+                    .values_list('employer_id', 'candidate_id', 'job_id')
+                )
+
+                self.stdout.write(
+                    f"{size:>8} {queries[0]:>10} {elapsed * 1000:>8.1f} "
+                    f"{legacy_queries[0]:>9} {legacy_elapsed * 1000:>8.1f} {len(sent):>9}"
+                )
+                if sent != expected:
+                    failures.append(f"{size} empleos: {len(sent)} enviados, se esperaban {len(expected)}")
+                if metrics['errors']:
+                    failures.append(f"{size} empleos: {metrics['errors']} bloques con error")
+                transaction.set_rollback(True)
+
+        if failures:
+            raise CommandError('; '.join(failures))
+        self.stdout.write(self.style.SUCCESS('Mismos recordatorios que el recorrido anterior'))
+
+    def _create(self, size):
+        tag = uuid.uuid4().hex[:8]
+        today = timezone.now().date()
+        period_start, period_end = bimonthly_period(today)
+        now = timezone.now()
+
+        # La última empresa no tiene empleador
+        jobs = []
+        employers = []
+        for i in range(COMPANIES + 1):
+            company = Company.objects.create(name=f"bench-{tag}-{i}")
+            jobs.append(Job.objects.create(name=f"bench-{tag}-{i}", company=company))
+            if i < COMPANIES:
+                user = User.objects.create(id=uuid.uuid4(), email=f"empleador{i}-{tag}@benchmark.invalid")
+                employers.append(Employer.objects.create(user=user, company=company))
+
+        users = [
+            User(id=uuid.uuid4(), email=f"recordatorio{i}-{tag}@benchmark.invalid", password='!',
+                 first_name='Candidato', last_name=str(i))
+            for i in range(size)
+        ]
+        User.objects.bulk_create(users)
+        UserProfile.objects.bulk_create([UserProfile(user=user) for user in users])
+        JobHistory.objects.bulk_create(
+            [JobHistory(candidate_id=user.pk, job=jobs[i % len(jobs)]) for i, user in enumerate(users)]
+        )
+
+        # Estados previos: sin recordatorio, avisado hace 8 días, avisado hace
+        # 2 días, con comentario, creado sin avisar
+        states = [
+            None,
+            {'notification_sent': True, 'last_reminder_sent': now - timedelta(days=8)},
+            {'notification_sent': True, 'last_reminder_sent': now - timedelta(days=2)},
+            {'comment_provided': True},
+            {},
+        ]
+        BimonthlyCommentReminder.objects.bulk_create([
+            BimonthlyCommentReminder(
+                employer=employers[i % len(jobs)], candidate_id=user.pk, job=jobs[i % len(jobs)],
+                period_start=period_start, period_end=period_end, **states[i % len(states)],
+            )
+            for i, user in enumerate(users)
+            if i % len(jobs) < COMPANIES and states[i % len(states)] is not None
+        ])
+        return [job.pk for job in jobs]
+
+    def _legacy(self, job_ids):
+        """Recorrido anterior a nivel de renglón; devuelve las llaves que se enviarían."""
+        today = timezone.now().date()
+        period_start, period_end = bimonthly_period(today)
+        due = set()
+        histories = JobHistory.objects.filter(
+            end_date__isnull=True, job_id__in=job_ids, job__company__isnull=False
+        ).select_related('candidate', 'job', 'job__company')
+        for job_history in histories:
+            employer = Employer.objects.filter(company=job_history.job.company).first()
+            if employer is None:
+                continue
+            reminder, _ = BimonthlyCommentReminder.objects.get_or_create(
+                employer=employer, candidate=job_history.candidate, job=job_history.job,
+                period_start=period_start, defaults={'period_end': period_end},
+            )
+            should_send = False
+            if not reminder.comment_provided:
+                if today >= period_start + timedelta(days=15) and not reminder.notification_sent:
+                    should_send = True
+                elif reminder.notification_sent and reminder.last_reminder_sent:
+                    should_send = (today - reminder.last_reminder_sent.date()).days >= 7
+                elif 0 <= reminder.days_until_due <= 3 or reminder.is_overdue:
+                    should_send = (
+                        not reminder.last_reminder_sent
+                        or (today - reminder.last_reminder_sent.date()).days >= 1
+                    )
+            if should_send:
+                due.add((reminder.employer_id, reminder.candidate_id, reminder.job_id))
+        return due
+
+
+class _Null:
+    def write(self, msg):
+        pass
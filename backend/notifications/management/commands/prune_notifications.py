@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from notifications.services.retention import PRUNE_CHUNK_SIZE, PRUNE_MAX_ROWS, prune_notifications
+
+
+class Command(BaseCommand):
+    help = "Delete notifications past their retention period in bounded chunks"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--chunk-size", type=int, default=PRUNE_CHUNK_SIZE)
+        parser.add_argument("--max-rows", type=int, default=PRUNE_MAX_ROWS)
+        parser.add_argument("--pause", type=float, default=0, help="Seconds to wait between chunks")
+
+    def handle(self, *args, **options):
+        prune_notifications(
+            chunk_size=options["chunk_size"],
+            max_rows=options["max_rows"],
+            pause=options["pause"],
+            stdout=self.stdout,
+        )
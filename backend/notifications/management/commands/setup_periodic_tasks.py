@@ -9,40 +9,101 @@ class Command(BaseCommand):
 
     def handle(self, *args, **options):
         self.stdout.write('Setting up periodic tasks...')
-        
+
         # Daily at 9:00 AM
+        schedule = self._get_schedule(minute="0", hour="9", description="9:00 AM daily")
+        self._ensure_task(
+            schedule,
+            name="Daily Bimonthly Reminder Task",
+            task="notifications.tasks.run_bimonthly_reminders",
+        )
+
+        # Every hour at minute 15
+        schedule = self._get_schedule(minute="15", hour="*", description="every hour at :15")
+        self._ensure_task(
+            schedule,
+            name="Hourly Expired Candidate Cohorts Purge",
+            task="candidatos.tasks.purge_expired_candidate_cohorts",
+        )
+
+        # Daily at 2:30 AM
+        schedule = self._get_schedule(minute="30", hour="2", description="2:30 AM daily")
+        self._ensure_task(
+            schedule,
+            name="Nightly Job Recommendations",
+            task="agencia.tasks.generate_recommendations_task",
+        )
+
+        # Daily at 3:15 AM
+        schedule = self._get_schedule(minute="15", hour="3", description="3:15 AM daily")
+        self._ensure_task(
+            schedule,
+            name="Nightly Notification Retention",
+            task="notifications.tasks.prune_notifications_task",
+        )
+
+        # Daily at 3:45 AM
+        schedule = self._get_schedule(minute="45", hour="3", description="3:45 AM daily")
+        self._ensure_task(
+            schedule,
+            name="Expired Upload Sessions Cleanup",
+            task="api.tasks.prune_upload_sessions_task",
+        )
+
+        # Daily at 4:00 AM
+        schedule = self._get_schedule(minute="0", hour="4", description="4:00 AM daily")
+        self._ensure_task(
+            schedule,
+            name="Email Outbox Retention",
+            task="api.tasks.prune_email_outbox_task",
+        )
+
+        # Every minute
+        schedule = self._get_schedule(minute="*", hour="*", description="every minute")
+        self._ensure_task(
+            schedule,
+            name="Email Outbox Flush",
+            task="api.tasks.flush_email_outbox_task",
+        )
+        self._ensure_task(
+            schedule,
+            name="Forum View Counts Flush",
+            task="communications.tasks.flush_forum_view_counts_task",
+        )
+
+        self.stdout.write(
+            self.style.SUCCESS('Periodic tasks setup completed!')
+        )
+
+    def _get_schedule(self, minute, hour, description):
         schedule, created = CrontabSchedule.objects.get_or_create(
-            minute="0",
-            hour="9",
+            minute=minute,
+            hour=hour,
             day_of_week="*",
             day_of_month="*",
             month_of_year="*",
         )
-        
+
         if created:
             self.stdout.write(
-                self.style.SUCCESS('Created new crontab schedule for 9:00 AM daily')
+                self.style.SUCCESS(f'Created new crontab schedule for {description}')
             )
         else:
-            self.stdout.write('Using existing crontab schedule for 9:00 AM daily')
-
-        task_name = "notifications.tasks.run_bimonthly_reminders"
+            self.stdout.write(f'Using existing crontab schedule for {description}')
+        return schedule
 
-        if not PeriodicTask.objects.filter(task=task_name).exists():
+    def _ensure_task(self, schedule, name, task):
+        if not PeriodicTask.objects.filter(task=task).exists():
             PeriodicTask.objects.create(
                 crontab=schedule,
-                name="Daily Bimonthly Reminder Task",
-                task=task_name,
+                name=name,
+                task=task,
                 args=json.dumps([]),  # can pass ["--dry-run"] etc.
                 start_time=now(),
                 enabled=True,
             )
             self.stdout.write(
-                self.style.SUCCESS(f'Created periodic task: {task_name}')
+                self.style.SUCCESS(f'Created periodic task: {task}')
             )
         else:
-            self.stdout.write(f'Periodic task already exists: {task_name}')
-        
-        self.stdout.write(
-            self.style.SUCCESS('Periodic tasks setup completed!')
-        )
+            self.stdout.write(f'Periodic task already exists: {task}')
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.12 on 2026-10-19 14:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notifications', '0004_auto_20250917_2107'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='notification',
+            name='batch',
+            field=models.UUIDField(blank=True, db_index=True, editable=False, null=True),
+        ),
+    ]
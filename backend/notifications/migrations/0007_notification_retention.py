@@ -0,0 +1,39 @@
+# Generated by Django 5.1.12 on 2026-10-19 15:02
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notifications', '0006_notification_batch_user_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NotificationPruneRun',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('started_at', models.DateTimeField(auto_now_add=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('read_cutoff', models.DateTimeField(help_text='Se borraron las leídas creadas antes de esta fecha')),
+                ('unread_cutoff', models.DateTimeField(help_text='Se borraron las no leídas creadas antes de esta fecha')),
+                ('read_deleted', models.PositiveIntegerField(default=0)),
+                ('unread_deleted', models.PositiveIntegerField(default=0)),
+                ('chunks', models.PositiveIntegerField(default=0)),
+                ('complete', models.BooleanField(default=False, help_text='False si se alcanzó el máximo de renglones por ejecución')),
+                ('duration_seconds', models.FloatField(blank=True, null=True)),
+            ],
+            options={
+                'verbose_name': 'Depuración de Notificaciones',
+                'verbose_name_plural': 'Depuraciones de Notificaciones',
+                'ordering': ['-started_at'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(fields=['user', 'is_read', 'created_at'], name='notification_user_read_idx'),
+        ),
+    ]
@@ -20,11 +20,46 @@ class Notification(models.Model):
     )
     is_read = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
+    # Envío masivo al que pertenece (notifications/services/fanout.py); permite
+    # recuperar los renglones de un bulk_create, que en SQL Server no devuelve
+    # IDs, y que cada conexión encuentre su notificación en una difusión
+    batch = models.UUIDField(null=True, blank=True, editable=False)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['batch', 'user'], name='notification_batch_user_idx'),
+            # Listado, no leídas y conteos por usuario
+            models.Index(fields=['user', 'is_read', 'created_at'], name='notification_user_read_idx'),
+        ]
 
     def __str__(self):
         return f"Notification({self.id}) → {self.user}"
 
 
+class NotificationPruneRun(models.Model):
+    """
+    Ejecución de la depuración de notificaciones antiguas
+    (notifications/services/retention.py).
+    """
+    started_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    read_cutoff = models.DateTimeField(help_text="Se borraron las leídas creadas antes de esta fecha")
+    unread_cutoff = models.DateTimeField(help_text="Se borraron las no leídas creadas antes de esta fecha")
+    read_deleted = models.PositiveIntegerField(default=0)
+    unread_deleted = models.PositiveIntegerField(default=0)
+    chunks = models.PositiveIntegerField(default=0)
+    complete = models.BooleanField(default=False, help_text="False si se alcanzó el máximo de renglones por ejecución")
+    duration_seconds = models.FloatField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-started_at']
+        verbose_name = 'Depuración de Notificaciones'
+        verbose_name_plural = 'Depuraciones de Notificaciones'
+
+    def __str__(self):
+        return f"Depuración {self.started_at:%Y-%m-%d %H:%M} ({self.read_deleted + self.unread_deleted})"
+
+
 class Settings(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE, related_name="notification_settings")
 
@@ -128,27 +163,17 @@ class BimonthlyCommentReminder(models.Model):
     
     def send_reminder(self):
         """Send a reminder notification to the employer"""
+        from .services.reminders import reminder_notification
         from .views import send_notification_to_user
-        
-        days_left = self.days_until_due
-        if days_left < 0:
-            message = f"⚠️ Evaluación VENCIDA: Debe proporcionar observaciones sobre {self.candidate.user.get_full_name()} en el empleo '{self.job.name}'. Vencimiento: {self.period_end.strftime('%d/%m/%Y')}"
-            notification_type = "warning"
-        elif days_left <= 3:
-            message = f"🔔 Recordatorio URGENTE: Debe evaluar a {self.candidate.user.get_full_name()} en '{self.job.name}' antes del {self.period_end.strftime('%d/%m/%Y')} ({days_left} días restantes)"
-            notification_type = "warning"
-        else:
-            message = f"📝 Recordatorio: Es momento de evaluar a {self.candidate.user.get_full_name()} en el empleo '{self.job.name}'. Fecha límite: {self.period_end.strftime('%d/%m/%Y')}"
-            notification_type = "info"
-        
-        # Send notification with link to the job candidates page
-        link = f"/empleador/empleo/{self.job.id}"
-        
+
+        notification = reminder_notification(
+            self.candidate.user.get_full_name(), self.job.id, self.job.name, self.period_end, timezone.now().date(),
+        )
         send_notification_to_user(
             user_id=self.employer.user.id,
-            message=message,
-            link=link,
-            notification_type=notification_type
+            message=notification['message'],
+            link=notification['link'],
+            notification_type=notification['type']
         )
         
         # Update tracking
@@ -8,6 +8,16 @@ class NotificationSerializer(serializers.ModelSerializer):
         fields = ['id', 'user', 'message', 'type', 'link', 'is_read', 'created_at']
         read_only_fields = ['id', 'user', 'is_read', 'created_at']
 
+class NotificationBulkSerializer(serializers.Serializer):
+    """IDs de las notificaciones a marcar o descartar, o `all` para todas."""
+    ids = serializers.ListField(child=serializers.IntegerField(), required=False, max_length=1000)
+    all = serializers.BooleanField(default=False)
+
+    def validate(self, attrs):
+        if not attrs['all'] and not attrs.get('ids'):
+            raise serializers.ValidationError("Indique 'ids' o 'all'.")
+        return attrs
+
 class SettingsSerializer(serializers.ModelSerializer):
     class Meta:
         model = Settings
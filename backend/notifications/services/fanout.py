@@ -0,0 +1,241 @@
+"""
+Envío masivo de notificaciones.
+
+`notify_users` resuelve en una sola consulta qué destinatarios aceptan la
+notificación según sus Settings, crea todos los renglones con bulk_create y
+encola el aviso por websocket en una tarea de Celery, de modo que la petición
+que origina el envío no espera a los websockets.
+
+Si los destinatarios caben en un grupo de difusión (notifications/
+channel_groups.py), la tarea guarda en la caché el ID de la notificación de
+cada destinatario y hace un solo group_send a ese grupo con el ID del envío;
+cada conexión lee su ID de la caché, y solo si no está lo busca en la base de
+datos. Los miembros del grupo sin renglón (no destinatarios o que
+desactivaron el aviso) no reciben nada. Si no, la tarea agrupa los group_send
+por usuario en bloques que se ejecutan concurrentemente en un solo ciclo de
+eventos.
+
+`notify_many` es el equivalente para notificaciones con un mensaje distinto
+por destinatario (p. ej. los recordatorios bimestrales).
+"""
+import asyncio
+import logging
+import uuid
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.core.cache import cache
+from django.db import transaction
+from kombu.exceptions import OperationalError
+
+from notifications.channel_groups import user_group_name
+from notifications.counters import adjust_unread
+from notifications.models import Notification, Settings
+
+logger = logging.getLogger(__name__)
+
+BULK_BATCH_SIZE = 1000
+# group_send concurrentes por bloque
+PUSH_CHUNK_SIZE = 200
+
+# ID de la notificación de cada destinatario de una difusión, para
+# NotificationConsumer.send_broadcast
+BROADCAST_RECIPIENT_KEY = 'notifications:broadcast:{}:{}'
+BROADCAST_RECIPIENT_TTL = 300
+
+
+def broadcast_recipient_key(batch, user_id):
+    return BROADCAST_RECIPIENT_KEY.format(batch, user_id)
+
+
+def notification_event(notification):
+    """Evento de channels para NotificationConsumer.send_notification."""
+    return {
+        'type': 'send_notification',
+        'notification': {
+            'id': notification['id'],
+            'message': notification['message'],
+            'link': notification['link'],
+            'type': notification['type'],
+            'created_at': notification['created_at'].isoformat(),
+        }
+    }
+
+
+def broadcast_event(batch, notification, cached=False):
+    """
+    Evento de difusión para NotificationConsumer.send_broadcast. Con `cached`
+    los IDs de los destinatarios están en la caché (`broadcast_recipient_key`).
+    """
+    return {
+        'type': 'send_broadcast',
+        'batch': str(batch),
+        'cached': cached,
+        'notification': {
+            'message': notification['message'],
+            'link': notification['link'],
+            'type': notification['type'],
+            'created_at': notification['created_at'].isoformat(),
+        }
+    }
+
+
+def notify_users(recipients, message, link=None, notification_type="info", setting=None, group=None):
+    """
+    Crea una notificación para cada usuario del queryset `recipients` que no
+    las haya desactivado. `setting` es el campo de Settings de la categoría
+    (p. ej. 'receive_announcement_notifications'); además siempre se respeta
+    `receive_notifications`. Los usuarios sin Settings reciben todo.
+
+    `group` es un grupo de difusión que contiene a todos los destinatarios
+    (puede tener más miembros). El aviso por websocket se encola al
+    confirmarse la transacción. Devuelve el número de notificaciones creadas.
+    """
+    recipients = recipients.exclude(notification_settings__receive_notifications=False)
+    if setting:
+        recipients = recipients.exclude(**{f'notification_settings__{setting}': False})
+    user_ids = list(recipients.order_by().values_list('id', flat=True).distinct())
+    if not user_ids:
+        return 0
+
+    batch = uuid.uuid4()
+    Notification.objects.bulk_create(
+        [
+            Notification(user_id=user_id, message=message, link=link, type=notification_type, batch=batch)
+            for user_id in user_ids
+        ],
+        batch_size=BULK_BATCH_SIZE,
+    )
+    adjust_unread(user_ids, 1)
+    transaction.on_commit(lambda: _dispatch(batch, group))
+    return len(user_ids)
+
+
+def notify_many(notifications):
+    """
+    Crea en bloque notificaciones con mensaje propio. `notifications` es una
+    lista de dicts con 'user_id', 'message', 'link' y 'type'; se omiten los
+    usuarios con `receive_notifications` desactivado. El aviso por websocket
+    se encola al confirmarse la transacción. Devuelve el número de
+    notificaciones creadas.
+    """
+    if not notifications:
+        return 0
+    user_ids = {item['user_id'] for item in notifications}
+    muted = set()
+    ids = list(user_ids)
+    for start in range(0, len(ids), BULK_BATCH_SIZE):
+        muted.update(
+            Settings.objects.filter(user_id__in=ids[start:start + BULK_BATCH_SIZE], receive_notifications=False)
+            .values_list('user_id', flat=True)
+        )
+    batch = uuid.uuid4()
+    rows = [
+        Notification(
+            user_id=item['user_id'], message=item['message'], link=item.get('link'),
+            type=item.get('type', 'info'), batch=batch,
+        )
+        for item in notifications
+        if item['user_id'] not in muted
+    ]
+    if not rows:
+        return 0
+
+    Notification.objects.bulk_create(rows, batch_size=BULK_BATCH_SIZE)
+    adjust_unread([row.user_id for row in rows], 1)
+    transaction.on_commit(lambda: _dispatch(batch))
+    return len(rows)
+
+
+def _dispatch(batch, group=None):
+    from notifications.tasks import push_notification_batch_task
+
+    try:
+        push_notification_batch_task.delay(str(batch), group)
+    except OperationalError:
+        logger.warning("Broker no disponible; enviando las notificaciones por websocket en el proceso")
+        push_notification_batch(batch, group)
+
+
+async def _group_send_many(channel_layer, rows):
+    results = await asyncio.gather(
+        *(channel_layer.group_send(user_group_name(row['user_id']), notification_event(row)) for row in rows),
+        return_exceptions=True,
+    )
+    return sum(1 for result in results if isinstance(result, Exception))
+
+
+def _cache_recipients(batch):
+    """
+    Guarda {destinatario: ID de su notificación} de un envío en la caché.
+    Devuelve False si la caché no está disponible; entonces cada conexión
+    busca su notificación en la base de datos.
+    """
+    rows = (
+        Notification.objects.filter(batch=batch)
+        .order_by()
+        .values_list('user_id', 'id')
+        .iterator(chunk_size=BULK_BATCH_SIZE)
+    )
+    chunk = {}
+    try:
+        for user_id, notification_id in rows:
+            chunk[broadcast_recipient_key(batch, user_id)] = notification_id
+            if len(chunk) >= BULK_BATCH_SIZE:
+                cache.set_many(chunk, BROADCAST_RECIPIENT_TTL)
+                chunk = {}
+        if chunk:
+            cache.set_many(chunk, BROADCAST_RECIPIENT_TTL)
+    except Exception as e:
+        logger.warning(f"No se pudieron guardar los destinatarios del envío {batch} en caché: {e}")
+        return False
+    return True
+
+
+def push_notification_batch(batch, group=None):
+    """
+    Envía por websocket las notificaciones de un envío masivo: con un solo
+    group_send si hay `group`, o en bloques de PUSH_CHUNK_SIZE group_send
+    concurrentes por usuario. Devuelve cuántos group_send se hicieron.
+    """
+    channel_layer = get_channel_layer()
+    if channel_layer is None:
+        logger.warning("Channel layer is not configured.")
+        return 0
+
+    if group:
+        first = (
+            Notification.objects.filter(batch=batch)
+            .values('message', 'link', 'type', 'created_at')
+            .order_by('id')
+            .first()
+        )
+        if first is None:
+            return 0
+        try:
+            async_to_sync(channel_layer.group_send)(group, broadcast_event(batch, first, _cache_recipients(batch)))
+        except Exception as e:
+            logger.info(f"No se pudo difundir el envío {batch} a {group}: {e}")
+        return 1
+
+    rows = (
+        Notification.objects.filter(batch=batch)
+        .order_by('id')
+        .values('id', 'user_id', 'message', 'link', 'type', 'created_at')
+        .iterator(chunk_size=BULK_BATCH_SIZE)
+    )
+    sent = failed = 0
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= PUSH_CHUNK_SIZE:
+            failed += async_to_sync(_group_send_many)(channel_layer, chunk)
+            sent += len(chunk)
+            chunk = []
+    if chunk:
+        failed += async_to_sync(_group_send_many)(channel_layer, chunk)
+        sent += len(chunk)
+
+    if failed:
+        logger.info(f"{failed} de {sent} avisos por websocket fallaron en el envío {batch}")
+    return sent
@@ -1,120 +1,279 @@
+"""
+Recordatorios bimestrales a empleadores para evaluar a sus candidatos.
+
+El planificador recorre los empleos activos (JobHistory sin fecha de fin)
+por bloques de IDs. Los empleadores se cargan una sola vez por empresa; en
+cada bloque los recordatorios que faltan se crean con un solo bulk_create,
+los que toca enviar se eligen con un filtro en SQL (`_due_q`) y las
+notificaciones salen juntas por `notify_many`. El número de consultas
+depende del número de bloques y no del de empleos activos.
+"""
+import calendar
 import logging
-from datetime import datetime, timedelta
+import time
+from datetime import date, datetime, time as dt_time, timedelta, timezone as dt_timezone
+
+from django.db import IntegrityError, connection, transaction
+from django.db.models import DateTimeField, F, Q, Value
+from django.db.models.functions import Coalesce
 from django.utils import timezone
-from candidatos.models import JobHistory
+
 from agencia.models import Employer
+from candidatos.models import JobHistory
 from notifications.models import BimonthlyCommentReminder
+from notifications.services.fanout import notify_many
 
 logger = logging.getLogger(__name__)
 
+# Empleos activos por bloque (límite de 2100 parámetros de SQL Server)
+REMINDER_CHUNK_SIZE = 500
+# Días desde el inicio del periodo para el primer aviso
+FIRST_NOTICE_DAYS = 15
+# Días entre recordatorios una vez enviado el primero
+REPEAT_DAYS = 7
+# Días antes del vencimiento en que se recuerda a diario
+URGENT_DAYS = 3
+
+
+def bimonthly_period(today):
+    """(inicio, fin) del bimestre (ene-feb, mar-abr, ...) que contiene `today`."""
+    first_month = today.month - (today.month - 1) % 2
+    last_day = calendar.monthrange(today.year, first_month + 1)[1]
+    return date(today.year, first_month, 1), date(today.year, first_month + 1, last_day)
+
+
+def reminder_notification(candidate_name, job_id, job_name, period_end, today):
+    """Mensaje, enlace y tipo de la notificación de un recordatorio."""
+    days_left = (period_end - today).days
+    if days_left < 0:
+        message = f"⚠️ Evaluación VENCIDA: Debe proporcionar observaciones sobre {candidate_name} en el empleo '{job_name}'. Vencimiento: {period_end.strftime('%d/%m/%Y')}"
+        notification_type = "warning"
+    elif days_left <= URGENT_DAYS:
+        message = f"🔔 Recordatorio URGENTE: Debe evaluar a {candidate_name} en '{job_name}' antes del {period_end.strftime('%d/%m/%Y')} ({days_left} días restantes)"
+        notification_type = "warning"
+    else:
+        message = f"📝 Recordatorio: Es momento de evaluar a {candidate_name} en el empleo '{job_name}'. Fecha límite: {period_end.strftime('%d/%m/%Y')}"
+        notification_type = "info"
+    # Enlace a la página de candidatos del empleo
+    return {'message': message, 'link': f"/empleador/empleo/{job_id}", 'type': notification_type}
+
 
-def process_bimonthly_reminders(dry_run=False, force=False, stdout=None):
+def _days_ago(today, days):
     """
-    Core logic for sending bimonthly reminders.
-    Can be called from management commands or Celery tasks.
+    Inicio (UTC) del día siguiente a `today - days`: un envío anterior a este
+    momento tiene al menos `days` días de antigüedad, igual que comparar
+    `(today - last_reminder_sent.date()).days >= days`, sin aplicar una
+    función a la columna.
     """
-    today = timezone.now().date()
+    return datetime.combine(today - timedelta(days=days - 1), dt_time.min, tzinfo=dt_timezone.utc)
 
-    # Determine bimonthly period
-    current_month = today.month
-    current_year = today.year
-
-    if current_month in [1, 2]:
-        period_start = datetime(current_year, 1, 1).date()
-        period_end = datetime(current_year, 2, 29 if (current_year % 4 == 0 and (current_year % 100 != 0 or current_year % 400 == 0)) else 28).date()
-    elif current_month in [3, 4]:
-        period_start = datetime(current_year, 3, 1).date()
-        period_end = datetime(current_year, 4, 30).date()
-    elif current_month in [5, 6]:
-        period_start = datetime(current_year, 5, 1).date()
-        period_end = datetime(current_year, 6, 30).date()
-    elif current_month in [7, 8]:
-        period_start = datetime(current_year, 7, 1).date()
-        period_end = datetime(current_year, 8, 31).date()
-    elif current_month in [9, 10]:
-        period_start = datetime(current_year, 9, 1).date()
-        period_end = datetime(current_year, 10, 31).date()
-    else:
-        period_start = datetime(current_year, 11, 1).date()
-        period_end = datetime(current_year, 12, 31).date()
 
-    _out(stdout, f"Current bimonthly period: {period_start} to {period_end}")
+def _due_q(today, period_start, period_end, force=False):
+    """
+    Recordatorios del periodo que toca enviar hoy. Son las mismas reglas que
+    se evaluaban recordatorio por recordatorio, en el mismo orden:
 
-    # Active job histories
-    active_job_histories = JobHistory.objects.filter(
-        end_date__isnull=True,
-        job__isnull=False,
-        job__company__isnull=False
-    ).select_related("candidate", "job", "job__company")
+    - desde el día 15 del periodo, el primer aviso (o cualquiera con `force`);
+    - ya avisado, uno cada semana;
+    - en los últimos días del periodo, o ya vencido, uno diario.
+    """
+    due = Q(pk__in=[])
+    if today >= period_start + timedelta(days=FIRST_NOTICE_DAYS):
+        if force:
+            return Q(comment_provided=False)
+        due |= Q(notification_sent=False)
 
-    _out(stdout, f"Found {active_job_histories.count()} active job assignments")
+    repeating = Q(notification_sent=True, last_reminder_sent__isnull=False)
+    due |= repeating & Q(last_reminder_sent__lt=_days_ago(today, REPEAT_DAYS))
 
-    reminders_created = 0
-    reminders_sent = 0
-    errors = 0
+    days_left = (period_end - today).days
+    if 0 <= days_left <= URGENT_DAYS or today > period_end:
+        due |= ~repeating & (
+            Q(last_reminder_sent__isnull=True) | Q(last_reminder_sent__lt=_days_ago(today, 1))
+        )
+    return Q(comment_provided=False) & due
 
-    for job_history in active_job_histories:
-        try:
-            # Find employer
-            try:
-                employer = Employer.objects.get(company=job_history.job.company)
-            except Employer.DoesNotExist:
-                _warn(stdout, f"No employer found for company {job_history.job.company.name}")
-                continue
-            except Employer.MultipleObjectsReturned:
-                employer = Employer.objects.filter(company=job_history.job.company).first()
-                _warn(stdout, f"Multiple employers found for company {job_history.job.company.name}, using first one")
-
-            reminder, created = BimonthlyCommentReminder.objects.get_or_create(
-                employer=employer,
-                candidate=job_history.candidate,
-                job=job_history.job,
-                period_start=period_start,
-                defaults={"period_end": period_end},
+
+def _employers_by_company(active):
+    """{company_id: user_id del empleador} en una consulta; el primero por llave si hay varios."""
+    employers, repeated = {}, set()
+    rows = (
+        Employer.objects.filter(company_id__in=active.values('job__company_id'))
+        .order_by('pk')
+        .values_list('company_id', 'user_id')
+    )
+    for company_id, user_id in rows:
+        if company_id in employers:
+            repeated.add(company_id)
+        else:
+            employers[company_id] = user_id
+    return employers, repeated
+
+
+def _create_missing(keys, period_start, period_end):
+    """Crea los recordatorios del periodo que aún no existen. Devuelve cuántos se crearon."""
+    existing = set(
+        BimonthlyCommentReminder.objects.filter(
+            period_start=period_start, candidate_id__in={candidate for _, candidate, _ in keys},
+        ).values_list('employer_id', 'candidate_id', 'job_id')
+    )
+    missing = [key for key in keys if key not in existing]
+    if not missing:
+        return 0
+    reminders = [
+        BimonthlyCommentReminder(
+            employer_id=employer_id, candidate_id=candidate_id, job_id=job_id,
+            period_start=period_start, period_end=period_end,
+        )
+        for employer_id, candidate_id, job_id in missing
+    ]
+    if connection.features.supports_ignore_conflicts:
+        BimonthlyCommentReminder.objects.bulk_create(reminders, ignore_conflicts=True)
+        return len(reminders)
+    # SQL Server no admite ignore_conflicts: si otro proceso creó alguno
+    # entre la consulta y el insert, se crean uno por uno
+    try:
+        with transaction.atomic():
+            BimonthlyCommentReminder.objects.bulk_create(reminders)
+        return len(reminders)
+    except IntegrityError:
+        created = 0
+        for reminder in reminders:
+            _, was_created = BimonthlyCommentReminder.objects.get_or_create(
+                employer_id=reminder.employer_id, candidate_id=reminder.candidate_id, job_id=reminder.job_id,
+                period_start=period_start, defaults={'period_end': period_end},
+            )
+            created += was_created
+        return created
+
+
+def _plan_chunk(rows, employers, today, period_start, period_end, force, dry_run, sent_ids):
+    """Crea y envía los recordatorios de un bloque de empleos activos. Devuelve (creados, enviados)."""
+    keys = {
+        (employers[company_id], candidate_id, job_id)
+        for _, candidate_id, job_id, company_id in rows
+        if company_id in employers
+    }
+    if not keys:
+        return 0, 0
+    created = _create_missing(keys, period_start, period_end)
+
+    due = [
+        reminder for reminder in (
+            BimonthlyCommentReminder.objects.filter(
+                _due_q(today, period_start, period_end, force),
+                period_start=period_start, candidate_id__in={candidate for _, candidate, _ in keys},
+            ).values(
+                'id', 'employer_id', 'candidate_id', 'job_id', 'period_end', 'job__name',
+                'candidate__user__first_name', 'candidate__user__last_name',
             )
+        )
+        if (reminder['employer_id'], reminder['candidate_id'], reminder['job_id']) in keys
+        and reminder['id'] not in sent_ids
+    ]
+    if not due or dry_run:
+        return created, len(due)
+
+    notify_many([
+        {
+            'user_id': reminder['employer_id'],
+            **reminder_notification(
+                f"{reminder['candidate__user__first_name']} {reminder['candidate__user__last_name']}".strip(),
+                reminder['job_id'], reminder['job__name'], reminder['period_end'], today,
+            ),
+        }
+        for reminder in due
+    ])
+    now = timezone.now()
+    ids = [reminder['id'] for reminder in due]
+    BimonthlyCommentReminder.objects.filter(id__in=ids).update(
+        reminder_count=F('reminder_count') + 1,
+        last_reminder_sent=now,
+        notification_sent=True,
+        notification_sent_at=Coalesce('notification_sent_at', Value(now, output_field=DateTimeField())),
+        updated_at=now,
+    )
+    sent_ids.update(ids)
+    return created, len(due)
 
-            if created:
-                reminders_created += 1
-                _out(stdout, f"Created reminder: {employer.user.get_full_name()} -> {job_history.candidate.user.get_full_name()}")
-
-            should_send = False
-
-            if not reminder.comment_provided:
-                notification_date = period_start + timedelta(days=15)
-
-                if today >= notification_date and (not reminder.notification_sent or force):
-                    should_send = True
-                elif reminder.notification_sent and reminder.last_reminder_sent:
-                    if (today - reminder.last_reminder_sent.date()).days >= 7:
-                        should_send = True
-                elif reminder.days_until_due <= 3 and reminder.days_until_due >= 0:
-                    if not reminder.last_reminder_sent or (today - reminder.last_reminder_sent.date()).days >= 1:
-                        should_send = True
-                elif reminder.is_overdue:
-                    if not reminder.last_reminder_sent or (today - reminder.last_reminder_sent.date()).days >= 1:
-                        should_send = True
-
-            if should_send and not dry_run:
-                reminder.send_reminder()
-                reminders_sent += 1
-                _success(stdout, f"Sent reminder to {employer.user.get_full_name()} about {job_history.candidate.user.get_full_name()}")
-            elif should_send and dry_run:
-                reminders_sent += 1
-                _out(stdout, f"[DRY RUN] Would send reminder to {employer.user.get_full_name()} about {job_history.candidate.user.get_full_name()}")
 
+def process_bimonthly_reminders(dry_run=False, force=False, stdout=None, chunk_size=REMINDER_CHUNK_SIZE):
+    """
+    Core logic for sending bimonthly reminders.
+    Can be called from management commands or Celery tasks.
+    Returns the run metrics.
+    """
+    start = time.perf_counter()
+    today = timezone.now().date()
+    period_start, period_end = bimonthly_period(today)
+    _out(stdout, f"Current bimonthly period: {period_start} to {period_end}")
+
+    active = JobHistory.objects.filter(end_date__isnull=True, job__isnull=False, job__company__isnull=False)
+    employers, repeated = _employers_by_company(active)
+    for company_id in repeated:
+        _warn(stdout, f"Multiple employers found for company {company_id}, using first one")
+
+    metrics = {
+        'rows_scanned': 0,
+        'reminders_created': 0,
+        'reminders_sent': 0,
+        'skipped_no_employer': 0,
+        'chunks': 0,
+        'errors': 0,
+    }
+    missing_companies = set()
+    sent_ids = set()
+    last_id = 0
+    while True:
+        rows = list(
+            active.filter(id__gt=last_id).order_by('id')
+            .values_list('id', 'candidate_id', 'job_id', 'job__company_id')[:chunk_size]
+        )
+        if not rows:
+            break
+        last_id = rows[-1][0]
+        metrics['rows_scanned'] += len(rows)
+        metrics['chunks'] += 1
+        for _, _, _, company_id in rows:
+            if company_id not in employers:
+                metrics['skipped_no_employer'] += 1
+                missing_companies.add(company_id)
+        try:
+            with transaction.atomic():
+                created, sent = _plan_chunk(
+                    rows, employers, today, period_start, period_end, force, dry_run, sent_ids,
+                )
         except Exception as e:
-            errors += 1
-            logger.error(f"Error processing job history {job_history.id}: {str(e)}")
-            _error(stdout, f"Error processing {job_history.candidate.user.get_full_name()}: {str(e)}")
+            metrics['errors'] += 1
+            logger.error(f"Error processing job histories up to {last_id}: {str(e)}")
+            _error(stdout, f"Error processing chunk ending at job history {last_id}: {str(e)}")
+            continue
+        metrics['reminders_created'] += created
+        metrics['reminders_sent'] += sent
 
-    # Summary
-    _success(stdout, f"\nSummary {'(DRY RUN)' if dry_run else ''}:\n- Reminders created: {reminders_created}\n- Reminders sent: {reminders_sent}\n- Errors: {errors}")
+    for company_id in missing_companies:
+        _warn(stdout, f"No employer found for company {company_id}")
 
-    overdue_reminders = BimonthlyCommentReminder.objects.filter(
+    metrics['overdue'] = BimonthlyCommentReminder.objects.filter(
         period_end__lt=today, comment_provided=False
     ).count()
-    if overdue_reminders > 0:
-        _warn(stdout, f"\nWarning: {overdue_reminders} overdue comment periods found!")
+    metrics['duration_seconds'] = round(time.perf_counter() - start, 3)
+
+    # Summary
+    _success(
+        stdout,
+        f"\nSummary {'(DRY RUN)' if dry_run else ''}:\n"
+        f"- Job assignments scanned: {metrics['rows_scanned']}\n"
+        f"- Reminders created: {metrics['reminders_created']}\n"
+        f"- Reminders {'to send' if dry_run else 'sent'}: {metrics['reminders_sent']}\n"
+        f"- Skipped (no employer): {metrics['skipped_no_employer']}\n"
+        f"- Errors: {metrics['errors']}\n"
+        f"- Duration: {metrics['duration_seconds']} s"
+    )
+    if metrics['overdue'] > 0:
+        _warn(stdout, f"\nWarning: {metrics['overdue']} overdue comment periods found!")
+    logger.info(f"Recordatorios bimestrales: {metrics}")
+    return metrics
 
 
 def _out(stdout, msg):
@@ -0,0 +1,104 @@
+"""
+Retención de notificaciones.
+
+Las notificaciones leídas se borran después de NOTIFICATION_RETENTION_DAYS
+días y las no leídas después de NOTIFICATION_UNREAD_RETENTION_DAYS (ambos
+configurables en settings). El borrado se hace por bloques de IDs, cada uno
+en su propia transacción corta, para no mantener bloqueos largos sobre la
+tabla en SQL Server ni escalar a un bloqueo de tabla. Como el ID crece con
+created_at, los candidatos se buscan recorriendo la llave primaria desde el
+principio, donde están los renglones más antiguos.
+
+Cada ejecución queda registrada en NotificationPruneRun.
+"""
+import logging
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from notifications.counters import invalidate_unread
+from notifications.models import Notification, NotificationPruneRun
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_RETENTION_DAYS = 90
+DEFAULT_UNREAD_RETENTION_DAYS = 180
+# Renglones por bloque (límite de 2100 parámetros de SQL Server)
+PRUNE_CHUNK_SIZE = 1000
+# Tope por ejecución; lo que quede se borra en la siguiente
+PRUNE_MAX_ROWS = 200_000
+
+
+def _cutoffs(now):
+    read_days = getattr(settings, 'NOTIFICATION_RETENTION_DAYS', DEFAULT_RETENTION_DAYS)
+    unread_days = getattr(settings, 'NOTIFICATION_UNREAD_RETENTION_DAYS', DEFAULT_UNREAD_RETENTION_DAYS)
+    return now - timedelta(days=read_days), now - timedelta(days=unread_days)
+
+
+def _prune(queryset, chunk_size, max_rows, pause, unread=False):
+    """Borra el queryset por bloques. Devuelve (borrados, bloques, completo)."""
+    deleted = chunks = 0
+    while deleted < max_rows:
+        rows = list(
+            queryset.order_by('id').values_list('id', 'user_id')[:min(chunk_size, max_rows - deleted)]
+        )
+        if not rows:
+            return deleted, chunks, True
+        with transaction.atomic():
+            count, _ = Notification.objects.filter(id__in=[pk for pk, _ in rows]).delete()
+            if unread:
+                # Los contadores de no leídas de esos usuarios cambian
+                invalidate_unread(user_id for _, user_id in rows)
+        deleted += count
+        chunks += 1
+        if pause:
+            time.sleep(pause)
+    return deleted, chunks, not queryset.exists()
+
+
+def prune_notifications(chunk_size=PRUNE_CHUNK_SIZE, max_rows=PRUNE_MAX_ROWS, pause=0, stdout=None):
+    """
+    Borra las notificaciones fuera del periodo de retención, hasta `max_rows`
+    por ejecución, con `pause` segundos entre bloques. Devuelve las métricas
+    de la ejecución.
+    """
+    start = time.perf_counter()
+    read_cutoff, unread_cutoff = _cutoffs(timezone.now())
+    run = NotificationPruneRun.objects.create(read_cutoff=read_cutoff, unread_cutoff=unread_cutoff)
+
+    read_deleted, read_chunks, read_complete = _prune(
+        Notification.objects.filter(is_read=True, created_at__lt=read_cutoff), chunk_size, max_rows, pause,
+    )
+    unread_deleted, unread_chunks, unread_complete = _prune(
+        Notification.objects.filter(is_read=False, created_at__lt=unread_cutoff),
+        chunk_size, max_rows - read_deleted, pause, unread=True,
+    )
+
+    run.read_deleted = read_deleted
+    run.unread_deleted = unread_deleted
+    run.chunks = read_chunks + unread_chunks
+    run.complete = read_complete and unread_complete
+    run.finished_at = timezone.now()
+    run.duration_seconds = round(time.perf_counter() - start, 3)
+    run.save()
+
+    metrics = {
+        'read_deleted': read_deleted,
+        'unread_deleted': unread_deleted,
+        'chunks': run.chunks,
+        'complete': run.complete,
+        'duration_seconds': run.duration_seconds,
+    }
+    message = (
+        f"Notificaciones depuradas: {read_deleted} leídas y {unread_deleted} no leídas "
+        f"en {run.chunks} bloques ({run.duration_seconds} s)"
+    )
+    logger.info(message)
+    if not run.complete:
+        logger.warning("La depuración alcanzó el máximo por ejecución; el resto se borrará en la siguiente")
+    if stdout:
+        stdout.write(message)
+    return metrics
@@ -1,10 +1,31 @@
 from celery import shared_task
+from notifications.services.fanout import push_notification_batch
 from notifications.services.reminders import process_bimonthly_reminders
+from notifications.services.retention import prune_notifications
 
 
 @shared_task
 def run_bimonthly_reminders(dry_run=False, force=False):
     """
-    Celery task for sending reminders.
+    Celery task for sending reminders. Returns the run metrics (job
+    assignments scanned, reminders created and sent, duration).
     """
-    process_bimonthly_reminders(dry_run=dry_run, force=force, stdout=None)
+    return process_bimonthly_reminders(dry_run=dry_run, force=force, stdout=None)
+
+
+@shared_task
+def push_notification_batch_task(batch, group=None):
+    """
+    Celery task that pushes a bulk notification batch over websockets,
+    either to a broadcast group or to each recipient's group.
+    """
+    return push_notification_batch(batch, group)
+
+
+@shared_task
+def prune_notifications_task():
+    """
+    Celery task that deletes notifications past their retention period
+    in bounded chunks and returns the run metrics.
+    """
+    return prune_notifications()
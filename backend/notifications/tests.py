@@ -1,3 +1,727 @@
-from django.test import TestCase
+import asyncio
+import itertools
+import uuid
+from datetime import date, datetime, time as dt_time, timedelta, timezone as dt_timezone
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import async_to_sync
+from channels.db import database_sync_to_async
+from channels.testing import WebsocketCommunicator
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Group
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+
+from rest_framework.test import APIClient
+
+from agencia.models import Company, Employer, Job
+from candidatos.models import JobHistory, UserProfile
+from centros.models import Center
+
+from . import consumers, counters
+from .channel_groups import center_group_name, center_role_group_name, role_group_name
+from .consumers import NotificationConsumer
+from .models import BimonthlyCommentReminder, Notification, NotificationPruneRun, Settings
+from .services import fanout, reminders
+from .services.retention import prune_notifications
+from .tasks import prune_notifications_task, push_notification_batch_task, run_bimonthly_reminders
+
+User = get_user_model()
+
+IN_MEMORY_LAYERS = {'default': {'BACKEND': 'channels.layers.InMemoryChannelLayer'}}
+
+
+@override_settings(CHANNEL_LAYERS=IN_MEMORY_LAYERS)
+class NotificationBroadcastTests(TransactionTestCase):
+    """
+    Conexiones de NotificationConsumer sobre la capa de channels en memoria:
+    la difusión a un grupo llega solo a los destinatarios, con el ID de su
+    notificación, y los grupos se ajustan al cambiar el centro o los roles.
+    """
+
+    def setUp(self):
+        self.center = Center.objects.create(name='Centro A')
+        self.other_center = Center.objects.create(name='Centro B')
+        self.role = Group.objects.create(name='personal')
+        self.users = []
+        for i in range(8):
+            # Mitad del centro con el rol, un cuarto del centro sin rol y un cuarto de otro centro con el rol
+            in_center, with_role = i % 4 != 3, i % 4 in (0, 1, 3)
+            user = User.objects.create(
+                id=uuid.uuid4(), email=f"difusion{i}@benchmark.invalid", password='!',
+                center=self.center if in_center else self.other_center,
+            )
+            if with_role:
+                user.groups.add(self.role)
+            self.users.append(user)
+        # Uno de los destinatarios desactivó las notificaciones
+        Settings.objects.create(user=self.users[4], receive_notifications=False)
+        self.recipients = User.objects.filter(center=self.center, groups=self.role)
+
+    def _notify(self, recipients):
+        """notify_users sin encolar la tarea: el envío se hace en la prueba."""
+        with mock.patch.object(fanout, '_dispatch'):
+            fanout.notify_users(recipients, 'Aviso', link='/anuncios')
+        return Notification.objects.filter(user__in=recipients).latest('id').batch
+
+    def _expected(self, batch):
+        return {(str(u), pk) for u, pk in Notification.objects.filter(batch=batch).values_list('user_id', 'id')}
+
+    async def _connect(self):
+        communicators = {}
+        for user in self.users:
+            communicator = WebsocketCommunicator(NotificationConsumer.as_asgi(), '/ws/notifications/')
+            communicator.scope['user'] = user
+            connected, _ = await communicator.connect()
+            self.assertTrue(connected)
+            communicators[user.pk] = communicator
+        return communicators
+
+    async def _disconnect(self, communicators):
+        for communicator in communicators.values():
+            await communicator.disconnect()
+
+    async def _broadcast(self, communicators, recipients, group):
+        """Crea un envío, lo difunde y devuelve lo recibido y lo esperado como {(usuario, id)}."""
+        batch = await database_sync_to_async(self._notify)(recipients)
+        await database_sync_to_async(fanout.push_notification_batch)(batch, group)
+        received = set()
+        for user_id, communicator in communicators.items():
+            while not await communicator.receive_nothing(timeout=0.05, interval=0.005):
+                message = await communicator.receive_json_from()
+                received.add((str(user_id), message['id']))
+        return received, await database_sync_to_async(self._expected)(batch)
+
+    def test_group_broadcast_reaches_only_recipients(self):
+        async def run():
+            communicators = await self._connect()
+            try:
+                for group in (
+                    None,
+                    center_role_group_name(self.center.id, self.role.id),
+                    center_group_name(self.center.id),
+                ):
+                    received, expected = await self._broadcast(communicators, self.recipients, group)
+                    self.assertEqual(received, expected, group)
+                    self.assertEqual(len(expected), 3)
+            finally:
+                await self._disconnect(communicators)
+
+        async_to_sync(run)()
+
+    def test_group_broadcast_recipients_read_their_id_from_cache(self):
+        async def run():
+            communicators = await self._connect()
+            try:
+                with mock.patch(
+                    'notifications.consumers._batch_notification_id', wraps=consumers._batch_notification_id,
+                ) as lookup:
+                    received, expected = await self._broadcast(
+                        communicators, self.recipients, center_group_name(self.center.id),
+                    )
+                self.assertEqual(received, expected)
+                # Solo los miembros del grupo sin notificación la buscan en la base de datos
+                looked_up = {str(call.args[1]) for call in lookup.call_args_list}
+                self.assertEqual(len(looked_up), 3)
+                self.assertFalse(looked_up & {user_id for user_id, _ in expected})
+            finally:
+                await self._disconnect(communicators)
+
+        async_to_sync(run)()
+
+    def test_group_broadcast_with_evicted_key_falls_back_to_database(self):
+        cache_recipients = fanout._cache_recipients
+
+        def cache_and_evict(batch):
+            cached = cache_recipients(batch)
+            user_id = Notification.objects.filter(batch=batch).values_list('user_id', flat=True).first()
+            cache.delete(fanout.broadcast_recipient_key(batch, user_id))
+            return cached
+
+        async def run():
+            communicators = await self._connect()
+            try:
+                with mock.patch.object(fanout, '_cache_recipients', side_effect=cache_and_evict):
+                    received, expected = await self._broadcast(
+                        communicators, self.recipients, center_group_name(self.center.id),
+                    )
+                self.assertEqual(received, expected)
+            finally:
+                await self._disconnect(communicators)
+
+        async_to_sync(run)()
+
+    def test_group_broadcast_without_cache_falls_back_to_database(self):
+        async def run():
+            communicators = await self._connect()
+            try:
+                with mock.patch.object(fanout.cache, 'set_many', side_effect=ConnectionError):
+                    received, expected = await self._broadcast(
+                        communicators, self.recipients, center_group_name(self.center.id),
+                    )
+                self.assertEqual(received, expected)
+            finally:
+                await self._disconnect(communicators)
+
+        async_to_sync(run)()
+
+    def test_groups_follow_center_and_role_changes(self):
+        def change_memberships():
+            moved = self.recipients.filter(notification_settings__isnull=True).first()
+            moved.center = self.other_center
+            moved.save()
+            demoted = self.recipients.filter(notification_settings__isnull=True).first()
+            demoted.groups.remove(self.role)
+            return moved, demoted
+
+        async def run():
+            communicators = await self._connect()
+            try:
+                moved, demoted = await database_sync_to_async(change_memberships)()
+                await asyncio.sleep(0.2)
+                checks = (
+                    (moved, center_group_name(self.center.id), False),
+                    (moved, center_group_name(self.other_center.id), True),
+                    (demoted, role_group_name(self.role.id), False),
+                )
+                for user, group, should_receive in checks:
+                    target = User.objects.filter(pk=user.pk)
+                    received, expected = await self._broadcast(communicators, target, group)
+                    self.assertEqual(received, expected if should_receive else set(), group)
+            finally:
+                await self._disconnect(communicators)
+
+        async_to_sync(run)()
+
+
+@override_settings(CHANNEL_LAYERS=IN_MEMORY_LAYERS)
+class NotificationReplayTests(TransactionTestCase):
+    """Reenvío de las notificaciones perdidas al reconectar con `?after=`."""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create(id=uuid.uuid4(), email='reconecta@benchmark.invalid', password='!')
+        self.notifications = [
+            Notification.objects.create(user=self.user, message=f"Aviso {i}", type='info') for i in range(7)
+        ]
+        Notification.objects.create(
+            user=User.objects.create(id=uuid.uuid4(), email='ajeno@benchmark.invalid', password='!'),
+            message='Ajena', type='info',
+        )
+        # Fuera del margen de REPLAY_GRACE salvo que la prueba diga otra cosa
+        Notification.objects.update(created_at=timezone.now() - timedelta(hours=1))
+
+    def _ids(self, notifications):
+        return [notification.id for notification in notifications]
+
+    def _replay(self, after):
+        """Conecta con el cursor `after` y devuelve los mensajes hasta replay_done o resync."""
+        async def run():
+            communicator = WebsocketCommunicator(NotificationConsumer.as_asgi(), f"/ws/notifications/?after={after}")
+            communicator.scope['user'] = self.user
+            connected, _ = await communicator.connect()
+            self.assertTrue(connected)
+            messages = []
+            try:
+                while not messages or messages[-1]['type'] == 'notification':
+                    messages.append(await communicator.receive_json_from())
+                self.assertTrue(await communicator.receive_nothing(timeout=0.05))
+            finally:
+                await communicator.disconnect()
+            return messages
+
+        return async_to_sync(run)()
+
+    def test_missing_notifications_are_replayed_in_batches(self):
+        after = self.notifications[1].id
+        with mock.patch.object(consumers, 'REPLAY_BATCH_SIZE', 3), \
+                mock.patch.object(consumers, '_replay_query', wraps=consumers._replay_query) as query:
+            messages = self._replay(after)
+        *replayed, done = messages
+        self.assertEqual([message['id'] for message in replayed], self._ids(self.notifications[2:]))
+        self.assertTrue(all(message['replayed'] and message['cursor'] == message['id'] for message in replayed))
+        self.assertEqual(
+            done, {'type': 'replay_done', 'cursor': self.notifications[-1].id, 'replayed': 5, 'unread_count': 7},
+        )
+        self.assertEqual([call.args[1:] for call in query.call_args_list], [(after, 3), (self.notifications[4].id, 3)])
+
+    def test_up_to_date_client_gets_nothing(self):
+        messages = self._replay(self.notifications[-1].id)
+        self.assertEqual(messages, [
+            {'type': 'replay_done', 'cursor': self.notifications[-1].id, 'replayed': 0, 'unread_count': 7},
+        ])
+
+    def test_recent_notifications_below_the_cursor_are_replayed(self):
+        # Confirmada después de una con ID mayor: dentro del margen aunque no pase el cursor
+        late = self.notifications[3]
+        Notification.objects.filter(pk=late.pk).update(created_at=timezone.now())
+        messages = self._replay(self.notifications[-1].id)
+        self.assertEqual([message['id'] for message in messages[:-1]], [late.id])
+        self.assertEqual(messages[-1]['replayed'], 0)
+
+    def test_resync_when_too_many_are_missing(self):
+        with mock.patch.object(consumers, 'REPLAY_BATCH_SIZE', 2), mock.patch.object(consumers, 'REPLAY_LIMIT', 4):
+            messages = self._replay(self.notifications[0].id)
+        *replayed, resync = messages
+        self.assertEqual([message['id'] for message in replayed], self._ids(self.notifications[1:5]))
+        self.assertEqual(resync, {'type': 'resync', 'unread_count': 7})
+
+    def test_exactly_replay_limit_missing_does_not_resync(self):
+        with mock.patch.object(consumers, 'REPLAY_BATCH_SIZE', 2), mock.patch.object(consumers, 'REPLAY_LIMIT', 4):
+            messages = self._replay(self.notifications[2].id)
+        self.assertEqual(len(messages), 5)
+        self.assertEqual(messages[-1]['type'], 'replay_done')
+        self.assertEqual(messages[-1]['replayed'], 4)
+
+
+class NotifyUsersTests(TestCase):
+    """notify_users: filtro de avisos desactivados, bulk_create y envío en una tarea."""
+
+    def setUp(self):
+        cache.clear()
+        self.users = [
+            User.objects.create(id=uuid.uuid4(), email=f"masivo{i}@benchmark.invalid", password='!')
+            for i in range(5)
+        ]
+        # El primero desactivó todo y el segundo solo los anuncios; el resto no tiene Settings o acepta todo
+        Settings.objects.create(user=self.users[0], receive_notifications=False)
+        Settings.objects.create(user=self.users[1], receive_announcement_notifications=False)
+        Settings.objects.create(user=self.users[2])
+        self.recipients = User.objects.filter(pk__in=[user.pk for user in self.users])
+
+    def _notified(self):
+        return set(Notification.objects.values_list('user_id', flat=True))
+
+    def test_opt_outs_are_filtered_per_recipient(self):
+        with mock.patch.object(fanout, '_dispatch'):
+            created = fanout.notify_users(
+                self.recipients, 'Anuncio', setting='receive_announcement_notifications',
+            )
+        # El primer usuario que desactivó los avisos no detiene a los demás
+        self.assertEqual(created, 3)
+        self.assertEqual(self._notified(), {user.pk for user in self.users[2:]})
+
+    def test_category_setting_is_optional(self):
+        with mock.patch.object(fanout, '_dispatch'):
+            created = fanout.notify_users(self.recipients, 'Aviso')
+        self.assertEqual(created, 4)
+        self.assertEqual(self._notified(), {user.pk for user in self.users[1:]})
+
+    def test_rows_are_created_with_one_bulk_create(self):
+        with mock.patch.object(fanout, '_dispatch'), \
+                mock.patch.object(Notification.objects, 'bulk_create', wraps=Notification.objects.bulk_create) as bulk_create:
+            fanout.notify_users(self.recipients, 'Aviso', link='/anuncios')
+        bulk_create.assert_called_once()
+        self.assertEqual(Notification.objects.count(), 4)
+        self.assertEqual(Notification.objects.values('batch').distinct().count(), 1)
+
+    def test_push_is_queued_on_commit(self):
+        with mock.patch.object(push_notification_batch_task, 'delay') as delay:
+            with self.captureOnCommitCallbacks(execute=False) as callbacks:
+                fanout.notify_users(self.recipients, 'Aviso', group='center_1')
+            # La petición no espera los websockets: nada se encola antes de confirmar
+            delay.assert_not_called()
+            for callback in callbacks:
+                callback()
+        batch = Notification.objects.values_list('batch', flat=True).first()
+        delay.assert_called_once_with(str(batch), 'center_1')
+
+    def test_push_falls_back_to_process_without_broker(self):
+        from kombu.exceptions import OperationalError
+
+        with mock.patch.object(push_notification_batch_task, 'delay', side_effect=OperationalError), \
+                mock.patch.object(fanout, 'push_notification_batch') as push:
+            with self.captureOnCommitCallbacks(execute=True):
+                fanout.notify_users(self.recipients, 'Aviso')
+        push.assert_called_once()
+
+    def test_task_sends_per_user_group_sends_in_chunks(self):
+        with mock.patch.object(fanout, '_dispatch'):
+            fanout.notify_users(self.recipients, 'Aviso')
+        batch = Notification.objects.values_list('batch', flat=True).first()
+
+        chunks = []
+
+        async def group_send_many(channel_layer, rows):
+            chunks.append([row['user_id'] for row in rows])
+            return 0
+
+        with override_settings(CHANNEL_LAYERS=IN_MEMORY_LAYERS), \
+                mock.patch.object(fanout, 'PUSH_CHUNK_SIZE', 3), \
+                mock.patch.object(fanout, '_group_send_many', side_effect=group_send_many):
+            sent = push_notification_batch_task.apply(args=(str(batch),)).get()
+        self.assertEqual(sent, 4)
+        self.assertEqual([len(chunk) for chunk in chunks], [3, 1])
+        self.assertEqual({user_id for chunk in chunks for user_id in chunk}, {user.pk for user in self.users[1:]})
+
+
+class NotificationListTests(TestCase):
+    """Historial por cursor, lectura y descarte en bloque y contador de no leídas."""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create(id=uuid.uuid4(), email='lector@benchmark.invalid', password='!')
+        self.other = User.objects.create(id=uuid.uuid4(), email='otro@benchmark.invalid', password='!')
+        self.notifications = [
+            Notification.objects.create(user=self.user, message=f"Aviso {i}", type='info', is_read=i % 5 == 0)
+            for i in range(25)
+        ]
+        self.foreign = Notification.objects.create(user=self.other, message='Ajena', type='info')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def _post(self, url, data):
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.post(url, data, format='json')
+
+    def test_cursor_pagination_walks_history_newest_first(self):
+        response = self.client.get('/api/notifications/', {'page_size': 10})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['unread_count'], 20)
+        seen = [item['id'] for item in response.data['results']]
+        # Una notificación nueva no desplaza las páginas siguientes
+        Notification.objects.create(user=self.user, message='Nueva', type='info')
+        next_url = response.data['next']
+        while next_url:
+            response = self.client.get(next_url)
+            seen += [item['id'] for item in response.data['results']]
+            next_url = response.data['next']
+        self.assertEqual(seen, [notification.id for notification in reversed(self.notifications)])
+
+    def test_unread_filter(self):
+        response = self.client.get('/api/notifications/', {'unread': 'true', 'page_size': 100})
+        self.assertEqual(len(response.data['results']), 20)
+        self.assertFalse(any(item['is_read'] for item in response.data['results']))
+
+    def test_mark_read_only_touches_own_notifications(self):
+        self.assertEqual(counters.unread_count(self.user.id), 20)
+        ids = [self.notifications[0].id, self.notifications[1].id, self.notifications[2].id, self.foreign.id]
+        response = self._post('/api/notifications/read/', {'ids': ids})
+        self.assertEqual(response.status_code, 200)
+        # La primera ya estaba leída
+        self.assertEqual(response.data, {'updated': 2, 'unread_count': 18})
+        self.assertFalse(Notification.objects.get(pk=self.foreign.pk).is_read)
+        self.assertEqual(cache.get(counters.UNREAD_KEY.format(self.user.id)), 18)
+
+        response = self._post('/api/notifications/read/', {'all': True})
+        self.assertEqual(response.data, {'updated': 18, 'unread_count': 0})
+        self.assertFalse(Notification.objects.filter(user=self.user, is_read=False).exists())
+        self.assertEqual(counters.unread_count(self.user.id), 0)
+
+    def test_dismiss_deletes_and_counts_only_unread(self):
+        counters.unread_count(self.user.id)
+        ids = [self.notifications[0].id, self.notifications[1].id, self.foreign.id]
+        response = self._post('/api/notifications/dismiss/', {'ids': ids})
+        self.assertEqual(response.data, {'updated': 2, 'unread_count': 19})
+        self.assertFalse(Notification.objects.filter(pk__in=ids[:2]).exists())
+        self.assertTrue(Notification.objects.filter(pk=self.foreign.pk).exists())
+        self.assertEqual(counters.unread_count(self.user.id), 19)
+
+    def test_bulk_actions_require_ids_or_all(self):
+        self.assertEqual(self._post('/api/notifications/read/', {}).status_code, 400)
+        self.assertEqual(self._post('/api/notifications/dismiss/', {'ids': []}).status_code, 400)
+
+    def test_unread_count_endpoint_uses_the_cache(self):
+        self.assertEqual(self.client.get('/api/notifications/unread-count/').data, {'unread_count': 20})
+        with self.assertNumQueries(0):
+            response = self.client.get('/api/notifications/unread-count/')
+        self.assertEqual(response.data, {'unread_count': 20})
+
+
+class UnreadCounterTests(TestCase):
+    """notifications.counters sobre la caché en memoria."""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create(id=uuid.uuid4(), email='contador@benchmark.invalid', password='!')
+        for _ in range(3):
+            Notification.objects.create(user=self.user, message='Aviso', type='info')
+
+    def _adjust(self, user_ids, delta, push=False):
+        with self.captureOnCommitCallbacks(execute=True):
+            counters.adjust_unread(user_ids, delta, push=push)
+
+    def test_count_is_rebuilt_after_cache_loss(self):
+        with self.assertNumQueries(1):
+            self.assertEqual(counters.unread_count(self.user.id), 3)
+        with self.assertNumQueries(0):
+            self.assertEqual(counters.unread_count(self.user.id), 3)
+        cache.clear()
+        Notification.objects.create(user=self.user, message='Aviso', type='info')
+        with self.assertNumQueries(1):
+            self.assertEqual(counters.unread_count(self.user.id), 4)
+
+    def test_adjust_applies_on_commit(self):
+        counters.unread_count(self.user.id)
+        with self.captureOnCommitCallbacks(execute=False) as callbacks:
+            counters.adjust_unread([self.user.id], 2)
+        self.assertEqual(counters.unread_count(self.user.id), 3)
+        for callback in callbacks:
+            callback()
+        self.assertEqual(counters.unread_count(self.user.id), 5)
+
+    def test_missing_keys_are_not_adjusted(self):
+        self._adjust([self.user.id], 1)
+        # El COUNT de la reconstrucción ya incluye cualquier ajuste previo
+        self.assertIsNone(cache.get(counters.UNREAD_KEY.format(self.user.id)))
+        self.assertEqual(counters.unread_count(self.user.id), 3)
+
+    def test_redis_script_skips_missing_keys(self):
+        other = uuid.uuid4()
+        script = mock.Mock(return_value=[5, -1])
+        redis = mock.Mock()
+        redis.register_script.return_value = script
+        with mock.patch.object(counters, '_redis_client', return_value=redis):
+            self.assertEqual(counters._incr([self.user.id, other], 2), {self.user.id: 5})
+        script.assert_called_once_with(
+            keys=[cache.make_key(counters.UNREAD_KEY.format(user_id)) for user_id in (self.user.id, other)], args=[2],
+        )
+
+    def test_push_reports_new_value_and_rebuilds_missing_keys(self):
+        other = User.objects.create(id=uuid.uuid4(), email='otro-contador@benchmark.invalid', password='!')
+        counters.unread_count(self.user.id)
+        with mock.patch.object(counters, '_push') as push:
+            self._adjust([self.user.id, other.id], -1, push=True)
+        push.assert_called_once_with({self.user.id: 2, other.id: 0}, -1)
+
+    def test_cache_failure_drops_the_counters(self):
+        counters.unread_count(self.user.id)
+        with mock.patch.object(counters, '_incr', side_effect=ConnectionError):
+            self._adjust([self.user.id], 1)
+        self.assertIsNone(cache.get(counters.UNREAD_KEY.format(self.user.id)))
+
+
+@override_settings(NOTIFICATION_RETENTION_DAYS=30, NOTIFICATION_UNREAD_RETENTION_DAYS=60)
+class NotificationRetentionTests(TestCase):
+    """Depuración por bloques de las notificaciones fuera del periodo de retención."""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create(id=uuid.uuid4(), email='retencion@benchmark.invalid', password='!')
+        now = timezone.now()
+        self.old_read = self._create(5, True, now - timedelta(days=40))
+        self.old_unread = self._create(3, False, now - timedelta(days=70))
+        # Leídas recientes y no leídas entre los dos cortes se conservan
+        self.kept = self._create(2, True, now - timedelta(days=10)) + self._create(2, False, now - timedelta(days=40))
+
+    def _create(self, count, is_read, created_at):
+        notifications = [
+            Notification.objects.create(user=self.user, message='Aviso', type='info', is_read=is_read)
+            for _ in range(count)
+        ]
+        Notification.objects.filter(pk__in=[n.pk for n in notifications]).update(created_at=created_at)
+        return [n.pk for n in notifications]
+
+    def _prune(self, **kwargs):
+        with self.captureOnCommitCallbacks(execute=True):
+            return prune_notifications(**kwargs)
+
+    def test_expired_notifications_are_deleted_in_chunks(self):
+        metrics = self._prune(chunk_size=2)
+        self.assertEqual(
+            {key: value for key, value in metrics.items() if key != 'duration_seconds'},
+            {'read_deleted': 5, 'unread_deleted': 3, 'chunks': 5, 'complete': True},
+        )
+        self.assertEqual(sorted(Notification.objects.values_list('pk', flat=True)), sorted(self.kept))
+
+    def test_each_chunk_is_its_own_delete(self):
+        with mock.patch.object(Notification.objects, 'filter', wraps=Notification.objects.filter) as filter_:
+            self._prune(chunk_size=3)
+        deletes = [call.kwargs['id__in'] for call in filter_.call_args_list if 'id__in' in call.kwargs]
+        self.assertEqual([len(ids) for ids in deletes], [3, 2, 3])
+        self.assertEqual(sorted(pk for ids in deletes for pk in ids), sorted(self.old_read + self.old_unread))
+
+    def test_deleting_unread_invalidates_the_counter(self):
+        self.assertEqual(counters.unread_count(self.user.id), 5)
+        self._prune()
+        self.assertEqual(counters.unread_count(self.user.id), 2)
+
+    def test_max_rows_caps_a_run(self):
+        metrics = self._prune(chunk_size=3, max_rows=4)
+        self.assertEqual((metrics['read_deleted'], metrics['unread_deleted']), (4, 0))
+        self.assertEqual(metrics['chunks'], 2)
+        self.assertFalse(metrics['complete'])
+        # La siguiente ejecución borra el resto
+        metrics = self._prune(chunk_size=3, max_rows=4)
+        self.assertEqual((metrics['read_deleted'], metrics['unread_deleted'], metrics['complete']), (1, 3, True))
+
+    def test_cap_reached_exactly_is_complete(self):
+        metrics = self._prune(max_rows=8)
+        self.assertEqual(metrics['read_deleted'] + metrics['unread_deleted'], 8)
+        self.assertTrue(metrics['complete'])
+
+    def test_runs_are_recorded(self):
+        metrics = self._prune(chunk_size=3, max_rows=4)
+        run = NotificationPruneRun.objects.get()
+        self.assertEqual(
+            (run.read_deleted, run.unread_deleted, run.chunks, run.complete, run.duration_seconds),
+            (4, 0, 2, False, metrics['duration_seconds']),
+        )
+        self.assertIsNotNone(run.finished_at)
+        self.assertEqual(run.read_cutoff.date(), (run.started_at - timedelta(days=30)).date())
+        self.assertEqual(run.unread_cutoff.date(), (run.started_at - timedelta(days=60)).date())
+
+    def test_task_returns_the_metrics(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            metrics = prune_notifications_task.apply().get()
+        self.assertEqual((metrics['read_deleted'], metrics['unread_deleted'], metrics['complete']), (5, 3, True))
+        self.assertEqual(NotificationPruneRun.objects.count(), 1)
+
+
+def legacy_should_send(reminder, today, period_start, force):
+    """
+    Cadena de condiciones que process_bimonthly_reminders evaluaba
+    recordatorio por recordatorio antes del planificador, con `today` fijo.
+    """
+    if reminder.comment_provided:
+        return False
+    days_until_due = (reminder.period_end - today).days
+    is_overdue = today > reminder.period_end
+    last_sent = reminder.last_reminder_sent
+    if today >= period_start + timedelta(days=15) and (not reminder.notification_sent or force):
+        return True
+    elif reminder.notification_sent and last_sent:
+        return (today - last_sent.date()).days >= 7
+    elif 0 <= days_until_due <= 3:
+        return not last_sent or (today - last_sent.date()).days >= 1
+    elif is_overdue:
+        return not last_sent or (today - last_sent.date()).days >= 1
+    return False
+
+
+class BimonthlyReminderTests(TestCase):
+    """Planificador de recordatorios bimestrales (notifications/services/reminders.py)."""
+
+    PERIOD = (date(2026, 3, 1), date(2026, 4, 30))
+
+    def setUp(self):
+        cache.clear()
+        self.company = Company.objects.create(name='Empresa')
+        self.employer = Employer.objects.create(
+            user=User.objects.create(id=uuid.uuid4(), email='empleador@benchmark.invalid', password='!'),
+            company=self.company,
+        )
+        self.job = Job.objects.create(name='Almacén', company=self.company)
+
+    def _candidate(self, job=None, **history):
+        user = User.objects.create(
+            id=uuid.uuid4(), email=f"candidato{uuid.uuid4().hex[:8]}@benchmark.invalid", password='!',
+            first_name='Ana', last_name='López',
+        )
+        candidate = UserProfile.objects.create(user=user)
+        if job is not None:
+            JobHistory.objects.create(candidate=candidate, job=job, **history)
+        return candidate
+
+    def _run(self, today, **kwargs):
+        now = datetime.combine(today, dt_time(15), tzinfo=dt_timezone.utc)
+        with mock.patch('django.utils.timezone.now', return_value=now):
+            return reminders.process_bimonthly_reminders(stdout=mock.Mock(), **kwargs)
+
+    def test_bimonthly_period(self):
+        self.assertEqual(reminders.bimonthly_period(date(2026, 3, 31)), self.PERIOD)
+        self.assertEqual(reminders.bimonthly_period(date(2028, 2, 10)), (date(2028, 1, 1), date(2028, 2, 29)))
+        self.assertEqual(reminders.bimonthly_period(date(2026, 12, 31)), (date(2026, 11, 1), date(2026, 12, 31)))
+
+    def test_due_filter_matches_previous_chain(self):
+        period_start, period_end = self.PERIOD
+        # Días desde el último envío (None: nunca) y la hora UTC a la que se hizo
+        last_sent = [None] + list(itertools.product((0, 1, 6, 7, 8), (dt_time(0, 30), dt_time(23, 30))))
+        cases = {}
+        for sent, last, comment in itertools.product((False, True), last_sent, (False, True)):
+            reminder = BimonthlyCommentReminder.objects.create(
+                employer=self.employer, candidate=self._candidate(), job=self.job,
+                period_start=period_start, period_end=period_end,
+                notification_sent=sent, comment_provided=comment,
+            )
+            cases[reminder.pk] = last
+
+        days = (1, 14, 15, 20, 40, 56, 57, 60, 61, 75)
+        for today in (period_start + timedelta(days=day) for day in days):
+            for pk, last in cases.items():
+                BimonthlyCommentReminder.objects.filter(pk=pk).update(
+                    last_reminder_sent=None if last is None else datetime.combine(
+                        today - timedelta(days=last[0]), last[1], tzinfo=dt_timezone.utc,
+                    ),
+                )
+            rows = list(BimonthlyCommentReminder.objects.all())
+            for force in (False, True):
+                due = set(
+                    BimonthlyCommentReminder.objects.filter(
+                        reminders._due_q(today, period_start, period_end, force),
+                    ).values_list('pk', flat=True)
+                )
+                expected = {row.pk for row in rows if legacy_should_send(row, today, period_start, force)}
+                self.assertEqual(due, expected, (today, force))
+
+    def test_conflicts_without_ignore_conflicts_fall_back_to_get_or_create(self):
+        period_start, period_end = self.PERIOD
+        candidates = [self._candidate() for _ in range(3)]
+        keys = {(self.employer.pk, candidate.pk, self.job.pk) for candidate in candidates}
+        # Otro proceso lo creó entre la consulta de los existentes y el insert
+        BimonthlyCommentReminder.objects.create(
+            employer=self.employer, candidate=candidates[0], job=self.job,
+            period_start=period_start, period_end=period_end,
+        )
+        with mock.patch.object(connection.features, 'supports_ignore_conflicts', False), \
+                mock.patch.object(
+                    BimonthlyCommentReminder.objects, 'filter',
+                    side_effect=[BimonthlyCommentReminder.objects.none()],
+                ):
+            created = reminders._create_missing(keys, period_start, period_end)
+        self.assertEqual(created, 2)
+        self.assertEqual(BimonthlyCommentReminder.objects.count(), 3)
+
+    def test_without_conflicts_one_bulk_create(self):
+        period_start, period_end = self.PERIOD
+        keys = {(self.employer.pk, self._candidate().pk, self.job.pk) for _ in range(3)}
+        with mock.patch.object(connection.features, 'supports_ignore_conflicts', False), \
+                mock.patch.object(
+                    BimonthlyCommentReminder.objects, 'get_or_create',
+                ) as get_or_create:
+            created = reminders._create_missing(keys, period_start, period_end)
+        self.assertEqual(created, 3)
+        get_or_create.assert_not_called()
+        self.assertEqual(BimonthlyCommentReminder.objects.count(), 3)
+
+    def test_run_metrics(self):
+        for _ in range(3):
+            self._candidate(self.job)
+        self._candidate(self.job, end_date=date(2026, 2, 1))
+        self._candidate(Job.objects.create(name='Sin empleador', company=Company.objects.create(name='Otra')))
+
+        metrics = self._run(date(2026, 3, 20), chunk_size=2)
+        self.assertEqual(
+            {key: value for key, value in metrics.items() if key != 'duration_seconds'},
+            {
+                'rows_scanned': 4, 'reminders_created': 3, 'reminders_sent': 3, 'skipped_no_employer': 1,
+                'chunks': 2, 'errors': 0, 'overdue': 0,
+            },
+        )
+        self.assertGreaterEqual(metrics['duration_seconds'], 0)
+        notifications = Notification.objects.filter(user_id=self.employer.pk)
+        self.assertEqual(notifications.count(), 3)
+        self.assertTrue(all(n.message.startswith('📝 Recordatorio: Es momento de evaluar a Ana López') for n in notifications))
+        self.assertEqual(set(BimonthlyCommentReminder.objects.values_list('reminder_count', flat=True)), {1})
+
+        # El mismo día no se repite; una semana después sí
+        self.assertEqual(self._run(date(2026, 3, 20))['reminders_sent'], 0)
+        self.assertEqual(self._run(date(2026, 3, 27))['reminders_sent'], 3)
+        self.assertEqual(Notification.objects.filter(user_id=self.employer.pk).count(), 6)
+
+    def test_dry_run_counts_without_sending(self):
+        self._candidate(self.job)
+        metrics = self._run(date(2026, 3, 20), dry_run=True)
+        self.assertEqual((metrics['reminders_created'], metrics['reminders_sent']), (1, 1))
+        self.assertFalse(Notification.objects.exists())
+        self.assertFalse(BimonthlyCommentReminder.objects.filter(notification_sent=True).exists())
+
+    def test_task_returns_the_metrics(self):
+        self._candidate(self.job)
+        now = datetime(2026, 3, 20, 15, tzinfo=dt_timezone.utc)
+        with mock.patch('django.utils.timezone.now', return_value=now):
+            metrics = run_bimonthly_reminders.apply().get()
+        self.assertEqual((metrics['rows_scanned'], metrics['reminders_sent']), (1, 1))
+        self.assertIn('duration_seconds', metrics)
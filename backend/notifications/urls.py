@@ -4,5 +4,8 @@ from . import views
 urlpatterns = [
     path("", views.NotificationListView.as_view(), name="notifications-list"),
     path("<int:notification_id>/", views.NotificationListView.as_view(), name="notification-detail"),
+    path("read/", views.NotificationMarkReadView.as_view(), name="notifications-mark-read"),
+    path("dismiss/", views.NotificationDismissView.as_view(), name="notifications-dismiss"),
+    path("unread-count/", views.UnreadCountView.as_view(), name="notifications-unread-count"),
     path("settings/", views.SettingsView.as_view(), name="notification-settings"),
 ]
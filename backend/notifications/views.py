@@ -1,13 +1,19 @@
+from rest_framework import generics
 from rest_framework.views import APIView
 from rest_framework.response import Response
+from rest_framework.pagination import CursorPagination
 from rest_framework.permissions import IsAuthenticated
 from .models import Notification, Settings, BimonthlyCommentReminder
-from .serializers import NotificationSerializer, SettingsSerializer
+from .serializers import NotificationSerializer, NotificationBulkSerializer, SettingsSerializer
+from .channel_groups import user_group_name
+from .counters import adjust_unread, unread_count
+from .services.fanout import notification_event
 from rest_framework.exceptions import NotFound
 from django.core.exceptions import ObjectDoesNotExist
 from asgiref.sync import async_to_sync
 from channels.layers import get_channel_layer
 from django.contrib.auth import get_user_model
+from django.db import transaction
 from django.utils import timezone
 import logging
 
@@ -27,6 +33,7 @@ def send_notification_to_user(user_id, message, link=None, notification_type="in
             link=link,
             type=notification_type
         )
+        adjust_unread([user.id], 1)
 
         channel_layer = get_channel_layer()
 
@@ -36,17 +43,8 @@ def send_notification_to_user(user_id, message, link=None, notification_type="in
 
         try:
             async_to_sync(channel_layer.group_send)(
-                f"user_{user.id}_notifications",
-                {
-                    'type': 'send_notification',
-                    'notification': {
-                        'id': notification.id,
-                        'message': notification.message,
-                        'link': notification.link,
-                        'type': notification.type,
-                        'created_at': notification.created_at.isoformat(),
-                    }
-                }
+                user_group_name(user.id),
+                notification_event(vars(notification))
             )
         except Exception as e:
             # El consumidor puede no estar activo
@@ -55,27 +53,92 @@ def send_notification_to_user(user_id, message, link=None, notification_type="in
     except ObjectDoesNotExist:
         logger.warning(f"User with ID {user_id} not found when trying to send notification.")
 
-class NotificationListView(APIView):
+class NotificationPagination(CursorPagination):
+    """
+    Historial de notificaciones por cursor, de la más reciente a la más
+    antigua. El ID es creciente, así que el cursor recorre el índice de la
+    llave primaria y no se desfasa con las notificaciones que llegan.
+    """
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    ordering = '-id'
+
+
+class NotificationListView(generics.ListAPIView):
+    """
+    GET: historial paginado (`?unread=true` para solo las no leídas) con el
+    contador de no leídas. PATCH /<id>/: marca una notificación como leída.
+    """
     permission_classes = [IsAuthenticated]
+    serializer_class = NotificationSerializer
+    pagination_class = NotificationPagination
 
-    def get(self, request):
-        notifications = request.user.notifications.all()
-        serializer = NotificationSerializer(notifications, many=True)
-        return Response(serializer.data)
+    def get_queryset(self):
+        queryset = Notification.objects.filter(user=self.request.user)
+        if self.request.query_params.get('unread') in ('1', 'true'):
+            queryset = queryset.filter(is_read=False)
+        return queryset
+
+    def list(self, request, *args, **kwargs):
+        response = super().list(request, *args, **kwargs)
+        response.data['unread_count'] = unread_count(request.user.id)
+        return response
 
     def patch(self, request, notification_id):
-        try:
-            notification = Notification.objects.get(id=notification_id, user=request.user)
-        except Notification.DoesNotExist:
+        if not Notification.objects.filter(id=notification_id, user=request.user).exists():
             raise NotFound("Notification not found.")
-        
-        notification.is_read = True
-        notification.save()  # Mark it as read
-        
-        # Delete the notification after it's marked as read
-        notification.delete()
 
-        return Response({"success": True})
+        before = unread_count(request.user.id)
+        updated = Notification.objects.filter(id=notification_id, user=request.user, is_read=False).update(is_read=True)
+        adjust_unread([request.user.id], -updated, push=True)
+        return Response({"success": True, "unread_count": max(before - updated, 0)})
+
+
+class NotificationBulkView(APIView):
+    """Base de las acciones sobre varias notificaciones (`ids` o `all`)."""
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        serializer = NotificationBulkSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        queryset = Notification.objects.filter(user=request.user)
+        if not serializer.validated_data['all']:
+            queryset = queryset.filter(id__in=serializer.validated_data['ids'])
+
+        # El contador se ajusta al confirmar la transacción (que con
+        # ATOMIC_REQUESTS es después de responder), así que se calcula aquí
+        before = unread_count(request.user.id)
+        with transaction.atomic():
+            affected, unread_removed = self.apply(queryset)
+            adjust_unread([request.user.id], -unread_removed, push=True)
+        return Response({"updated": affected, "unread_count": max(before - unread_removed, 0)})
+
+    def apply(self, queryset):
+        """Devuelve (renglones afectados, no leídas que dejan de contarse)."""
+        raise NotImplementedError
+
+
+class NotificationMarkReadView(NotificationBulkView):
+    def apply(self, queryset):
+        updated = queryset.filter(is_read=False).update(is_read=True)
+        return updated, updated
+
+
+class NotificationDismissView(NotificationBulkView):
+    def apply(self, queryset):
+        unread, _ = queryset.filter(is_read=False).delete()
+        read, _ = queryset.filter(is_read=True).delete()
+        return unread + read, unread
+
+
+class UnreadCountView(APIView):
+    """Contador de no leídas para los clientes sin websocket; no toca la base de datos."""
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        return Response({"unread_count": unread_count(request.user.id)})
+
 
 class SettingsView(APIView):
     permission_classes = [IsAuthenticated]
@@ -8,6 +8,7 @@ from .report_proyecto_vida import ProyectoVidaReport
 from .report_cuadro_habilidades import CuadroHabilidadesReport
 from .report_plan_apoyos import PlanApoyosReport
 from api.permissions import PersonalPermission, GerentePermission
+from api.roles import has_role
 
 class ReportAccessPermission(BasePermission):
     """
@@ -18,10 +19,10 @@ class ReportAccessPermission(BasePermission):
         if request.user.is_staff:
             return True
 
-        if request.user.groups.filter(name='personal').exists():
+        if has_role(request.user, 'personal'):
             return obj.user.center == request.user.center
         
-        if request.user.groups.filter(name='empleador').exists():
+        if has_role(request.user, 'empleador'):
             report_type = view.kwargs.get('report_type')
             if report_type == 'habilidades':
                 return obj.user.current_job.company == request.user.employer.company
@@ -11,6 +11,8 @@ echo "Checking for pending migrations..."
 python3.12 manage.py showmigrations --plan | grep -q '\[ \]' && {
     echo "Running pending migrations..."
     python3.12 manage.py migrate --noinput
+    # Llena el índice de matching la primera vez que se crea su tabla
+    python3.12 manage.py rebuild_match_index --if-empty
 } || {
     echo "No pending migrations found, skipping..."
 }
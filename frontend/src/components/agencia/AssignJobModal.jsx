@@ -80,7 +80,9 @@ const AssignJobModal = ({ open, candidate, availableJobs, onClose, onAssigned })
   const loadMatchingData = async () => {
     setLoadingMatching(true);
     try {
-      const response = await api.get(`/api/agencia/candidatos/${candidate.id}/matching-jobs/`);
+      const response = await api.get(`/api/agencia/candidatos/${candidate.id}/matching-jobs/`, {
+        params: { job_id: selectedJob },
+      });
       const matchingJobs = response.data.empleos_matching || [];
       const selectedJobMatching = matchingJobs.find(job => job.empleo.id === parseInt(selectedJob));
       setMatchingData(selectedJobMatching);
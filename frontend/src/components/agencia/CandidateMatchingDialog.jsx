@@ -12,6 +12,7 @@ import api from '../../api';
 const CandidateMatchingDialog = ({ open, candidate, onClose }) => {
   const [matchingData, setMatchingData] = useState(null);
   const [loading, setLoading] = useState(false);
+  const [loadingMore, setLoadingMore] = useState(false);
   const [error, setError] = useState('');
 
   useEffect(() => {
@@ -35,6 +36,26 @@ const CandidateMatchingDialog = ({ open, candidate, onClose }) => {
     }
   };
 
+  // Los resultados vienen paginados (MatchPagination, 50 por página): se sigue `next`
+  const loadMore = async () => {
+    if (!matchingData?.next) return;
+    setLoadingMore(true);
+    setError('');
+
+    try {
+      const response = await api.get(matchingData.next);
+      setMatchingData((prev) => ({
+        ...response.data,
+        empleos_matching: [...prev.empleos_matching, ...response.data.empleos_matching],
+      }));
+    } catch (error) {
+      console.error('Error al cargar más empleos:', error);
+      setError('Error al cargar más empleos');
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
   const getMatchingColor = (percentage) => {
     if (percentage >= 80) return 'success';
     if (percentage >= 60) return 'warning';
@@ -106,6 +127,7 @@ const CandidateMatchingDialog = ({ open, candidate, onClose }) => {
             {/* Resultados de matching */}
             <Typography variant="h6" gutterBottom>
               Empleos Encontrados ({matchingData.total_empleos})
+              {matchingData.next && ` — mostrando ${matchingData.empleos_matching.length}`}
             </Typography>
 
             {matchingData.empleos_matching.length === 0 ? (
@@ -204,6 +226,14 @@ const CandidateMatchingDialog = ({ open, candidate, onClose }) => {
                 ))}
               </Box>
             )}
+
+            {matchingData.next && (
+              <Box display="flex" justifyContent="center" mt={2}>
+                <Button variant="outlined" onClick={loadMore} disabled={loadingMore}>
+                  {loadingMore ? <CircularProgress size={20} /> : 'Cargar más empleos'}
+                </Button>
+              </Box>
+            )}
           </Box>
         )}
       </DialogContent>
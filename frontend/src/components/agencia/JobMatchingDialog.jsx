@@ -12,6 +12,7 @@ import api from '../../api';
 const JobMatchingDialog = ({ open, job, onClose }) => {
   const [matchingData, setMatchingData] = useState(null);
   const [loading, setLoading] = useState(false);
+  const [loadingMore, setLoadingMore] = useState(false);
   const [error, setError] = useState('');
 
   useEffect(() => {
@@ -35,6 +36,26 @@ const JobMatchingDialog = ({ open, job, onClose }) => {
     }
   };
 
+  // Los resultados vienen paginados (MatchPagination, 50 por página): se sigue `next`
+  const loadMore = async () => {
+    if (!matchingData?.next) return;
+    setLoadingMore(true);
+    setError('');
+
+    try {
+      const response = await api.get(matchingData.next);
+      setMatchingData((prev) => ({
+        ...response.data,
+        candidatos_matching: [...prev.candidatos_matching, ...response.data.candidatos_matching],
+      }));
+    } catch (error) {
+      console.error('Error al cargar más candidatos:', error);
+      setError('Error al cargar más candidatos');
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
   const getMatchingColor = (percentage) => {
     if (percentage >= 80) return 'success';
     if (percentage >= 60) return 'warning';
@@ -106,6 +127,7 @@ const JobMatchingDialog = ({ open, job, onClose }) => {
             {/* Resultados de matching */}
             <Typography variant="h6" gutterBottom>
               Candidatos Encontrados ({matchingData.total_candidatos})
+              {matchingData.next && ` — mostrando ${matchingData.candidatos_matching.length}`}
             </Typography>
 
             {matchingData.candidatos_matching.length === 0 ? (
@@ -197,6 +219,14 @@ const JobMatchingDialog = ({ open, job, onClose }) => {
                 ))}
               </Box>
             )}
+
+            {matchingData.next && (
+              <Box display="flex" justifyContent="center" mt={2}>
+                <Button variant="outlined" onClick={loadMore} disabled={loadingMore}>
+                  {loadingMore ? <CircularProgress size={20} /> : 'Cargar más candidatos'}
+                </Button>
+              </Box>
+            )}
           </Box>
         )}
       </DialogContent>
@@ -1,4 +1,4 @@
-import { Box, IconButton, Popover, Typography, List, ListItem, Divider, useTheme, Menu, MenuItem, Avatar, Badge, Tooltip, TextField, InputAdornment, Paper, ListItemIcon, ListItemText } from "@mui/material";
+import { Box, Button, IconButton, Popover, Typography, List, ListItem, Divider, useTheme, Menu, MenuItem, Avatar, Badge, Tooltip, TextField, InputAdornment, Paper, ListItemIcon, ListItemText } from "@mui/material";
 import { useContext, useState, useEffect } from "react";
 import { ColorModeContext, tokens } from "../../theme";
 import { SidebarContext } from "./SidebarContext";
@@ -18,7 +18,7 @@ import CheckCircleOutlineIcon from '@mui/icons-material/CheckCircleOutline';
 import RadioButtonUncheckedIcon from '@mui/icons-material/RadioButtonUnchecked';
 import SearchIcon from '@mui/icons-material/Search';
 import { useDispatch, useSelector } from "react-redux";
-import { fetchNotifications, markAsRead } from "../../features/notifications/notificationsSlice";
+import { fetchNotifications, fetchMoreNotifications, markAllAsRead, markAsRead } from "../../features/notifications/notificationsSlice";
 import { useNavigate, Link, useLocation } from "react-router-dom";
 import { useMsal } from "@azure/msal-react";
 import LogoutConfirmationDialog from "../LogoutConfirmationDialog";
@@ -32,7 +32,7 @@ const Topbar = () => {
   const { isCollapsed, toggleCollapsed } = useContext(SidebarContext);
 
   const dispatch = useDispatch();
-  const { notifications, unreadCount } = useSelector((state) => state.notifications);
+  const { notifications, unreadCount, nextCursor } = useSelector((state) => state.notifications);
   const user = useSelector((state) => state.auth.user);
   const isStaff = user?.is_staff;
   
@@ -100,6 +100,14 @@ const Topbar = () => {
     // No navigation here, just mark as read
   };
 
+  const handleMarkAllAsRead = () => {
+    dispatch(markAllAsRead());
+  };
+
+  const handleLoadMoreNotifications = () => {
+    dispatch(fetchMoreNotifications());
+  };
+
 
   // User Menu Handlers
   const handleMenuClick = (event) => {
@@ -317,7 +325,14 @@ const Topbar = () => {
         transformOrigin={{ vertical: "top", horizontal: "right" }}
       >
         <Box sx={{ width: 300, maxHeight: 400, overflowY: "auto" }}>
-          <Typography variant="h6" sx={{ p: 2 }}>Notificaciones</Typography>
+          <Box sx={{ display: "flex", justifyContent: "space-between", alignItems: "center", p: 2 }}>
+            <Typography variant="h6">Notificaciones</Typography>
+            {unreadCount > 0 && (
+              <Button size="small" onClick={handleMarkAllAsRead}>
+                Marcar todas como leídas
+              </Button>
+            )}
+          </Box>
           <List>
             {notifications.map((notification) => (
               <ListItem
@@ -372,6 +387,13 @@ const Topbar = () => {
             {notifications.length === 0 && (
               <Typography sx={{ p: 2 }}>Sin Notificaciones</Typography>
             )}
+            {nextCursor && (
+              <Box sx={{ display: "flex", justifyContent: "center", p: 1 }}>
+                <Button size="small" onClick={handleLoadMoreNotifications}>
+                  Ver notificaciones anteriores
+                </Button>
+              </Box>
+            )}
           </List>
         </Box>
       </Popover>
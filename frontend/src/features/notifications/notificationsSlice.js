@@ -1,7 +1,11 @@
 import { createSlice, createAsyncThunk } from "@reduxjs/toolkit";
 import axios from "../../api"; // your axios instance
 
-// Fetch notifications
+// The list endpoint is cursor-paginated; keep only the cursor so the request
+// goes through the axios base URL instead of the absolute `next` link.
+const cursorFrom = (url) => (url ? new URL(url).searchParams.get("cursor") : null);
+
+// Fetch the first page of notifications
 export const fetchNotifications = createAsyncThunk(
   "notifications/fetchNotifications",
   async (_, thunkAPI) => {
@@ -14,6 +18,35 @@ export const fetchNotifications = createAsyncThunk(
   }
 );
 
+// Fetch the next (older) page of notifications
+export const fetchMoreNotifications = createAsyncThunk(
+  "notifications/fetchMoreNotifications",
+  async (_, { getState, rejectWithValue }) => {
+    const { nextCursor } = getState().notifications;
+    if (!nextCursor) {
+      return rejectWithValue("No more notifications.");
+    }
+    try {
+      const response = await axios.get("/api/notifications/", { params: { cursor: nextCursor } });
+      return response.data;
+    } catch (error) {
+      return rejectWithValue(error.response?.data || "Failed to load notifications.");
+    }
+  }
+);
+
+export const fetchUnreadCount = createAsyncThunk(
+  "notifications/fetchUnreadCount",
+  async (_, { rejectWithValue }) => {
+    try {
+      const response = await axios.get("/api/notifications/unread-count/");
+      return response.data.unread_count;
+    } catch (error) {
+      return rejectWithValue(error.response?.data || "Failed to load unread count.");
+    }
+  }
+);
+
 export const markAsRead = createAsyncThunk(
   "notifications/markAsRead",
   async (notificationId, { getState, rejectWithValue }) => {
@@ -29,16 +62,41 @@ export const markAsRead = createAsyncThunk(
 
     try {
       const response = await axios.patch(`/api/notifications/${notificationId}/`);
-      return notificationId; // Return notificationId to update the state
+      return { notificationId, unreadCount: response.data.unread_count };
     } catch (error) {
       return rejectWithValue(error.response?.data || "Failed to mark as read.");
     }
   }
 );
 
+export const markAllAsRead = createAsyncThunk(
+  "notifications/markAllAsRead",
+  async (_, { rejectWithValue }) => {
+    try {
+      const response = await axios.post("/api/notifications/read/", { all: true });
+      return response.data.unread_count;
+    } catch (error) {
+      return rejectWithValue(error.response?.data || "Failed to mark all as read.");
+    }
+  }
+);
+
+export const dismissNotifications = createAsyncThunk(
+  "notifications/dismissNotifications",
+  async (ids, { rejectWithValue }) => {
+    try {
+      const response = await axios.post("/api/notifications/dismiss/", { ids });
+      return { ids, unreadCount: response.data.unread_count };
+    } catch (error) {
+      return rejectWithValue(error.response?.data || "Failed to dismiss notifications.");
+    }
+  }
+);
+
 const initialState = {
   notifications: [],
   unreadCount: 0,
+  nextCursor: null,
 };
 
 const notificationsSlice = createSlice({
@@ -50,27 +108,61 @@ const notificationsSlice = createSlice({
       state.unreadCount = action.payload.filter((n) => !n.is_read).length;
     },
     addNotification(state, action) {
-      state.notifications.unshift(action.payload);
-      state.unreadCount++;
+      if (state.notifications.some((n) => n.id === action.payload.id)) {
+        return;
+      }
+      const notification = { ...action.payload, is_read: Boolean(action.payload.is_read) };
+      // Replayed notifications may arrive out of order; keep newest first
+      const index = state.notifications.findIndex((n) => n.id < notification.id);
+      state.notifications.splice(index === -1 ? state.notifications.length : index, 0, notification);
+      if (!notification.is_read) {
+        state.unreadCount++;
+      }
+    },
+    // Counter pushed by the server after reads or dismissals in another tab
+    setUnreadCount(state, action) {
+      state.unreadCount = action.payload;
     },
     clearNotifications(state) {
       state.notifications = [];
       state.unreadCount = 0;
+      state.nextCursor = null;
     },
   },
   extraReducers: (builder) => {
     builder
     .addCase(markAsRead.fulfilled, (state, action) => {
-      const notificationId = action.payload;
+      const { notificationId, unreadCount } = action.payload;
       const notification = state.notifications.find((n) => n.id === notificationId);
       if (notification) {
         notification.is_read = true;
-        state.unreadCount--;
       }
+      state.unreadCount = unreadCount;
+    })
+    .addCase(markAllAsRead.fulfilled, (state, action) => {
+      state.notifications.forEach((n) => {
+        n.is_read = true;
+      });
+      state.unreadCount = action.payload;
+    })
+    .addCase(dismissNotifications.fulfilled, (state, action) => {
+      const { ids, unreadCount } = action.payload;
+      state.notifications = state.notifications.filter((n) => !ids.includes(n.id));
+      state.unreadCount = unreadCount;
     })
     .addCase(fetchNotifications.fulfilled, (state, action) => {
-      state.notifications = action.payload;
-      state.unreadCount = action.payload.filter((n) => !n.is_read).length;
+      state.notifications = action.payload.results;
+      state.nextCursor = cursorFrom(action.payload.next);
+      state.unreadCount = action.payload.unread_count;
+    })
+    .addCase(fetchMoreNotifications.fulfilled, (state, action) => {
+      const known = new Set(state.notifications.map((n) => n.id));
+      state.notifications.push(...action.payload.results.filter((n) => !known.has(n.id)));
+      state.nextCursor = cursorFrom(action.payload.next);
+      state.unreadCount = action.payload.unread_count;
+    })
+    .addCase(fetchUnreadCount.fulfilled, (state, action) => {
+      state.unreadCount = action.payload;
     })
     .addCase(markAsRead.rejected, (state, action) => {
       if (action.payload !== "Notification already marked as read.") {
@@ -80,8 +172,7 @@ const notificationsSlice = createSlice({
   },
 });
 
-export const { setNotifications, addNotification, clearNotifications } =
+export const { setNotifications, addNotification, setUnreadCount, clearNotifications } =
   notificationsSlice.actions;
 
 export default notificationsSlice.reducer;
-
@@ -104,6 +104,8 @@ const JobCandidatesPage = () => {
 
     // State to manage visibility of comments for each candidate
     const [showComments, setShowComments] = useState({});
+    // Older comments loaded on demand (cursor-paginated), keyed by candidate
+    const [olderComments, setOlderComments] = useState({});
 
     // States for inline job editing
     const [isEditing, setIsEditing] = useState(false);
@@ -156,6 +158,7 @@ const JobCandidatesPage = () => {
                 axios.get(habilidadesURL),
             ]);
             setJobData(jobRes.data);
+            setOlderComments({});
             setHabilidades(habilidadesRes.data);
 
             // Set selected habilidades for editing
@@ -193,12 +196,20 @@ const JobCandidatesPage = () => {
 
     /**
      * Opens the add comment dialog for a specific candidate.
-     * It fetches the relevant job history entry for the current job and candidate.
-     * @param {number} candidateId - The ID of the candidate to add a comment for.
+     * Uses the current job history entry returned with the job; falls back to
+     * fetching the candidate's job histories when it is not available.
+     * @param {object} candidate - The assigned candidate to add a comment for.
      */
-    const openAddCommentDialog = async (candidateId) => {
+    const openAddCommentDialog = async (candidate) => {
+        if (candidate.current_job_history_id) {
+            setJobHistoryForComment({ id: candidate.current_job_history_id, candidate_name: candidate.full_name });
+            setCommentFormData({ comment_text: '', type: 'info' });
+            setCommentErrorMsg('');
+            setOpenCommentDialog(true);
+            return;
+        }
         try {
-            const response = await axios.get(`${jobHistoryURL}?candidate=${candidateId}`);
+            const response = await axios.get(`${jobHistoryURL}?candidate=${candidate.id}`);
             const jobHistories = response.data;
             // Find the job history entry that matches the current job and has no end date (current assignment)
             const currentJobHistory = jobHistories.find(
@@ -267,6 +278,43 @@ const JobCandidatesPage = () => {
         }));
     };
 
+    /**
+     * Loads the next page of older comments for a candidate from the
+     * cursor-paginated comment history.
+     * @param {object} candidate - The assigned candidate whose comments to load.
+     */
+    const loadOlderComments = async (candidate) => {
+        const loaded = olderComments[candidate.id];
+        const url = loaded?.next || `${commentsURL}${candidate.current_job_history_id}/`;
+        try {
+            const response = await axios.get(url);
+            const known = new Set([
+                ...candidate.current_job_history_comments.map(c => c.id),
+                ...(loaded?.comments || []).map(c => c.id),
+            ]);
+            setOlderComments(prev => ({
+                ...prev,
+                [candidate.id]: {
+                    comments: [...(loaded?.comments || []), ...response.data.results.filter(c => !known.has(c.id))],
+                    next: response.data.next,
+                },
+            }));
+        } catch (err) {
+            console.error("Error fetching older comments:", err);
+            setError("No se pudieron cargar las observaciones anteriores.");
+        }
+    };
+
+    /**
+     * Returns the comments loaded for a candidate: the latest ones sent with the
+     * job plus any older pages loaded on demand.
+     * @param {object} candidate - The assigned candidate.
+     */
+    const candidateComments = (candidate) => [
+        ...(candidate.current_job_history_comments || []),
+        ...(olderComments[candidate.id]?.comments || []),
+    ];
+
     /**
      * Starts inline editing mode for the job.
      */
@@ -814,7 +862,7 @@ const JobCandidatesPage = () => {
                                     <Tooltip title="Añadir Observación al Candidato">
                                         <IconButton
                                             color="primary"
-                                            onClick={() => openAddCommentDialog(candidate.id)}
+                                            onClick={() => openAddCommentDialog(candidate)}
                                         >
                                             <AddCommentIcon />
                                         </IconButton>
@@ -840,7 +888,7 @@ const JobCandidatesPage = () => {
                             {showComments[candidate.id] && candidate.current_job_history_comments && candidate.current_job_history_comments.length > 0 && (
                                 <Box sx={{ mt: 2, borderTop: `1px solid ${theme.palette.divider}`, pt: 2 }}>
                                     <Typography variant="subtitle1" gutterBottom>Observaciones:</Typography>
-                                    {candidate.current_job_history_comments
+                                    {candidateComments(candidate)
                                         .sort((a, b) => dayjs(b.created_at).diff(dayjs(a.created_at))) // Sort by most recent
                                         .map(comment => {
                                             const { icon, color } = getCommentIconAndColor(comment.type);
@@ -859,6 +907,11 @@ const JobCandidatesPage = () => {
                                                 </Box>
                                             );
                                         })}
+                                    {candidateComments(candidate).length < (candidate.current_job_history_comments_count || 0) && (
+                                        <Button size="small" onClick={() => loadOlderComments(candidate)} sx={{ mt: 1 }}>
+                                            Ver observaciones anteriores
+                                        </Button>
+                                    )}
                                 </Box>
                             )}
                             {/* If no comments and comments are shown, display a message */}
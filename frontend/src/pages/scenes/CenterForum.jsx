@@ -34,6 +34,7 @@ import {
 import { useSelector } from 'react-redux';
 import axios from '../../api';
 import useDocumentTitle from '../../hooks/useDocumentTitle';
+import { uploadFile } from '../../utils/uploads';
 import { DeleteConfirmDialog } from '../../components/DeleteConfirmDialog';
 
 function stringToColor(string) {
@@ -682,6 +683,7 @@ const CenterForum = () => {
     useDocumentTitle('Foro de Centros');
 
     const [topics, setTopics] = useState([]);
+    const [nextTopicsUrl, setNextTopicsUrl] = useState(null);
     const [selectedTopic, setSelectedTopic] = useState(null);
     const [showNewTopic, setShowNewTopic] = useState(false);
     const [showReplyDialog, setShowReplyDialog] = useState(false);
@@ -708,11 +710,30 @@ const CenterForum = () => {
         fetchTopics();
     }, []);
 
+    // Listado por cursor: la primera página trae los temas fijados aparte
     const fetchTopics = async () => {
         try {
             setLoading(true);
             const res = await axios.get('api/communications/forum/topics/');
-            setTopics(res.data);
+            setTopics([...(res.data.pinned || []), ...res.data.results]);
+            setNextTopicsUrl(res.data.next);
+        } catch (error) {
+            console.error('Error fetching topics:', error);
+        } finally {
+            setLoading(false);
+        }
+    };
+
+    const fetchMoreTopics = async () => {
+        if (!nextTopicsUrl) return;
+        try {
+            setLoading(true);
+            const res = await axios.get(nextTopicsUrl);
+            setTopics((prev) => {
+                const seen = new Set(prev.map((t) => t.id));
+                return [...prev, ...res.data.results.filter((t) => !seen.has(t.id))];
+            });
+            setNextTopicsUrl(res.data.next);
         } catch (error) {
             console.error('Error fetching topics:', error);
         } finally {
@@ -743,13 +764,13 @@ const CenterForum = () => {
             formData.append('title', newTopicForm.title);
             formData.append('description', newTopicForm.description);
 
-            newTopicForm.files.forEach((file) => {
-                formData.append('files', file);
-            });
-
-            await axios.post('api/communications/forum/topics/', formData, {
+            const { data: topic } = await axios.post('api/communications/forum/topics/', formData, {
                 headers: { 'Content-Type': 'multipart/form-data' }
             });
+            // Los archivos van directo al storage por bloques
+            for (const file of newTopicForm.files) {
+                await uploadFile(file, 'forum_topic_file', topic.id);
+            }
 
             setNewTopicForm({ title: '', description: '', files: [] });
             setShowNewTopic(false);
@@ -779,9 +800,14 @@ const CenterForum = () => {
                 });
                 setEditingReply(null);
             } else {
-                await axios.post(`api/communications/forum/topics/${selectedTopic.id}/reply/`, formData, {
+                const replyData = new FormData();
+                replyData.append('content', replyForm.content);
+                const { data: reply } = await axios.post(`api/communications/forum/topics/${selectedTopic.id}/reply/`, replyData, {
                     headers: { 'Content-Type': 'multipart/form-data' }
                 });
+                for (const file of replyForm.files) {
+                    await uploadFile(file, 'forum_reply_file', reply.id);
+                }
             }
 
             setReplyForm({ content: '', files: [] });
@@ -938,6 +964,13 @@ const filteredTopics = topics.filter((topic) =>
       No se encontraron temas.
     </Typography>
   )}
+  {nextTopicsUrl && (
+    <Box display="flex" justifyContent="center" mt={2}>
+      <Button variant="outlined" onClick={fetchMoreTopics} disabled={loading}>
+        Cargar más temas
+      </Button>
+    </Box>
+  )}
 </Box>
 
 
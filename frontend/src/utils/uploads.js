@@ -0,0 +1,65 @@
+import axios from '../api';
+
+/**
+ * Direct-to-storage chunked uploads (backend api/uploads.py)
+ */
+
+const MAX_CHUNK_RETRIES = 3;
+
+const wait = (ms) => new Promise((resolve) => setTimeout(resolve, ms));
+
+/**
+ * Upload one chunk to its signed URL. The URL already carries its own
+ * signature (Azure SAS or a signed backend URL), so it goes out with fetch
+ * and without the Authorization header of the api instance.
+ */
+const putChunk = async (chunk, blob) => {
+  const response = await fetch(chunk.url, {
+    method: 'PUT',
+    body: blob,
+    headers: { 'Content-Type': 'application/octet-stream' },
+  });
+  if (!response.ok) {
+    throw new Error(`Chunk ${chunk.index} failed with status ${response.status}`);
+  }
+};
+
+/**
+ * Upload a file in chunks and attach it to its target.
+ * @param {File} file - File to upload
+ * @param {string} target - forum_topic_file, forum_reply_file, post_attachment, profile_photo or imagen_opcion
+ * @param {string|number} targetId - Id of the object that receives the file
+ * @param {Object} options - { onProgress(fraction), extra: fields sent on finalize }
+ * @returns {Promise<Object>} - { id, status, object_id, file_url }
+ */
+export const uploadFile = async (file, target, targetId, { onProgress, extra } = {}) => {
+  const { data: session } = await axios.post('api/uploads/', {
+    target,
+    target_id: targetId,
+    filename: file.name,
+    size: file.size,
+    content_type: file.type,
+  });
+
+  let status = session;
+  for (let attempt = 0; status.chunks.length > 0; attempt += 1) {
+    let done = status.chunk_count - status.chunks.length;
+    try {
+      for (const chunk of status.chunks) {
+        const start = chunk.index * status.chunk_size;
+        await putChunk(chunk, file.slice(start, start + chunk.size));
+        done += 1;
+        onProgress?.(done / status.chunk_count);
+      }
+      break;
+    } catch (error) {
+      if (attempt >= MAX_CHUNK_RETRIES) throw error;
+      await wait(1000 * 2 ** attempt);
+      // Resume: the session returns the received chunks and fresh URLs for the rest
+      ({ data: status } = await axios.get(`api/uploads/${session.id}/`));
+    }
+  }
+
+  const { data } = await axios.post(`api/uploads/${session.id}/finalize/`, extra || {});
+  return data;
+};
@@ -1,6 +1,6 @@
 import React, { useEffect, useRef, useState } from "react";
 import { useDispatch, useSelector } from "react-redux";
-import { addNotification, fetchNotifications } from "../features/notifications/notificationsSlice";
+import { addNotification, fetchNotifications, setUnreadCount } from "../features/notifications/notificationsSlice";
 import { setUser, checkAndRefreshToken } from "../features/auth/authSlice";
 import { ACCESS_TOKEN, AUTH_TYPE, SOUND_ALERT } from "../constants";
 import { loginRequest } from "../auth-config";
@@ -21,6 +21,16 @@ const WebSocketProvider = ({ instance, children }) => {
   const [isProviderInitializing, setIsProviderInitializing] = useState(true);
   const debounceTimeoutRef = useRef(null);
   const isAuthenticated = useSelector((state) => state.auth.isAuthenticated);
+  // Highest notification id seen; sent as `after` on reconnect so the server
+  // replays only what was missed instead of the client refetching the list
+  const lastNotificationId = useSelector((state) =>
+    state.notifications.notifications.reduce((max, n) => Math.max(max, n.id), 0)
+  );
+  const lastNotificationIdRef = useRef(0);
+
+  useEffect(() => {
+    lastNotificationIdRef.current = Math.max(lastNotificationIdRef.current, lastNotificationId);
+  }, [lastNotificationId]);
 
   // Helper function to check if token is expired
   const isTokenExpired = (token) => {
@@ -97,7 +107,10 @@ const WebSocketProvider = ({ instance, children }) => {
         }
 
         console.log(`[${type}] Creating WebSocket connection with fresh token`);
-        return new WebSocket(`${url}?token=${token}`);
+        const after = type === "notifications" && lastNotificationIdRef.current
+          ? `&after=${lastNotificationIdRef.current}`
+          : "";
+        return new WebSocket(`${url}?token=${token}${after}`);
       } catch (err) {
         console.error(`[${type}] Token fetch failed during WebSocket connection:`, err);
         setIsWsConnecting(false);
@@ -132,17 +145,26 @@ const WebSocketProvider = ({ instance, children }) => {
         socket.onmessage = (event) => {
           const data = JSON.parse(event.data);
           if (type === "notifications" && data.type === "notification") {
+            lastNotificationIdRef.current = Math.max(lastNotificationIdRef.current, data.cursor ?? data.id);
             dispatch(addNotification({
               id: data.id,
               message: data.message,
               link: data.link,
               created_at: data.created_at,
+              is_read: data.is_read,
             }));
-            if (!localStorage.getItem(SOUND_ALERT) || localStorage.getItem(SOUND_ALERT) === 'true') {
+            if (!data.replayed && (!localStorage.getItem(SOUND_ALERT) || localStorage.getItem(SOUND_ALERT) === 'true')) {
               const notificationSound = new Audio('../../assets/sounds/notification.wav');
               notificationSound.volume = 0.3;
               notificationSound.play().catch(e => console.error("Sound error:", e));
             }
+          } else if (type === "notifications" && data.type === "unread_count") {
+            dispatch(setUnreadCount(data.count));
+          } else if (type === "notifications" && data.type === "replay_done") {
+            dispatch(setUnreadCount(data.unread_count));
+          } else if (type === "notifications" && data.type === "resync") {
+            // Too many missed notifications to replay: reload the first page
+            dispatch(fetchNotifications());
           } else if (type === "userUpdates" && data.type === "user_update") {
             dispatch(setUser(data.data));
           }